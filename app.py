@@ -25,6 +25,9 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware
 from models.settings_ini import ensure_settings_defaults
+from models.access_log import AccessLogMiddleware
+from models.tracing import TracingMiddleware
+from models.room_workers import RoomWorkerMiddleware
 from models.song import StreamSong, LocalSong
 
 # ============================================
@@ -39,6 +42,7 @@ from routers.state import (
     _get_resource_path,
 )
 
+from routers.dependencies import get_player_for_request, get_player_lock, get_playback_history
 from routers import player as player_router
 from routers import playlist as playlist_router
 from routers import search as search_router
@@ -66,6 +70,10 @@ def _init_default_settings_ini():
             },
             'cache': {
                 'url_cache_enabled': 'true',
+                'local_cache_dir': '',
+                'local_cache_max_mb': '4096',
+                'local_cache_prefetch': '3',
+                'local_cache_bandwidth_mbps': '40',
             },
             'backup': {
                 'enabled': 'true',
@@ -82,6 +90,22 @@ def _init_default_settings_ini():
             'room': {
                 'max_rooms': '10',
                 'idle_timeout': '3600',
+                'prewarm_pool_size': '0',
+                'ipc_dir': '/run/clubmusic',
+                'worker_shards': '0',
+            },
+            'library': {
+                'tag_scan_workers': '2',
+            },
+            'loudness': {
+                'enabled': 'true',
+                'target_lufs': '-16',
+            },
+            'diagnostics': {
+                'loop_watchdog': 'true',
+                'loop_block_threshold_ms': '100',
+                'tracing': 'true',
+                'traces_per_route': '10',
             },
         },
     )
@@ -99,19 +123,21 @@ def _init_default_settings_ini():
 
 def auto_fill_and_play_if_idle():
     """
-    后台守护线程：如果1分钟内没有歌曲播放且队列为空，自动随机选择10首歌填充并播放
-
-    改进：
-    - 随机池同时包含：所有非默认歌单、默认歌单（作为回退）和本地文件树
-    - 支持从歌单中包含网络歌曲(YouTube/http)及其不同字段名 (url, stream_url, id)
-    - 归一化歌曲条目为 dict: {url, title, type, duration?, thumbnail_url?}
-    - 去重基于 url
+    空闲自动填充：如果1分钟内没有歌曲播放且队列为空，自动加权抽取10首歌填充并播放
+
+    - 候选池（models.auto_fill）同时包含：所有非默认歌单、播放历史中的网络歌曲和本地文件树，
+      按来源版本增量维护，只重建发生变化的来源
+    - 抽样按播放历史加权：播放次数多、最近播放过的歌曲被选中的概率更低
+    - 就绪集合在后台预校验若干候选（本地文件存在 / YouTube 直链已缓存），填充时优先使用，
+      空闲后第一首无需等待 yt-dlp；播放失败的歌曲标记为不可用并跳过
+    - 空闲检测由默认 PLAYER 的状态广播驱动（IdleTrigger），不再轮询
     - 空闲阈值严格使用 60 秒（需求）
     """
     import time
-    import random
-    import re
     import configparser
+    from models.auto_fill import (
+        AutoFillCandidatePool, AutoFillReadySet, IdleTrigger, history_weight, play_failure_kind, validate_song,
+    )
 
     # 读取 [auto_fill] 配置
     _config = configparser.ConfigParser()
@@ -128,178 +154,21 @@ def auto_fill_and_play_if_idle():
 
     logger.info(f"[自动填充] 来源配置: 歌单={source_playlists}, 历史={source_history}, 本地={source_local}")
 
-    def build_youtube_url_from_id(video_id: str):
-        if not video_id:
-            return ""
-        if video_id.startswith("http"):
-            return video_id
-        return f"https://www.youtube.com/watch?v={video_id}"
-
-    def normalize_song_item(item):
-        """把不同来源的歌曲条目标准化为 dict（更鲁棒地包含网络歌曲）"""
-        try:
-            if not item:
-                return None
-
-            url = None
-            title = ""
-            typ = "local"
-            duration = 0
-            thumbnail = None
-
-            if isinstance(item, dict):
-                url = item.get("url") or item.get("stream_url") or item.get("rel") or item.get("path") or ""
-                title = item.get("title") or item.get("name") or item.get("media_title") or ""
-                duration = item.get("duration", 0)
-                thumbnail = item.get("thumbnail_url") or item.get("thumb") or None
-                typ = item.get("type") or item.get("song_type") or typ
-
-            else:
-                url = getattr(item, "url", None) or getattr(item, "stream_url", None) or getattr(item, "rel", None)
-                title = getattr(item, "title", None) or getattr(item, "name", None) or title
-                duration = getattr(item, "duration", duration)
-                thumbnail = getattr(item, "thumbnail_url", None) or getattr(item, "get_thumbnail_url", None)
-                typ = getattr(item, "type", None) or getattr(item, "stream_type", None) or typ
-
-            if not url:
-                vid = None
-                if isinstance(item, dict):
-                    vid = item.get("id") or item.get("video_id")
-                else:
-                    vid = getattr(item, "video_id", None) or getattr(item, "id", None)
-                if vid:
-                    url = build_youtube_url_from_id(vid)
-
-            if not url:
-                return None
-
-            url = str(url).strip()
-
-            if not typ or typ == "local":
-                if url.startswith("http://") or url.startswith("https://"):
-                    if "youtube.com" in url.lower() or "youtu.be" in url.lower():
-                        typ = "youtube"
-                    else:
-                        typ = "stream"
-                else:
-                    typ = "local"
-
-            return {
-                "url": url,
-                "title": title or os.path.splitext(os.path.basename(url))[0],
-                "type": typ,
-                "duration": duration or 0,
-                "thumbnail_url": thumbnail
-            }
-        except Exception as e:
-            logger.debug(f"[自动填充.normalize] 归一化条目失败: {e}")
-            return None
-
-    def get_all_available_songs():
-        """根据 settings.ini [auto_fill] 配置收集歌曲来源"""
-        all_songs = []
-
-        # 来源1: 用户歌单（排除 default 和 room_ 歌单）
-        if source_playlists:
-            try:
-                pls = PLAYLISTS_MANAGER.get_all()
-                logger.debug(f"[自动填充] 收集歌单数量: {len(pls)}")
-                for pl in pls:
-                    try:
-                        pid = getattr(pl, 'id', '')
-                        # 跳过 default 歌单和房间临时歌单
-                        if pid == DEFAULT_PLAYLIST_ID:
-                            continue
-                        if pid and PLAYLISTS_MANAGER.is_room_playlist(pid):
-                            continue
-                        if not getattr(pl, "songs", None):
-                            continue
-                        for s in pl.songs:
-                            norm = normalize_song_item(s)
-                            if norm and norm.get("url"):
-                                all_songs.append(norm)
-                    except Exception as e:
-                        logger.debug(f"[自动填充] 处理歌单 {getattr(pl,'id', '??')} 的歌曲失败: {e}")
-            except Exception as e:
-                logger.warning(f"[自动填充] 收集歌单歌曲失败: {e}")
-
-        # 来源2: 播放历史中的网络歌曲（YouTube / stream / http）
-        if source_history:
-            try:
-                history_items = []
-                try:
-                    history_items = PLAYBACK_HISTORY.get_all() if hasattr(PLAYBACK_HISTORY, 'get_all') else []
-                except Exception as he:
-                    logger.debug(f"[自动填充] 读取播放历史失败: {he}")
-
-                for h in history_items:
-                    try:
-                        if not h:
-                            continue
-                        url = h.get('url') if isinstance(h, dict) else None
-                        typ = (h.get('type') if isinstance(h, dict) else None) or ''
-                        if not url:
-                            continue
-                        url = str(url).strip()
-                        if typ in ('youtube', 'stream') or url.startswith('http'):
-                            song_entry = {
-                                'url': url,
-                                'title': h.get('title') if isinstance(h, dict) else os.path.basename(url),
-                                'type': typ or ('youtube' if 'youtube' in url.lower() or 'youtu.be' in url.lower() else 'stream'),
-                                'duration': h.get('duration', 0) if isinstance(h, dict) else 0,
-                                'thumbnail_url': h.get('thumbnail_url') if isinstance(h, dict) else None
-                            }
-                            all_songs.append(song_entry)
-                    except Exception as e:
-                        logger.debug(f"[自动填充] 处理播放历史项失败: {e}")
-            except Exception:
-                pass
-
-        # 来源3: 本地文件树
-        if source_local:
-            def collect_local(node):
-                items = []
-                if not node:
-                    return items
-                files = node.get("files") or []
-                for f in files:
-                    rel = f.get("rel") or f.get("path") or None
-                    name = f.get("name") or None
-                    if rel:
-                        items.append({
-                            "url": rel,
-                            "title": os.path.splitext(name or rel)[0],
-                            "type": "local",
-                            "duration": 0,
-                            "thumbnail_url": None
-                        })
-                for d in (node.get("dirs") or []):
-                    items.extend(collect_local(d))
-                return items
-
-            try:
-                tree = getattr(PLAYER, "local_file_tree", None)
-                if tree:
-                    all_songs.extend(collect_local(tree))
-            except Exception as e:
-                logger.debug(f"[自动填充] 收集本地文件失败: {e}")
-
-        # 去重并保持首个出现顺序；确保网络歌曲保留
-        seen = set()
-        unique = []
-        for s in all_songs:
-            url = s.get("url")
-            if not url:
-                continue
-            url_norm = url.strip()
-            if url_norm in seen:
-                continue
-            seen.add(url_norm)
-            s["url"] = url_norm
-            unique.append(s)
-
-        logger.debug(f"[自动填充] 候选总数: {len(unique)} (本地+网络+歌单聚合) -> youtube/stream count: {sum(1 for x in unique if x['type'] in ('youtube','stream'))}")
-        return unique
+    pool = AutoFillCandidatePool(
+        playlists_manager=PLAYLISTS_MANAGER,
+        history=PLAYBACK_HISTORY,
+        tree_fn=lambda: getattr(PLAYER, "local_file_tree", None),
+        # 跳过 default 歌单和房间临时歌单
+        skip_playlist_fn=lambda pid: pid == DEFAULT_PLAYLIST_ID or bool(pid and PLAYLISTS_MANAGER.is_room_playlist(pid)),
+        source_playlists=source_playlists,
+        source_history=source_history,
+        source_local=source_local,
+    )
+    ready_set = AutoFillReadySet(
+        pool,
+        validate_fn=lambda song: validate_song(song, music_dir=PLAYER.music_dir),
+        weight_fn_factory=lambda: history_weight(PLAYBACK_HISTORY),
+    )
 
     def fill_and_play():
         playlist = get_runtime_playlist(PLAYER)
@@ -308,38 +177,32 @@ def auto_fill_and_play_if_idle():
         if playlist.songs:
             return
 
-        candidates = get_all_available_songs()
-        if not candidates:
+        selected = ready_set.take(10)
+        if not selected:
             logger.info("[自动填充] 无可用候选歌曲，跳过填充")
             return
 
-        playable = [c for c in candidates if c.get("url")]
-        if not playable:
-            logger.info("[自动填充] 无有效 URL，跳过")
-            return
-
-        random.shuffle(playable)
-        selected = playable[:10]
-
-        import time as _time
+        now = int(time.time())
         for song in selected:
-            song_dict = {
+            playlist.songs.append({
                 "url": song.get("url"),
                 "title": song.get("title") or os.path.basename(song.get("url") or ""),
                 "type": song.get("type", "local"),
                 "duration": song.get("duration", 0),
                 "thumbnail_url": song.get("thumbnail_url") or None,
-                "ts": int(_time.time())
-            }
-            playlist.songs.append(song_dict)
+                "ts": now
+            })
 
-        playlist.updated_at = _time.time()
+        playlist.updated_at = time.time()
         logger.info(f"[自动填充] 已添加 {len(selected)} 首歌曲到运行时队列 (包含网络歌曲: {sum(1 for x in selected if x['type'] in ('youtube','stream'))})")
         state._broadcast_from_thread(playlist_updated=True)
 
         try:
-            first = playlist.songs[0]
-            if first:
+            # 队首播放失败时按失败类型屏蔽并顺延（最多尝试 3 首）
+            for _ in range(3):
+                if not playlist.songs:
+                    break
+                first = playlist.songs[0]
                 url = first.get("url")
                 title = first.get("title", url)
                 typ = first.get("type", "local")
@@ -348,7 +211,7 @@ def auto_fill_and_play_if_idle():
                     s = StreamSong(stream_url=url, title=title, duration=duration)
                 else:
                     s = LocalSong(file_path=url, title=title)
-                PLAYER.play(
+                ok = PLAYER.play(
                     s,
                     mpv_command_func=PLAYER.mpv_command,
                     mpv_pipe_exists_func=PLAYER.mpv_pipe_exists,
@@ -357,84 +220,56 @@ def auto_fill_and_play_if_idle():
                     save_to_history=True,
                     mpv_cmd=PLAYER.mpv_cmd
                 )
-                PLAYER.current_index = 0
-                logger.info("[自动填充] 自动播放已启动（第一首）")
+                if ok:
+                    PLAYER.current_index = 0
+                    logger.info("[自动填充] 自动播放已启动（第一首）")
+                    break
+                ready_set.mark_failed(url, play_failure_kind(first, PLAYER.music_dir))
+                playlist.songs.pop(0)
+                playlist.updated_at = time.time()
+                state._broadcast_from_thread(playlist_updated=True)
         except Exception as e:
             logger.error(f"[自动填充] 自动播放第一首失败: {e}")
 
-    def monitor():
-        import time as _time
-        logger.info("[自动填充] 后台自动填充线程已启动")
-        last_play_ts = _time.time()
-        IDLE_SECONDS = 60
-        while True:
-            try:
-                playlist = get_runtime_playlist(PLAYER)
-                is_playing = bool(PLAYER.current_meta and PLAYER.current_meta.get("url"))
-                if is_playing:
-                    last_play_ts = _time.time()
-                elif (not playlist or not playlist.songs) and (_time.time() - last_play_ts > IDLE_SECONDS):
-                    logger.info("[自动填充] 检测到空闲超过1分钟且队列为空，自动填充并播放")
-                    fill_and_play()
-                    last_play_ts = _time.time()
-                _time.sleep(10)
-            except Exception as e:
-                logger.error(f"[自动填充] 线程异常: {e}")
-                import time as _t
-                _t.sleep(10)
+    def is_idle():
+        playlist = get_runtime_playlist(PLAYER)
+        is_playing = bool(PLAYER.current_meta and PLAYER.current_meta.get("url"))
+        return not is_playing and (not playlist or not playlist.songs)
 
-    t = threading.Thread(target=monitor, daemon=True, name="AutoFillIdleThread")
-    t.start()
+    def on_idle():
+        logger.info("[自动填充] 检测到空闲超过1分钟且队列为空，自动填充并播放")
+        fill_and_play()
+
+    trigger = IdleTrigger(is_idle, on_idle, idle_seconds=60)
+    state.add_main_state_listener(trigger.notify)
+    trigger.notify()
+    ready_set.schedule_refresh(5)
+    logger.info("[自动填充] 空闲触发器已启用（由播放状态变化驱动）")
 
 
 # ============================================
-# 空闲房间自动清理
+# 房间后台维护
 # ============================================
 
-def _start_idle_room_monitor():
-    """后台线程：定期检查并清理空闲超时的房间。"""
-    import time as _time
-    import configparser as _cfgparser
-
-    _cfg = _cfgparser.ConfigParser()
-    _cfg.read("settings.ini", encoding="utf-8")
-    idle_timeout = _cfg.getint("room", "idle_timeout", fallback=3600)
+def _start_room_health_monitor():
+    """后台线程：定期刷新各房间状态快照（MPV 进程/管道/PCM 输出健康检查）。
 
-    if idle_timeout <= 0:
-        logger.info("[RoomMonitor] 空闲清理已禁用 (idle_timeout <= 0)")
-        return
+    /room/list 与 /room/{id}/status 只读取快照，检测开销集中在此线程。
+    """
+    import time as _time
+    from routers.state import ROOM_HEALTH_CHECK_INTERVAL, refresh_all_room_status_snapshots
 
     def _monitor():
-        logger.info(f"[RoomMonitor] 空闲房间清理线程已启动 (timeout={idle_timeout}s)")
+        logger.info(f"[RoomHealth] 房间健康检查线程已启动 (interval={ROOM_HEALTH_CHECK_INTERVAL}s)")
         while True:
             try:
-                _time.sleep(60)  # 每分钟检查一次
-                now = _time.time()
-                from routers.state import (
-                    ROOM_PLAYERS, _room_players_lock,
-                    ROOM_LAST_ACTIVITY, ROOM_HISTORIES,
-                )
-                # 收集超时房间
-                expired = []
-                with _room_players_lock:
-                    for room_id in list(ROOM_PLAYERS.keys()):
-                        last = ROOM_LAST_ACTIVITY.get(room_id, 0)
-                        if now - last > idle_timeout:
-                            expired.append(room_id)
-
-                for room_id in expired:
-                    with _room_players_lock:
-                        player = ROOM_PLAYERS.pop(room_id, None)
-                    if player:
-                        player.destroy_room_player()
-                        ROOM_HISTORIES.pop(room_id, None)
-                        ROOM_LAST_ACTIVITY.pop(room_id, None)
-                        logger.info(f"[RoomMonitor] 已清理空闲房间: {room_id}")
+                _time.sleep(ROOM_HEALTH_CHECK_INTERVAL)
+                refresh_all_room_status_snapshots()
             except Exception as e:
-                logger.error(f"[RoomMonitor] 异常: {e}")
+                logger.error(f"[RoomHealth] 异常: {e}")
                 _time.sleep(10)
 
-    threading.Thread(target=_monitor, daemon=True, name="RoomIdleMonitor").start()
+    threading.Thread(target=_monitor, daemon=True, name="RoomHealthMonitor").start()
 
 
 # ============================================
@@ -453,13 +288,75 @@ async def lifespan(app: FastAPI):
     from models.backup import backup_manager as _backup_manager
     _backup_manager.start()
 
-    # 启动空闲房间清理线程
-    _start_idle_room_monitor()
+    # 打开播放统计库（首次启用时从播放历史导入已有时间戳）
+    from models.play_stats import play_stats as _play_stats
+    try:
+        _play_stats.open(os.path.join(PLAYER.data_dir, "play_events.db"))
+        _play_stats.backfill_from_history(PLAYBACK_HISTORY)
+    except Exception as e:
+        logger.warning(f"[PlayStats] 播放统计库初始化失败，统计功能不可用: {e}")
+
+    # 加载 YouTube 响度缓存（本地歌曲的响度随标签索引扫描分析）
+    from models.loudness import loudness as _loudness
+    _loudness.cache_file = os.path.join(PLAYER.data_dir, "loudness.json")
+    _loudness.load()
+
+    # 启用本地标签索引：加载缓存并在后台扫描变化的文件
+    from models.tag_index import tag_index as _tag_index, iter_tree_rels as _iter_tree_rels
+    _tag_index.cache_file = os.path.join(PLAYER.data_dir, "tag_index.json")
+    _tag_index.load()
+    _tag_index.schedule_scan(PLAYER.music_dir, _iter_tree_rels(getattr(PLAYER, "local_file_tree", None)))
+
+    # 启用空闲房间回收（按到期时间调度，无轮询线程）
+    state.start_room_reaper()
+    _start_room_health_monitor()
+
+    # 启动 RoomPlayer MPV 预热池
+    from models.mpv_pool import room_mpv_pool as _room_mpv_pool
+    _room_mpv_pool.start()
+
+    # 启动房间工作进程（worker_shards > 0 时 RoomPlayer 运行在独立进程中）
+    from models.room_workers import room_workers as _room_workers
+    _room_workers.start(
+        event_fn=state.broadcast_room_message_from_thread,
+        playlists_manager=PLAYLISTS_MANAGER,
+        loop=asyncio.get_running_loop(),
+    )
+
+    # 事件循环延迟采样（导出到 /metrics）
+    from models.metrics import event_loop_lag_monitor
+    _loop_lag_task = asyncio.create_task(event_loop_lag_monitor())
+
+    # 事件循环阻塞检测（抓取阻塞调用栈，见 /diagnostic/loop-blocks）
+    from models.loop_watchdog import loop_watchdog as _loop_watchdog
+    _loop_watchdog.start(asyncio.get_running_loop())
 
     yield  # 应用运行期间
 
     # 关闭事件
     logger.info("应用正在关闭...")
+    _loop_lag_task.cancel()
+    _loop_watchdog.stop()
+
+    # 写入延迟保存中的播放历史
+    try:
+        PLAYBACK_HISTORY.flush()
+    except Exception as e:
+        logger.warning(f"[Shutdown] 保存播放历史失败: {e}")
+
+    from models.play_stats import play_stats as _play_stats
+    _play_stats.close()
+
+    from models.loudness import loudness as _loudness
+    _loudness.shutdown()
+
+    # 结束预热池中的空闲 MPV
+    from models.mpv_pool import room_mpv_pool as _room_mpv_pool
+    _room_mpv_pool.shutdown()
+
+    # 通知房间工作进程销毁房间并退出
+    from models.room_workers import room_workers as _room_workers
+    _room_workers.stop()
 
     # 关闭所有 RoomPlayer（自定义房间的 MPV 进程）
     from routers.state import ROOM_PLAYERS, _room_players_lock, ROOM_HISTORIES, ROOM_LAST_ACTIVITY
@@ -512,6 +409,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# 房间工作进程路由（最内层：room_id 指向工作进程房间的请求整体转发，外层日志/追踪照常记录）
+app.add_middleware(
+    RoomWorkerMiddleware,
+    dependencies=(get_player_for_request, get_player_lock, get_playback_history),
+    touch_fn=state.touch_room_activity,
+)
+
 # 添加 CORS 中间件（允许跨域请求）
 # 注意：allow_credentials=True 与 allow_origins=["*"] 不兼容（浏览器会拒绝）
 # 本应用无认证机制，因此不需要 credentials 支持
@@ -548,6 +452,13 @@ async def add_security_headers(request: Request, call_next):
     return response
 
 
+# 请求追踪中间件（为每个请求建立 Trace，span 随 contextvars 传播到 player / mpv / yt-dlp）
+app.add_middleware(TracingMiddleware)
+
+# 访问日志采样中间件（最外层，耗时包含其他中间件）
+app.add_middleware(AccessLogMiddleware)
+
+
 # ============================================
 # 挂载路由
 # ============================================
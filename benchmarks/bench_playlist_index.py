@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+歌单 URL 索引基准：对比线性扫描去重与 SongList 索引的添加/查找耗时
+
+用法：
+  python benchmarks/bench_playlist_index.py [--songs 10000] [--json]
+"""
+
+import sys
+
+# Ensure stdout uses UTF-8 on Windows consoles.
+if sys.stdout and sys.stdout.encoding and sys.stdout.encoding.lower() != "utf-8":
+    try:
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+    except Exception:
+        pass
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from models.playlists import Playlist
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark playlist URL index operations.")
+    parser.add_argument("--songs", type=int, default=10000, help="Number of songs to add.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    return parser.parse_args()
+
+
+def make_songs(count: int) -> list:
+    return [
+        {"url": f"/music/artist-{i % 97}/track-{i:06d}.mp3", "title": f"Track {i}", "type": "local"}
+        for i in range(count)
+    ]
+
+
+def bench_linear_add(songs: list) -> float:
+    """旧实现：每次添加前线性扫描去重（O(n²)）"""
+    items = []
+    start = time.perf_counter()
+    for song in songs:
+        url = song["url"]
+        if not any(isinstance(s, dict) and s.get("url") == url for s in items):
+            items.append(song)
+    return time.perf_counter() - start
+
+
+def bench_indexed_add(songs: list) -> float:
+    """逐首添加：contains_url O(1) 去重 + 尾部追加"""
+    playlist = Playlist(playlist_id="bench", name="bench")
+    start = time.perf_counter()
+    for song in songs:
+        if not playlist.contains_url(song["url"]):
+            playlist.songs.append(song)
+    return time.perf_counter() - start
+
+
+def bench_batch_add(songs: list) -> float:
+    """批量添加：add_songs 一次遍历去重"""
+    playlist = Playlist(playlist_id="bench", name="bench")
+    start = time.perf_counter()
+    playlist.add_songs(songs)
+    return time.perf_counter() - start
+
+
+def bench_lookup(songs: list, lookups: int = 1000) -> dict:
+    """模拟 handle_playback_end：查找当前 URL 位置"""
+    playlist = Playlist(playlist_id="bench", name="bench", songs=list(songs))
+    targets = [songs[(i * 7919) % len(songs)]["url"] for i in range(lookups)]
+
+    start = time.perf_counter()
+    for url in targets:
+        next((idx for idx, s in enumerate(playlist.songs) if s.get("url") == url), -1)
+    linear = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for url in targets:
+        playlist.index_of_url(url)
+    indexed = time.perf_counter() - start
+    return {"linear_s": linear, "indexed_s": indexed, "lookups": lookups}
+
+
+def main():
+    args = parse_args()
+    songs = make_songs(args.songs)
+    results = {
+        "songs": args.songs,
+        "linear_add_s": bench_linear_add(songs),
+        "indexed_add_s": bench_indexed_add(songs),
+        "batch_add_s": bench_batch_add(songs),
+        "lookup": bench_lookup(songs),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"songs: {args.songs}")
+    print(f"  linear dedup add : {results['linear_add_s'] * 1000:9.1f} ms")
+    print(f"  indexed add      : {results['indexed_add_s'] * 1000:9.1f} ms")
+    print(f"  add_songs batch  : {results['batch_add_s'] * 1000:9.1f} ms")
+    lookup = results["lookup"]
+    print(f"  {lookup['lookups']} lookups linear : {lookup['linear_s'] * 1000:9.1f} ms")
+    print(f"  {lookup['lookups']} lookups index  : {lookup['indexed_s'] * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
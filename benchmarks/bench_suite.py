@@ -0,0 +1,438 @@
+# -*- coding: utf-8 -*-
+"""
+离线基准套件：假 MPV（Unix socket JSON IPC）+ 假 yt-dlp + 合成曲库，在普通 Linux 上测量关键路径
+
+场景：
+  status          /status 轮询（每次 4 个 IPC 属性查询）
+  next_local      /next 切到本地歌曲
+  next_stream     /next 切到 YouTube 歌曲（假 yt-dlp 解析直链，含下一首的后台预获取）
+  search          本地搜索（search_local + 标签补全；YouTube 搜索走 yt_dlp 模块，不在离线范围内）
+  room_init       /room/init 冷启动（PATH 中的 mpv 包装为假 MPV 进程，经 Unix socket 等待 IPC 就绪），附各阶段平均耗时
+  ws_fanout       WebSocket 状态广播扇出
+  playlist_batch  /playlist_batch 批量插入/移动/删除
+
+运行时切换到临时工作目录（settings.ini 仅写入 [room] ipc_dir 指向临时 socket 目录，其余取默认值；
+历史/歌单文件不写入仓库）。
+结果为 JSON（--json 打印，--output 写文件），便于跨版本对比回归。
+
+用法：
+  python benchmarks/bench_suite.py [--scenarios status,next_local] [--mpv-latency-ms 1]
+                                   [--ytdlp-delay-ms 300] [--json] [--output results.json]
+"""
+
+import sys
+
+# Ensure stdout uses UTF-8 on Windows consoles.
+if sys.stdout and sys.stdout.encoding and sys.stdout.encoding.lower() != "utf-8":
+    try:
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+    except Exception:
+        pass
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.fake_mpv import FakeMpvServer
+from benchmarks.music_tree import make_music_tree
+
+SCENARIOS = ("status", "next_local", "next_stream", "search", "room_init", "ws_fanout", "playlist_batch")
+SEARCH_QUERIES = ("night", "夜曲", "album 03", "artist 012", "晴天 01", "no-such-track")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline ClubMusic benchmark suite (fake mpv / fake yt-dlp).")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run.")
+    parser.add_argument("--iterations", type=int, default=200, help="Iterations for status/ws/playlist scenarios.")
+    parser.add_argument("--next-iterations", type=int, default=30, help="Track changes for next_local.")
+    parser.add_argument("--stream-iterations", type=int, default=8, help="Track changes for next_stream.")
+    parser.add_argument("--search-iterations", type=int, default=20, help="Repetitions per search query.")
+    parser.add_argument("--rooms", type=int, default=5, help="Rooms created (and destroyed) for room_init.")
+    parser.add_argument("--mpv-latency-ms", type=float, default=1.0, help="Fake mpv delay per IPC command.")
+    parser.add_argument("--ytdlp-delay-ms", type=float, default=300.0, help="Fake yt-dlp delay per invocation.")
+    parser.add_argument("--ytdlp-jitter-ms", type=float, default=0.0, help="Random +/- jitter for fake yt-dlp.")
+    parser.add_argument("--artists", type=int, default=40, help="Synthetic library: artists.")
+    parser.add_argument("--albums", type=int, default=5, help="Synthetic library: albums per artist.")
+    parser.add_argument("--tracks", type=int, default=12, help="Synthetic library: tracks per album.")
+    parser.add_argument("--ws-clients", type=int, default=50, help="WebSocket clients for ws_fanout.")
+    parser.add_argument("--ws-send-delay-ms", type=float, default=0.2, help="Per-client send delay for ws_fanout.")
+    parser.add_argument("--queue-songs", type=int, default=2000, help="Queue size for playlist_batch.")
+    parser.add_argument("--batch-size", type=int, default=50, help="Songs inserted/removed per batch.")
+    parser.add_argument("--log-level", default="ERROR", help="Log level for application loggers (stderr).")
+    parser.add_argument("--keep-workdir", action="store_true", help="Do not delete the temporary work directory.")
+    parser.add_argument("--output", help="Write JSON results to this file.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    return parser.parse_args()
+
+
+def summarize(samples: list) -> dict:
+    """秒级样本 → 毫秒统计"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    total = sum(ordered)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(total / len(ordered) * 1000, 3),
+        "p50_ms": round(pct(50), 3),
+        "p95_ms": round(pct(95), 3),
+        "p99_ms": round(pct(99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "ops_per_s": round(len(ordered) / total, 1) if total else 0.0,
+    }
+
+
+def install_fake_ytdlp(bin_dir: Path, args):
+    """在 bin_dir 生成名为 yt-dlp 的包装脚本并放到 PATH 最前面"""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    wrapper = bin_dir / "yt-dlp"
+    wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{BENCH_DIR / "fake_ytdlp.py"}" "$@"\n', encoding="utf-8")
+    wrapper.chmod(0o755)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+    os.environ["FAKE_YTDLP_DELAY_MS"] = str(args.ytdlp_delay_ms)
+    os.environ["FAKE_YTDLP_JITTER_MS"] = str(args.ytdlp_jitter_ms)
+
+
+def install_fake_mpv(bin_dir: Path, args):
+    """在 bin_dir 生成名为 mpv 的包装脚本（RoomPlayer 在非 Windows 平台使用 PATH 中的 mpv）"""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    wrapper = bin_dir / "mpv"
+    wrapper.write_text(
+        f'#!/bin/sh\nexec "{sys.executable}" "{BENCH_DIR / "fake_mpv.py"}" --latency-ms={args.mpv_latency_ms} "$@"\n',
+        encoding="utf-8",
+    )
+    wrapper.chmod(0o755)
+
+
+def write_settings(workdir: Path, socket_dir: Path):
+    """房间 IPC socket 放到临时目录（[room] ipc_dir），避免写入 /run/clubmusic"""
+    socket_dir.mkdir(parents=True, exist_ok=True)
+    (workdir / "settings.ini").write_text(f"[room]\nipc_dir = {socket_dir}\n", encoding="utf-8")
+
+
+class BenchRequest:
+    """路由函数所需的最小 Request 替身（来源描述只读取 client/headers）"""
+
+    client = None
+    headers = {}
+    query_params = {}
+
+
+class FakeWebSocket:
+    """模拟客户端：序列化消息并按 send_delay 让出事件循环"""
+
+    def __init__(self, send_delay: float):
+        self.send_delay = send_delay
+        self.sent_bytes = 0
+
+    async def accept(self):
+        return None
+
+    async def send_json(self, message: dict):
+        self.sent_bytes += len(json.dumps(message, ensure_ascii=False))
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+
+
+# ==================== 场景 ====================
+
+async def bench_status(ctx, args) -> dict:
+    from routers import player as player_router
+
+    samples = []
+    for _ in range(args.iterations):
+        started = time.perf_counter()
+        result = await player_router.get_status(None, ctx.player, None)
+        samples.append(time.perf_counter() - started)
+    return {**summarize(samples), "ok": result.get("status") == "OK"}
+
+
+async def _bench_next(ctx, songs: list, iterations: int) -> dict:
+    from routers import player as player_router
+
+    player = ctx.player
+    player.runtime_queue.songs = songs
+    player.current_meta = {}
+    player.loop_mode = 0
+    samples, failures = [], 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = await player_router.next_track(BenchRequest(), player, ctx.playlists, ctx.history, player._lock)
+        samples.append(time.perf_counter() - started)
+        if not isinstance(result, dict) or result.get("status") != "OK":
+            failures += 1
+    return {**summarize(samples), "failures": failures}
+
+
+async def bench_next_local(ctx, args) -> dict:
+    songs = [{"url": rel, "title": Path(rel).stem, "type": "local"} for rel in ctx.rels[: args.next_iterations + 1]]
+    return await _bench_next(ctx, songs, args.next_iterations)
+
+
+async def bench_next_stream(ctx, args) -> dict:
+    songs = [
+        {"url": f"https://www.youtube.com/watch?v=bench{i:06d}", "title": f"Bench {i}", "type": "youtube"}
+        for i in range(args.stream_iterations + 1)
+    ]
+    result = await _bench_next(ctx, songs, args.stream_iterations)
+    return {**result, "ytdlp_delay_ms": args.ytdlp_delay_ms}
+
+
+async def bench_search(ctx, args) -> dict:
+    from models.tag_index import tag_index
+
+    per_query, all_samples = {}, []
+    for query in SEARCH_QUERIES:
+        samples = []
+        for _ in range(args.search_iterations):
+            started = time.perf_counter()
+            results = [
+                tag_index.enrich_song(item)
+                for item in ctx.player.search_local(query, max_results=ctx.player.local_search_max_results)
+            ]
+            samples.append(time.perf_counter() - started)
+        per_query[query] = {**summarize(samples), "results": len(results)}
+        all_samples.extend(samples)
+    return {**summarize(all_samples), "library_tracks": len(ctx.rels), "queries": per_query}
+
+
+async def bench_room_init(ctx, args) -> dict:
+    from models.api_contracts import RoomInitRequest
+    from models.metrics import ROOM_INIT_PHASE_SECONDS
+    from routers import room as room_router
+
+    phases_before = ROOM_INIT_PHASE_SECONDS.collect()
+    samples, failures = [], 0
+    for i in range(args.rooms):
+        room_id = f"bench-{i:03d}"
+        started = time.perf_counter()
+        result = await room_router.init_room(RoomInitRequest(room_id=room_id, default_volume=80))
+        samples.append(time.perf_counter() - started)
+        if not isinstance(result, dict) or result.get("status") != "ok":
+            failures += 1
+        await room_router.destroy_room(room_id)
+
+    phases = {}
+    for key, (_, total, count) in ROOM_INIT_PHASE_SECONDS.collect().items():
+        _, prev_total, prev_count = phases_before.get(key, (None, 0.0, 0))
+        if count > prev_count:
+            phases[key[0]] = round((total - prev_total) / (count - prev_count) * 1000, 3)
+    return {**summarize(samples), "failures": failures, "phase_mean_ms": phases}
+
+
+async def bench_ws_fanout(ctx, args) -> dict:
+    from routers import state
+
+    clients = [FakeWebSocket(args.ws_send_delay_ms / 1000) for _ in range(args.ws_clients)]
+    for ws in clients:
+        await state.ws_manager.connect(ws, None)
+    samples = []
+    try:
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            await state._broadcast_state(ctx.player)
+            samples.append(time.perf_counter() - started)
+    finally:
+        for ws in clients:
+            state.ws_manager.disconnect(ws)
+    return {
+        **summarize(samples),
+        "clients": args.ws_clients,
+        "message_bytes": clients[0].sent_bytes // max(1, args.iterations) if clients else 0,
+    }
+
+
+async def bench_playlist_batch(ctx, args) -> dict:
+    from models.api_contracts import PlaylistBatchRequest
+    from routers import playlist as playlist_router
+
+    player = ctx.player
+    player.runtime_queue.songs = [
+        {"url": f"bench/queue-{i:06d}.mp3", "title": f"Queue {i}", "type": "local"} for i in range(args.queue_songs)
+    ]
+    player.current_index = 0
+    samples, failures = [], 0
+    for n in range(args.iterations):
+        batch = [{"url": f"bench/batch-{n}-{i}.mp3", "title": f"Batch {i}", "type": "local"} for i in range(args.batch_size)]
+        operations = [{"op": "insert", "songs": batch, "index": 10}]
+        operations += [{"op": "move", "from_index": 20 + k, "to_index": args.queue_songs - 20 - k} for k in range(10)]
+        operations += [{"op": "remove", "url": song["url"]} for song in batch]
+        payload = PlaylistBatchRequest(operations=operations)
+        started = time.perf_counter()
+        result = await playlist_router.playlist_batch(payload, player, ctx.playlists, player._lock)
+        samples.append(time.perf_counter() - started)
+        if not isinstance(result, dict) or result.get("status") != "OK":
+            failures += 1
+    return {
+        **summarize(samples),
+        "failures": failures,
+        "queue_songs": args.queue_songs,
+        "operations_per_batch": len(operations),
+    }
+
+
+SCENARIO_FUNCS = {
+    "status": bench_status,
+    "next_local": bench_next_local,
+    "next_stream": bench_next_stream,
+    "search": bench_search,
+    "room_init": bench_room_init,
+    "ws_fanout": bench_ws_fanout,
+    "playlist_batch": bench_playlist_batch,
+}
+
+
+# ==================== 运行 ====================
+
+def build_context(workdir: Path, args) -> SimpleNamespace:
+    """合成曲库 + 假 MPV 服务器 + 连接到它的 PipePlayer"""
+    from models.loudness import loudness
+    from models.player import MusicPlayer
+    from models.playlist import PlayHistory
+    from models.playlists import Playlists
+
+    # 假直链无法被 ffmpeg 分析，跳过后台响度分析（施加增益的 IPC 命令仍计入）
+    loudness.analyze_video_later = lambda video_id, stream_url: None
+
+    music_root = workdir / "music"
+    rels = make_music_tree(str(music_root), args.artists, args.albums, args.tracks)
+    socket_dir = workdir / "sockets"
+    server = FakeMpvServer(str(socket_dir / "mpv-bench.sock"), latency_ms=args.mpv_latency_ms).start()
+
+    playlists = Playlists(str(workdir / "playlists.json"))
+    history = PlayHistory(max_size=500, file_path=str(workdir / "playback_history.json"))
+    player = MusicPlayer.create_pipe_player(
+        pipe_name=server.socket_path,
+        playlists_manager=playlists,
+        playback_history=history,
+        music_dir=str(music_root),
+    )
+    player.local_search_max_results = 20
+    return SimpleNamespace(
+        workdir=workdir, socket_dir=str(socket_dir), rels=rels, server=server,
+        playlists=playlists, history=history, player=player,
+    )
+
+
+async def run_scenarios(ctx, args, names: list) -> dict:
+    results = {}
+    for name in names:
+        commands_before = ctx.server.commands
+        started = time.perf_counter()
+        try:
+            result = await SCENARIO_FUNCS[name](ctx, args)
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        result["wall_s"] = round(time.perf_counter() - started, 3)
+        # 只写不读的命令（loadfile 等）由假 MPV 异步处理，计数前稍等其处理完
+        await asyncio.sleep(0.1 + args.mpv_latency_ms / 100)
+        result["mpv_commands"] = ctx.server.commands - commands_before
+        results[name] = result
+        if not args.json:
+            print(f"  {name:<15} {format_result(result)}", flush=True)
+    return results
+
+
+def format_result(result: dict) -> str:
+    if "error" in result:
+        return f"ERROR {result['error']}"
+    return (
+        f"n={result.get('count', 0):<5} mean={result.get('mean_ms', 0):9.2f} ms  "
+        f"p95={result.get('p95_ms', 0):9.2f} ms  max={result.get('max_ms', 0):9.2f} ms  "
+        f"{result.get('ops_per_s', 0):>9} ops/s"
+    )
+
+
+def configure_logging(level_name: str):
+    """导入 models.logger 会把根 logger 输出到 stdout；基准改为只向 stderr 输出指定级别以上的日志"""
+    from models.logger import shutdown_logging
+
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level_name.upper(), logging.ERROR))
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=5
+        )
+        return out.stdout.strip() if out.returncode == 0 else ""
+    except Exception:
+        return ""
+
+
+def main():
+    args = parse_args()
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIO_FUNCS]
+    if unknown:
+        print(f"unknown scenarios: {', '.join(unknown)} (available: {', '.join(SCENARIOS)})", file=sys.stderr)
+        sys.exit(2)
+
+    workdir = Path(tempfile.mkdtemp(prefix="clubmusic-bench-"))
+    original_cwd = os.getcwd()
+    os.chdir(workdir)
+    configure_logging(args.log_level)
+    install_fake_ytdlp(workdir / "bin", args)
+    install_fake_mpv(workdir / "bin", args)
+    write_settings(workdir, workdir / "sockets")
+    ctx = None
+    try:
+        ctx = build_context(workdir, args)
+        from routers.settings import APP_VERSION
+
+        if not args.json:
+            print(f"library: {len(ctx.rels)} tracks, mpv latency {args.mpv_latency_ms} ms, "
+                  f"yt-dlp delay {args.ytdlp_delay_ms} ms")
+        scenario_results = asyncio.run(run_scenarios(ctx, args, names))
+        ctx.player.destroy_pipe_player()
+    finally:
+        if ctx is not None:
+            ctx.server.stop()
+        os.chdir(original_cwd)
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "version": APP_VERSION,
+        "git_revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("json", "output", "keep_workdir")},
+        "scenarios": scenario_results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+假 MPV：在 Unix socket 上实现 mpv 的 JSON IPC（--input-ipc-server），供离线基准使用
+
+- 每条命令按 latency_ms 延迟后应答（模拟 mpv 主线程处理 IPC 的耗时）
+- get_property / set_property 读写内存属性表；loadfile 更新 path、media-title、duration，
+  并向所有连接广播 end-file(stop) / start-file / file-loaded 事件
+- 作为独立进程运行时接受并忽略其余 mpv 参数，可直接替代 mpv 可执行文件
+
+MusicPlayer 在非 Windows 平台经 models.mpv_ipc.UnixSocketTransport 直接连接这些 socket。
+
+用法：
+  python benchmarks/fake_mpv.py --input-ipc-server=/tmp/mpv.sock [--latency-ms 1.5]
+"""
+
+import sys
+
+# Ensure stdout uses UTF-8 on Windows consoles.
+if sys.stdout and sys.stdout.encoding and sys.stdout.encoding.lower() != "utf-8":
+    try:
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+    except Exception:
+        pass
+
+import argparse
+import json
+import os
+import signal
+import socket
+import threading
+import time
+
+
+class FakeMpvServer:
+    """线程化的 mpv JSON IPC 服务器（每个连接一个线程）。"""
+
+    def __init__(self, socket_path: str, latency_ms: float = 0.0):
+        self.socket_path = socket_path
+        self.latency = max(0.0, latency_ms) / 1000
+        self.properties = {
+            "pause": False,
+            "time-pos": 0.0,
+            "duration": 0.0,
+            "volume": 80,
+            "path": None,
+            "media-title": None,
+            "idle-active": True,
+            "ytdl-format": "bestaudio",
+        }
+        self.commands = 0
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._sock = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self.socket_path)
+        self._sock.listen(64)
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True, name="FakeMpvAccept")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        with self._lock:
+            clients, self._clients = list(self._clients), set()
+        for conn in clients:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+                conn.close()
+            except OSError:
+                pass
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._clients.add(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True, name="FakeMpvConn").start()
+
+    def _serve(self, conn):
+        try:
+            with conn.makefile("rb") as reader:
+                for line in reader:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        request = json.loads(line)
+                    except ValueError:
+                        continue
+                    if self.latency:
+                        time.sleep(self.latency)
+                    reply, events = self.handle(request)
+                    self._send(conn, reply)
+                    for event in events:
+                        self.broadcast(event)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._clients.discard(conn)
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _send(conn, obj: dict) -> bool:
+        try:
+            conn.sendall((json.dumps(obj) + "\n").encode("utf-8"))
+            return True
+        except OSError:
+            return False
+
+    def broadcast(self, event: dict):
+        with self._lock:
+            clients = list(self._clients)
+        for conn in clients:
+            self._send(conn, event)
+
+    def handle(self, request: dict):
+        """处理一条命令，返回 (应答, 需要广播的事件列表)"""
+        command = request.get("command") or []
+        reply = {"request_id": request.get("request_id", 0), "error": "success"}
+        events = []
+        name = command[0] if command else ""
+        with self._lock:
+            self.commands += 1
+            if name == "get_property" and len(command) > 1:
+                if command[1] in self.properties:
+                    reply["data"] = self.properties[command[1]]
+                else:
+                    reply["error"] = "property unavailable"
+            elif name == "set_property" and len(command) > 2:
+                self.properties[command[1]] = command[2]
+            elif name == "loadfile" and len(command) > 1:
+                target = str(command[1])
+                self.properties.update({
+                    "path": target,
+                    "media-title": os.path.basename(target.split("?")[0]) or target,
+                    "duration": 180.0,
+                    "time-pos": 0.0,
+                    "idle-active": False,
+                })
+                events = [
+                    {"event": "end-file", "reason": "stop"},
+                    {"event": "start-file"},
+                    {"event": "file-loaded"},
+                ]
+            elif name == "stop":
+                self.properties.update({"path": None, "idle-active": True})
+                events = [{"event": "end-file", "reason": "stop"}]
+        return reply, events
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fake mpv JSON IPC server on a Unix socket.")
+    parser.add_argument("--input-ipc-server", required=True, help="Unix socket path to listen on.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before each IPC reply.")
+    args, _unknown_mpv_args = parser.parse_known_args(argv)
+    return args
+
+
+def main():
+    args = parse_args()
+    server = FakeMpvServer(args.input_ipc_server, latency_ms=args.latency_ms).start()
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    try:
+        stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+假 yt-dlp：按 URLCache 使用的参数格式输出假直链与元数据，不访问网络
+
+- `-f bestaudio --print urls --print %(...)j URL` → 音频直链 + 元数据 JSON
+- `-g URL`                                     → 视频直链
+- `--version`                                  → 版本号
+延迟由环境变量控制（毫秒）：FAKE_YTDLP_DELAY_MS（默认 800）、FAKE_YTDLP_JITTER_MS（默认 0）；
+FAKE_YTDLP_FAIL_RATE（0~1）按比例返回非零退出码。
+
+bench_suite.py 会在临时 bin 目录生成名为 yt-dlp 的包装脚本并放到 PATH 最前面。
+
+用法：
+  FAKE_YTDLP_DELAY_MS=300 python benchmarks/fake_ytdlp.py -g "https://www.youtube.com/watch?v=abcdefghijk"
+"""
+
+import sys
+
+# Ensure stdout uses UTF-8 on Windows consoles.
+if sys.stdout and sys.stdout.encoding and sys.stdout.encoding.lower() != "utf-8":
+    try:
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+    except Exception:
+        pass
+
+import hashlib
+import json
+import os
+import random
+import time
+from urllib.parse import parse_qs, urlparse
+
+FAKE_VERSION = "2099.01.01-fake"
+
+
+def _video_id(url: str) -> str:
+    parsed = urlparse(url)
+    return parse_qs(parsed.query).get("v", [""])[0] or parsed.path.rstrip("/").rsplit("/", 1)[-1] or "unknown"
+
+
+def _direct_url(video_id: str, kind: str) -> str:
+    expire = int(time.time()) + 6 * 3600
+    sig = hashlib.sha1(f"{video_id}:{kind}".encode("utf-8")).hexdigest()[:16]
+    return f"https://rr1---sn-fake.googlevideo.com/videoplayback?id={video_id}&kind={kind}&expire={expire}&sig={sig}"
+
+
+def _delay():
+    delay_ms = float(os.environ.get("FAKE_YTDLP_DELAY_MS", "800"))
+    jitter_ms = float(os.environ.get("FAKE_YTDLP_JITTER_MS", "0"))
+    total = max(0.0, delay_ms + random.uniform(-jitter_ms, jitter_ms))
+    time.sleep(total / 1000)
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if "--version" in argv:
+        print(FAKE_VERSION)
+        return 0
+
+    urls = [arg for arg in argv if arg.startswith("http")]
+    if not urls:
+        print("ERROR: no URL given", file=sys.stderr)
+        return 2
+
+    _delay()
+    if random.random() < float(os.environ.get("FAKE_YTDLP_FAIL_RATE", "0")):
+        print("ERROR: [youtube] fake extraction failure", file=sys.stderr)
+        return 1
+
+    video_id = _video_id(urls[-1])
+    if "-g" in argv or "--get-url" in argv:
+        print(_direct_url(video_id, "video"))
+        return 0
+
+    print(_direct_url(video_id, "audio"))
+    if any(arg.startswith("%(") and arg.endswith(")j") for arg in argv):
+        print(json.dumps({"title": f"Fake Video {video_id}", "duration": 180, "uploader": "Fake Channel"}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+合成音乐目录：生成 艺术家/专辑/曲目 三层目录树（小体积占位文件），用于本地搜索、
+文件树构建与本地播放基准；文件名混合中英文，贴近真实曲库的搜索匹配
+
+用法：
+  python benchmarks/music_tree.py DEST [--artists 40] [--albums 5] [--tracks 12] [--json]
+"""
+
+import sys
+
+# Ensure stdout uses UTF-8 on Windows consoles.
+if sys.stdout and sys.stdout.encoding and sys.stdout.encoding.lower() != "utf-8":
+    try:
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+    except Exception:
+        pass
+
+import argparse
+import json
+import os
+
+EXTENSIONS = (".mp3", ".flac", ".m4a")
+_WORDS = ("Night", "夜曲", "River", "晴天", "Echo", "星空", "Drive", "稻香", "Neon", "海边", "Rain", "回忆")
+
+
+def make_music_tree(root: str, artists: int = 40, albums: int = 5, tracks: int = 12, file_bytes: int = 2048) -> list:
+    """在 root 下生成目录树，返回所有曲目的相对路径（/ 分隔）"""
+    rels = []
+    payload = b"\0" * file_bytes
+    for a in range(artists):
+        artist = f"Artist {a:03d} {_WORDS[a % len(_WORDS)]}"
+        for b in range(albums):
+            album = f"{_WORDS[(a + b) % len(_WORDS)]} Album {b + 1:02d}"
+            album_dir = os.path.join(root, artist, album)
+            os.makedirs(album_dir, exist_ok=True)
+            for t in range(tracks):
+                name = f"{t + 1:02d} - {_WORDS[(a * 7 + b * 3 + t) % len(_WORDS)]} {a:03d}{b:02d}{t:02d}"
+                file_name = name + EXTENSIONS[(a + t) % len(EXTENSIONS)]
+                with open(os.path.join(album_dir, file_name), "wb") as f:
+                    f.write(payload)
+                rels.append(f"{artist}/{album}/{file_name}")
+    return rels
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a synthetic music library tree.")
+    parser.add_argument("dest", help="Destination directory.")
+    parser.add_argument("--artists", type=int, default=40, help="Number of artist directories.")
+    parser.add_argument("--albums", type=int, default=5, help="Albums per artist.")
+    parser.add_argument("--tracks", type=int, default=12, help="Tracks per album.")
+    parser.add_argument("--file-bytes", type=int, default=2048, help="Size of each placeholder file.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rels = make_music_tree(args.dest, args.artists, args.albums, args.tracks, args.file_bytes)
+    if args.json:
+        print(json.dumps({"dest": os.path.abspath(args.dest), "tracks": len(rels)}, indent=2))
+        return
+    print(f"generated {len(rels)} tracks under {os.path.abspath(args.dest)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -519,4 +519,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包为 exe 时标签扫描进程池需要 freeze_support
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
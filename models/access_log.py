@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+访问日志采样 - ASGI 中间件，按匹配到的路由模板（如 /room/{room_id}/status）记录访问日志。
+
+- 高频轮询路由（[logging] filtered_paths）按确定性计数采样：每 round(1 / polling_sample_rate)
+  个请求记录一条，被采样掉的请求不会创建日志记录
+- 所有请求（包括未记录日志的）都计入按路由聚合的统计：次数、4xx/5xx、耗时
+- 统计通过 GET /diagnostic/access 查看
+"""
+
+import time
+import logging
+
+from models.logger import load_logging_config
+
+logger = logging.getLogger("clubmusic.access")
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RouteAccessStats:
+    """单个 (方法, 路由) 的聚合统计（只在事件循环线程中更新，无需加锁）"""
+
+    __slots__ = ("method", "route", "count", "logged", "client_errors", "server_errors", "total_ms", "max_ms")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.count = 0
+        self.logged = 0
+        self.client_errors = 0
+        self.server_errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "method": self.method,
+            "route": self.route,
+            "count": self.count,
+            "logged": self.logged,
+            "sampled_out": self.count - self.logged,
+            "client_errors": self.client_errors,
+            "server_errors": self.server_errors,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class AccessLogSampler:
+    """按路由确定性采样访问日志，并维护按路由的聚合统计。"""
+
+    def __init__(self, sampled_routes=None, sample_rate: float = None):
+        config = load_logging_config()
+        self.sampled_routes = set(config["filtered_paths"] if sampled_routes is None else sampled_routes)
+        rate = config["polling_sample_rate"] if sample_rate is None else sample_rate
+        # 每 N 个请求记录一条；采样率 <= 0 时高频路由完全不记录
+        self.sample_every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._stats = {}
+
+    def observe(self, method: str, route: str, status: int, duration_ms: float) -> bool:
+        """记录一次请求；返回是否输出了访问日志"""
+        key = (method, route)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = RouteAccessStats(method, route)
+        stats.count += 1
+        stats.total_ms += duration_ms
+        if duration_ms > stats.max_ms:
+            stats.max_ms = duration_ms
+        if status >= 500:
+            stats.server_errors += 1
+        elif status >= 400:
+            stats.client_errors += 1
+
+        if route in self.sampled_routes:
+            if not self.sample_every or (stats.count - 1) % self.sample_every:
+                return False
+        if not logger.isEnabledFor(logging.INFO):
+            return False
+        stats.logged += 1
+        logger.info("%s %s %d %.1fms", method, route, status, duration_ms)
+        return True
+
+    def snapshot(self) -> list:
+        """按请求次数降序返回各路由统计"""
+        return sorted((s.to_dict() for s in list(self._stats.values())), key=lambda s: s["count"], reverse=True)
+
+    def reset(self):
+        self._stats = {}
+
+
+access_sampler = AccessLogSampler()
+
+
+class AccessLogMiddleware:
+    """纯 ASGI 中间件：请求结束后按路由模板交给 AccessLogSampler（WebSocket 不计入）。"""
+
+    def __init__(self, app, sampler: AccessLogSampler = None):
+        self.app = app
+        self.sampler = sampler or access_sampler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 路由匹配后 FastAPI 会把 APIRoute 写入 scope["route"]；静态文件挂载等取挂载路径
+            route = getattr(scope.get("route"), "path", None) or scope.get("root_path") or UNMATCHED_ROUTE
+            self.sampler.observe(
+                scope.get("method", ""), route, status[0], (time.perf_counter() - started) * 1000
+            )
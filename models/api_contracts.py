@@ -201,6 +201,44 @@ class PlaybackHistoryResponse(BaseModel):
 
 class PlaybackHistoryMergedResponse(PlaybackHistoryResponse):
     count: int
+    offset: int | None = None
+    limit: int | None = None
+    next_offset: int | None = None
+
+
+class PlayStatsSongEntry(BaseModel):
+    url: str
+    title: str
+    plays: int
+    last_ts: int
+
+
+class PlayStatsTopResponse(BaseModel):
+    status: Literal["OK"]
+    since: int
+    room_id: str | None = None
+    songs: list[PlayStatsSongEntry] = Field(default_factory=list)
+
+
+class PlayStatsHourlyResponse(BaseModel):
+    status: Literal["OK"]
+    since: int
+    room_id: str | None = None
+    hours: list[int] = Field(default_factory=list)
+    total: int
+
+
+class PlayStatsRoomEntry(BaseModel):
+    room_id: str
+    plays: int
+    unique_songs: int
+    last_ts: int
+
+
+class PlayStatsRoomsResponse(BaseModel):
+    status: Literal["OK"]
+    since: int
+    rooms: list[PlayStatsRoomEntry] = Field(default_factory=list)
 
 
 class HistoryAddRequest(BaseModel):
@@ -264,6 +302,7 @@ class RoomStatusSnapshot(BaseModel):
     exists: bool
     mpv_running: bool
     pipe_exists: bool
+    output_ready: bool = False
     bot_ready: bool
     current_playlist_id: str
     current_index: int
@@ -311,6 +350,59 @@ class RoomListResponse(BaseModel):
     max: int
 
 
+class RoomResourceUsage(BaseModel):
+    room_id: str
+    mpv_pid: int | None = None
+    mpv_rss_bytes: int | None = None
+    threads: list[str] = Field(default_factory=list)
+    thread_count: int = 0
+    queue_length: int = 0
+    history_length: int = 0
+    url_cache_entries: int = 0
+    last_activity: float = 0
+    idle_seconds: float = 0
+
+
+class RoomDiagnosticsResponse(BaseModel):
+    status: Literal["ok"]
+    rooms: list[RoomResourceUsage] = Field(default_factory=list)
+    count: int
+    process_rss_bytes: int | None = None
+    process_thread_count: int
+    url_cache_entries: int
+    idle_timeout: int
+
+
+class RoomMigrateRequest(BaseModel):
+    shard: int | None = None
+
+
+class RoomMigrateResponse(BaseModel):
+    status: Literal["ok"]
+    room_id: str
+    from_shard: int
+    to_shard: int
+
+
+class RoomWorkerShard(BaseModel):
+    index: int
+    pid: int | None = None
+    alive: bool
+    disabled: bool
+    rooms: list[str] = Field(default_factory=list)
+    pending: int = 0
+    recent_crashes: int = 0
+
+
+class RoomWorkersResponse(BaseModel):
+    status: Literal["ok"]
+    enabled: bool
+    running: bool
+    restarts: int
+    room_count: int
+    shards: list[RoomWorkerShard] = Field(default_factory=list)
+
+
 class PlaylistNameRequest(BaseModel):
     name: str = ""
 
@@ -349,7 +441,37 @@ class PlaylistAddRequest(BaseModel):
 class PlaylistReorderRequest(BaseModel):
     from_index: int | None = None
     to_index: int | None = None
+    count: int | None = None
+    playlist_id: str | None = None
+
+
+class PlaylistBatchOperation(BaseModel):
+    op: Literal["add", "insert", "remove", "move"]
+    song: SongSnapshot | None = None
+    songs: list[SongSnapshot] | None = None
+    index: int | None = None
+    url: str | None = None
+    from_index: int | None = None
+    to_index: int | None = None
+    count: int | None = None
+
+
+class PlaylistBatchRequest(BaseModel):
     playlist_id: str | None = None
+    operations: list[PlaylistBatchOperation] = Field(default_factory=list)
+
+
+class PlaylistBatchResponse(BaseModel):
+    status: Literal["OK"]
+    playlist_id: str
+    applied: int
+    added: int
+    skipped: int
+    removed: int
+    added_urls: list[str] = Field(default_factory=list)
+    total: int
+    current_index: int
+    version: int
 
 
 class PlaylistUpdateRequest(BaseModel):
@@ -400,6 +522,11 @@ class PlaylistQueryResponse(BaseModel):
     playlist_id: str
     playlist_name: str
     current_index: int
+    total: int | None = None
+    version: int | None = None
+    offset: int | None = None
+    limit: int | None = None
+    next_offset: int | None = None
 
 
 class PlaylistSwitchInfo(BaseModel):
@@ -473,6 +600,8 @@ class AlbumSnapshot(BaseModel):
     track_count: int
     cover_path: str | None = None
     modified_at: float | None = None
+    artist: str | None = None
+    album: str | None = None
 
 
 class AlbumsResponse(BaseModel):
@@ -552,6 +681,72 @@ class DiagnosticInstanceStatusResponse(BaseModel):
     data: dict[str, Any]
 
 
+class AccessRouteStats(BaseModel):
+    method: str
+    route: str
+    count: int
+    logged: int
+    sampled_out: int
+    client_errors: int
+    server_errors: int
+    avg_ms: float
+    max_ms: float
+
+
+class DiagnosticAccessStatsResponse(BaseModel):
+    status: Literal["OK"]
+    sample_every: int
+    sampled_routes: list[str] = Field(default_factory=list)
+    routes: list[AccessRouteStats] = Field(default_factory=list)
+
+
+class LoopBlockOffender(BaseModel):
+    route: str
+    site: str
+    count: int
+    total_ms: float
+    max_ms: float
+    last_seen: float | None = None
+    stack: list[str] = Field(default_factory=list)
+
+
+class DiagnosticLoopBlocksResponse(BaseModel):
+    status: Literal["OK"]
+    enabled: bool
+    running: bool
+    threshold_ms: float
+    total_blocks: int
+    offenders: list[LoopBlockOffender] = Field(default_factory=list)
+
+
+class TraceSpan(BaseModel):
+    name: str
+    parent: int | None = None
+    start_ms: float
+    duration_ms: float
+    thread: int
+    attrs: dict[str, str] = Field(default_factory=dict)
+
+
+class RequestTrace(BaseModel):
+    trace_id: int
+    method: str
+    route: str
+    path: str
+    status: int
+    start_ts: float
+    duration_ms: float
+    spans: list[TraceSpan] = Field(default_factory=list)
+
+
+class DiagnosticTracesResponse(BaseModel):
+    status: Literal["OK"]
+    enabled: bool
+    per_route: int
+    routes: list[str] = Field(default_factory=list)
+    traces: list[RequestTrace] = Field(default_factory=list)
+
+
 class DiagnosticYtDlpResponse(BaseModel):
     status: Literal["OK"]
     yt_dlp_path: str
@@ -0,0 +1,553 @@
+"""
+自动填充引擎 - 候选池 + 加权抽样 + 事件驱动的空闲触发。
+
+- AutoFillCandidatePool：按来源（每个用户歌单 / 播放历史 / 本地文件树）缓存归一化后的
+  候选歌曲，每个来源记录版本号，只重建版本变化的来源；合并结果在任一来源变化前复用。
+- weighted_sample：加权蓄水池抽样（Efraimidis–Spirakis A-Res），一次遍历、O(n log k)，
+  无需整体 shuffle。
+- history_weight：按播放历史的播放次数与最近播放时间降低权重，避免刚播过的歌反复出现。
+- IdleTrigger：播放器状态变化时评估是否空闲，空闲持续 idle_seconds 后触发回调，
+  无需轮询线程（计时交给共享调度器）。
+- AutoFillReadySet：后台预先校验少量候选（本地文件存在、YouTube 直链已解析进共享
+  URL 缓存），在直链过期前刷新；校验失败的歌曲标记为不可用一段时间，填充时跳过。
+"""
+
+import math
+import os
+import random
+import heapq
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 最近 RECENT_WINDOW_SECONDS 内播放过的歌曲权重按时间线性恢复
+RECENT_WINDOW_SECONDS = 6 * 3600
+MIN_WEIGHT = 0.02
+
+# 就绪集合：预校验的候选数量、不可用标记时长、无过期时间条目的复核间隔
+READY_SET_SIZE = 3
+UNAVAILABLE_TTL_SECONDS = 6 * 3600
+READY_RECHECK_SECONDS = 600
+# 暂时性失败（yt-dlp 超时、网络抖动、限流）的屏蔽时长：首次 TRANSIENT_RETRY_SECONDS，
+# 连续失败时翻倍，最长 TRANSIENT_RETRY_MAX_SECONDS
+TRANSIENT_RETRY_SECONDS = 120
+TRANSIENT_RETRY_MAX_SECONDS = 1800
+
+# 校验失败类型（与 url_cache 的 FAILURE_* 一致）
+FAILURE_UNAVAILABLE = "unavailable"
+FAILURE_TRANSIENT = "transient"
+
+
+def _build_youtube_url_from_id(video_id: str) -> str:
+    if not video_id:
+        return ""
+    if video_id.startswith("http"):
+        return video_id
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def normalize_song_item(item):
+    """把不同来源的歌曲条目标准化为 dict: {url, title, type, duration, thumbnail_url}"""
+    try:
+        if not item:
+            return None
+
+        url = None
+        title = ""
+        typ = "local"
+        duration = 0
+        thumbnail = None
+
+        if isinstance(item, dict):
+            url = item.get("url") or item.get("stream_url") or item.get("rel") or item.get("path") or ""
+            title = item.get("title") or item.get("name") or item.get("media_title") or ""
+            duration = item.get("duration", 0)
+            thumbnail = item.get("thumbnail_url") or item.get("thumb") or None
+            typ = item.get("type") or item.get("song_type") or typ
+        else:
+            url = getattr(item, "url", None) or getattr(item, "stream_url", None) or getattr(item, "rel", None)
+            title = getattr(item, "title", None) or getattr(item, "name", None) or title
+            duration = getattr(item, "duration", duration)
+            thumbnail = getattr(item, "thumbnail_url", None) or getattr(item, "get_thumbnail_url", None)
+            typ = getattr(item, "type", None) or getattr(item, "stream_type", None) or typ
+
+        if not url:
+            if isinstance(item, dict):
+                vid = item.get("id") or item.get("video_id")
+            else:
+                vid = getattr(item, "video_id", None) or getattr(item, "id", None)
+            if vid:
+                url = _build_youtube_url_from_id(vid)
+
+        if not url:
+            return None
+
+        url = str(url).strip()
+
+        if not typ or typ == "local":
+            if url.startswith("http://") or url.startswith("https://"):
+                if "youtube.com" in url.lower() or "youtu.be" in url.lower():
+                    typ = "youtube"
+                else:
+                    typ = "stream"
+            else:
+                typ = "local"
+
+        song = {
+            "url": url,
+            "title": title or os.path.splitext(os.path.basename(url))[0],
+            "type": typ,
+            "duration": duration or 0,
+            "thumbnail_url": thumbnail,
+        }
+        if isinstance(item, dict) and item.get("unavailable"):
+            song["unavailable"] = True
+        return song
+    except Exception as e:
+        logger.debug(f"[自动填充.normalize] 归一化条目失败: {e}")
+        return None
+
+
+def _iter_local_files(tree):
+    """非递归遍历本地文件树，生成候选歌曲"""
+    stack = [tree] if tree else []
+    while stack:
+        node = stack.pop()
+        for f in node.get("files") or []:
+            rel = f.get("rel") or f.get("path") or None
+            if rel:
+                name = f.get("name") or None
+                yield {
+                    "url": rel,
+                    "title": os.path.splitext(name or rel)[0],
+                    "type": "local",
+                    "duration": 0,
+                    "thumbnail_url": None,
+                }
+        stack.extend(reversed(node.get("dirs") or []))
+
+
+class AutoFillCandidatePool:
+    """按来源增量维护的自动填充候选池（线程安全）。
+
+    参数:
+      playlists_manager: Playlists 实例（来源1：用户歌单）
+      history: PlayHistory 实例（来源2：历史中的网络歌曲）
+      tree_fn: 返回当前本地文件树的回调（来源3）
+      skip_playlist_fn: 返回 True 的歌单 ID 不参与（默认歌单、房间歌单）
+    """
+
+    def __init__(self, playlists_manager=None, history=None, tree_fn=None, skip_playlist_fn=None,
+                 source_playlists: bool = True, source_history: bool = True, source_local: bool = True):
+        self._playlists_manager = playlists_manager
+        self._history = history
+        self._tree_fn = tree_fn
+        self._skip_playlist_fn = skip_playlist_fn or (lambda pid: False)
+        self.source_playlists = source_playlists
+        self.source_history = source_history
+        self.source_local = source_local
+        self._lock = threading.Lock()
+        self._sources = {}       # source_key -> (version, [song, ...])
+        self._merged = None      # (source_versions, [song, ...])
+        self.rebuilds = 0        # 来源重建次数（诊断用）
+
+    # ---------- 来源 ----------
+
+    def _source_specs(self):
+        """当前各来源的 (key, version, build_fn)"""
+        specs = []
+        if self.source_playlists and self._playlists_manager is not None:
+            try:
+                playlists = self._playlists_manager.get_all()
+            except Exception as e:
+                logger.warning(f"[自动填充] 收集歌单失败: {e}")
+                playlists = []
+            for pl in playlists:
+                pid = getattr(pl, "id", "")
+                if self._skip_playlist_fn(pid):
+                    continue
+                songs = getattr(pl, "songs", None) or []
+                version = (id(pl), getattr(pl, "updated_at", 0), len(songs))
+                specs.append((("playlist", pid), version, lambda songs=songs: self._build_playlist(songs)))
+
+        if self.source_history and self._history is not None:
+            version = getattr(self._history, "version", None)
+            if version is None:
+                version = time.monotonic()  # 无版本号时每次重建
+            specs.append((("history",), version, self._build_history))
+
+        if self.source_local and self._tree_fn is not None:
+            tree = self._tree_fn()
+            if tree:
+                from models.tag_index import tag_index
+                specs.append((
+                    ("local",),
+                    (id(tree), tag_index.version),
+                    lambda tree=tree: [tag_index.enrich_song(song) for song in _iter_local_files(tree)],
+                ))
+        return specs
+
+    @staticmethod
+    def _build_playlist(songs) -> list:
+        return [norm for norm in (normalize_song_item(s) for s in list(songs)) if norm]
+
+    def _build_history(self) -> list:
+        result = []
+        try:
+            items = self._history.get_all()
+        except Exception as e:
+            logger.debug(f"[自动填充] 读取播放历史失败: {e}")
+            return result
+        for h in items:
+            if not isinstance(h, dict):
+                continue
+            url = str(h.get("url") or "").strip()
+            typ = h.get("type") or ""
+            if not url or not (typ in ("youtube", "stream") or url.startswith("http")):
+                continue
+            result.append({
+                "url": url,
+                "title": h.get("title") or os.path.basename(url),
+                "type": typ or ("youtube" if "youtube" in url.lower() or "youtu.be" in url.lower() else "stream"),
+                "duration": h.get("duration", 0),
+                "thumbnail_url": h.get("thumbnail_url"),
+            })
+        return result
+
+    # ---------- 候选 ----------
+
+    def candidates(self) -> list:
+        """返回去重后的候选列表（按 URL 保留首次出现）；只重建版本变化的来源"""
+        specs = self._source_specs()
+        with self._lock:
+            live_keys = set()
+            versions = []
+            for key, version, build in specs:
+                live_keys.add(key)
+                versions.append((key, version))
+                cached = self._sources.get(key)
+                if cached is None or cached[0] != version:
+                    self._sources[key] = (version, build())
+                    self.rebuilds += 1
+            for key in list(self._sources):
+                if key not in live_keys:
+                    del self._sources[key]
+
+            versions = tuple(versions)
+            if self._merged is None or self._merged[0] != versions:
+                seen = set()
+                merged = []
+                for key, _ in versions:
+                    for song in self._sources[key][1]:
+                        url = song["url"]
+                        if url not in seen:
+                            seen.add(url)
+                            merged.append(song)
+                self._merged = (versions, merged)
+                logger.debug(
+                    f"[自动填充] 候选池已更新: {len(merged)} 首 "
+                    f"(网络歌曲 {sum(1 for s in merged if s['type'] in ('youtube', 'stream'))})"
+                )
+            return self._merged[1]
+
+    def sample(self, k: int, weight_fn=None, rng=None) -> list:
+        """从候选池中加权抽取 k 首（返回副本，调用方可修改）"""
+        picked = weighted_sample(self.candidates(), k, weight_fn or (lambda song: 1.0), rng)
+        return [dict(song) for song in picked]
+
+
+def weighted_sample(items, k: int, weight_fn, rng=None) -> list:
+    """加权蓄水池抽样（A-Res）：key = u^(1/w)，保留 key 最大的 k 个，按 key 降序返回"""
+    rng = rng or random
+    heap = []
+    for index, item in enumerate(items):
+        weight = weight_fn(item)
+        if weight <= 0:
+            continue
+        key = rng.random() ** (1.0 / weight)
+        entry = (key, index, item)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+    return [item for _, _, item in sorted(heap, reverse=True)]
+
+
+def history_weight(history, now: float = None):
+    """根据播放历史生成权重函数：播放越多、越近期播放的歌曲权重越低"""
+    get_info = getattr(history, "get_play_info", None)
+    if get_info is None:
+        return lambda song: 1.0
+    now = time.time() if now is None else now
+
+    def _weight(song) -> float:
+        info = get_info(song.get("url"))
+        if not info:
+            return 1.0
+        play_count, last_ts = info
+        weight = 1.0 / (1.0 + math.log1p(max(0, play_count)))
+        age = max(0.0, now - (last_ts or 0))
+        if age < RECENT_WINDOW_SECONDS:
+            weight *= age / RECENT_WINDOW_SECONDS
+        return max(MIN_WEIGHT, weight)
+
+    return _weight
+
+
+class IdleTrigger:
+    """事件驱动的空闲触发器。
+
+    notify() 在播放器状态变化时调用：空闲（is_idle_fn 为真）时安排 idle_seconds 后检查，
+    恢复播放时取消；到期仍空闲则调用 on_idle()，之后重新评估（仍空闲则再等待一个周期）。
+    """
+
+    def __init__(self, is_idle_fn, on_idle, idle_seconds: float = 60, scheduler=None):
+        if scheduler is None:
+            from models.scheduler import room_tasks as scheduler
+        self._is_idle_fn = is_idle_fn
+        self._on_idle = on_idle
+        self.idle_seconds = idle_seconds
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._handle = None
+
+    @property
+    def armed(self) -> bool:
+        return self._handle is not None
+
+    def _is_idle(self) -> bool:
+        try:
+            return bool(self._is_idle_fn())
+        except Exception as e:
+            logger.debug(f"[自动填充] 空闲检测失败: {e}")
+            return False
+
+    def notify(self):
+        idle = self._is_idle()
+        with self._lock:
+            if idle:
+                if self._handle is None:
+                    self._handle = self._scheduler.call_later(self.idle_seconds, self._fire)
+            elif self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
+
+    def _fire(self):
+        with self._lock:
+            self._handle = None
+        if self._is_idle():
+            try:
+                self._on_idle()
+            except Exception as e:
+                logger.error(f"[自动填充] 空闲回调异常: {e}")
+        self.notify()
+
+
+def validate_song(song, music_dir: str = None, yt_dlp_exe_fn=None):
+    """校验候选歌曲可播放，返回 (是否可用, 有效期截止时间戳)；不可用时第二项为失败类型
+
+    本地歌曲检查文件存在；YouTube 歌曲通过共享 URL 缓存解析直链（播放时直接命中缓存）；
+    其他网络串流无法预校验，视为可用。
+    """
+    from models.song import LocalSong, StreamSong
+
+    url = song.get("url") or ""
+    now = time.time()
+    if song.get("type") == "local" and not url.startswith("http"):
+        if os.path.exists(LocalSong(url).get_absolute_path(base_dir=music_dir)):
+            return True, now + READY_RECHECK_SECONDS
+        return False, FAILURE_UNAVAILABLE
+
+    if "youtube.com" in url or "youtu.be" in url:
+        from models.url_cache import url_cache
+
+        video_id = StreamSong.extract_video_id(url)
+        if not video_id:
+            return False, FAILURE_UNAVAILABLE
+        if yt_dlp_exe_fn is None:
+            from models.player import MusicPlayer
+            yt_dlp_exe_fn = MusicPlayer._get_yt_dlp_path
+        resolved = url_cache.resolve(video_id, url, yt_dlp_exe_fn())
+        if not resolved:
+            return False, url_cache.failure_kind(video_id) or FAILURE_TRANSIENT
+        return True, resolved.get("expires_at") or now + READY_RECHECK_SECONDS
+
+    return True, now + READY_RECHECK_SECONDS
+
+
+def play_failure_kind(song, music_dir: str = None) -> str:
+    """播放失败的类型：本地文件缺失或 yt-dlp 报告视频不可用为确定性失败，其余视为暂时性"""
+    from models.song import LocalSong, StreamSong
+
+    url = song.get("url") or ""
+    if song.get("type", "local") == "local" and not url.startswith("http"):
+        if not os.path.exists(LocalSong(url).get_absolute_path(base_dir=music_dir)):
+            return FAILURE_UNAVAILABLE
+        return FAILURE_TRANSIENT
+    if "youtube.com" in url or "youtu.be" in url:
+        from models.url_cache import url_cache
+
+        return url_cache.failure_kind(StreamSong.extract_video_id(url)) or FAILURE_TRANSIENT
+    return FAILURE_TRANSIENT
+
+
+class AutoFillReadySet:
+    """自动填充的就绪集合：保持 size 首已校验的候选，填充时优先取用。
+
+    参数:
+      pool: AutoFillCandidatePool
+      validate_fn: song -> (ok, expires_at)，失败时第二项为失败类型 FAILURE_*；在后台线程调用（可能阻塞数秒）
+      weight_fn_factory: 每次抽样前调用，返回权重函数（如 lambda: history_weight(history)）
+    """
+
+    EXPIRY_MARGIN = 60.0
+
+    def __init__(self, pool, validate_fn=validate_song, weight_fn_factory=None,
+                 size: int = READY_SET_SIZE, scheduler=None, rng=None):
+        if scheduler is None:
+            # 校验会调用 yt-dlp，放在阻塞任务调度器中
+            from models.scheduler import blocking_tasks as scheduler
+        self._pool = pool
+        self._validate_fn = validate_fn
+        self._weight_fn_factory = weight_fn_factory or (lambda: (lambda song: 1.0))
+        self.size = size
+        self._scheduler = scheduler
+        self._rng = rng
+        self._lock = threading.Lock()
+        self._ready = []           # [(song, expires_at)]，按加入顺序
+        self._unavailable = {}     # url -> 不可用截止时间
+        self._transient_failures = {}  # url -> 连续暂时性失败次数（决定退避时长）
+        self._refreshing = False
+        self._timer = None
+
+    # ---------- 不可用标记 ----------
+
+    def mark_unavailable(self, url: str, ttl: float = UNAVAILABLE_TTL_SECONDS):
+        """标记歌曲不可用（视频已删除、本地文件缺失等），ttl 秒内不会被选中"""
+        if not url:
+            return
+        with self._lock:
+            self._transient_failures.pop(url, None)
+            self._block(url, ttl)
+        logger.info(f"[自动填充] 已标记不可用: {url} ({ttl:.0f}s)")
+
+    def mark_failed(self, url: str, kind: str = FAILURE_TRANSIENT):
+        """按失败类型屏蔽歌曲：确定性失败屏蔽 UNAVAILABLE_TTL_SECONDS，暂时性失败按连续次数指数退避"""
+        if not url:
+            return
+        if kind == FAILURE_UNAVAILABLE:
+            self.mark_unavailable(url)
+            return
+        with self._lock:
+            failures = self._transient_failures.get(url, 0) + 1
+            self._transient_failures[url] = failures
+            ttl = min(TRANSIENT_RETRY_SECONDS * 2 ** (failures - 1), TRANSIENT_RETRY_MAX_SECONDS)
+            self._block(url, ttl)
+        logger.info(f"[自动填充] 暂时不可用: {url} (第 {failures} 次，{ttl:.0f}s 后重试)")
+
+    def _block(self, url: str, ttl: float):
+        """调用方持有 self._lock"""
+        self._unavailable[url] = time.time() + ttl
+        self._ready = [(song, exp) for song, exp in self._ready if song["url"] != url]
+
+    def is_unavailable(self, song) -> bool:
+        if song.get("unavailable"):
+            return True
+        until = self._unavailable.get(song.get("url"))
+        if until is None:
+            return False
+        if until <= time.time():
+            self._unavailable.pop(song.get("url"), None)
+            return False
+        return True
+
+    def ready_songs(self) -> list:
+        with self._lock:
+            now = time.time()
+            return [dict(song) for song, exp in self._ready if exp - self.EXPIRY_MARGIN > now]
+
+    # ---------- 取用 ----------
+
+    def _weight_fn(self, exclude):
+        base = self._weight_fn_factory()
+
+        def _weight(song):
+            if song["url"] in exclude or self.is_unavailable(song):
+                return 0.0
+            return base(song)
+
+        return _weight
+
+    def take(self, k: int) -> list:
+        """取出 k 首：先用就绪集合中仍有效的歌曲，不足部分从候选池加权抽取；随后后台补充"""
+        now = time.time()
+        with self._lock:
+            valid = [song for song, exp in self._ready if exp - self.EXPIRY_MARGIN > now
+                     and not self.is_unavailable(song)]
+            picked = [dict(song) for song in valid[:k]]
+            self._ready = [(song, exp) for song, exp in self._ready if song not in valid[:k]]
+        if len(picked) < k:
+            exclude = {song["url"] for song in picked}
+            picked.extend(self._pool.sample(k - len(picked), self._weight_fn(exclude), self._rng))
+        self.schedule_refresh(0)
+        return picked
+
+    # ---------- 后台补充 ----------
+
+    def schedule_refresh(self, delay: float):
+        """delay 秒后刷新（已有更早的计划时保留更早的）"""
+        with self._lock:
+            when = time.monotonic() + delay
+            if self._timer is not None:
+                if self._timer.when <= when:
+                    return
+                self._timer.cancel()
+            self._timer = self._scheduler.call_later(delay, self.refresh)
+
+    def refresh(self) -> int:
+        """剔除即将过期/不可用的条目并补充到 size 首，返回新增数量"""
+        with self._lock:
+            self._timer = None
+            if self._refreshing:
+                return 0
+            self._refreshing = True
+            now = time.time()
+            self._ready = [(song, exp) for song, exp in self._ready
+                           if exp - self.EXPIRY_MARGIN > now and not self.is_unavailable(song)]
+            missing = self.size - len(self._ready)
+            exclude = {song["url"] for song, _ in self._ready}
+
+        added = 0
+        try:
+            if missing > 0:
+                # 多抽一些备选，校验失败时顺延
+                for song in self._pool.sample(missing * 3, self._weight_fn(exclude), self._rng):
+                    if added >= missing:
+                        break
+                    try:
+                        ok, expires_at = self._validate_fn(song)
+                    except Exception as e:
+                        logger.debug(f"[自动填充] 校验候选异常: {e}")
+                        ok, expires_at = False, FAILURE_TRANSIENT
+                    if not ok:
+                        self.mark_failed(song["url"], expires_at or FAILURE_TRANSIENT)
+                        continue
+                    with self._lock:
+                        self._transient_failures.pop(song["url"], None)
+                        self._ready.append((song, expires_at or time.time() + READY_RECHECK_SECONDS))
+                    added += 1
+                if added:
+                    logger.info(f"[自动填充] 就绪集合已补充 {added} 首（共 {len(self._ready)} 首）")
+        finally:
+            with self._lock:
+                self._refreshing = False
+                expiries = [exp for _, exp in self._ready]
+            # 在最早的直链过期前刷新；集合未满时稍后重试
+            if len(expiries) < self.size:
+                next_delay = READY_RECHECK_SECONDS
+            else:
+                next_delay = max(1.0, min(expiries) - self.EXPIRY_MARGIN - time.time())
+            self.schedule_refresh(next_delay)
+        return added
@@ -31,7 +31,8 @@ class BackupManager:
         self.backup_dir    = Path(cfg["backup_dir"])
         self.interval_secs = cfg["interval_hours"] * 3600
         self.keep_days     = cfg["keep_days"]
-        self.source_files  = ["playlists.json", "playback_history.json"]
+        # playlists.journal 为歌单增量日志，需与 playlists.json 一同备份
+        self.source_files  = ["playlists.json", "playlists.journal", "playback_history.json"]
 
     # ------------------------------------------------------------------
     # 配置读取
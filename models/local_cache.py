@@ -0,0 +1,261 @@
+"""
+本地音频读穿缓存 - music_dir 位于网络共享（如 Z:）时，把即将播放的本地歌曲预先复制到
+本机 SSD，LocalSong.play 直接加载本地副本，曲目开始不再受共享延迟影响。
+
+- 根据运行时队列在当前曲开始后调度复制接下来的 N 首（后台单线程，限速复制）
+- 缓存条目按 (相对路径, mtime, size) 失效；总字节数超过上限时按 LRU 淘汰
+- 索引持久化到缓存目录下的 index.json，重启后已有副本继续可用
+
+配置项（settings.ini [cache] 节）：
+  local_cache_dir            =           # 缓存目录；留空表示禁用
+  local_cache_max_mb         = 4096      # 缓存总大小上限（MB）
+  local_cache_prefetch       = 3         # 预复制队列中接下来的歌曲数量
+  local_cache_bandwidth_mbps = 40        # 复制限速（MB/s），0 表示不限速
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import configparser
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_SETTINGS_FILE = "settings.ini"
+_INDEX_FILE = "index.json"
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class LocalAudioCache:
+    """本地副本缓存（线程安全）；cache_dir 为空时所有操作均为空操作。"""
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, prefetch_count: int = None,
+                 bandwidth_bytes: int = None):
+        config = self._read_config()
+        self.cache_dir = None
+        self.max_bytes = config["max_bytes"] if max_bytes is None else int(max_bytes)
+        self.prefetch_count = config["prefetch_count"] if prefetch_count is None else int(prefetch_count)
+        self.bandwidth_bytes = config["bandwidth_bytes"] if bandwidth_bytes is None else int(bandwidth_bytes)
+        self._entries = OrderedDict()   # rel -> {"file", "mtime", "size"}，最近使用的在末尾
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pending = None            # 复制进行中时收到的新请求 (music_dir, rels)
+        self.hits = 0
+        self.misses = 0
+        self.copied_bytes = 0
+        self.evictions = 0
+        if cache_dir or config["cache_dir"]:
+            self.open(cache_dir or config["cache_dir"])
+
+    @staticmethod
+    def _read_config() -> dict:
+        config = configparser.ConfigParser()
+        if os.path.exists(_SETTINGS_FILE):
+            config.read(_SETTINGS_FILE, encoding="utf-8")
+        return {
+            "cache_dir": config.get("cache", "local_cache_dir", fallback="").strip(),
+            "max_bytes": config.getint("cache", "local_cache_max_mb", fallback=4096) * 1024 * 1024,
+            "prefetch_count": config.getint("cache", "local_cache_prefetch", fallback=3),
+            "bandwidth_bytes": int(config.getfloat("cache", "local_cache_bandwidth_mbps", fallback=40) * 1024 * 1024),
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache_dir is not None
+
+    # ------------------------------------------------------------------
+    # 生命周期与持久化
+    # ------------------------------------------------------------------
+
+    def open(self, cache_dir: str):
+        """启用缓存目录并加载索引（丢弃副本已不存在的条目）"""
+        cache_dir = os.path.abspath(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        entries = OrderedDict()
+        index_path = os.path.join(cache_dir, _INDEX_FILE)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for rel, entry in data if isinstance(data, list) else []:
+                    if isinstance(entry, dict) and os.path.exists(os.path.join(cache_dir, entry.get("file", ""))):
+                        entries[rel] = entry
+            except Exception as e:
+                logger.warning(f"[LocalCache] 加载缓存索引失败: {e}")
+        with self._lock:
+            self.cache_dir = cache_dir
+            self._entries = entries
+        logger.info(f"[LocalCache] 本地音频缓存已启用: {cache_dir}（{len(entries)} 个副本）")
+
+    def _save_index(self):
+        with self._lock:
+            if self.cache_dir is None:
+                return
+            data = list(self._entries.items())
+            cache_dir = self.cache_dir
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, os.path.join(cache_dir, _INDEX_FILE))
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except Exception as e:
+            logger.warning(f"[LocalCache] 保存缓存索引失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 查询（播放路径）
+    # ------------------------------------------------------------------
+
+    def lookup(self, rel: str, st: os.stat_result):
+        """源文件 (mtime, size) 与副本一致时返回副本绝对路径，否则返回 None"""
+        if self.cache_dir is None or not rel:
+            return None
+        with self._lock:
+            entry = self._entries.get(rel)
+            if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+                self._entries.move_to_end(rel)
+                self.hits += 1
+                return os.path.join(self.cache_dir, entry["file"])
+            self.misses += 1
+        return None
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry["size"] for entry in self._entries.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "total_bytes": self.total_bytes(),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "copied_bytes": self.copied_bytes,
+            "evictions": self.evictions,
+        }
+
+    # ------------------------------------------------------------------
+    # 预复制
+    # ------------------------------------------------------------------
+
+    def schedule_prefetch(self, music_dir: str, rel_paths):
+        """后台复制 rel_paths（立即返回）；复制进行中时以最新请求替换尚未开始的请求"""
+        if self.cache_dir is None or not music_dir:
+            return
+        rels = [rel for rel in rel_paths if rel][: max(0, self.prefetch_count)]
+        if not rels:
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                self._pending = (music_dir, rels)
+                return
+            self._worker = threading.Thread(
+                target=self._prefetch_loop, args=(music_dir, rels), daemon=True, name="LocalCachePrefetch"
+            )
+            self._worker.start()
+
+    def _prefetch_loop(self, music_dir: str, rels: list):
+        while True:
+            for rel in rels:
+                try:
+                    self.ensure_cached(music_dir, rel)
+                except Exception as e:
+                    logger.warning(f"[LocalCache] 复制失败 {rel}: {e}")
+            with self._lock:
+                pending, self._pending = self._pending, None
+                if pending is None:
+                    self._worker = None
+                    return
+            music_dir, rels = pending
+
+    def ensure_cached(self, music_dir: str, rel: str) -> bool:
+        """同步确保 rel 已有最新副本（在后台线程调用），返回副本是否可用"""
+        if self.cache_dir is None:
+            return False
+        src = os.path.join(os.path.abspath(music_dir), rel)
+        st = os.stat(src)
+        if st.st_size > self.max_bytes:
+            return False
+        with self._lock:
+            entry = self._entries.get(rel)
+            if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+                self._entries.move_to_end(rel)
+                return True
+
+        file_name = hashlib.sha1(rel.encode("utf-8")).hexdigest() + os.path.splitext(rel)[1].lower()
+        dst = os.path.join(self.cache_dir, file_name)
+        started = time.perf_counter()
+        self._copy_throttled(src, dst)
+        with self._lock:
+            self._entries[rel] = {"file": file_name, "mtime": st.st_mtime, "size": st.st_size}
+            self._entries.move_to_end(rel)
+            self.copied_bytes += st.st_size
+        logger.info(
+            f"[LocalCache] 已缓存 {rel}（{st.st_size / 1048576:.1f} MB，{time.perf_counter() - started:.1f}s）"
+        )
+        self._evict(keep=rel)
+        self._save_index()
+        return True
+
+    def _copy_throttled(self, src: str, dst: str):
+        """分块复制到临时文件后原子替换；bandwidth_bytes > 0 时按速率限速"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with open(src, "rb") as fin, os.fdopen(fd, "wb") as fout:
+                started = time.monotonic()
+                copied = 0
+                while True:
+                    chunk = fin.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    fout.write(chunk)
+                    copied += len(chunk)
+                    if self.bandwidth_bytes > 0:
+                        ahead = copied / self.bandwidth_bytes - (time.monotonic() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+            os.replace(tmp_path, dst)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _evict(self, keep: str = None):
+        """按 LRU 删除副本直到总大小不超过上限（不淘汰刚复制的 keep）"""
+        removed = []
+        with self._lock:
+            total = sum(entry["size"] for entry in self._entries.values())
+            for rel in list(self._entries):
+                if total <= self.max_bytes:
+                    break
+                if rel == keep:
+                    continue
+                entry = self._entries.pop(rel)
+                total -= entry["size"]
+                removed.append(entry["file"])
+            self.evictions += len(removed)
+        for file_name in removed:
+            try:
+                os.unlink(os.path.join(self.cache_dir, file_name))
+            except OSError:
+                pass
+        if removed:
+            logger.info(f"[LocalCache] LRU 淘汰 {len(removed)} 个副本")
+
+
+local_cache = LocalAudioCache()
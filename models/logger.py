@@ -5,6 +5,9 @@ import logging
 import logging.handlers
 import sys
 import os
+import copy
+import queue
+import atexit
 import configparser
 
 # ==================== 日志颜色常量 ====================
@@ -94,10 +97,23 @@ class PlainFormatter(logging.Formatter):
 
 DEFAULT_LOG_LEVEL = 'INFO'
 DEFAULT_POLLING_SAMPLE_RATE = 0.1
-DEFAULT_FILTERED_PATHS = {'/status', '/volume'}
+# 前端与房间机器人的轮询路由（路由模板）
+DEFAULT_FILTERED_PATHS = {'/status', '/volume', '/room/{room_id}/status', '/room/list', '/playlist', '/playlists'}
 DEFAULT_HEARTBEAT_LOG_INTERVAL = 10
 DEFAULT_LOG_DIR = 'logs'
 DEFAULT_LOG_KEEP_DAYS = 7
+DEFAULT_ASYNC_HANDLERS = True
+
+
+def parse_logger_levels(value: str) -> dict:
+    """解析 "logger名=级别, ..." 形式的子系统日志级别，忽略无法识别的项"""
+    levels = {}
+    for item in (value or '').split(','):
+        name, sep, level = item.partition('=')
+        name, level = name.strip(), level.strip().upper()
+        if sep and name and isinstance(logging.getLevelName(level), int):
+            levels[name] = level
+    return levels
 
 
 def load_logging_config():
@@ -109,6 +125,8 @@ def load_logging_config():
         'heartbeat_log_interval': DEFAULT_HEARTBEAT_LOG_INTERVAL,
         'log_dir': DEFAULT_LOG_DIR,
         'log_keep_days': DEFAULT_LOG_KEEP_DAYS,
+        'levels': {},
+        'async_handlers': DEFAULT_ASYNC_HANDLERS,
     }
     
     try:
@@ -155,6 +173,17 @@ def load_logging_config():
                         config['log_keep_days'] = int(ini.get('logging', 'log_keep_days'))
                     except ValueError:
                         pass
+
+                # 读取子系统日志级别（如 models.player.ipc=WARNING）
+                if ini.has_option('logging', 'levels'):
+                    config['levels'] = parse_logger_levels(ini.get('logging', 'levels'))
+
+                # 读取是否通过队列异步写日志
+                if ini.has_option('logging', 'async_handlers'):
+                    try:
+                        config['async_handlers'] = ini.getboolean('logging', 'async_handlers')
+                    except ValueError:
+                        pass
     
     except Exception as e:
         print(f"⚠️ 加载日志配置失败: {e}，使用默认值")
@@ -169,30 +198,8 @@ _LOGGING_CONFIG = load_logging_config()
 # ==================== 模块级别 Logger ====================
 
 def _setup_module_logger():
-    """创建模块级别的 logger"""
-    logger = logging.getLogger(__name__)
-    
-    # 避免重复配置
-    if logger.handlers:
-        return logger
-    
-    logger.setLevel(logging.DEBUG)
-    
-    # 创建控制台处理器
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(logging.DEBUG)
-    
-    # 使用美化的格式化器
-    formatter = ColoredFormatter()
-    handler.setFormatter(formatter)
-    
-    # 添加处理器
-    logger.addHandler(handler)
-    
-    # 防止日志向上传播
-    logger.propagate = False
-    
-    return logger
+    """创建模块级别的 logger（传播到根 logger，与其他模块共用处理器与级别配置）"""
+    return logging.getLogger(__name__)
 
 
 # 创建模块级别的 logger
@@ -201,28 +208,6 @@ logger = _setup_module_logger()
 
 # ==================== 日志过滤函数（可选）====================
 
-class PollingRequestFilter(logging.Filter):
-    """过滤高频请求的日志采样"""
-    
-    def __init__(self, filtered_paths=None, sample_rate=None):
-        super().__init__()
-        self.filtered_paths = filtered_paths or _LOGGING_CONFIG['filtered_paths']
-        self.sample_rate = sample_rate or _LOGGING_CONFIG['polling_sample_rate']
-    
-    def filter(self, record):
-        import random
-        
-        message = record.getMessage()
-        
-        # 检查是否为高频路由
-        for path in self.filtered_paths:
-            if path in message:
-                # 采样：只记录一部分请求
-                return random.random() < self.sample_rate
-        
-        return True  # 其他日志全部通过
-
-
 class AsyncioConnectionFilter(logging.Filter):
     """Suppress harmless Windows ProactorEventLoop connection cleanup errors."""
 
@@ -233,6 +218,41 @@ class AsyncioConnectionFilter(logging.Filter):
         return True
 
 
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """只在调用线程合并消息参数的 QueueHandler；格式化、过滤与文件 I/O 都在监听线程完成"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_QUEUE_LISTENER = None
+
+
+def shutdown_logging():
+    """停止日志监听线程并写完队列中剩余的日志（可重复调用）"""
+    global _QUEUE_LISTENER
+    listener, _QUEUE_LISTENER = _QUEUE_LISTENER, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            try:
+                handler.close()
+            except Exception:
+                pass
+
+
+atexit.register(shutdown_logging)
+
+
+def apply_logger_levels(levels: dict):
+    """按子系统设置 logger 级别"""
+    for name, level in (levels or {}).items():
+        logging.getLogger(name).setLevel(level)
+
+
 def setup_logging(debug=None):
     """配置应用级别的日志
     
@@ -252,24 +272,20 @@ def setup_logging(debug=None):
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
     
-    # 清除已有的处理器
+    # 清除已有的处理器（重复调用时先停止旧的日志监听线程）
+    shutdown_logging()
     for handler in list(root_logger.handlers):
         root_logger.removeHandler(handler)
+    handlers = []
     
     # 创建控制台处理器
+    # 处理器不设级别：由根 logger 与子系统 logger 的级别决定输出
     handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(log_level)
     
     # 使用美化的格式化器
     formatter = ColoredFormatter()
     handler.setFormatter(formatter)
-    
-    # 添加处理器和过滤器
-    handler.addFilter(PollingRequestFilter(
-        filtered_paths=_LOGGING_CONFIG['filtered_paths'],
-        sample_rate=_LOGGING_CONFIG['polling_sample_rate']
-    ))
-    root_logger.addHandler(handler)
+    handlers.append(handler)
 
     # 从目录配置派生日志文件路径
     log_dir = _LOGGING_CONFIG.get('log_dir', '').strip()
@@ -291,16 +307,21 @@ def setup_logging(debug=None):
                 base, date_suffix = default_name.rsplit('.log.', 1)
                 return f"{base}.{date_suffix}.log"
             file_handler.namer = _log_namer
-            file_handler.setLevel(log_level)
             file_handler.setFormatter(PlainFormatter())
-            file_handler.addFilter(PollingRequestFilter(
-                filtered_paths=_LOGGING_CONFIG['filtered_paths'],
-                sample_rate=_LOGGING_CONFIG['polling_sample_rate']
-            ))
-            root_logger.addHandler(file_handler)
+            handlers.append(file_handler)
         except Exception as e:
             print(f"⚠️ 无法创建日志文件处理器 ({log_file}): {e}")
 
+    # 异步模式：请求线程只把记录放入队列，控制台/文件输出由监听线程完成
+    if _LOGGING_CONFIG.get('async_handlers', DEFAULT_ASYNC_HANDLERS):
+        global _QUEUE_LISTENER
+        log_queue = queue.SimpleQueue()
+        _QUEUE_LISTENER = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _QUEUE_LISTENER.start()
+        handlers = [AsyncQueueHandler(log_queue)]
+    for h in handlers:
+        root_logger.addHandler(h)
+
     # 压制第三方 logger 噪音（WebSocket ping/pong 帧、httpx、yt-dlp）
     _NOISY_LOGGERS = [
         "uvicorn.protocols.websockets",
@@ -313,6 +334,9 @@ def setup_logging(debug=None):
     for name in _NOISY_LOGGERS:
         logging.getLogger(name).setLevel(logging.WARNING)
 
+    # 子系统级别覆盖（在默认压制之后应用，允许重新打开某个子系统的日志）
+    apply_logger_levels(_LOGGING_CONFIG.get('levels'))
+
     # 过滤 asyncio 在 Windows 上的 ProactorEventLoop 连接清理错误
     logging.getLogger("asyncio").addFilter(AsyncioConnectionFilter())
 
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+事件循环阻塞检测 - 找出在 async def 中执行阻塞调用、冻结事件循环的代码路径。
+
+- 事件循环中的心跳协程每 interval 秒更新一次时间戳
+- 独立的监视线程发现心跳停滞超过阈值时，通过 sys._current_frames() 抓取事件循环线程的
+  当前调用栈，并从栈上 ASGI scope 取出正在处理的请求路由
+- 事件循环恢复后记录阻塞时长，按 (路由, 阻塞位置) 聚合，GET /diagnostic/loop-blocks 列出最严重的条目
+
+配置项（settings.ini [diagnostics] 节）：
+  loop_watchdog           = true   # 是否启用
+  loop_block_threshold_ms = 100    # 判定为阻塞的停滞时长（毫秒）
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+import configparser
+import logging
+
+from models.metrics import registry as metrics_registry
+
+logger = logging.getLogger(__name__)
+
+_SETTINGS_FILE = "settings.ini"
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_OFFENDERS = 200
+STACK_LIMIT = 40
+
+LOOP_BLOCKS = metrics_registry.counter(
+    "clubmusic_event_loop_blocks_total", "事件循环阻塞次数（超过阈值，按路由）", ("route",)
+)
+
+
+def _is_project_frame(filename: str) -> bool:
+    path = os.path.abspath(filename)
+    return path.startswith(_PROJECT_ROOT) and "site-packages" not in path and path != os.path.abspath(__file__)
+
+
+def describe_blocking_frame(frame) -> dict:
+    """从阻塞时的栈顶帧提取：路由、项目内最内层阻塞位置与格式化调用栈"""
+    route = None
+    site = None
+    walker = frame
+    while walker is not None:
+        code = walker.f_code
+        if site is None and _is_project_frame(code.co_filename):
+            rel = os.path.relpath(code.co_filename, _PROJECT_ROOT).replace("\\", "/")
+            site = f"{rel}:{walker.f_lineno} in {code.co_name}"
+        if route is None:
+            scope = walker.f_locals.get("scope")
+            if isinstance(scope, dict) and scope.get("type") in ("http", "websocket"):
+                route = getattr(scope.get("route"), "path", None) or scope.get("path")
+        if route is not None and site is not None:
+            break
+        walker = walker.f_back
+    if site is None:
+        code = frame.f_code
+        site = f"{os.path.basename(code.co_filename)}:{frame.f_lineno} in {code.co_name}"
+    return {
+        "route": route or "<background>",
+        "site": site,
+        "stack": [line.rstrip("\n") for line in traceback.format_stack(frame, limit=STACK_LIMIT)],
+    }
+
+
+class LoopWatchdog:
+    """事件循环停滞监视器（start() 必须在事件循环线程中调用）。"""
+
+    def __init__(self, threshold_ms: float = None, interval: float = 0.05, enabled: bool = None):
+        config = self._read_config()
+        self.enabled = config["enabled"] if enabled is None else enabled
+        self.threshold = (config["threshold_ms"] if threshold_ms is None else threshold_ms) / 1000
+        self.interval = interval
+        self._beat = 0.0
+        self._loop_thread_id = None
+        self._heartbeat_task = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._offenders = {}         # (route, site) -> 统计
+        self.total_blocks = 0
+
+    @staticmethod
+    def _read_config() -> dict:
+        config = configparser.ConfigParser()
+        if os.path.exists(_SETTINGS_FILE):
+            config.read(_SETTINGS_FILE, encoding="utf-8")
+        return {
+            "enabled": config.getboolean("diagnostics", "loop_watchdog", fallback=True),
+            "threshold_ms": config.getfloat("diagnostics", "loop_block_threshold_ms", fallback=100.0),
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, loop=None):
+        if not self.enabled or self.running:
+            return
+        loop = loop or asyncio.get_event_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stop.clear()
+        self._heartbeat_task = loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, daemon=True, name="LoopWatchdog")
+        self._thread.start()
+        logger.info(f"[LoopWatchdog] 已启用，阻塞阈值 {self.threshold * 1000:.0f}ms")
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+    async def _heartbeat(self):
+        while not self._stop.is_set():
+            self._beat = time.perf_counter()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        pending = None   # (停滞开始时的心跳时间戳, 抓取到的栈信息)
+        while not self._stop.wait(self.interval / 2):
+            beat = self._beat
+            if pending is not None:
+                if beat != pending[0]:
+                    # 事件循环已恢复：阻塞时长 = 两次心跳间隔 - 正常的 sleep 间隔
+                    self.record(pending[1], beat - pending[0] - self.interval)
+                    pending = None
+                continue
+            if time.perf_counter() - beat - self.interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            try:
+                pending = (beat, describe_blocking_frame(frame))
+            except Exception as e:
+                logger.debug(f"[LoopWatchdog] 抓取调用栈失败: {e}")
+            finally:
+                del frame
+
+    def record(self, capture: dict, blocked_seconds: float):
+        """记录一次阻塞（监视线程调用；测试中也可直接调用）"""
+        blocked_ms = max(blocked_seconds, self.threshold) * 1000
+        key = (capture["route"], capture["site"])
+        with self._lock:
+            self.total_blocks += 1
+            entry = self._offenders.get(key)
+            if entry is None:
+                if len(self._offenders) >= MAX_OFFENDERS:
+                    # 淘汰累计阻塞时间最少的条目
+                    del self._offenders[min(self._offenders, key=lambda k: self._offenders[k]["total_ms"])]
+                entry = self._offenders[key] = {
+                    "route": capture["route"], "site": capture["site"],
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += blocked_ms
+            if blocked_ms >= entry["max_ms"]:
+                entry["max_ms"] = blocked_ms
+                entry["stack"] = capture["stack"]
+            entry["last_seen"] = time.time()
+        LOOP_BLOCKS.inc(capture["route"])
+        logger.warning(
+            "[LoopWatchdog] 事件循环阻塞 %.0fms，路由 %s，位置 %s", blocked_ms, capture["route"], capture["site"]
+        )
+
+    def offenders(self, limit: int = 20) -> list:
+        """按累计阻塞时长降序返回最严重的阻塞点"""
+        with self._lock:
+            entries = [dict(e) for e in self._offenders.values()]
+        entries.sort(key=lambda e: e["total_ms"], reverse=True)
+        for e in entries:
+            e["total_ms"] = round(e["total_ms"], 1)
+            e["max_ms"] = round(e["max_ms"], 1)
+        return entries[:max(1, limit)]
+
+    def reset(self):
+        with self._lock:
+            self._offenders = {}
+            self.total_blocks = 0
+
+
+loop_watchdog = LoopWatchdog()
@@ -0,0 +1,252 @@
+"""
+响度分析与逐曲增益 - 用 ffmpeg ebur128 滤镜测量整体响度 (LUFS) 与真峰值，
+播放时经 MPV 的 af 滤镜 (@trackgain) 施加 ReplayGain 式增益，减少本地歌曲与
+YouTube 串流之间的音量跳变。
+
+- 本地歌曲：标签索引（models.tag_index）扫描完成后在后台工作池中分析，结果写入
+  标签索引条目（lufs / peak），随 (path, mtime, size) 一同失效。
+- YouTube：首次播放时在后台分析直链，按 video_id 缓存到 loudness.json；之后的播放生效
+  （避免当前曲目中途跳变）。
+
+配置项（settings.ini [loudness] 节）：
+  enabled     = true     # 是否启用响度均衡
+  target_lufs = -16      # 目标整体响度
+"""
+
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+import subprocess
+import configparser
+import logging
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+_SETTINGS_FILE = "settings.ini"
+_CREATE_NO_WINDOW = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+
+DEFAULT_TARGET_LUFS = -16.0
+MAX_GAIN_DB = 12.0
+PEAK_CEILING_DB = -1.0       # 增益后的真峰值上限（dBTP）
+ANALYZE_TIMEOUT = 300
+GAIN_FILTER_LABEL = "@trackgain"
+
+_SUMMARY_I = re.compile(r"^\s*I:\s*(-?[\d.]+|-inf)\s*LUFS", re.MULTILINE)
+_SUMMARY_PEAK = re.compile(r"^\s*Peak:\s*(-?[\d.]+|-inf)\s*dBFS", re.MULTILINE)
+
+
+def parse_ebur128_summary(stderr: str):
+    """解析 ebur128 滤镜输出的 Summary，返回 {"lufs", "peak"}；无有效结果时返回 None"""
+    summary = stderr[stderr.rfind("Summary:"):] if "Summary:" in stderr else stderr
+    integrated = _SUMMARY_I.search(summary)
+    if not integrated or integrated.group(1) == "-inf":
+        return None
+    peak = _SUMMARY_PEAK.search(summary)
+    peak_value = float(peak.group(1)) if peak and peak.group(1) != "-inf" else None
+    return {"lufs": float(integrated.group(1)), "peak": peak_value}
+
+
+def analyze_loudness(ffmpeg_exe: str, source: str, timeout: float = ANALYZE_TIMEOUT):
+    """流式解码 source（文件路径或直链）并测量响度；失败返回 None"""
+    cmd = [
+        ffmpeg_exe, "-hide_banner", "-nostats", "-nostdin",
+        "-i", source, "-vn", "-sn", "-dn",
+        "-af", "ebur128=peak=true", "-f", "null", "-",
+    ]
+    try:
+        proc = subprocess.run(
+            cmd, capture_output=True, text=True, encoding="utf-8", errors="replace",
+            timeout=timeout, creationflags=_CREATE_NO_WINDOW,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.debug(f"[Loudness] ffmpeg 分析失败: {e}")
+        return None
+    return parse_ebur128_summary(proc.stderr or "")
+
+
+def compute_gain_db(lufs, peak=None, target_lufs: float = DEFAULT_TARGET_LUFS) -> float:
+    """目标响度与实测响度之差，限制在 ±MAX_GAIN_DB，且增益后峰值不超过 PEAK_CEILING_DB"""
+    if lufs is None:
+        return 0.0
+    gain = max(-MAX_GAIN_DB, min(MAX_GAIN_DB, target_lufs - lufs))
+    if peak is not None and gain > 0:
+        gain = min(gain, max(0.0, PEAK_CEILING_DB - peak))
+    return round(gain, 2)
+
+
+class LoudnessAnalyzer:
+    """响度分析与增益施加（线程安全）。"""
+
+    def __init__(self, cache_file: str = None, workers: int = 2, ffmpeg_fn=None):
+        config = self._read_config()
+        self.enabled = config["enabled"]
+        self.target_lufs = config["target_lufs"]
+        self.cache_file = cache_file
+        self._ffmpeg_fn = ffmpeg_fn
+        self._workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._videos = {}        # video_id -> {"lufs", "peak", "analyzed_at"}
+        self._inflight = set()
+        self._save_timer = None
+
+    @staticmethod
+    def _read_config() -> dict:
+        config = configparser.ConfigParser()
+        if os.path.exists(_SETTINGS_FILE):
+            config.read(_SETTINGS_FILE, encoding="utf-8")
+        return {
+            "enabled": config.getboolean("loudness", "enabled", fallback=True),
+            "target_lufs": config.getfloat("loudness", "target_lufs", fallback=DEFAULT_TARGET_LUFS),
+        }
+
+    def _ffmpeg(self) -> str:
+        if self._ffmpeg_fn is not None:
+            return self._ffmpeg_fn()
+        from models.player import MusicPlayer
+        return MusicPlayer._get_ffmpeg_path()
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="LoudnessWorker"
+                )
+        return self._executor.submit(fn, *args)
+
+    # ------------------------------------------------------------------
+    # 增益
+    # ------------------------------------------------------------------
+
+    def gain_for(self, measurement) -> float:
+        if not measurement:
+            return 0.0
+        return compute_gain_db(measurement.get("lufs"), measurement.get("peak"), self.target_lufs)
+
+    def local_gain(self, rel: str):
+        """本地歌曲的增益（dB）；未分析时返回 None"""
+        from models.tag_index import tag_index
+        entry = tag_index.get(rel)
+        if not entry or entry.get("lufs") is None:
+            return None
+        return self.gain_for(entry)
+
+    def video_gain(self, video_id: str):
+        """YouTube 歌曲的增益（dB）；未分析时返回 None"""
+        measurement = self._videos.get(video_id) if video_id else None
+        return self.gain_for(measurement) if measurement else None
+
+    def apply_gain(self, mpv_command_func, gain_db) -> bool:
+        """经 MPV af 滤镜施加增益；gain 为 None/0 时移除滤镜（未分析的曲目按原音量播放）"""
+        if not self.enabled:
+            return False
+        try:
+            if not gain_db:
+                return bool(mpv_command_func(["af", "remove", GAIN_FILTER_LABEL]))
+            logger.info(f"[Loudness] 施加逐曲增益 {gain_db:+.2f} dB")
+            return bool(mpv_command_func(["af", "add", f"{GAIN_FILTER_LABEL}:lavfi=[volume={gain_db:.2f}dB]"]))
+        except Exception as e:
+            logger.debug(f"[Loudness] 设置增益失败: {e}")
+            return False
+
+    # ------------------------------------------------------------------
+    # 分析
+    # ------------------------------------------------------------------
+
+    def analyze_video_later(self, video_id: str, stream_url: str):
+        """首次播放 YouTube 歌曲时后台分析直链（已分析或分析中时跳过）"""
+        if not self.enabled or not video_id or not stream_url:
+            return
+        with self._lock:
+            if video_id in self._videos or video_id in self._inflight:
+                return
+            self._inflight.add(video_id)
+        self._submit(self._analyze_video, video_id, stream_url)
+
+    def _analyze_video(self, video_id: str, stream_url: str):
+        try:
+            result = analyze_loudness(self._ffmpeg(), stream_url)
+            if result:
+                result["analyzed_at"] = int(time.time())
+                with self._lock:
+                    self._videos[video_id] = result
+                logger.info(f"[Loudness] {video_id}: {result['lufs']:.1f} LUFS，增益 {self.gain_for(result):+.2f} dB")
+                self._schedule_save()
+        finally:
+            with self._lock:
+                self._inflight.discard(video_id)
+
+    def analyze_files(self, items: list) -> list:
+        """并行分析 [(rel, abs_path)]，返回 [(rel, 结果或 None)]（在调用线程中等待）"""
+        if not items:
+            return []
+        ffmpeg = self._ffmpeg()
+        futures = [(rel, self._submit(analyze_loudness, ffmpeg, abs_path)) for rel, abs_path in items]
+        results = []
+        for rel, future in futures:
+            try:
+                results.append((rel, future.result()))
+            except Exception:
+                results.append((rel, None))
+        return results
+
+    # ------------------------------------------------------------------
+    # 持久化（YouTube 结果）
+    # ------------------------------------------------------------------
+
+    def load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                with self._lock:
+                    self._videos = {k: v for k, v in data.items() if isinstance(v, dict)}
+            logger.info(f"[Loudness] 已加载 {len(self._videos)} 条 YouTube 响度缓存")
+        except Exception as e:
+            logger.warning(f"[Loudness] 加载响度缓存失败: {e}")
+
+    def _schedule_save(self):
+        with self._lock:
+            if self._save_timer is not None or not self.cache_file:
+                return
+            self._save_timer = threading.Timer(5.0, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def save(self):
+        with self._lock:
+            self._save_timer = None
+            data = dict(self._videos)
+        if not self.cache_file:
+            return
+        try:
+            dir_name = os.path.dirname(self.cache_file) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(tmp_path, self.cache_file)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except Exception as e:
+            logger.warning(f"[Loudness] 保存响度缓存失败: {e}")
+
+    def shutdown(self):
+        self.save()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+loudness = LoudnessAnalyzer()
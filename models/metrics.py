@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+进程内指标 - 计数器/直方图/回调式 Gauge，由 GET /metrics 以 Prometheus 文本格式导出。
+
+热路径上的 inc()/observe() 不加锁：每个线程写自己的分片（threading.local 中的 dict），
+导出时汇总所有分片；线程退出后其分片在下一次导出时并入已退役的汇总值，不丢失计数。
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+
+class _ShardedMetric:
+    """按线程分片存储 {标签值元组: 值} 的指标基类。"""
+
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []            # [(thread, dict)]
+        self._retired = {}           # 已退出线程的汇总值
+        self._lock = threading.Lock()  # 仅在新线程首次写入与导出时使用
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _labels(self, labels) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，收到 {labels}")
+        return tuple(str(v) for v in labels)
+
+    def _merge_into(self, target: dict, shard: dict):
+        raise NotImplementedError
+
+    def collect(self) -> dict:
+        """汇总所有分片（并把已退出线程的分片并入 _retired）"""
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self._merge_into(self._retired, shard.copy())
+            self._shards = alive
+            total = {}
+            self._merge_into(total, self._retired)
+            for _, shard in alive:
+                self._merge_into(total, shard.copy())
+        return total
+
+    def clear(self):
+        with self._lock:
+            for _, shard in self._shards:
+                shard.clear()
+            self._retired = {}
+
+
+class Counter(_ShardedMetric):
+    type_name = "counter"
+
+    def inc(self, *labels, value: float = 1):
+        key = self._labels(labels)
+        shard = self._shard()
+        shard[key] = shard.get(key, 0) + value
+
+    def _merge_into(self, target: dict, shard: dict):
+        for key, value in shard.items():
+            target[key] = target.get(key, 0) + value
+
+    def value(self, *labels) -> float:
+        return self.collect().get(self._labels(labels), 0)
+
+    def render(self) -> list:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.collect().items())
+        ]
+
+
+class Histogram(_ShardedMetric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        key = self._labels(labels)
+        shard = self._shard()
+        data = shard.get(key)
+        if data is None:
+            # [各桶计数（不累加，最后一个为 +Inf）, 总和, 次数]
+            data = shard[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        data[0][bisect.bisect_left(self.buckets, value)] += 1
+        data[1] += value
+        data[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        """with metric.time(...): 记录代码块耗时（秒）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _merge_into(self, target: dict, shard: dict):
+        for key, (counts, total, count) in shard.items():
+            merged = target.get(key)
+            if merged is None:
+                target[key] = [list(counts), total, count]
+            else:
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+
+    def count(self, *labels) -> int:
+        data = self.collect().get(self._labels(labels))
+        return data[2] if data else 0
+
+    def render(self) -> list:
+        lines = []
+        for key, (counts, total, count) in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class CallbackGauge:
+    """导出时调用 fn 取值的 Gauge；fn 返回数值，或 {标签值元组: 数值}。"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, fn, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> list:
+        value = self.fn()
+        if not isinstance(value, dict):
+            return [f"{self.name} {_format_value(value)}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key if isinstance(key, tuple) else (key,))} "
+            f"{_format_value(v)}"
+            for key, v in sorted(value.items(), key=lambda kv: str(kv[0]))
+        ]
+
+
+class MetricsRegistry:
+    """指标注册表；同名指标重复注册时返回已有实例。"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames=()) -> Counter:
+        return self._register(name, lambda: Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name: str, help_text: str, fn, labelnames=()) -> CallbackGauge:
+        """注册回调式 Gauge（重复注册时替换回调）"""
+        gauge = self._register(name, lambda: CallbackGauge(name, help_text, fn, labelnames))
+        gauge.fn = fn
+        return gauge
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                body = metric.render()
+            except Exception:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(body)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# ==================== 应用指标 ====================
+
+MPV_IPC_SECONDS = registry.histogram(
+    "clubmusic_mpv_ipc_seconds", "MPV IPC 往返（request）或写入（write）耗时", ("command", "kind")
+)
+YTDLP_RESOLVE_SECONDS = registry.histogram(
+    "clubmusic_ytdlp_resolve_seconds", "yt-dlp 直链解析耗时", ("outcome",),
+    buckets=(0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 12.0, 20.0, 40.0),
+)
+URL_CACHE_EVENTS = registry.counter(
+    "clubmusic_url_cache_events_total", "YouTube 直链/元数据缓存事件（hit/miss/expired/invalidated/evicted）",
+    ("cache", "event"),
+)
+SEARCH_SECONDS = registry.histogram(
+    "clubmusic_search_seconds", "搜索耗时（按来源）", ("source",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0),
+)
+WS_BROADCAST_SECONDS = registry.histogram(
+    "clubmusic_ws_broadcast_seconds", "WebSocket 状态广播扇出耗时（按房间）", ("room",)
+)
+ROOM_INIT_PHASE_SECONDS = registry.histogram(
+    "clubmusic_room_init_phase_seconds", "房间初始化各阶段耗时", ("phase",)
+)
+EVENT_LOOP_LAG_SECONDS = registry.histogram(
+    "clubmusic_event_loop_lag_seconds", "事件循环调度延迟",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+def room_label(room_id) -> str:
+    """房间标签：默认播放器（room_id 为空）记为 default"""
+    return room_id or "default"
+
+
+async def event_loop_lag_monitor(interval: float = 0.5):
+    """持续测量事件循环调度延迟（sleep 实际唤醒时间与预期之差），在 lifespan 中作为后台任务运行"""
+    import asyncio
+
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, time.perf_counter() - expected))
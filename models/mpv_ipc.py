@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+MPV JSON IPC 传输层 — 按 --input-ipc-server 路径选择 Windows 命名管道或 Unix domain socket。
+
+- NamedPipeTransport：\\\\.\\pipe\\* 路径，沿用 open() 读写管道、WaitNamedPipeW 探测存在
+- UnixSocketTransport：其余路径（Linux/macOS），AF_UNIX 连接后经 makefile() 提供同样的文件接口
+
+三种打开方式与 MusicPlayer 的用法一一对应：
+  open_writer  → 只写命令（mpv_command）
+  open_duplex  → 写请求并按行读应答（mpv_request，二进制）
+  open_reader  → 按行读事件（事件监听线程，UTF-8 文本）
+
+房间路径（settings.ini [room] 节）：
+  ipc_dir = /run/clubmusic   # 非 Windows 下房间 IPC socket / PCM FIFO 所在目录
+Windows 下房间仍使用 \\\\.\\pipe\\mpv-ipc-<room> 与 \\\\.\\pipe\\pcm-<room>。
+"""
+
+import configparser
+import functools
+import logging
+import os
+import socket
+import stat
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+_SETTINGS_FILE = "settings.ini"
+
+WINDOWS_PIPE_PREFIX = "\\\\.\\pipe\\"
+DEFAULT_IPC_DIR = "/run/clubmusic"
+_ROOM_PIPE_PREFIX = WINDOWS_PIPE_PREFIX + "mpv-ipc-"
+_POOL_PREFIX = "mpv-ipc-pool-"
+
+
+class MpvIpcTransport:
+    """IPC 传输接口；打开失败（端点不存在）统一抛出 FileNotFoundError。"""
+
+    name = "base"
+
+    def exists(self, path: str) -> bool:
+        raise NotImplementedError
+
+    def open_writer(self, path: str):
+        raise NotImplementedError
+
+    def open_duplex(self, path: str):
+        raise NotImplementedError
+
+    def open_reader(self, path: str):
+        raise NotImplementedError
+
+
+class NamedPipeTransport(MpvIpcTransport):
+    """Windows 命名管道：管道可直接当作文件 open()。"""
+
+    name = "named_pipe"
+
+    def exists(self, path: str) -> bool:
+        """使用 Win32 API 检测命名管道是否存在（比 os.path.exists 更可靠）"""
+        try:
+            import ctypes
+            # WaitNamedPipeW: 等待管道可用，timeout=0 表示立即返回
+            result = ctypes.windll.kernel32.WaitNamedPipeW(path, 0)
+            if result:
+                return True
+            # WaitNamedPipeW 返回 0 可能是管道不存在或繁忙，用 GetLastError 区分
+            # ERROR_SEM_TIMEOUT (121) = 管道存在但繁忙
+            return ctypes.windll.kernel32.GetLastError() == 121
+        except Exception:
+            # 如果 ctypes 不可用，回退到 os.path.exists
+            return os.path.exists(path)
+
+    def open_writer(self, path: str):
+        return open(path, "wb")
+
+    def open_duplex(self, path: str):
+        return open(path, "r+b", 0)
+
+    def open_reader(self, path: str):
+        return open(path, "r", encoding="utf-8")
+
+
+class UnixSocketTransport(MpvIpcTransport):
+    """Unix domain socket（mpv 在非 Windows 平台上的 --input-ipc-server 实现）。"""
+
+    name = "unix_socket"
+
+    def exists(self, path: str) -> bool:
+        """socket 需能连上才算存在（MPV 崩溃会留下失效的 socket 文件）。"""
+        try:
+            mode = os.stat(path).st_mode
+        except OSError:
+            return False
+        if not stat.S_ISSOCK(mode):
+            return False
+        try:
+            self._connect(path).close()
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _connect(path: str) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            sock.close()
+            raise FileNotFoundError(e.errno, e.strerror, path) from None
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _open(self, path: str, mode: str, **kwargs):
+        sock = self._connect(path)
+        f = sock.makefile(mode, **kwargs)
+        # 文件对象持有连接；关闭 socket 对象本身不会断开，连接随文件关闭释放
+        sock.close()
+        return f
+
+    def open_writer(self, path: str):
+        return self._open(path, "wb")
+
+    def open_duplex(self, path: str):
+        return self._open(path, "rwb")
+
+    def open_reader(self, path: str):
+        return self._open(path, "r", encoding="utf-8")
+
+
+_NAMED_PIPE = NamedPipeTransport()
+_UNIX_SOCKET = UnixSocketTransport()
+
+
+def transport_for(path: str) -> MpvIpcTransport:
+    """按 IPC 路径选择传输：命名管道前缀或 Windows 平台 → 命名管道，否则 Unix socket"""
+    if os.name == "nt" or (path or "").startswith(WINDOWS_PIPE_PREFIX) or not hasattr(socket, "AF_UNIX"):
+        return _NAMED_PIPE
+    return _UNIX_SOCKET
+
+
+def pcm_output_ready(path: str) -> bool:
+    """PCM 接收端是否已就绪（可以启动写入该路径的 MPV）
+
+    Windows：命名管道存在即可。其他平台：路径必须是接收端创建的 FIFO（socket、普通文件不算）。
+    只检查文件类型、不打开写端：健康检查每 2 秒探测一次，打开再关闭写端会让等待中的读端
+    收到 EOF；读端尚未打开时，MPV 打开 FIFO 会一直等到读端就绪。
+    """
+    if not path:
+        return False
+    if transport_for(path) is _NAMED_PIPE:
+        return _NAMED_PIPE.exists(path)
+    try:
+        return stat.S_ISFIFO(os.stat(path).st_mode)
+    except OSError as e:
+        logger.debug(f"[MPV IPC] PCM 输出不可用 {path}: {e}")
+        return False
+
+
+# ---------- 房间 IPC / PCM 路径 ----------
+
+@functools.lru_cache(maxsize=1)
+def ipc_dir() -> str:
+    """非 Windows 平台的 IPC 目录（[room] ipc_dir），不可创建时回退系统临时目录"""
+    config = configparser.ConfigParser()
+    if os.path.exists(_SETTINGS_FILE):
+        config.read(_SETTINGS_FILE, encoding="utf-8")
+    path = config.get("room", "ipc_dir", fallback="").strip() or DEFAULT_IPC_DIR
+    try:
+        os.makedirs(path, exist_ok=True)
+    except OSError as e:
+        fallback = os.path.join(tempfile.gettempdir(), "clubmusic")
+        logger.warning(f"[MPV IPC] 无法创建 IPC 目录 {path}: {e}，改用 {fallback}")
+        os.makedirs(fallback, exist_ok=True)
+        path = fallback
+    return os.path.abspath(path)
+
+
+def room_ipc_path(room_id: str) -> str:
+    """RoomPlayer 的 MPV IPC 路径"""
+    if os.name == "nt":
+        return _ROOM_PIPE_PREFIX + room_id
+    return os.path.join(ipc_dir(), f"{room_id}.sock")
+
+
+def room_pcm_path(room_id: str) -> str:
+    """RoomPlayer 的 PCM 输出路径（--ao-pcm-file；Linux 下由接收端预先 mkfifo）"""
+    if os.name == "nt":
+        return f"{WINDOWS_PIPE_PREFIX}pcm-{room_id}"
+    return os.path.join(ipc_dir(), f"{room_id}.pcm")
+
+
+def pool_ipc_path(tag: str) -> str:
+    """预热池 MPV 的临时 IPC 路径"""
+    if os.name == "nt":
+        return f"{WINDOWS_PIPE_PREFIX}{_POOL_PREFIX}{tag}"
+    return os.path.join(ipc_dir(), f"{_POOL_PREFIX}{tag}.sock")
+
+
+def room_id_from_ipc_path(path: str) -> str:
+    """从房间 IPC 路径反推 room_id；不是房间路径（包括预热池路径）时返回空字符串"""
+    if not path:
+        return ""
+    if path.startswith(_ROOM_PIPE_PREFIX):
+        if path.startswith(WINDOWS_PIPE_PREFIX + _POOL_PREFIX):
+            return ""
+        return path[len(_ROOM_PIPE_PREFIX):]
+    name = os.path.basename(path)
+    if os.name != "nt" and name.endswith(".sock") and not name.startswith(_POOL_PREFIX) \
+            and os.path.dirname(path) == ipc_dir():
+        return name[:-len(".sock")]
+    return ""
@@ -0,0 +1,214 @@
+"""
+RoomPlayer MPV 预热池 - 预先启动空闲 MPV 进程，/room/init 时直接认领。
+
+冷启动 MPV 并等待 IPC 管道通常需要数秒；预热池在后台保持若干个已就绪的
+空闲 MPV（使用临时 IPC 管道 mpv-ipc-pool-N（Linux 下为 <ipc_dir>/mpv-ipc-pool-N.sock）、未绑定 PCM 输出），房间创建时
+认领其一并经 IPC 重绑定管道/PCM 输出/音量，随后后台补充。
+
+配置项（settings.ini [room] 节）：
+  prewarm_pool_size = 0     # 预热 MPV 数量，0 表示禁用（默认；常驻的空闲 MPV 会占用内存与进程）
+"""
+
+import os
+import time
+import threading
+import itertools
+import configparser
+import logging
+import subprocess
+
+from .mpv_ipc import pool_ipc_path, transport_for
+
+logger = logging.getLogger(__name__)
+
+_SETTINGS_FILE = "settings.ini"
+
+
+class PooledMpv:
+    """预热池中的一个空闲 MPV 进程。"""
+
+    def __init__(self, process, ipc_pipe: str):
+        self.process = process
+        self.ipc_pipe = ipc_pipe
+        self.created_at = time.time()
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def terminate(self):
+        """结束进程（认领失败或池关闭时调用）。"""
+        if not self.process:
+            return
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=3)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        except Exception as e:
+            logger.warning(f"[MpvPool] 结束预热 MPV 异常: {e}")
+        finally:
+            self.process = None
+
+
+class RoomMpvPool:
+    """固定大小的空闲 MPV 进程池，后台线程负责补充。
+
+    spawn_fn / pipe_ready_fn 可注入，默认使用 MusicPlayer 的 RoomPlayer 启动逻辑
+    与 IPC 传输层的管道 / socket 探测。
+    """
+
+    READY_TIMEOUT = 15.0
+    RETRY_BACKOFF_MAX = 300.0
+
+    def __init__(self, size: int = None, spawn_fn=None, pipe_ready_fn=None):
+        self.size = max(0, self._read_config() if size is None else int(size))
+        self._spawn_fn = spawn_fn or self._default_spawn
+        self._pipe_ready_fn = pipe_ready_fn or self._default_pipe_ready
+        self._idle = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._seq = itertools.count(1)
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # 配置读取 / 默认实现
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _read_config() -> int:
+        config = configparser.ConfigParser()
+        if os.path.exists(_SETTINGS_FILE):
+            config.read(_SETTINGS_FILE, encoding="utf-8")
+        return config.getint("room", "prewarm_pool_size", fallback=0)
+
+    @staticmethod
+    def _default_spawn(ipc_pipe: str):
+        from models.player import MusicPlayer
+        cmd = MusicPlayer.build_room_mpv_cmd(ipc_pipe)
+        return MusicPlayer.spawn_room_mpv_process(cmd, os.path.basename(ipc_pipe))
+
+    @staticmethod
+    def _default_pipe_ready(ipc_pipe: str) -> bool:
+        return transport_for(ipc_pipe).exists(ipc_pipe)
+
+    # ------------------------------------------------------------------
+    # 核心操作
+    # ------------------------------------------------------------------
+
+    def _spawn_one(self):
+        """启动一个预热 MPV 并等待 IPC 管道就绪；失败返回 None。"""
+        ipc_pipe = pool_ipc_path(f"{os.getpid()}-{next(self._seq)}")
+        try:
+            process = self._spawn_fn(ipc_pipe)
+        except Exception as e:
+            logger.warning(f"[MpvPool] 预热 MPV 启动失败: {e}")
+            return None
+
+        pooled = PooledMpv(process, ipc_pipe)
+        deadline = time.time() + self.READY_TIMEOUT
+        while time.time() < deadline and not self._stopped:
+            if self._pipe_ready_fn(ipc_pipe):
+                logger.info(f"[MpvPool] 预热 MPV 就绪: {ipc_pipe} (PID={process.pid})")
+                return pooled
+            if not pooled.alive():
+                break
+            time.sleep(0.15)
+
+        logger.warning(f"[MpvPool] 预热 MPV 未就绪，放弃: {ipc_pipe}")
+        pooled.terminate()
+        return None
+
+    def fill(self) -> int:
+        """补充池至目标大小，返回本次新增数量。"""
+        added = 0
+        while not self._stopped:
+            with self._lock:
+                self._idle = [p for p in self._idle if p.alive()]
+                if len(self._idle) >= self.size:
+                    break
+            pooled = self._spawn_one()
+            if pooled is None:
+                break
+            with self._lock:
+                if self._stopped:
+                    pooled.terminate()
+                    break
+                self._idle.append(pooled)
+            added += 1
+        return added
+
+    def acquire(self):
+        """认领一个存活的空闲 MPV；池空时返回 None（调用方回退冷启动）。"""
+        pooled = None
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.pop(0)
+                if candidate.alive():
+                    pooled = candidate
+                    break
+            if pooled is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._wakeup.set()
+        return pooled
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return sum(1 for p in self._idle if p.alive())
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self.idle_count(),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _run(self):
+        backoff = 5.0
+        while not self._stopped:
+            try:
+                self.fill()
+            except Exception as e:
+                logger.error(f"[MpvPool] 补充异常: {e}")
+            if self._stopped:
+                break
+            # 补充失败（池仍不满）时指数退避，避免 MPV 缺失时反复拉起进程
+            if self.idle_count() < self.size:
+                wait = backoff
+                backoff = min(backoff * 2, self.RETRY_BACKOFF_MAX)
+            else:
+                wait = 60.0
+                backoff = 5.0
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def start(self):
+        """启动后台补充线程（size 为 0 时不启动）。"""
+        if self.size <= 0:
+            logger.info("[MpvPool] 预热池已禁用 (prewarm_pool_size = 0)")
+            return
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="RoomMpvPool")
+        self._thread.start()
+        logger.info(f"[MpvPool] 预热池已启动 (size={self.size})")
+
+    def shutdown(self):
+        """停止补充并结束所有空闲 MPV。"""
+        self._stopped = True
+        self._wakeup.set()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            pooled.terminate()
+        if idle:
+            logger.info(f"[MpvPool] 已结束 {len(idle)} 个预热 MPV")
+
+
+room_mpv_pool = RoomMpvPool()
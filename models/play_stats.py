@@ -0,0 +1,213 @@
+"""
+播放统计时间序列存储 - 以 SQLite 追加写入播放事件 (song_id, ts, room_id)。
+
+播放历史 JSON 只保留每首歌最近的若干时间戳（启动时整体加载），完整的播放事件
+写入 play_events.db，按时间/房间建索引，支持：
+  - 一段时间内播放次数最多的歌曲（top N）
+  - 按小时（本地时间 0-23 点）的播放分布
+  - 按房间的播放统计
+
+未调用 open() 前 record() 为空操作（测试与未启用统计时不产生文件）。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS play_events (
+    song_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    room_id TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_play_events_ts ON play_events (ts, song_id);
+CREATE INDEX IF NOT EXISTS idx_play_events_room_ts ON play_events (room_id, ts, song_id);
+"""
+
+
+class PlayEventStore:
+    """追加写入的播放事件表（线程安全，单连接 + 锁）。"""
+
+    def __init__(self):
+        self.db_path = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self._song_ids = {}
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def open(self, db_path: str):
+        """打开（必要时创建）数据库；重复调用会先关闭旧连接。"""
+        self.close()
+        dir_name = os.path.dirname(db_path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        with self._lock:
+            self._conn = conn
+            self.db_path = db_path
+            self._song_ids = {}
+        logger.info(f"[PlayStats] 播放统计库已打开: {db_path}")
+
+    def close(self):
+        with self._lock:
+            conn, self._conn = self._conn, None
+            self._song_ids = {}
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.warning(f"[PlayStats] 关闭数据库异常: {e}")
+
+    @property
+    def is_open(self) -> bool:
+        return self._conn is not None
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def _song_id(self, url: str, title: str) -> int:
+        """URL → song_id（调用方持锁）；标题变化时同步更新。"""
+        cached = self._song_ids.get(url)
+        if cached is not None and cached[1] == title:
+            return cached[0]
+        self._conn.execute(
+            "INSERT INTO songs (url, title) VALUES (?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET title = excluded.title WHERE excluded.title != ''",
+            (url, title or ""),
+        )
+        song_id = self._conn.execute("SELECT id FROM songs WHERE url = ?", (url,)).fetchone()[0]
+        self._song_ids[url] = (song_id, title)
+        return song_id
+
+    def record(self, url: str, title: str = "", room_id: str = "", ts: int = None):
+        """记录一次播放；数据库未打开时忽略。"""
+        self.record_many([(url, title, room_id, ts)])
+
+    def record_many(self, events):
+        """批量记录 (url, title, room_id, ts) 事件（ts 为 None 时取当前时间）。"""
+        if self._conn is None or not events:
+            return
+        now = int(time.time())
+        try:
+            with self._lock:
+                if self._conn is None:
+                    return
+                rows = [
+                    (self._song_id(url, title or ""), int(ts if ts is not None else now), room_id or "")
+                    for url, title, room_id, ts in events
+                    if url
+                ]
+                self._conn.executemany(
+                    "INSERT INTO play_events (song_id, ts, room_id) VALUES (?, ?, ?)", rows
+                )
+                self._conn.commit()
+        except Exception as e:
+            logger.warning(f"[PlayStats] 记录播放事件失败: {e}")
+
+    def backfill_from_history(self, history) -> int:
+        """事件表为空时，从播放历史的时间戳导入初始数据；返回导入条数。"""
+        if self._conn is None or self.count() > 0:
+            return 0
+        events = []
+        room_id = getattr(history, "room_id", "") or ""
+        for song in list(getattr(history, "_items", []) or []):
+            url = getattr(song, "url", None)
+            for ts in getattr(song, "play_timestamps", []) or []:
+                events.append((url, getattr(song, "title", ""), room_id, ts))
+        self.record_many(events)
+        if events:
+            logger.info(f"[PlayStats] 已从播放历史导入 {len(events)} 条播放事件")
+        return len(events)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _where(since, until, room_id):
+        clauses, params = [], []
+        if room_id is not None:
+            clauses.append("e.room_id = ?")
+            params.append(room_id)
+        if since is not None:
+            clauses.append("e.ts >= ?")
+            params.append(int(since))
+        if until is not None:
+            clauses.append("e.ts < ?")
+            params.append(int(until))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _query(self, sql: str, params) -> list:
+        if self._conn is None:
+            return []
+        with self._lock:
+            if self._conn is None:
+                return []
+            return self._conn.execute(sql, params).fetchall()
+
+    def count(self, since: int = None, until: int = None, room_id: str = None) -> int:
+        where, params = self._where(since, until, room_id)
+        rows = self._query(f"SELECT COUNT(*) FROM play_events e{where}", params)
+        return rows[0][0] if rows else 0
+
+    def top_songs(self, since: int = None, until: int = None, room_id: str = None, limit: int = 10) -> list:
+        """时间段内播放次数最多的歌曲，按次数、最后播放时间降序。"""
+        where, params = self._where(since, until, room_id)
+        rows = self._query(
+            "SELECT s.url, s.title, t.plays, t.last_ts FROM ("
+            f"  SELECT e.song_id, COUNT(*) AS plays, MAX(e.ts) AS last_ts FROM play_events e{where}"
+            "  GROUP BY e.song_id ORDER BY plays DESC, last_ts DESC LIMIT ?"
+            ") t JOIN songs s ON s.id = t.song_id ORDER BY t.plays DESC, t.last_ts DESC",
+            params + [max(1, int(limit))],
+        )
+        return [
+            {"url": url, "title": title or url, "plays": plays, "last_ts": last_ts}
+            for url, title, plays, last_ts in rows
+        ]
+
+    def hourly_histogram(self, since: int = None, until: int = None, room_id: str = None) -> list:
+        """按本地时间小时（0-23）统计播放次数，返回长度 24 的列表。"""
+        where, params = self._where(since, until, room_id)
+        rows = self._query(
+            "SELECT CAST(strftime('%H', e.ts, 'unixepoch', 'localtime') AS INTEGER) AS hour, COUNT(*)"
+            f" FROM play_events e{where} GROUP BY hour",
+            params,
+        )
+        hours = [0] * 24
+        for hour, plays in rows:
+            if hour is not None and 0 <= hour < 24:
+                hours[hour] = plays
+        return hours
+
+    def room_stats(self, since: int = None, until: int = None) -> list:
+        """按房间统计播放次数与不同歌曲数（主播放器的 room_id 为空字符串）。"""
+        where, params = self._where(since, until, None)
+        rows = self._query(
+            "SELECT e.room_id, COUNT(*) AS plays, COUNT(DISTINCT e.song_id), MAX(e.ts)"
+            f" FROM play_events e{where} GROUP BY e.room_id ORDER BY plays DESC",
+            params,
+        )
+        return [
+            {"room_id": room_id, "plays": plays, "unique_songs": unique_songs, "last_ts": last_ts}
+            for room_id, plays, unique_songs, last_ts in rows
+        ]
+
+
+play_stats = PlayEventStore()
@@ -24,10 +24,18 @@ import logging
 import errno
 from .playlist import CurrentPlaylist, PlayHistory
 from .playlists import Playlist
+from .scheduler import blocking_tasks, room_tasks
 from .settings_ini import replace_section_values
-from .song import LocalSong, Song, StreamSong
+from .song import LocalSong, Song, StreamSong, library_relpath
+from .tag_index import iter_tree_rels, tag_index
+from .metrics import MPV_IPC_SECONDS
+from .tracing import span
+from .mpv_ipc import pcm_output_ready, room_ipc_path, room_pcm_path, transport_for
+from .room_workers import in_room_worker
 
 logger = logging.getLogger(__name__)
+# MPV IPC 热路径日志（可在 settings.ini [logging] levels 中单独调整级别）
+_ipc_logger = logging.getLogger(__name__ + ".ipc")
 
 try:
     import opencc as _opencc
@@ -157,6 +165,15 @@ class MusicPlayer:
             return bin_yt_dlp
         return "yt-dlp"
 
+    @staticmethod
+    def _get_ffmpeg_path() -> str:
+        """获取 ffmpeg 可执行文件路径（优先使用 bin 目录，其次系统 PATH）"""
+        app_dir = MusicPlayer._get_app_dir()
+        bin_ffmpeg = os.path.join(app_dir, "bin", "ffmpeg.exe")
+        if os.path.exists(bin_ffmpeg):
+            return bin_ffmpeg
+        return "ffmpeg"
+
     @staticmethod
     def _is_invalid_title(title, raw_url):
         """判断 mpv 返回的 media-title 是否为无效标题（URL、video ID 等）"""
@@ -521,24 +538,14 @@ class MusicPlayer:
         instance = object.__new__(cls)
 
         # RoomPlayer 专有：管道和 MPV 命令配置
-        ipc_pipe = rf'\\.\pipe\mpv-ipc-{room_id}'
-        pcm_pipe = rf'\\.\pipe\pcm-{room_id}'
+        ipc_pipe = room_ipc_path(room_id)
+        pcm_pipe = room_pcm_path(room_id)
         instance._room_id = room_id
         instance._pcm_pipe_name = pcm_pipe
         instance._default_volume = default_volume
 
         # MPV 命令: PCM 输出直接写入 Named Pipe（ClubVoice 作为管道服务端）
-        app_dir = MusicPlayer._get_app_dir()
-        mpv_exe = os.path.join(app_dir, "bin", "mpv.exe")
-        instance.mpv_cmd = (
-            f'{mpv_exe}'
-            f' --no-config'
-            f' --input-ipc-server={ipc_pipe}'
-            f' --ao=pcm --ao-pcm-file={pcm_pipe} --ao-pcm-waveheader=no'
-            f' --audio-samplerate=48000 --audio-channels=stereo --audio-format=s16'
-            f' --idle=yes --force-window=no --no-video'
-            f' --volume={default_volume}'
-        )
+        instance.mpv_cmd = cls.build_room_mpv_cmd(ipc_pipe, pcm_pipe, default_volume)
         instance.mpv_process = None
 
         # 共享基础属性（与 PipePlayer 相同）
@@ -557,11 +564,95 @@ class MusicPlayer:
         logger.info(f"[RoomPlayer] 已初始化房间运行时队列: {instance._room_playlist_id}")
         return instance
 
-    def start_room_mpv(self) -> bool:
+    @staticmethod
+    def build_room_mpv_cmd(ipc_pipe: str, pcm_pipe: str = "", volume: int = 80) -> str:
+        """构建 RoomPlayer 的 MPV 启动命令。
+
+        pcm_pipe 为空时不指定 --ao-pcm-file（预热池进程，认领时再经 IPC 绑定）。
+        非 Windows 平台优先使用 bin/mpv，否则使用 PATH 中的 mpv；路径按 POSIX 规则引用。
+        """
+        if os.name == "nt":
+            mpv_exe = os.path.join(MusicPlayer._get_app_dir(), "bin", "mpv.exe")
+        else:
+            import shlex
+            import shutil
+
+            local_mpv = os.path.join(MusicPlayer._get_app_dir(), "bin", "mpv")
+            mpv_exe = shlex.quote(local_mpv if os.path.exists(local_mpv) else (shutil.which("mpv") or "mpv"))
+            ipc_pipe = shlex.quote(ipc_pipe)
+            pcm_pipe = shlex.quote(pcm_pipe) if pcm_pipe else ""
+        pcm_arg = f' --ao-pcm-file={pcm_pipe}' if pcm_pipe else ''
+        return (
+            f'{mpv_exe}'
+            f' --no-config'
+            f' --input-ipc-server={ipc_pipe}'
+            f' --ao=pcm{pcm_arg} --ao-pcm-waveheader=no'
+            f' --audio-samplerate=48000 --audio-channels=stereo --audio-format=s16'
+            f' --idle=yes --force-window=no --no-video'
+            f' --volume={volume}'
+        )
+
+    @staticmethod
+    def spawn_room_mpv_process(mpv_cmd: str, label: str):
+        """启动一个 RoomPlayer 风格的 MPV 进程（不等待 IPC 管道）。
+
+        返回 subprocess.Popen；stderr 由后台线程持续读取，避免缓冲区满阻塞 MPV。
+        Windows 下使用独立进程组且不弹窗口；其他平台放入新会话（与父进程信号隔离）。
+        """
+        import shlex
+        CREATE_NEW_PROCESS_GROUP = 0x00000200
+        CREATE_NO_WINDOW = 0x08000000
+
+        is_windows = os.name == "nt"
+        cmd_list = shlex.split(mpv_cmd, posix=not is_windows)
+
+        # 添加 yt-dlp 支持
+        app_dir = MusicPlayer._get_app_dir()
+        yt_dlp = os.path.join(app_dir, "bin", "yt-dlp.exe" if is_windows else "yt-dlp")
+        if os.path.exists(yt_dlp):
+            cmd_list.append("--ytdl=yes")
+            if is_windows:
+                yt_path_escaped = os.path.abspath(yt_dlp).replace("\\", "/")
+                cmd_list.append(f'--script-opts=ytdl_hook-ytdl_path="{yt_path_escaped}"')
+            else:
+                cmd_list.append(f"--script-opts=ytdl_hook-ytdl_path={os.path.abspath(yt_dlp)}")
+        else:
+            cmd_list.append("--ytdl=yes")
+
+        platform_kwargs = (
+            {"creationflags": CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW}
+            if is_windows else {"start_new_session": True}
+        )
+        process = subprocess.Popen(
+            cmd_list,
+            shell=False,
+            **platform_kwargs,
+            stdout=subprocess.DEVNULL,  # PCM 直接写入 Named Pipe，不经 stdout
+            stderr=subprocess.PIPE,     # 捕获 stderr 用于诊断
+            stdin=subprocess.DEVNULL,
+        )
+
+        def _drain_stderr():
+            try:
+                for line in process.stderr:
+                    text = line.decode('utf-8', errors='replace').rstrip()
+                    if text:
+                        logger.info(f"[RoomPlayer MPV stderr] {text}")
+            except Exception:
+                pass
+        threading.Thread(target=_drain_stderr, daemon=True,
+                         name=f"mpv-stderr-{label}").start()
+        return process
+
+    def start_room_mpv(self, pooled=None) -> bool:
         """启动 RoomPlayer 的 MPV 进程。
 
         PCM 音频通过 --ao-pcm-file 直接写入 Named Pipe（ClubVoice 管道服务端），
         无需 stdout relay。返回 True 表示 MPV 和 IPC 管道已就绪。
+
+        pooled: 预热池中认领的 MPV（models.mpv_pool.PooledMpv，可选）。
+        提供时通过 IPC 重绑定管道/PCM 输出/音量，跳过进程冷启动；
+        重绑定失败则结束该进程并回退冷启动。
         """
         if not hasattr(self, '_room_id') or not self._room_id:
             logger.error("[RoomPlayer] start_room_mpv 仅用于 RoomPlayer 实例")
@@ -571,47 +662,16 @@ class MusicPlayer:
             logger.info(f"[RoomPlayer] MPV IPC 管道已存在: {self.pipe_name}")
             return True
 
+        if pooled is not None:
+            if self._adopt_pooled_mpv(pooled):
+                return True
+            pooled.terminate()
+
         logger.info(f"[RoomPlayer] 启动 MPV: {self.mpv_cmd}")
         try:
-            import shlex
-            import ctypes as _ctypes
-            CREATE_NEW_PROCESS_GROUP = 0x00000200
-            CREATE_NO_WINDOW = 0x08000000
-
-            cmd_list = shlex.split(self.mpv_cmd, posix=False)
-
-            # 添加 yt-dlp 支持
-            app_dir = MusicPlayer._get_app_dir()
-            yt_dlp = os.path.join(app_dir, "bin", "yt-dlp.exe")
-            if os.path.exists(yt_dlp):
-                yt_path_escaped = os.path.abspath(yt_dlp).replace("\\", "/")
-                cmd_list.append("--ytdl=yes")
-                cmd_list.append(f'--script-opts=ytdl_hook-ytdl_path="{yt_path_escaped}"')
-            else:
-                cmd_list.append("--ytdl=yes")
-
-            process = subprocess.Popen(
-                cmd_list,
-                shell=False,
-                creationflags=CREATE_NEW_PROCESS_GROUP | CREATE_NO_WINDOW,
-                stdout=subprocess.DEVNULL,  # PCM 直接写入 Named Pipe，不经 stdout
-                stderr=subprocess.PIPE,     # 捕获 stderr 用于诊断
-                stdin=subprocess.DEVNULL,
-            )
+            process = MusicPlayer.spawn_room_mpv_process(self.mpv_cmd, self._room_id)
             self.mpv_process = process
             logger.info(f"[RoomPlayer] MPV 已启动 (PID={process.pid})")
-
-            # 启动 stderr 读取线程（避免 stderr 缓冲区满阻塞 MPV）
-            def _drain_stderr():
-                try:
-                    for line in process.stderr:
-                        text = line.decode('utf-8', errors='replace').rstrip()
-                        if text:
-                            logger.info(f"[RoomPlayer MPV stderr] {text}")
-                except Exception:
-                    pass
-            threading.Thread(target=_drain_stderr, daemon=True,
-                           name=f"mpv-stderr-{self._room_id}").start()
         except Exception as e:
             logger.error(f"[RoomPlayer] MPV 启动失败: {e}")
             return False
@@ -634,6 +694,41 @@ class MusicPlayer:
         logger.info(f"[RoomPlayer] ✓ 房间 {self._room_id} MPV 已就绪 (PCM → {self._pcm_pipe_name})")
         return True
 
+    def _adopt_pooled_mpv(self, pooled) -> bool:
+        """接管预热池中的空闲 MPV：经 IPC 设置音量、PCM 输出并切换到房间 IPC 管道。
+
+        input-ipc-server 必须最后设置（MPV 会关闭旧管道并在新路径重新监听）。
+        """
+        if not pooled.alive():
+            logger.warning(f"[RoomPlayer] 预热 MPV 已退出，回退冷启动: {pooled.ipc_pipe}")
+            return False
+
+        commands = [
+            ["set_property", "volume", self._default_volume],
+            ["set_property", "ao-pcm-file", self._pcm_pipe_name],
+            ["set_property", "input-ipc-server", self.pipe_name],
+        ]
+        try:
+            with transport_for(pooled.ipc_pipe).open_writer(pooled.ipc_pipe) as w:
+                for cmd in commands:
+                    w.write((json.dumps({"command": cmd}) + "\n").encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"[RoomPlayer] 预热 MPV 重绑定失败，回退冷启动: {e}")
+            return False
+
+        self.mpv_process = pooled.process
+        if not self._wait_pipe(timeout=3):
+            logger.warning(f"[RoomPlayer] 预热 MPV 未切换到房间管道，回退冷启动: {self.pipe_name}")
+            self.mpv_process = None
+            return False
+
+        self._start_event_listener()
+        logger.info(
+            f"[RoomPlayer] ✓ 房间 {self._room_id} 已接管预热 MPV "
+            f"(PID={pooled.process.pid}, PCM → {self._pcm_pipe_name})"
+        )
+        return True
+
     def destroy_room_player(self):
         """销毁 RoomPlayer: 杀 MPV、清理播放列表。"""
         room_id = getattr(self, '_room_id', '?')
@@ -812,7 +907,7 @@ class MusicPlayer:
         if not pcm_pipe:
             return False
 
-        return self._pipe_exists(pcm_pipe)
+        return pcm_output_ready(pcm_pipe)
 
     def _get_desired_audio_device(self) -> str:
         """获取当前实例期望使用的音频设备。"""
@@ -836,7 +931,7 @@ class MusicPlayer:
             return True
 
         try:
-            with open(self.pipe_name, "wb") as pipe:
+            with transport_for(self.pipe_name).open_writer(self.pipe_name) as pipe:
                 pipe.write((json.dumps({"command": ["quit"]}) + "\n").encode("utf-8"))
             end = time.time() + timeout
             while time.time() < end:
@@ -1048,8 +1143,10 @@ class MusicPlayer:
         self.playback_history.load()
 
     def save_playback_history(self):
-        """保存播放历史到文件"""
+        """保存播放历史到文件（立即写入，不等待延迟合并）"""
         self.playback_history.save()
+        if hasattr(self.playback_history, "flush"):
+            self.playback_history.flush()
 
     def load_current_playlist(self):
         """从文件加载当前播放列表"""
@@ -1084,6 +1181,9 @@ class MusicPlayer:
     def _init_mpv_ipc(self):
         """初始化 MPV IPC 连接（在播放器初始化时只调用一次）"""
         self._extract_pipe_name_from_cmd()
+        if in_room_worker():
+            # 房间工作进程只承载 RoomPlayer：默认播放器的 MPV 与事件监听属于主进程
+            return
         self.ensure_mpv()
         # 启动 MPV 事件监听线程（用于服务端自动播放）
         self._start_event_listener()
@@ -1121,7 +1221,7 @@ class MusicPlayer:
                         continue
                 try:
                     # 从管道读取事件
-                    with open(self.pipe_name, "r", encoding="utf-8") as pipe:
+                    with transport_for(self.pipe_name).open_reader(self.pipe_name) as pipe:
                         consecutive_errors = 0
                         for line in pipe:
                             try:
@@ -1214,7 +1314,8 @@ class MusicPlayer:
                     time.sleep(1)
 
         # 启动守护线程
-        listener_thread = threading.Thread(target=event_listener_thread, daemon=True, name="MPVEventListener")
+        listener_name = f"MPVEventListener-{self._room_id}" if getattr(self, '_room_id', '') else "MPVEventListener"
+        listener_thread = threading.Thread(target=event_listener_thread, daemon=True, name=listener_name)
         listener_thread.start()
         logger.info("[事件监听] ✓ 事件监听器线程已启动")
 
@@ -1257,11 +1358,9 @@ class MusicPlayer:
                     # 从歌单中查找当前歌曲的完整数据
                     song_data = None
                     if current_playing_url:
-                        for s in default_playlist.songs:
-                            s_url = s.get("url") if isinstance(s, dict) else str(s)
-                            if s_url == current_playing_url:
-                                song_data = s
-                                break
+                        found_index = default_playlist.index_of_url(current_playing_url)
+                        if found_index >= 0:
+                            song_data = default_playlist.songs[found_index]
                     if song_data is None:
                         song_data = dict(self.current_meta)
 
@@ -1305,11 +1404,7 @@ class MusicPlayer:
                     # === 非单曲循环：处理当前歌曲（删除或移到队尾） ===
                     removed_index = -1
                     if current_playing_url:
-                        for idx, s in enumerate(default_playlist.songs):
-                            s_url = s.get("url") if isinstance(s, dict) else str(s)
-                            if s_url == current_playing_url:
-                                removed_index = idx
-                                break
+                        removed_index = default_playlist.index_of_url(current_playing_url)
 
                     if self.loop_mode == 2:
                         # 全部循环：将当前歌曲移到队尾
@@ -1422,25 +1517,11 @@ class MusicPlayer:
             traceback.print_exc()
 
     def _pipe_exists(self, pipe_path: str) -> bool:
-        """使用 Win32 API 检测命名管道是否存在（比 os.path.exists 更可靠）"""
-        try:
-            import ctypes
-            # WaitNamedPipeW: 等待管道可用，timeout=0 表示立即返回
-            result = ctypes.windll.kernel32.WaitNamedPipeW(pipe_path, 0)
-            if result:
-                return True
-            # WaitNamedPipeW 返回 0 可能是管道不存在或繁忙，用 GetLastError 区分
-            err = ctypes.windll.kernel32.GetLastError()
-            # ERROR_SEM_TIMEOUT (121) = 管道存在但繁忙
-            if err == 121:
-                return True
-            return False
-        except Exception:
-            # 如果 ctypes 不可用，回退到 os.path.exists
-            return os.path.exists(pipe_path)
+        """检测 IPC 端点是否存在（命名管道用 WaitNamedPipeW，Unix socket 需可连接）"""
+        return transport_for(pipe_path).exists(pipe_path)
 
     def mpv_pipe_exists(self) -> bool:
-        """检查 MPV 管道是否存在（仅在 Windows 上检查）"""
+        """检查 MPV IPC 管道 / socket 是否存在"""
         if not self.pipe_name:
             return False
         return self._pipe_exists(self.pipe_name)
@@ -1709,6 +1790,25 @@ class MusicPlayer:
         
         return True
 
+    def _log_mpv_command_diagnostics(self, cmd_list):
+        """mpv_command 的 DEBUG 级诊断日志（调用方已确认 DEBUG 开启）"""
+        _ipc_logger.debug("mpv_command -> %s (pipe %s)", cmd_list, self.pipe_name)
+        if not cmd_list or cmd_list[0] != "loadfile":
+            return
+        file_url = cmd_list[1] if len(cmd_list) > 1 else ""
+        is_room = hasattr(self, '_room_id')
+        if self.mpv_cmd and not is_room:  # PipePlayer/RoomPlayer 跳过启动命令诊断
+            mpv_display_cmd, _runtime_audio_device = self._build_effective_mpv_launch_cmd()
+            _ipc_logger.debug("   MPV 完整命令: %s", mpv_display_cmd)
+        if file_url.startswith(('http://', 'https://')):
+            try:
+                _ipc_logger.debug("   网络播放模式, ytdl-format: %s", self.mpv_get("ytdl-format"))
+            except Exception:
+                pass
+        if is_room:
+            mpv_alive = self.mpv_process is not None and self.mpv_process.poll() is None
+            _ipc_logger.debug("[RoomPlayer 诊断] loadfile → MPV进程存活=%s, 管道=%s", mpv_alive, self.pipe_name)
+
     def mpv_command(self, cmd_list) -> bool:
         """向 MPV 发送命令
 
@@ -1716,69 +1816,23 @@ class MusicPlayer:
         """
 
         def _write():
-            # Debug: 显示发送的命令
-            logger.debug(f"mpv_command -> sending: {cmd_list} to pipe {self.pipe_name}")
-
-            # PipePlayer 模式：额外日志
-            if self.mpv_cmd is None:
-                logger.info(f"[PipePlayer] 发送命令: {cmd_list[0] if cmd_list else 'N/A'}, 管道: {self.pipe_name}")
-
-            # ✅ 对特定命令显示更详细的日志
-            if cmd_list and len(cmd_list) > 0:
-                cmd_name = cmd_list[0]
-                if cmd_name == "loadfile":
-                    file_url = cmd_list[1] if len(cmd_list) > 1 else 'N/A'
-                    logger.info(f"📂 [MPV 命令] loadfile: {file_url[:100]}{'...' if len(file_url) > 100 else ''}")
-                    
-                    # 显示当前 MPV 完整配置信息（包含运行时参数）
-                    if self.mpv_cmd and not hasattr(self, '_room_id'):  # PipePlayer/RoomPlayer 跳过此诊断块
-                        mpv_display_cmd, _runtime_audio_device = self._build_effective_mpv_launch_cmd()
+            # 诊断日志（含额外的 ytdl-format IPC 查询）仅在 IPC 子系统开启 DEBUG 时执行
+            if _ipc_logger.isEnabledFor(logging.DEBUG):
+                self._log_mpv_command_diagnostics(cmd_list)
 
-                        logger.info(f"   🎵 MPV 完整命令: {mpv_display_cmd}")
-                    
-                    # 对于网络歌曲（YouTube等），显示额外的参数
-                    is_network_url = file_url.startswith(('http://', 'https://'))
-                    if is_network_url:
-                        logger.info(f"   🌐 网络播放模式")
-                        if self.mpv_cmd and not hasattr(self, '_room_id'):
-                            logger.info(f"   📋 完整命令参数: {mpv_display_cmd} \"{file_url}\"")
-                        # 显示 ytdl 相关属性
-                        try:
-                            ytdl_format = self.mpv_get("ytdl-format")
-                            if ytdl_format:
-                                logger.info(f"   🎬 ytdl-format: {ytdl_format}")
-                        except:
-                            pass
-                        
-                elif cmd_name == "set_property":
-                    if len(cmd_list) >= 3:
-                        logger.info(f"⚙️  [MPV 命令] set_property: {cmd_list[1]} = {cmd_list[2]}")
-                    else:
-                        logger.info(f"⚙️  [MPV 命令] set_property: {cmd_list}")
-                elif cmd_name == "cycle":
-                    logger.info(f"🔄 [MPV 命令] cycle: {cmd_list[1] if len(cmd_list) > 1 else 'N/A'}")
-                elif cmd_name == "stop":
-                    logger.info(f"⏹️  [MPV 命令] stop")
-                else:
-                    logger.debug(f"[MPV 命令] {cmd_name}: {cmd_list[1:] if len(cmd_list) > 1 else 'N/A'}")
-            
-            with open(self.pipe_name, "wb") as w:
-                json_cmd = json.dumps({"command": cmd_list})
+            json_cmd = json.dumps({"command": cmd_list})
+            with transport_for(self.pipe_name).open_writer(self.pipe_name) as w:
                 w.write((json_cmd + "\n").encode("utf-8"))
-                logger.debug(f"✅ 命令已发送到管道: {self.pipe_name}")
-                logger.debug(f"  JSON内容: {json_cmd}")
 
-            # RoomPlayer loadfile 后诊断
-            if (cmd_list and cmd_list[0] == "loadfile"
-                    and hasattr(self, '_room_id')):
-                mpv_alive = (self.mpv_process is not None
-                             and self.mpv_process.poll() is None)
-                logger.info(f"[RoomPlayer 诊断] loadfile 已发送 → "
-                            f"MPV进程存活={mpv_alive}, "
-                            f"管道={self.pipe_name}")
+            if cmd_list and cmd_list[0] == "loadfile" and len(cmd_list) > 1:
+                _ipc_logger.info("[MPV 命令] loadfile: %.100s", cmd_list[1])
 
         try:
-            _write()
+            label = self._ipc_command_label(cmd_list)
+            started = time.perf_counter()
+            with span(f"mpv.{label}"):
+                _write()
+            MPV_IPC_SECONDS.observe(time.perf_counter() - started, label, "write")
             return True
         except TimeoutError as e:
             logger.error(f"❌ 命令发送超时: {e}")
@@ -1831,8 +1885,27 @@ class MusicPlayer:
                     return False
             return False
 
+    @staticmethod
+    def _ipc_command_label(cmd_list) -> str:
+        """IPC 指标的命令标签：属性读写附带属性名（如 get_property:time-pos）"""
+        if not cmd_list:
+            return "unknown"
+        name = str(cmd_list[0])
+        if name in ("get_property", "set_property") and len(cmd_list) > 1:
+            return f"{name}:{cmd_list[1]}"
+        return name
+
     def mpv_request(self, payload: dict):
-        """向 MPV 发送请求并等待响应"""
+        """向 MPV 发送请求并等待响应（记录往返耗时指标）"""
+        label = self._ipc_command_label(payload.get("command"))
+        started = time.perf_counter()
+        try:
+            with span(f"mpv.{label}", kind="request"):
+                return self._mpv_request(payload)
+        finally:
+            MPV_IPC_SECONDS.observe(time.perf_counter() - started, label, "request")
+
+    def _mpv_request(self, payload: dict):
         if self._stop_flag:
             return None
 
@@ -1845,7 +1918,7 @@ class MusicPlayer:
                 return None
 
             try:
-                with open(self.pipe_name, "r+b", 0) as f:
+                with transport_for(self.pipe_name).open_duplex(self.pipe_name) as f:
                     f.write((json.dumps(payload) + "\n").encode("utf-8"))
                     f.flush()
                     while True:
@@ -2133,8 +2206,14 @@ class MusicPlayer:
         tree, albums = self._build_local_library_snapshot()
         self.local_file_tree = tree
         self.local_albums = albums
+        self._schedule_tag_scan(tree)
         return albums
 
+    def _schedule_tag_scan(self, tree: dict):
+        """媒体库变化后在后台更新标签索引（索引未启用时跳过，不阻塞调用方）"""
+        if tag_index.cache_file:
+            tag_index.schedule_scan(self.music_dir, iter_tree_rels(tree))
+
     def get_local_albums(self) -> list[dict]:
         """获取缓存的本地专辑列表。"""
         if not hasattr(self, "local_albums"):
@@ -2149,6 +2228,7 @@ class MusicPlayer:
         """
         tree, albums = self._build_local_library_snapshot()
         self.local_albums = albums
+        self._schedule_tag_scan(tree)
         return tree
 
     def build_playlist(self) -> list:
@@ -2322,6 +2402,9 @@ class MusicPlayer:
         # 添加到播放队列
         for rel_path in tracks:
             song = LocalSong(rel_path, os.path.basename(rel_path))
+            tags = tag_index.get(rel_path)
+            if tags and tags.get("duration"):
+                song.duration = tags["duration"]
             self.current_playlist.add(song)
 
         # 如果队列不为空，设置当前索引为第一首
@@ -2559,38 +2642,9 @@ class MusicPlayer:
                     self.current_playlist.set_current_index(0)
                     logger.debug(f"创建新播放队列（单个视频）")
 
-            # 后台线程轮询获取 mpv 的 media-title（避免阻塞调用方最多 10 秒）
-            def _poll_media_title():
-                for attempt in range(20):
-                    time.sleep(0.5)
-                    try:
-                        media_title = mpv_get_func("media-title")
-                        if (
-                            media_title
-                            and isinstance(media_title, str)
-                            and not MusicPlayer._is_invalid_title(media_title, url)
-                        ):
-                            # 将获得的媒体标题写入 media_title 字段，并同步更新用户可见的 name
-                            self.current_meta["media_title"] = media_title
-                            self.current_meta["name"] = media_title
-                            # 更新历史记录中最新项的标题（仅当save_to_history为True时）
-                            if save_to_history and not self.playback_history.is_empty():
-                                history_items = self.playback_history.get_all()
-                                if history_items and history_items[0]["url"] == url:
-                                    self.playback_history.update_item(0, name=media_title)
-                            logger.debug(f"mpv media-title 探测到 (尝试 {attempt+1}): {media_title}")
-                            break
-                        else:
-                            if attempt < 4:
-                                logger.debug(f"media-title 未就绪或不符合 (尝试 {attempt+1}), 值: {repr(media_title)}")
-                    except Exception as _e:
-                        if attempt == 19:
-                            logger.warning(f"无法读取 mpv media-title (最终失败): {_e}")
-
-            import threading
-            threading.Thread(
-                target=_poll_media_title, daemon=True, name="play_url-title-poll"
-            ).start()
+            # 共享元数据已知标题时直接使用；否则由共享调度器轮询 mpv 的 media-title
+            # （避免阻塞调用方最多 10 秒，且不占用专属线程）
+            self._watch_media_title(url, mpv_get_func, save_to_history)
 
             # 记录播放开始时间
             self._last_play_time = time.time()
@@ -2716,14 +2770,15 @@ class MusicPlayer:
         try:
             # 根据歌曲类型调用相应的播放方法
             logger.info(f"[MusicPlayer.play] 调用 song.play()...")
-            success = song.play(
-                mpv_command_func=mpv_command_func,
-                mpv_pipe_exists_func=mpv_pipe_exists_func,
-                ensure_mpv_func=ensure_mpv_func,
-                add_to_history_func=add_to_history_func,
-                save_to_history=save_to_history,
-                music_dir=self.music_dir,
-            )
+            with span("song.play", type=type(song).__name__):
+                success = song.play(
+                    mpv_command_func=mpv_command_func,
+                    mpv_pipe_exists_func=mpv_pipe_exists_func,
+                    ensure_mpv_func=ensure_mpv_func,
+                    add_to_history_func=add_to_history_func,
+                    save_to_history=save_to_history,
+                    music_dir=self.music_dir,
+                )
 
             if not success:
                 logger.error(f"[MusicPlayer.play] ❌ song.play() 返回失败")
@@ -2746,47 +2801,7 @@ class MusicPlayer:
 
             # 对于串流媒体，尝试获取真实的媒体标题
             if song.is_stream():
-                import threading
-
-                def _fetch_media_title():
-                    """后台线程：获取串流媒体的真实标题"""
-
-                    url = song.url
-                    for attempt in range(20):
-                        time.sleep(0.5)
-                        try:
-                            media_title = self.mpv_get("media-title")
-                            if (
-                                media_title
-                                and isinstance(media_title, str)
-                                and not MusicPlayer._is_invalid_title(media_title, url)
-                            ):
-                                # 更新当前元数据
-                                self.current_meta["media_title"] = media_title
-                                self.current_meta["name"] = media_title
-                                # 更新历史记录中的标题
-                                if (
-                                    save_to_history
-                                    and not self.playback_history.is_empty()
-                                ):
-                                    history_items = self.playback_history.get_all()
-                                    if history_items and history_items[0]["url"] == url:
-                                        self.playback_history.update_item(
-                                            0, name=media_title
-                                        )
-                                logger.debug(f"获取到串流媒体标题 (尝试 {attempt+1}): {media_title}") 
-                                break
-                            else:
-                                if attempt < 4:
-                                    logger.debug(f"媒体标题未就绪 (尝试 {attempt+1}), 值: {repr(media_title)}") 
-                        except Exception as e:
-                            if attempt == 19:
-                                logger.warning(f"无法获取媒体标题: {e}")
-
-                # 启动后台线程获取标题
-                threading.Thread(
-                    target=_fetch_media_title, daemon=True, name="FetchMediaTitle"
-                ).start()
+                self._watch_media_title(song.url, self.mpv_get, save_to_history)
 
             # 播放成功后，后台预获取下一曲直链（仅 YouTube 歌曲受益）
             self._prefetch_next_song_url()
@@ -2799,10 +2814,55 @@ class MusicPlayer:
             traceback.print_exc()
             return False
 
+    def _apply_media_title(self, url: str, media_title: str, save_to_history: bool):
+        """写入当前曲目的真实标题，并同步播放历史与共享元数据缓存。"""
+        self.current_meta["media_title"] = media_title
+        self.current_meta["name"] = media_title
+        # 更新历史记录中最新项的标题（仅当save_to_history为True时）
+        if save_to_history and not self.playback_history.is_empty():
+            self.playback_history.update_latest(url, name=media_title)
+
+        from .url_cache import url_cache
+        url_cache.update_metadata(StreamSong.extract_video_id(url), title=media_title)
+
+    def _watch_media_title(self, url: str, mpv_get_func, save_to_history: bool):
+        """获取串流媒体的真实标题：优先共享元数据缓存，未命中时轮询 mpv media-title。"""
+        from .url_cache import url_cache
+
+        known = url_cache.get_metadata(StreamSong.extract_video_id(url))
+        if known and known.get("title"):
+            self._apply_media_title(url, known["title"], save_to_history)
+            logger.debug(f"媒体标题命中共享缓存: {known['title']}")
+            return
+
+        attempts = {"n": 0}
+
+        def _poll_media_title():
+            attempts["n"] += 1
+            attempt = attempts["n"]
+            media_title = mpv_get_func("media-title")
+            if (
+                media_title
+                and isinstance(media_title, str)
+                and not MusicPlayer._is_invalid_title(media_title, url)
+            ):
+                self._apply_media_title(url, media_title, save_to_history)
+                logger.debug(f"mpv media-title 探测到 (尝试 {attempt}): {media_title}")
+                return True
+            if attempt < 5:
+                logger.debug(f"media-title 未就绪或不符合 (尝试 {attempt}), 值: {repr(media_title)}")
+            return False
+
+        room_tasks.poll(
+            0.5, 20, _poll_media_title,
+            on_exhausted=lambda: logger.warning(f"无法读取 mpv media-title (最终失败): {url[:60]}"),
+        )
+
     def _prefetch_next_song_url(self):
-        """后台守护线程：预获取播放列表中下一曲的 YouTube 直链并写入缓存。
+        """后台任务：预获取播放列表中下一曲的 YouTube 直链并写入缓存。
         在当前曲开始播放后立即触发，使下次切歌能直接命中缓存。
         幂等：由 url_cache.prefetch() 内部保证不重复提交同一 video_id。
+        同时把接下来的本地歌曲交给本地音频缓存预复制（music_dir 位于网络共享时）。
         """
         def _do():
             try:
@@ -2813,6 +2873,7 @@ class MusicPlayer:
                 songs = playlist.songs
                 # 下一首：当前 index+1，超出则回到 0（循环头部）
                 current_idx = self.current_index if self.current_index >= 0 else 0
+                self._prefetch_local_cache(songs, current_idx)
                 next_idx = current_idx + 1
                 if next_idx >= len(songs):
                     next_idx = 0
@@ -2846,8 +2907,26 @@ class MusicPlayer:
             except Exception as e:
                 logger.debug(f"[预获取] 异常（无害）: {e}")
 
-        import threading
-        threading.Thread(target=_do, daemon=True, name="PrefetchNextURL").start()
+        blocking_tasks.submit(_do)
+
+    def _prefetch_local_cache(self, songs: list, current_idx: int):
+        """把队列中当前曲之后的本地歌曲交给本地音频缓存（未启用时为空操作）"""
+        from .local_cache import local_cache
+
+        if not local_cache.enabled or not self.music_dir:
+            return
+        rels = []
+        for song in songs[current_idx + 1:current_idx + 1 + local_cache.prefetch_count]:
+            if isinstance(song, dict):
+                url = song.get("url", "")
+                if song.get("type", "local") == "local" and url and not url.startswith("http"):
+                    if os.path.isabs(url):
+                        # 库外文件（含 Windows 跨盘符）不缓存
+                        url = library_relpath(url, self.music_dir)
+                        if url is None:
+                            continue
+                    rels.append(url.replace("\\", "/"))
+        local_cache.schedule_prefetch(self.music_dir, rels)
 
     def handle_track_end(
         self,
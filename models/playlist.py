@@ -2,15 +2,24 @@
 播放列表基类和子类实现
 """
 
+import atexit
 import json
 import os
+import itertools
 import tempfile
+import threading
 import logging
+from collections import OrderedDict
 from abc import ABC, abstractmethod
+from .play_stats import play_stats
 from .song import Song, LocalSong, StreamSong
 
 logger = logging.getLogger(__name__)
 
+# 全局单调递增的版本序列：不同 PlayHistory 实例的版本号也不会重复，
+# 可直接用作 ETag / 响应缓存的 key
+_HISTORY_VERSION_SEQ = itertools.count(1)
+
 
 class BasePlaylist(ABC):
     """播放列表基类 - 抽象基类"""
@@ -308,17 +317,144 @@ class CurrentPlaylist(BasePlaylist):
 
 
 class PlayHistory(Playlist):
-    """播放历史 - 继承自Playlist，每个Song对象有play_count属性"""
+    """播放历史 - 继承自Playlist，每个Song对象有play_count属性
+
+    内部以 OrderedDict（url → Song，最近播放在前）存储，重复播放的移到头部为 O(1)；
+    每首歌的播放时间戳保存为整数列表 play_timestamps。
+    由于条目按 URL 唯一且按最后播放时间排列，存储本身即"合并历史"视图；
+    每个条目的字典形式按需缓存，get_all()/get_page() 只重建变更过的条目。
+    save() 只标记脏数据并延迟 SAVE_DEBOUNCE_SECONDS 秒合并写盘，flush() 立即写入。
+    完整的播放事件写入 models.play_stats（SQLite），JSON 中每首歌只保留最近
+    MAX_SAVED_TIMESTAMPS 个时间戳。
+    """
+
+    SAVE_DEBOUNCE_SECONDS = 2.0
+    MAX_SAVED_TIMESTAMPS = 50
 
-    def __init__(self, max_size: int = 50, file_path: str = None):
+    def __init__(self, max_size: int = 50, file_path: str = None, room_id: str = ""):
         """初始化播放历史
 
         参数:
           max_size: 历史记录最大条数（默认 50）
           file_path: 持久化存储文件路径
+          room_id: 所属房间（写入播放统计，主播放器为空字符串）
         """
+        self.room_id = room_id or ""
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._items_cache = None
+        self._dict_cache = {}
+        self._all_cache = None
         super().__init__(max_size=max_size)
-        self._file_path = file_path
+        self._file_path = None
+        self._dirty = False
+        self._save_timer = None
+        self._version = next(_HISTORY_VERSION_SEQ)
+        if file_path:
+            self.set_file_path(file_path)
+
+    # ---------- 存储 ----------
+
+    @property
+    def _items(self) -> list:
+        """按最近播放排序的 Song 列表快照（兼容基类按下标访问的方法）"""
+        with self._lock:
+            if self._items_cache is None:
+                self._items_cache = list(self._entries.values())
+            return self._items_cache
+
+    @_items.setter
+    def _items(self, items):
+        with self._lock:
+            self._entries = OrderedDict()
+            for song in items or []:
+                url = getattr(song, 'url', None)
+                if url is not None and url not in self._entries:
+                    self._entries[url] = song
+            self._items_cache = None
+            self._all_cache = None
+            self._dict_cache = {}
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def is_empty(self) -> bool:
+        return not self._entries
+
+    @property
+    def version(self) -> int:
+        """数据版本号，每次内容变更后递增"""
+        return self._version
+
+    def _bump_version(self, *urls):
+        """内容变更：递增版本号并失效缓存（传入 urls 时只失效对应条目的字典缓存）"""
+        self._items_cache = None
+        self._all_cache = None
+        if urls:
+            for url in urls:
+                self._dict_cache.pop(url, None)
+        else:
+            self._dict_cache = {}
+        self._version = next(_HISTORY_VERSION_SEQ)
+
+    @staticmethod
+    def _parse_timestamps(value, fallback: int = 0) -> list:
+        """兼容旧格式（逗号分隔字符串）与新格式（整数列表）"""
+        if isinstance(value, list):
+            raw = value
+        elif isinstance(value, str) and value:
+            raw = value.split(',')
+        else:
+            raw = []
+        result = []
+        for ts in raw:
+            try:
+                result.append(int(ts))
+            except (TypeError, ValueError):
+                continue
+        if not result and fallback:
+            result.append(int(fallback))
+        return result
+
+    @staticmethod
+    def _history_fields(song) -> dict:
+        return {
+            'play_count': getattr(song, 'play_count', 1),
+            'ts': getattr(song, 'timestamp', 0),
+        }
+
+    # ---------- 写操作 ----------
+
+    def add(self, item):
+        """添加项目到列表最上位置"""
+        with self._lock:
+            url = getattr(item, 'url', None)
+            self._entries.pop(url, None)
+            self._entries[url] = item
+            self._entries.move_to_end(url, last=False)
+            self._trim()
+            self._bump_version(url)
+
+    def insert(self, index: int, item):
+        """在指定位置插入项目"""
+        with self._lock:
+            items = [song for song in self._items if song is not item]
+            items.insert(index, item)
+            self._items = items[: self._max_size] if self._max_size else items
+            self._bump_version()
+
+    def remove(self, index: int):
+        """删除指定位置的项目"""
+        with self._lock:
+            song = self.get_item(index)
+            if song is not None:
+                self._entries.pop(song.url, None)
+                self._bump_version(song.url)
+
+    def _trim(self):
+        while self._max_size and len(self._entries) > self._max_size:
+            url, _ = self._entries.popitem(last=True)
+            self._dict_cache.pop(url, None)
 
     def add_to_history(self, url_or_path: str, name: str, is_local: bool = False, thumbnail_url: str = None):
         """添加项目到历史记录，聚合相同URL的播放并记录每次播放时间
@@ -331,63 +467,55 @@ class PlayHistory(Playlist):
         """
         import time
 
-        # 查找已存在的同一URL记录
-        existing_song = None
-        existing_index = -1
-        for idx, song in enumerate(self._items):
-            if isinstance(song, Song) and song.url == url_or_path:
-                existing_song = song
-                existing_index = idx
-                break
-
         current_timestamp = int(time.time())
 
-        if existing_song:
-            # 如果已存在，增加play_count并更新时间戳
-            if not hasattr(existing_song, 'play_count'):
-                existing_song.play_count = 0
-            existing_song.play_count += 1
-            existing_song.timestamp = current_timestamp
-            existing_song.ts = current_timestamp
-            existing_song.title = name  # 更新名称
-            if thumbnail_url and hasattr(existing_song, 'thumbnail_url'):
-                existing_song.thumbnail_url = thumbnail_url
-            
-            # 维护 timestamps 字段（逗号分割的时间戳列表）
-            if not hasattr(existing_song, 'timestamps'):
-                existing_song.timestamps = str(current_timestamp)
-            else:
-                # 添加新的时间戳
-                existing_song.timestamps = f"{existing_song.timestamps},{current_timestamp}"
-            
-            # 将该项移动到列表头部
-            self._items.pop(existing_index)
-            self._items.insert(0, existing_song)
-            logger.debug(f"已更新播放历史: {name} ({existing_song.type})，播放次数: {existing_song.play_count}，时间戳: {current_timestamp}")
-        else:
-            # 如果不存在，创建新Song对象
-            if is_local:
-                song = LocalSong(url_or_path, title=name)
+        with self._lock:
+            existing_song = self._entries.get(url_or_path)
+            if existing_song is not None:
+                # 如果已存在，增加play_count并更新时间戳
+                existing_song.play_count = getattr(existing_song, 'play_count', 0) + 1
+                existing_song.timestamp = current_timestamp
+                existing_song.ts = current_timestamp
+                existing_song.title = name  # 更新名称
+                if thumbnail_url and hasattr(existing_song, 'thumbnail_url'):
+                    existing_song.thumbnail_url = thumbnail_url
+
+                if not hasattr(existing_song, 'play_timestamps'):
+                    existing_song.play_timestamps = []
+                existing_song.play_timestamps.append(current_timestamp)
+                del existing_song.play_timestamps[:-self.MAX_SAVED_TIMESTAMPS]
+
+                # 将该项移动到头部（O(1)）
+                self._entries.move_to_end(url_or_path, last=False)
+                logger.debug(f"已更新播放历史: {name} ({existing_song.type})，播放次数: {existing_song.play_count}，时间戳: {current_timestamp}")
             else:
-                song = StreamSong(url_or_path, title=name)
-                if thumbnail_url:
-                    song.thumbnail_url = thumbnail_url
-            
-            # 添加播放历史特有属性
-            song.play_count = 1
-            song.timestamp = current_timestamp
-            song.ts = current_timestamp
-            song.timestamps = str(current_timestamp)  # 第一次播放的时间戳
-            
-            self._items.insert(0, song)
-            # 保持列表大小限制
-            if self._max_size and len(self._items) > self._max_size:
-                self._items = self._items[: self._max_size]
-            logger.debug(f"已添加播放历史: {name} ({song.type})，时间戳: {current_timestamp}")
-
-        # 保存到文件
-        if self._file_path:
-            self.save()
+                # 如果不存在，创建新Song对象
+                if is_local:
+                    song = LocalSong(url_or_path, title=name)
+                else:
+                    song = StreamSong(url_or_path, title=name)
+                    if thumbnail_url:
+                        song.thumbnail_url = thumbnail_url
+
+                # 添加播放历史特有属性
+                song.play_count = 1
+                song.timestamp = current_timestamp
+                song.ts = current_timestamp
+                song.play_timestamps = [current_timestamp]
+
+                self._entries[url_or_path] = song
+                self._entries.move_to_end(url_or_path, last=False)
+                # 保持列表大小限制（淘汰最久未播放的条目）
+                self._trim()
+                logger.debug(f"已添加播放历史: {name} ({song.type})，时间戳: {current_timestamp}")
+
+            self._bump_version(url_or_path)
+
+        # 追加到播放统计（未启用时为空操作）
+        play_stats.record(url_or_path, name, self.room_id, current_timestamp)
+
+        # 延迟保存到文件
+        self.save()
 
     def remove_by_url(self, url: str) -> bool:
         """根据URL删除单条播放历史记录
@@ -398,42 +526,65 @@ class PlayHistory(Playlist):
         返回:
           True 如果成功删除，False 如果未找到
         """
-        for idx, song in enumerate(self._items):
-            if isinstance(song, Song) and song.url == url:
-                self._items.pop(idx)
-                if self._file_path:
-                    self.save()
-                logger.info(f"已删除播放历史记录: {song.title} ({url})")
-                return True
-        return False
+        with self._lock:
+            song = self._entries.pop(url, None)
+            if song is None:
+                return False
+            self._bump_version(url)
+        self.save()
+        logger.info(f"已删除播放历史记录: {song.title} ({url})")
+        return True
 
     def set_file_path(self, file_path: str):
-        """设置持久化文件路径"""
+        """设置持久化文件路径（进程退出时自动写入未保存的变更）"""
+        if file_path and not self._file_path:
+            atexit.register(self.flush)
         self._file_path = file_path
 
+    # ---------- 持久化 ----------
+
+    def _serialize(self) -> list:
+        data = []
+        for song in self._items:
+            song_dict = song.to_dict() if hasattr(song, 'to_dict') else {}
+            # 保存播放历史特有属性
+            song_dict.update(self._history_fields(song))
+            # 最近若干次播放的时间戳（整数列表，完整记录见 play_stats）
+            song_dict['timestamps'] = list(getattr(song, 'play_timestamps', []) or [])[-self.MAX_SAVED_TIMESTAMPS:]
+            data.append(song_dict)
+        return data
+
     def save(self):
-        """保存历史记录到文件（原子写入：先写临时文件再重命名）"""
+        """标记需要保存，并在 SAVE_DEBOUNCE_SECONDS 秒后合并写盘（连续播放只写一次）"""
         if not self._file_path:
             return
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.SAVE_DEBOUNCE_SECONDS, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """立即写入未保存的变更（原子写入：先写临时文件再重命名）"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._file_path or not self._dirty:
+                return
+            self._dirty = False
+            data = self._serialize()
+            file_path = self._file_path
+
         try:
-            # 转换为字典格式保存
-            data = []
-            for song in self._items:
-                song_dict = song.to_dict() if hasattr(song, 'to_dict') else {}
-                # 保存播放历史特有属性
-                song_dict['play_count'] = getattr(song, 'play_count', 1)
-                song_dict['ts'] = getattr(song, 'timestamp', 0)
-                # 保存每次播放的时间戳列表
-                song_dict['timestamps'] = getattr(song, 'timestamps', str(getattr(song, 'timestamp', 0)))
-                data.append(song_dict)
-
-            # 原子写入：先写入临时文件，再重命名替换
-            dir_name = os.path.dirname(self._file_path) or "."
+            dir_name = os.path.dirname(file_path) or "."
             fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".tmp")
             try:
                 with os.fdopen(fd, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                os.replace(tmp_path, self._file_path)
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, file_path)
             except BaseException:
                 # 清理临时文件
                 try:
@@ -446,6 +597,7 @@ class PlayHistory(Playlist):
 
     def load(self):
         """从文件加载历史记录"""
+        self._bump_version()
         if not self._file_path or not os.path.exists(self._file_path):
             self._items = []
             return
@@ -453,26 +605,29 @@ class PlayHistory(Playlist):
         try:
             with open(self._file_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
-                if isinstance(data, list):
-                    self._items = []
-                    for item in data[: self._max_size]:
-                        # 从字典创建Song对象
-                        song = Song.from_dict(item) if isinstance(item, dict) else None
-                        if song:
-                            # 恢复播放历史特有属性
-                            song.play_count = item.get('play_count', 1)
-                            song.timestamp = item.get('ts', 0)
-                            song.ts = song.timestamp
-                            # 恢复每次播放的时间戳列表
-                            song.timestamps = item.get('timestamps', str(song.timestamp))
-                            self._items.append(song)
-                    logger.info(f"已加载 {len(self._items)} 条播放历史")
-                else:
-                    self._items = []
+            items = []
+            if isinstance(data, list):
+                for item in data[: self._max_size]:
+                    # 从字典创建Song对象
+                    song = Song.from_dict(item) if isinstance(item, dict) else None
+                    if song:
+                        # 恢复播放历史特有属性
+                        song.play_count = item.get('play_count', 1)
+                        song.timestamp = item.get('ts', 0)
+                        song.ts = song.timestamp
+                        # 恢复每次播放的时间戳列表（兼容旧版逗号分隔字符串）
+                        song.play_timestamps = self._parse_timestamps(item.get('timestamps'), song.timestamp)
+                        items.append(song)
+            # 保持"最近播放在前"的不变式（旧文件可能未按时间排序）
+            items.sort(key=lambda song: song.timestamp or 0, reverse=True)
+            self._items = items
+            logger.info(f"已加载 {self.size()} 条播放历史")
         except Exception as e:
             logger.error(f"加载播放历史失败: {e}")
             self._items = []
 
+    # ---------- 读操作 ----------
+
     def update_item(self, index: int, **kwargs):
         """更新历史记录中的项目属性
 
@@ -480,49 +635,94 @@ class PlayHistory(Playlist):
           index: 项目索引
           **kwargs: 要更新的属性（如 name, title 等）
         """
-        if 0 <= index < len(self._items):
-            song = self._items[index]
+        with self._lock:
+            song = self.get_item(index)
+            if song is None:
+                return
             for key, value in kwargs.items():
                 setattr(song, key, value)
-            if self._file_path:
-                self.save()
+            self._bump_version(song.url)
+        self.save()
 
-    def get_all(self) -> list:
-        """获取所有历史记录，返回字典格式以兼容现有API"""
-        result = []
-        for song in self._items:
+    def update_latest(self, url: str, **kwargs) -> bool:
+        """仅当最近一条历史的 URL 为 url 时更新其属性（O(1)，供标题轮询使用）
+
+        返回:
+          True 如果已更新
+        """
+        with self._lock:
+            song = self.latest()
+            if song is None or song.url != url:
+                return False
+            for key, value in kwargs.items():
+                setattr(song, key, value)
+            self._bump_version(url)
+        self.save()
+        return True
+
+    def latest(self):
+        """返回最近播放的 Song（无历史时返回 None）"""
+        with self._lock:
+            return next(iter(self._entries.values()), None)
+
+    def _entry_dict(self, song) -> dict:
+        """条目的字典形式（按 URL 缓存，条目变更时失效）；调用方不应修改返回值"""
+        item = self._dict_cache.get(song.url)
+        if item is None:
             item = song.to_dict() if hasattr(song, 'to_dict') else {}
-            item['play_count'] = getattr(song, 'play_count', 1)
-            item['ts'] = getattr(song, 'timestamp', 0)
-            # 包含每次播放的时间戳列表
-            item['timestamps'] = getattr(song, 'timestamps', str(getattr(song, 'timestamp', 0)))
-            result.append(item)
-        return result
-    
+            item.update(self._history_fields(song))
+            # 包含每次播放的时间戳列表（逗号分隔，兼容现有API）
+            item['timestamps'] = ",".join(str(ts) for ts in getattr(song, 'play_timestamps', []) or [])
+            self._dict_cache[song.url] = item
+        return item
+
+    def get_all(self) -> list:
+        """获取所有历史记录，返回字典格式以兼容现有API（按版本缓存）"""
+        with self._lock:
+            if self._all_cache is None or self._all_cache[0] != self._version:
+                self._all_cache = (self._version, [self._entry_dict(song) for song in self._entries.values()])
+            return list(self._all_cache[1])
+
+    def get_page(self, offset: int = 0, limit: int = None) -> list:
+        """按最后播放时间降序分页获取历史记录（相同 URL 只出现一次）
+
+        参数:
+          offset: 起始位置
+          limit: 最多返回条数，None 表示到末尾
+        """
+        offset = max(0, int(offset or 0))
+        stop = None if limit is None else offset + max(0, int(limit))
+        with self._lock:
+            if self._all_cache is not None and self._all_cache[0] == self._version:
+                return self._all_cache[1][offset:stop]
+            return [self._entry_dict(song) for song in itertools.islice(self._entries.values(), offset, stop)]
+
     def get_play_timestamps(self, url: str) -> list:
         """获取特定URL的所有播放时间戳列表
-        
+
         参数:
           url: 歌曲URL
-        
+
         返回:
           时间戳列表 (整数列表)
         """
-        for song in self._items:
-            if isinstance(song, Song) and song.url == url:
-                timestamps_str = getattr(song, 'timestamps', '')
-                if timestamps_str:
-                    try:
-                        return [int(ts) for ts in timestamps_str.split(',')]
-                    except:
-                        return []
-        return []
+        with self._lock:
+            song = self._entries.get(url)
+            return list(getattr(song, 'play_timestamps', []) or []) if song is not None else []
+
+    def get_play_info(self, url: str):
+        """返回 (play_count, 最后播放时间戳)；未播放过返回 None（O(1)）"""
+        with self._lock:
+            song = self._entries.get(url)
+            if song is None:
+                return None
+            return getattr(song, 'play_count', 1), getattr(song, 'timestamp', 0)
 
     def clear(self):
         """清空所有播放历史"""
-        self._items = []
-        self._current_index = -1
-        if self._file_path:
-            self.save()
+        with self._lock:
+            self._items = []
+            self._current_index = -1
+            self._bump_version()
+        self.save()
         logger.info("播放历史已清空")
-
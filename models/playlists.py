@@ -4,13 +4,14 @@
 每个 Playlist 包含多首歌曲的路径
 """
 
+import itertools
 import json
 import time
 import os
 import threading
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 
 from models.song import StreamSong
 from models.logger import logger
@@ -19,6 +20,14 @@ DEFAULT_PLAYLIST_ID = "default"
 ROOM_PLAYLIST_PREFIX = "room_"
 DEFAULT_PLAYLIST_NAME = "未命名歌单"
 
+# 全局单调递增的修改序号：SongList 每次变更、Playlist 每次写 updated_at / 替换 songs 时取新值。
+# 歌单 revision 取两者较大值，同一时钟刻度内长度不变的连续修改也会得到不同的版本。
+_revision_counter = itertools.count(1)
+
+
+def next_revision() -> int:
+    return next(_revision_counter)
+
 
 def sanitize_playlist_name(name: str, fallback: Optional[str] = DEFAULT_PLAYLIST_NAME) -> str:
     """标准化歌单名称，去除控制字符并折叠多余空白。"""
@@ -34,6 +43,155 @@ def sanitize_playlist_name(name: str, fallback: Optional[str] = DEFAULT_PLAYLIST
     return fallback if fallback is not None else ""
 
 
+def song_url_key(song) -> Optional[str]:
+    """歌曲条目的 URL 键（dict 取 url，字符串条目本身即路径）"""
+    if isinstance(song, dict):
+        return song.get("url")
+    return str(song) if song is not None else None
+
+
+class SongList(list):
+    """带 URL 索引的歌曲列表
+
+    路由和播放器中大量代码直接对 playlist.songs 做 append/insert/pop/切片赋值，
+    这里在 list 的所有变更入口上同步维护索引，调用方无需改动即可保持一致：
+      - _counts: url → 出现次数，每次变更 O(1) 增量维护，用于 O(1) 成员判断
+      - _positions: url → 首次出现的位置，仅在尾部追加时增量更新；
+        插入/删除/重排等会整体平移位置的操作只标记失效，下次查询时 O(n) 重建一次
+      - revision: 每次变更取新的全局修改序号（见 next_revision）
+    """
+
+    def __init__(self, iterable=()):
+        super().__init__(iterable)
+        self.revision = next_revision()
+        self._counts: Dict[str, int] = {}
+        self._positions: Optional[Dict[str, int]] = None
+        for song in self:
+            self._count_in(song)
+
+    # ---------- 索引维护 ----------
+    def _count_in(self, song):
+        key = song_url_key(song)
+        if key:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _count_out(self, song):
+        key = song_url_key(song)
+        if key:
+            remaining = self._counts.get(key, 0) - 1
+            if remaining > 0:
+                self._counts[key] = remaining
+            else:
+                self._counts.pop(key, None)
+
+    def _rebuild_positions(self) -> Dict[str, int]:
+        positions: Dict[str, int] = {}
+        for idx, song in enumerate(self):
+            key = song_url_key(song)
+            if key and key not in positions:
+                positions[key] = idx
+        self._positions = positions
+        return positions
+
+    def contains_url(self, url: str) -> bool:
+        """O(1) 判断 URL 是否在列表中"""
+        return bool(url) and url in self._counts
+
+    def index_of_url(self, url: str) -> int:
+        """返回 URL 首次出现的位置，不存在返回 -1"""
+        if not self.contains_url(url):
+            return -1
+        positions = self._positions if self._positions is not None else self._rebuild_positions()
+        return positions.get(url, -1)
+
+    # ---------- list 变更入口 ----------
+    def append(self, song):
+        self.revision = next_revision()
+        if self._positions is not None:
+            key = song_url_key(song)
+            if key and key not in self._counts:
+                self._positions[key] = len(self)
+        self._count_in(song)
+        super().append(song)
+
+    def extend(self, songs):
+        for song in list(songs):
+            self.append(song)
+
+    def __iadd__(self, songs):
+        self.extend(songs)
+        return self
+
+    def insert(self, index, song):
+        self.revision = next_revision()
+        self._count_in(song)
+        self._positions = None
+        super().insert(index, song)
+
+    def pop(self, index=-1):
+        song = super().pop(index)
+        self.revision = next_revision()
+        self._count_out(song)
+        self._positions = None
+        return song
+
+    def remove(self, song):
+        super().remove(song)
+        self.revision = next_revision()
+        self._count_out(song)
+        self._positions = None
+
+    def clear(self):
+        super().clear()
+        self.revision = next_revision()
+        self._counts.clear()
+        self._positions = None
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            old_songs, new_songs = self[index], value
+        else:
+            old_songs, new_songs = [self[index]], [value]
+        super().__setitem__(index, value)
+        self.revision = next_revision()
+        for song in old_songs:
+            self._count_out(song)
+        for song in new_songs:
+            self._count_in(song)
+        self._positions = None
+
+    def __delitem__(self, index):
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        super().__delitem__(index)
+        self.revision = next_revision()
+        for song in removed:
+            self._count_out(song)
+        self._positions = None
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.revision = next_revision()
+        self._positions = None
+
+    def reverse(self):
+        super().reverse()
+        self.revision = next_revision()
+        self._positions = None
+
+    def __imul__(self, n):
+        result = super().__imul__(n)
+        self.revision = next_revision()
+        self._counts = {}
+        for song in self:
+            self._count_in(song)
+        self._positions = None
+        return result
+
+    def __reduce_ex__(self, protocol):
+        return (self.__class__, (list(self),))
+
+
 class Playlist:
     """单个播放列表"""
 
@@ -58,7 +216,7 @@ class Playlist:
         """
         self.id = playlist_id or str(int(time.time() * 1000))
         self.name = sanitize_playlist_name(name)
-        self.songs = songs or []
+        self.songs = songs or []  # 经 setter 包装为 SongList（带 URL 索引）
         self.created_at = created_at or time.time()
         self.updated_at = updated_at or time.time()
         self.current_playing_index = current_playing_index
@@ -66,30 +224,65 @@ class Playlist:
         # 确保串流歌曲具备缩略图（兼容旧数据）
         self._hydrate_stream_thumbnails()
 
+    @property
+    def songs(self) -> SongList:
+        return self._songs
+
+    @songs.setter
+    def songs(self, value):
+        # 整体替换（如 playlist.songs = [...]）时重新建立索引
+        self._songs = value if isinstance(value, SongList) else SongList(value or [])
+        self._revision = next_revision()
+
+    @property
+    def updated_at(self) -> float:
+        return self._updated_at
+
+    @updated_at.setter
+    def updated_at(self, value):
+        # 修改歌曲条目内容（标题、时长等）的代码只写 updated_at，同样视为一次修改
+        self._updated_at = value
+        self._revision = next_revision()
+
+    @property
+    def revision(self) -> int:
+        """歌单修改序号：任何修改后都严格增大（用于 ETag 与持久化变更检测）"""
+        return max(self._revision, self._songs.revision)
+
+    def contains_url(self, url: str) -> bool:
+        """O(1) 判断歌单中是否已有该 URL"""
+        return self._songs.contains_url(url)
+
+    def index_of_url(self, url: str) -> int:
+        """返回 URL 在歌单中的位置，不存在返回 -1"""
+        return self._songs.index_of_url(url)
+
+    @staticmethod
+    def _hydrate_stream_thumbnail(song_item: dict):
+        """为缺失 thumbnail_url 的串流歌曲补全缩略图"""
+        if song_item.get("type") not in ("youtube", "stream") or song_item.get("thumbnail_url"):
+            return False
+        try:
+            stream_song = StreamSong(
+                stream_url=song_item.get("url", ""),
+                title=song_item.get("title"),
+                stream_type=song_item.get("type"),
+                duration=song_item.get("duration", 0),
+            )
+            thumb = stream_song.get_thumbnail_url()
+            if thumb:
+                song_item["thumbnail_url"] = thumb
+                return True
+        except Exception:
+            pass
+        return False
+
     def _hydrate_stream_thumbnails(self):
         """补全串流歌曲的缩略图，避免旧数据缺失 thumbnail_url"""
         changed = False
         for song_item in self.songs:
-            if not isinstance(song_item, dict):
-                continue
-            s_type = song_item.get("type")
-            if s_type in ("youtube", "stream") and not song_item.get("thumbnail_url"):
-                url = song_item.get("url", "")
-                title = song_item.get("title")
-                duration = song_item.get("duration", 0)
-                try:
-                    stream_song = StreamSong(
-                        stream_url=url,
-                        title=title,
-                        stream_type=s_type,
-                        duration=duration,
-                    )
-                    thumb = stream_song.get_thumbnail_url()
-                    if thumb:
-                        song_item["thumbnail_url"] = thumb
-                        changed = True
-                except Exception:
-                    continue
+            if isinstance(song_item, dict) and self._hydrate_stream_thumbnail(song_item):
+                changed = True
         if changed:
             self.updated_at = time.time()
         return changed
@@ -107,37 +300,51 @@ class Playlist:
         if isinstance(song_path_or_dict, dict):
             song_item = song_path_or_dict
             # 补充串流歌曲缩略图
-            if (
-                isinstance(song_item, dict)
-                and song_item.get("type") in ("youtube", "stream")
-                and not song_item.get("thumbnail_url")
-            ):
-                try:
-                    stream_song = StreamSong(
-                        stream_url=song_item.get("url", ""),
-                        title=song_item.get("title"),
-                        stream_type=song_item.get("type"),
-                        duration=song_item.get("duration", 0),
-                    )
-                    thumb = stream_song.get_thumbnail_url()
-                    if thumb:
-                        song_item["thumbnail_url"] = thumb
-                except Exception:
-                    pass
-            # 用URL作为唯一键进行去重检查
+            self._hydrate_stream_thumbnail(song_item)
+            # 用URL作为唯一键进行去重检查（O(1) 索引）
             url = song_item.get("url")
-            if not any(isinstance(s, dict) and s.get("url") == url for s in self.songs):
+            if not self.contains_url(url):
                 self.songs.insert(0, song_item)
                 self.updated_at = time.time()
                 return True
         else:
             # 字符串路径方式（向后兼容）
-            if song_path_or_dict not in self.songs:
+            if not self.contains_url(song_path_or_dict):
                 self.songs.insert(0, song_path_or_dict)
                 self.updated_at = time.time()
                 return True
         return False
 
+    def add_songs(self, songs: List, insert_index: int = None) -> List:
+        """批量添加歌曲，一次遍历完成去重（与歌单已有歌曲及批次内部）
+
+        参数:
+            songs: 歌曲字典或路径列表
+            insert_index: 插入位置（None 表示追加到末尾）
+
+        返回:
+            实际添加的歌曲列表（按原顺序）
+        """
+        added = []
+        seen = set()
+        for song_item in songs or []:
+            url = song_url_key(song_item)
+            if not url or url in seen or self.contains_url(url):
+                continue
+            seen.add(url)
+            if isinstance(song_item, dict):
+                self._hydrate_stream_thumbnail(song_item)
+            added.append(song_item)
+
+        if added:
+            if insert_index is None:
+                self.songs.extend(added)
+            else:
+                insert_index = max(0, min(insert_index, len(self.songs)))
+                self.songs[insert_index:insert_index] = added
+            self.updated_at = time.time()
+        return added
+
     def remove(self, index: int) -> bool:
         """按索引删除歌曲（兼容旧接口）"""
         if 0 <= index < len(self.songs):
@@ -160,6 +367,35 @@ class Playlist:
         self.updated_at = time.time()
         return True
 
+    def move_range(self, from_index: int, to_index: int, count: int = 1) -> bool:
+        """将 [from_index, from_index + count) 区间的歌曲整体移动到 to_index
+
+        参数:
+            from_index: 区间起始索引
+            to_index: 移动后区间起始位置（以移除区间后的列表计算，范围 0 ~ len - count）
+            count: 移动的歌曲数量（默认 1，等价于 reorder）
+
+        返回:
+            True 如果移动成功，False 如果参数越界
+        """
+        total = len(self.songs)
+        if (
+            from_index is None
+            or to_index is None
+            or count is None
+            or count < 1
+            or not (0 <= from_index and from_index + count <= total)
+            or not (0 <= to_index <= total - count)
+        ):
+            return False
+        if from_index == to_index:
+            return True
+        block = self.songs[from_index:from_index + count]
+        del self.songs[from_index:from_index + count]
+        self.songs[to_index:to_index] = block
+        self.updated_at = time.time()
+        return True
+
     def remove_song(self, song_path: str) -> bool:
         """从歌单移除歌曲
 
@@ -268,7 +504,18 @@ class Playlist:
 
 
 class Playlists:
-    """多歌单管理器 - 管理多个 Playlist 对象"""
+    """多歌单管理器 - 管理多个 Playlist 对象
+
+    持久化采用「基准文件 + 追加日志」：
+      - playlists.json：基准快照（.tmp 写入后原子替换）
+      - playlists.journal：每次保存只追加发生变化的歌单快照 / 删除 / 顺序变更（JSON Lines）
+    加载时先读基准文件再按序号重放日志；日志条数或体积超过阈值时压缩回基准文件。
+    """
+
+    JOURNAL_SUFFIX = ".journal"
+    # 日志超过此条数，或体积超过基准文件（至少 JOURNAL_COMPACT_MIN_BYTES）时触发压缩
+    JOURNAL_COMPACT_RECORDS = 500
+    JOURNAL_COMPACT_MIN_BYTES = 1024 * 1024
 
     @staticmethod
     def is_room_playlist(playlist_id: str) -> bool:
@@ -287,50 +534,162 @@ class Playlists:
             data_file: 保存歌单数据的文件路径
         """
         self.data_file = data_file
+        self.journal_file = str(Path(data_file).with_suffix(self.JOURNAL_SUFFIX))
         self._playlists: Dict[str, Playlist] = {}  # 按 ID 索引
         self._order: List[str] = []  # 歌单的显示顺序
         self._save_timer: Optional[threading.Timer] = None
         self._save_lock = threading.Lock()
+        # 增量持久化状态：已落盘的歌单指纹 / 顺序 / 日志序号
+        self._write_lock = threading.Lock()
+        self._persisted: Dict[str, tuple] = {}
+        self._persisted_order: List[str] = []
+        self._journal_seq = 0
+        self._journal_records = 0
+        self._needs_compaction = False
+        # 房间工作进程中不直接落盘：变更记录交给 replica sink 发回主进程
+        self._replica_sink: Optional[Callable[[List[Dict]], None]] = None
+        self._change_listeners: List[Callable[[List[Dict]], None]] = []
         self.load()
 
+    def set_replica_sink(self, sink: Optional[Callable[[List[Dict]], None]]):
+        """设置变更记录接收方（设置后保存不再写磁盘，只把 put / delete / order 记录交给 sink）"""
+        self._replica_sink = sink
+
+    def add_change_listener(self, listener: Callable[[List[Dict]], None]):
+        """注册落盘后的变更记录回调（在写锁外调用）"""
+        if listener not in self._change_listeners:
+            self._change_listeners.append(listener)
+
+    def apply_records(self, records: List[Dict], persisted: bool = False):
+        """应用其他进程的变更记录（格式同日志记录）
+
+        persisted=True 表示记录已由主进程落盘（工作进程收到推送）：同步已落盘指纹，避免回传；
+        本地尚未同步的修改优先（下一次保存时回传，后写入者生效）。
+        与日志写入互斥（_write_lock）；调用方应在处理请求的事件循环线程中调用。
+        """
+        with self._write_lock:
+            self._apply_records(records, persisted)
+
+    def _apply_records(self, records: List[Dict], persisted: bool):
+        order_changed = False
+        for record in records:
+            op = record.get("op")
+            if op == "put" and isinstance(record.get("playlist"), dict):
+                pid = record["playlist"].get("id")
+                if not pid or self.is_runtime_playlist(pid):
+                    continue
+                current = self._playlists.get(pid)
+                if persisted and current is not None and self._persisted.get(pid) != self._fingerprint(current):
+                    continue
+                playlist = Playlist.from_dict(record["playlist"])
+                self._playlists[pid] = playlist
+                if pid not in self._order:
+                    self._order.append(pid)
+                if persisted:
+                    self._persisted[pid] = self._fingerprint(playlist)
+            elif op == "delete":
+                pid = record.get("id")
+                self._playlists.pop(pid, None)
+                if pid in self._order:
+                    self._order.remove(pid)
+                if persisted:
+                    self._persisted.pop(pid, None)
+            elif op == "order" and isinstance(record.get("order"), list):
+                ordered = [pid for pid in record["order"] if pid in self._playlists]
+                self._order = ordered + [pid for pid in self._order if pid not in ordered]
+                order_changed = True
+        if persisted and order_changed:
+            self._persisted_order = self._persistent_order()
+
+    @staticmethod
+    def _fingerprint(playlist: Playlist) -> tuple:
+        """歌单变更指纹（修改序号每次修改严格递增，同一时钟刻度内的等长修改也能识别）"""
+        return (playlist.revision, playlist.name, playlist.current_playing_index)
+
+    def _read_journal(self, base_seq: int) -> List[Dict]:
+        """读取日志中序号大于 base_seq 的记录（忽略崩溃时写了一半的行）"""
+        records = []
+        if not os.path.exists(self.journal_file):
+            return records
+        with open(self.journal_file, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"歌单日志第 {line_no} 行损坏，已忽略")
+                    continue
+                if isinstance(record, dict) and record.get("seq", 0) > base_seq:
+                    records.append(record)
+        return records
+
     def load(self):
-        """从文件加载歌单数据"""
-        if os.path.exists(self.data_file):
+        """从基准文件 + 日志加载歌单数据"""
+        if os.path.exists(self.data_file) or os.path.exists(self.journal_file):
             try:
-                with open(self.data_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(data, dict):
-                        self._order = data.get("order", [])
-                        playlists_data = data.get("playlists", [])
-                    else:
-                        # 兼容旧格式（直接是列表）
-                        self._order = []
-                        playlists_data = data if isinstance(data, list) else []
-
-                    hydration_changed = False
-                    for pl_data in playlists_data:
-                        pl = Playlist.from_dict(pl_data)
-                        # 跳过运行时播放队列（默认队列、房间队列）
-                        if self.is_runtime_playlist(pl.id):
-                            continue
-                        # 再次补全缩略图（兼容旧数据），如有变更稍后保存
-                        if pl._hydrate_stream_thumbnails():
-                            hydration_changed = True
-                        self._playlists[pl.id] = pl
-                        if pl.id not in self._order:
-                            self._order.append(pl.id)
-
-                    # 清理 _order 中残留的运行时播放列表 ID
-                    runtime_ids_in_order = [pid for pid in self._order if self.is_runtime_playlist(pid)]
-                    if runtime_ids_in_order:
-                        for rid in runtime_ids_in_order:
-                            self._order.remove(rid)
-                        logger.info(f"已清理 {len(runtime_ids_in_order)} 个残留的运行时播放列表")
-
-                    if hydration_changed:
-                        self.save()
-
-                    logger.debug(f"已加载 {len(self._playlists)} 个歌单")
+                data = {}
+                if os.path.exists(self.data_file):
+                    with open(self.data_file, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                if isinstance(data, dict):
+                    self._order = data.get("order", [])
+                    playlists_data = data.get("playlists", [])
+                    base_seq = data.get("journal_seq", 0)
+                else:
+                    # 兼容旧格式（直接是列表）
+                    self._order = []
+                    playlists_data = data if isinstance(data, list) else []
+                    base_seq = 0
+                    self._needs_compaction = True
+
+                # 重放日志：put 覆盖整个歌单快照，delete 删除，order 替换顺序
+                by_id = {pl_data.get("id"): pl_data for pl_data in playlists_data if isinstance(pl_data, dict)}
+                records = self._read_journal(base_seq)
+                for record in records:
+                    op = record.get("op")
+                    if op == "put" and isinstance(record.get("playlist"), dict):
+                        by_id[record["playlist"].get("id")] = record["playlist"]
+                    elif op == "delete":
+                        by_id.pop(record.get("id"), None)
+                    elif op == "order" and isinstance(record.get("order"), list):
+                        self._order = record["order"]
+                self._journal_seq = max([base_seq] + [r.get("seq", 0) for r in records])
+                self._journal_records = len(records)
+                if records:
+                    logger.debug(f"已重放 {len(records)} 条歌单日志")
+
+                hydration_changed = False
+                for pl_data in by_id.values():
+                    pl = Playlist.from_dict(pl_data)
+                    # 跳过运行时播放队列（默认队列、房间队列）
+                    if self.is_runtime_playlist(pl.id):
+                        self._needs_compaction = True
+                        continue
+                    # 再次补全缩略图（兼容旧数据），如有变更稍后保存
+                    if pl._hydrate_stream_thumbnails():
+                        hydration_changed = True
+                    self._playlists[pl.id] = pl
+                    if pl.id not in self._order:
+                        self._order.append(pl.id)
+
+                # 清理 _order 中残留的运行时播放列表 ID
+                runtime_ids_in_order = [pid for pid in self._order if self.is_runtime_playlist(pid)]
+                if runtime_ids_in_order:
+                    for rid in runtime_ids_in_order:
+                        self._order.remove(rid)
+                    self._needs_compaction = True
+                    logger.info(f"已清理 {len(runtime_ids_in_order)} 个残留的运行时播放列表")
+                # 清理指向已删除歌单的顺序项
+                self._order = [pid for pid in self._order if pid in self._playlists]
+
+                self._mark_persisted()
+
+                if hydration_changed:
+                    self.save()
+
+                logger.debug(f"已加载 {len(self._playlists)} 个歌单")
             except Exception as e:
                 logger.error(f"加载歌单失败: {e}")
                 self._playlists = {}
@@ -340,31 +699,119 @@ class Playlists:
             self._playlists = {}
             self._order = []
 
+    def _persistent_order(self) -> List[str]:
+        return [
+            pid for pid in self._order
+            if not self.is_runtime_playlist(pid) and pid in self._playlists
+        ]
+
+    def _mark_persisted(self, order: List[str] = None, fingerprints: Dict[str, tuple] = None):
+        """记录已落盘的歌单顺序和指纹（默认取当前内存状态）"""
+        if order is None:
+            order = self._persistent_order()
+        if fingerprints is None:
+            fingerprints = {pid: self._fingerprint(self._playlists[pid]) for pid in order}
+        self._persisted_order = list(order)
+        self._persisted = fingerprints
+
+    def _collect_journal_records(self, persistent_order: List[str], fingerprints: Dict[str, tuple]) -> List[Dict]:
+        """对比已落盘指纹，生成本次需要追加的日志记录"""
+        records = []
+        for pid in self._persisted:
+            if pid not in fingerprints:
+                records.append({"op": "delete", "id": pid})
+        for pid in persistent_order:
+            if self._persisted.get(pid) != fingerprints[pid]:
+                records.append({"op": "put", "playlist": self._playlists[pid].to_dict()})
+        if persistent_order != self._persisted_order:
+            records.append({"op": "order", "order": persistent_order})
+        return records
+
+    def _append_journal(self, records: List[Dict]):
+        """追加日志记录（每条一行，写入后 fsync）"""
+        lines = []
+        for record in records:
+            self._journal_seq += 1
+            record["seq"] = self._journal_seq
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        with open(self.journal_file, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_records += len(records)
+
+    def _journal_too_large(self) -> bool:
+        if self._journal_records >= self.JOURNAL_COMPACT_RECORDS:
+            return True
+        try:
+            journal_size = os.path.getsize(self.journal_file)
+        except OSError:
+            return False
+        try:
+            base_size = os.path.getsize(self.data_file)
+        except OSError:
+            base_size = 0
+        return journal_size > max(base_size, self.JOURNAL_COMPACT_MIN_BYTES)
+
+    def _compact(self, persistent_order: List[str]):
+        """将全部共享歌单写入基准文件（.tmp 写入后原子替换），然后清空日志"""
+        data = {
+            "order": persistent_order,
+            "playlists": [self._playlists[pid].to_dict() for pid in persistent_order],
+            # 基准文件已包含该序号之前的所有日志，崩溃后重放会跳过这些记录
+            "journal_seq": self._journal_seq,
+        }
+        path = Path(self.data_file)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps(data, ensure_ascii=False, indent=2),
+            encoding="utf-8"
+        )
+        tmp.replace(path)  # 原子操作，POSIX 和 Windows 均支持
+        try:
+            os.remove(self.journal_file)
+        except FileNotFoundError:
+            pass
+        self._journal_records = 0
+        self._needs_compaction = False
+        logger.debug(f"已压缩保存 {len(persistent_order)} 个共享歌单")
+
     def _do_save(self):
-        """执行实际的原子化磁盘写入（.tmp 写入后原子替换）
+        """执行实际的磁盘写入：只追加变化的歌单，必要时压缩
 
         运行时播放队列（default / room_*）不会写入磁盘。
         """
-        try:
-            persistent_order = [pid for pid in self._order if not self.is_runtime_playlist(pid)]
-            data = {
-                "order": persistent_order,
-                "playlists": [
-                    self._playlists[pid].to_dict()
-                    for pid in persistent_order
-                    if pid in self._playlists
-                ],
-            }
-            path = Path(self.data_file)
-            tmp = path.with_suffix(".tmp")
-            tmp.write_text(
-                json.dumps(data, ensure_ascii=False, indent=2),
-                encoding="utf-8"
-            )
-            tmp.replace(path)  # 原子操作，POSIX 和 Windows 均支持
-            logger.debug(f"已保存 {len(persistent_order)} 个共享歌单")
-        except Exception as e:
-            logger.error(f"保存歌单失败: {e}")
+        records = []
+        with self._write_lock:
+            try:
+                persistent_order = self._persistent_order()
+                # 先取指纹再序列化：写入期间发生的新修改会在下一次保存时被识别
+                fingerprints = {pid: self._fingerprint(self._playlists[pid]) for pid in persistent_order}
+                records = self._collect_journal_records(persistent_order, fingerprints)
+                if self._replica_sink is not None:
+                    if records:
+                        self._replica_sink(records)
+                    self._mark_persisted(persistent_order, fingerprints)
+                    return
+                if self._needs_compaction or not os.path.exists(self.data_file):
+                    self._compact(persistent_order)
+                else:
+                    if not records:
+                        return
+                    self._append_journal(records)
+                    logger.debug(f"已追加 {len(records)} 条歌单日志")
+                    if self._journal_too_large():
+                        self._compact(persistent_order)
+                self._mark_persisted(persistent_order, fingerprints)
+            except Exception as e:
+                logger.error(f"保存歌单失败: {e}")
+                records = []
+        if records and self._replica_sink is None:
+            for listener in list(self._change_listeners):
+                try:
+                    listener(records)
+                except Exception as e:
+                    logger.debug(f"歌单变更回调异常: {e}")
 
     def _schedule_save(self):
         """写防抖：500ms 内多次调用只触发一次磁盘写入"""
@@ -0,0 +1,979 @@
+# -*- coding: utf-8 -*-
+"""
+房间工作进程 - 把 RoomPlayer 按分片放到独立的 Python 进程中运行（多核扩展 + 崩溃隔离）。
+
+所有 RoomPlayer 在主进程内共用一个 GIL，每个房间的事件监听、预获取、stderr 读取与
+标题轮询线程相互争用，房间数量受解释器争用限制。启用工作进程模式后：
+
+- 每个分片是一个 spawn 启动的工作进程，承载若干 RoomPlayer 及其 MPV 子进程，
+  内部用同一套路由（room / player / playlist / ...）处理请求
+- 主进程保留 WebSocket 连接、共享歌单落盘、播放统计与空闲回收；room_id 指向工作进程
+  房间、且命中依赖 RoomPlayer 的接口的请求由 RoomWorkerMiddleware 整体转发，响应原样返回
+- 进程间经 multiprocessing.Pipe 交换请求/应答、状态广播（主进程再扇出给 WebSocket）、
+  共享歌单变更与日志记录
+- 工作进程退出只影响本分片：等待中的请求返回 503，主进程终止遗留的 MPV，重启分片并按
+  最近一次状态广播恢复各房间（队列、当前曲目与播放位置、模式、音量）；窗口期内反复崩溃的
+  分片停用，其房间迁移到其他分片
+- migrate()（POST /room/{room_id}/migrate）把房间迁移到指定分片：导出状态 → 销毁 → 重建 → 恢复，
+  迁移期间 PCM 输出会短暂中断
+
+共享歌单在每个进程中各有一份：工作进程的修改以日志记录（put / delete / order）发回主进程落盘，
+主进程落盘后推送给所有工作进程（以歌单为单位，后写入者生效）。房间播放历史保存在工作进程内，
+崩溃恢复时不保留。
+
+配置项（settings.ini [room] 节）：
+  worker_shards = 0     # 房间工作进程数，0 表示 RoomPlayer 在主进程内运行（默认）
+"""
+
+import os
+import json
+import time
+import signal
+import asyncio
+import logging
+import itertools
+import threading
+import configparser
+import multiprocessing
+import concurrent.futures
+from urllib.parse import parse_qs, urlencode
+
+logger = logging.getLogger(__name__)
+
+_SETTINGS_FILE = "settings.ini"
+
+# 转发请求的等待上限（/play 可能需要等待 yt-dlp 解析直链，工作进程重启也需要数秒）
+REQUEST_TIMEOUT_SECONDS = 60.0
+# 分片在窗口期内崩溃达到上限后停用，其房间迁移到其他分片
+CRASH_WINDOW_SECONDS = 60.0
+MAX_CRASHES_PER_WINDOW = 3
+# 恢复播放位置时等待文件加载的上限
+RESTORE_SEEK_TIMEOUT_SECONDS = 10.0
+
+# 当前进程为工作进程时记录分片序号（主进程中为 None）
+_WORKER_SHARD = None
+
+
+class RoomWorkerError(RuntimeError):
+    """工作进程不可用（已退出、应答超时或处理失败）"""
+
+
+def in_room_worker() -> bool:
+    """当前进程是否为房间工作进程"""
+    return _WORKER_SHARD is not None
+
+
+def build_request(method: str, path: str, query: dict = None, json_body=None, headers=None) -> dict:
+    """构造转发给工作进程的 HTTP 请求"""
+    body = b""
+    headers = list(headers or [])
+    if json_body is not None:
+        body = json.dumps(json_body, ensure_ascii=False).encode("utf-8")
+        headers.append((b"content-type", b"application/json"))
+    return {
+        "method": method,
+        "path": path,
+        "query_string": urlencode(query or {}).encode("latin-1"),
+        "headers": headers,
+        "body": body,
+    }
+
+
+def response_json(response: dict):
+    """解析工作进程应答的 JSON 正文（非 JSON 时返回 None）"""
+    try:
+        return json.loads(response.get("body") or b"null")
+    except ValueError:
+        return None
+
+
+def _json_response(status: int, payload: dict) -> dict:
+    return {
+        "status": status,
+        "headers": [(b"content-type", b"application/json")],
+        "body": json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+    }
+
+
+class _Shard:
+    """主进程侧的分片句柄：工作进程、连接与等待应答的请求。"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.lock = threading.Lock()   # 保护 conn 发送、pending 与 generation
+        self.pending = {}              # req_id -> Future
+        self.generation = 0            # 每次（重新）启动递增，过期的读线程据此退出
+        self.alive = False
+        self.disabled = False
+        self.crashes = []              # 窗口期内的崩溃时间戳
+
+
+class RoomWorkerPool:
+    """房间分片路由表 + 工作进程生命周期（线程安全）。"""
+
+    def __init__(self, shards: int = None, context=None, target=None):
+        self.shards = max(0, self._read_config() if shards is None else int(shards))
+        self._context = context
+        self._target = target or _worker_main
+        self._lock = threading.Lock()
+        self._shards = []
+        self._rooms = {}       # room_id -> {"shard", "default_volume", "state"}
+        self._moving = set()
+        self._req_ids = itertools.count(1)
+        self._event_fn = None
+        self._playlists = None
+        self._loop = None
+        self._stopping = False
+        self.restarts = 0
+
+    @staticmethod
+    def _read_config() -> int:
+        config = configparser.ConfigParser()
+        if os.path.exists(_SETTINGS_FILE):
+            config.read(_SETTINGS_FILE, encoding="utf-8")
+        return config.getint("room", "worker_shards", fallback=0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.shards > 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._shards) and not self._stopping
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def start(self, event_fn=None, playlists_manager=None, loop=None) -> bool:
+        """启动全部分片；event_fn(room_id, message) 接收房间状态广播（在读线程中调用）
+
+        loop 为持有 playlists_manager 的事件循环：工作进程发回的歌单变更在该循环中应用。
+        """
+        if not self.enabled:
+            logger.info("[RoomWorkers] 工作进程模式未启用 (worker_shards = 0)，RoomPlayer 在主进程内运行")
+            return False
+        if self._shards:
+            return True
+        self._event_fn = event_fn
+        self._playlists = playlists_manager
+        self._loop = loop
+        if playlists_manager is not None:
+            playlists_manager.add_change_listener(self._push_playlists)
+        self._stopping = False
+        self._shards = [_Shard(i) for i in range(self.shards)]
+        for shard in self._shards:
+            self._spawn(shard)
+        logger.info(f"[RoomWorkers] 已启动 {self.shards} 个房间工作进程")
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """通知各工作进程销毁房间并退出，超时后强制终止"""
+        if not self._shards:
+            return
+        self._stopping = True
+        for shard in self._shards:
+            with shard.lock:
+                if shard.alive:
+                    try:
+                        shard.conn.send(("stop", None))
+                    except (OSError, ValueError):
+                        pass
+        deadline = time.time() + timeout
+        for shard in self._shards:
+            process = shard.process
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.time()))
+            if process.is_alive():
+                logger.warning(f"[RoomWorkers] 分片 {shard.index} 未按时退出，强制终止")
+                process.terminate()
+        with self._lock:
+            self._rooms.clear()
+        self._shards = []
+
+    def _spawn(self, shard: _Shard):
+        context = self._context or multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=self._target, args=(child_conn, shard.index),
+            name=f"RoomWorker-{shard.index}", daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        with shard.lock:
+            shard.generation += 1
+            shard.process, shard.conn, shard.alive = process, parent_conn, True
+            generation = shard.generation
+        threading.Thread(
+            target=self._read_loop, args=(shard, parent_conn, generation),
+            daemon=True, name=f"RoomWorkerReader-{shard.index}",
+        ).start()
+
+    # ------------------------------------------------------------------
+    # 路由表
+    # ------------------------------------------------------------------
+
+    def shard_of(self, room_id: str):
+        """房间所在分片序号；不在工作进程中时返回 None"""
+        with self._lock:
+            entry = self._rooms.get(room_id)
+            return entry["shard"] if entry else None
+
+    def room_count(self) -> int:
+        with self._lock:
+            return len(self._rooms)
+
+    def shard_indexes(self) -> list:
+        """可接收请求的分片"""
+        return [shard.index for shard in self._shards if shard.alive and not shard.disabled]
+
+    def is_moving(self, room_id: str) -> bool:
+        with self._lock:
+            return room_id in self._moving
+
+    def pick_shard(self, exclude: int = None):
+        """房间最少的可用分片；没有可用分片时返回 None"""
+        with self._lock:
+            loads = {index: 0 for index in self.shard_indexes() if index != exclude}
+            for entry in self._rooms.values():
+                if entry["shard"] in loads:
+                    loads[entry["shard"]] += 1
+        if not loads:
+            return None
+        return min(loads, key=lambda index: (loads[index], index))
+
+    def register(self, room_id: str, shard_index: int, default_volume: int = 80):
+        with self._lock:
+            self._rooms[room_id] = {"shard": shard_index, "default_volume": default_volume, "state": None}
+
+    def unregister(self, room_id: str) -> bool:
+        with self._lock:
+            return self._rooms.pop(room_id, None) is not None
+
+    # ------------------------------------------------------------------
+    # 请求
+    # ------------------------------------------------------------------
+
+    def submit(self, shard_index: int, kind: str, *payload) -> concurrent.futures.Future:
+        """向分片发送请求，返回等待应答的 Future（分片不可用时 Future 直接失败）"""
+        future = concurrent.futures.Future()
+        if not 0 <= shard_index < len(self._shards):
+            future.set_exception(RoomWorkerError(f"room worker {shard_index} does not exist"))
+            return future
+        shard = self._shards[shard_index]
+        req_id = next(self._req_ids)
+        with shard.lock:
+            if not shard.alive:
+                future.set_exception(RoomWorkerError(f"room worker {shard_index} is not running"))
+                return future
+            shard.pending[req_id] = future
+            try:
+                shard.conn.send((kind, req_id) + payload)
+            except (OSError, ValueError) as e:
+                shard.pending.pop(req_id, None)
+                future.set_exception(RoomWorkerError(f"room worker {shard_index} unreachable: {e}"))
+        return future
+
+    def call(self, shard_index: int, kind: str, *payload, timeout: float = REQUEST_TIMEOUT_SECONDS):
+        """同步请求（后台线程使用）"""
+        try:
+            return self.submit(shard_index, kind, *payload).result(timeout)
+        except concurrent.futures.TimeoutError:
+            raise RoomWorkerError(f"room worker {shard_index} timed out ({kind})") from None
+
+    async def call_async(self, shard_index: int, kind: str, *payload, timeout: float = REQUEST_TIMEOUT_SECONDS):
+        """异步请求（事件循环中使用，不阻塞循环）"""
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self.submit(shard_index, kind, *payload)), timeout)
+        except asyncio.TimeoutError:
+            raise RoomWorkerError(f"room worker {shard_index} timed out ({kind})") from None
+
+    # ------------------------------------------------------------------
+    # 读线程：应答、状态广播、歌单变更、日志
+    # ------------------------------------------------------------------
+
+    def _read_loop(self, shard: _Shard, conn, generation: int):
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            try:
+                self._dispatch(shard, message)
+            except Exception as e:
+                logger.error(f"[RoomWorkers] 处理分片 {shard.index} 消息失败: {e}")
+        self._on_shard_exit(shard, generation)
+
+    def _dispatch(self, shard: _Shard, message: tuple):
+        kind = message[0]
+        if kind == "reply":
+            _, req_id, ok, result = message
+            with shard.lock:
+                future = shard.pending.pop(req_id, None)
+            if future is not None and not future.done():
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(RoomWorkerError(result))
+        elif kind == "ws":
+            # 恢复快照只在队列 / 模式变化时随消息发送，其余广播只刷新播放位置等字段
+            _, room_id, state_message, snapshot = message
+            with self._lock:
+                entry = self._rooms.get(room_id)
+                if entry is not None and entry["shard"] == shard.index:
+                    if snapshot:
+                        entry["state"] = snapshot
+                    elif entry["state"]:
+                        entry["state"] = refresh_room_state(entry["state"], state_message)
+            if self._event_fn is not None:
+                self._event_fn(room_id, state_message)
+        elif kind == "playlists":
+            if self._playlists is None:
+                return
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._apply_playlists, message[1])
+            else:
+                self._apply_playlists(message[1])
+        elif kind == "log":
+            record = logging.makeLogRecord(message[1])
+            record_logger = logging.getLogger(record.name)
+            if record_logger.isEnabledFor(record.levelno):
+                record_logger.handle(record)
+        elif kind == "ready":
+            logger.info(f"[RoomWorkers] 分片 {shard.index} 已就绪 (pid={message[2]})")
+
+    def _apply_playlists(self, records: list):
+        self._playlists.apply_records(records)
+        self._playlists.save()
+
+    def _push_playlists(self, records: list):
+        """主进程歌单落盘后推送给所有工作进程"""
+        for shard in self._shards:
+            with shard.lock:
+                if not shard.alive:
+                    continue
+                try:
+                    shard.conn.send(("playlists", None, records))
+                except (OSError, ValueError):
+                    pass
+
+    # ------------------------------------------------------------------
+    # 崩溃隔离与迁移
+    # ------------------------------------------------------------------
+
+    def _on_shard_exit(self, shard: _Shard, generation: int):
+        with shard.lock:
+            if generation != shard.generation:
+                return
+            shard.alive = False
+            pending, shard.pending = shard.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RoomWorkerError(f"room worker {shard.index} exited"))
+        try:
+            shard.conn.close()
+        except OSError:
+            pass
+        if self._stopping:
+            return
+
+        with self._lock:
+            rooms = {rid: dict(entry) for rid, entry in self._rooms.items() if entry["shard"] == shard.index}
+        if shard.process is not None:
+            shard.process.join(1.0)
+        exitcode = getattr(shard.process, "exitcode", None)
+        logger.error(
+            f"[RoomWorkers] 分片 {shard.index} 意外退出 (exitcode={exitcode})，受影响房间: {sorted(rooms) or '无'}"
+        )
+        for entry in rooms.values():
+            _terminate_orphan_mpv((entry.get("state") or {}).get("mpv_pid"))
+
+        now = time.time()
+        shard.crashes = [t for t in shard.crashes if now - t < CRASH_WINDOW_SECONDS] + [now]
+        if len(shard.crashes) >= MAX_CRASHES_PER_WINDOW:
+            shard.disabled = True
+            logger.error(f"[RoomWorkers] 分片 {shard.index} 在 {CRASH_WINDOW_SECONDS:.0f}s 内崩溃 {len(shard.crashes)} 次，已停用")
+        else:
+            self.restarts += 1
+            self._spawn(shard)
+        if rooms:
+            threading.Thread(
+                target=self._recover_rooms, args=(rooms,), daemon=True, name=f"RoomWorkerRecover-{shard.index}",
+            ).start()
+
+    def _recover_rooms(self, rooms: dict):
+        """在重启后的分片（或其他分片）上重建房间并恢复状态"""
+        for room_id, entry in rooms.items():
+            target = entry["shard"] if entry["shard"] in self.shard_indexes() else self.pick_shard()
+            if target is None:
+                self.unregister(room_id)
+                logger.error(f"[RoomWorkers] 没有可用分片，无法恢复房间: {room_id}")
+                continue
+            try:
+                self._place(room_id, target, entry["default_volume"], entry.get("state"))
+                logger.info(f"[RoomWorkers] ✓ 已在分片 {target} 恢复房间: {room_id}")
+            except RoomWorkerError as e:
+                self.unregister(room_id)
+                logger.error(f"[RoomWorkers] 恢复房间 {room_id} 失败: {e}")
+
+    def _place(self, room_id: str, shard_index: int, default_volume: int, snapshot: dict = None):
+        """在分片上创建房间并（可选）恢复导出的状态
+
+        先登记路由再转发创建请求：房间创建过程中的状态广播即可记录为最近状态。
+        """
+        with self._lock:
+            self._rooms[room_id] = {"shard": shard_index, "default_volume": default_volume, "state": snapshot}
+        try:
+            response = self.call(
+                shard_index, "http",
+                build_request("POST", "/room/init", json_body={"room_id": room_id, "default_volume": default_volume}),
+            )
+        except RoomWorkerError:
+            self.unregister(room_id)
+            raise
+        if response["status"] != 200:
+            self.unregister(room_id)
+            raise RoomWorkerError(f"room init failed on worker {shard_index}: HTTP {response['status']}")
+        if snapshot:
+            self.call(shard_index, "restore", room_id, snapshot)
+
+    def destroy_room(self, room_id: str) -> bool:
+        """销毁工作进程中的房间（同步，供空闲回收使用），返回房间是否存在"""
+        shard_index = self.shard_of(room_id)
+        if shard_index is None:
+            return False
+        self.unregister(room_id)
+        try:
+            self.call(shard_index, "http", build_request("DELETE", f"/room/{room_id}"))
+        except RoomWorkerError as e:
+            logger.warning(f"[RoomWorkers] 销毁房间 {room_id} 失败: {e}")
+        return True
+
+    def migrate(self, room_id: str, target: int = None) -> tuple:
+        """把房间迁移到 target 分片（None 表示房间最少的其他分片），返回 (原分片, 新分片)"""
+        with self._lock:
+            entry = self._rooms.get(room_id)
+            if entry is None:
+                raise KeyError(room_id)
+            if room_id in self._moving:
+                raise RoomWorkerError("room is migrating")
+            source = entry["shard"]
+        if target is None:
+            target = self.pick_shard(exclude=source)
+        if target is None or target not in self.shard_indexes():
+            raise ValueError(f"room worker {target} is not available")
+        if target == source:
+            return source, target
+
+        with self._lock:
+            self._moving.add(room_id)
+        try:
+            try:
+                snapshot = self.call(source, "export", room_id)
+                self.call(source, "http", build_request("DELETE", f"/room/{room_id}"))
+            except RoomWorkerError as e:
+                # 原分片已不可用：使用最近一次状态广播
+                logger.warning(f"[RoomWorkers] 从分片 {source} 导出房间 {room_id} 失败，使用最近的状态: {e}")
+                snapshot = entry.get("state")
+                _terminate_orphan_mpv((snapshot or {}).get("mpv_pid"))
+            self._place(room_id, target, entry["default_volume"], snapshot)
+        finally:
+            with self._lock:
+                self._moving.discard(room_id)
+        logger.info(f"[RoomWorkers] ✓ 房间 {room_id} 已从分片 {source} 迁移到分片 {target}")
+        return source, target
+
+    def snapshot(self) -> dict:
+        """诊断信息：各分片进程、房间与崩溃次数"""
+        with self._lock:
+            rooms_by_shard = {}
+            for room_id, entry in self._rooms.items():
+                rooms_by_shard.setdefault(entry["shard"], []).append(room_id)
+        shards = []
+        for shard in self._shards:
+            shards.append({
+                "index": shard.index,
+                "pid": getattr(shard.process, "pid", None),
+                "alive": shard.alive,
+                "disabled": shard.disabled,
+                "rooms": sorted(rooms_by_shard.get(shard.index, [])),
+                "pending": len(shard.pending),
+                "recent_crashes": len(shard.crashes),
+            })
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "restarts": self.restarts,
+            "room_count": sum(len(rooms) for rooms in rooms_by_shard.values()),
+            "shards": shards,
+        }
+
+
+def _terminate_orphan_mpv(pid):
+    """工作进程退出后遗留的 MPV 仍占用 IPC 路径与 PCM 输出，重建房间前终止它"""
+    if not pid:
+        return
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        if "mpv" not in process.name().lower():
+            return
+        process.terminate()
+    except ImportError:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    except Exception:
+        pass
+
+
+# ----------------------------------------------------------------------
+# 主进程中间件：转发工作进程房间的请求
+# ----------------------------------------------------------------------
+
+def _depends_on(dependant, calls) -> bool:
+    stack = [dependant]
+    while stack:
+        current = stack.pop()
+        if current.call in calls:
+            return True
+        stack.extend(current.dependencies)
+    return False
+
+
+class RoomWorkerMiddleware:
+    """纯 ASGI 中间件：room_id 指向工作进程房间、且路由依赖 RoomPlayer 时整体转发到对应分片。
+
+    dependencies 为判定"房间接口"的依赖函数（如 get_player_for_request）；匹配到的路由写入
+    scope["route"]，外层的访问日志 / 追踪中间件仍按路由模板统计。
+    """
+
+    def __init__(self, app, pool: RoomWorkerPool = None, dependencies=(), touch_fn=None):
+        self.app = app
+        self.pool = pool or room_workers
+        self.dependencies = tuple(dependencies)
+        self.touch_fn = touch_fn
+        self._room_routes = {}    # id(route) -> 是否依赖 RoomPlayer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.pool.running:
+            await self.app(scope, receive, send)
+            return
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        room_id = (query.get("room_id") or [""])[0]
+        shard_index = self.pool.shard_of(room_id) if room_id else None
+        route = self._match_room_route(scope) if shard_index is not None else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        scope["route"] = route
+        if self.pool.is_moving(room_id):
+            response = _json_response(409, {"status": "error", "message": "room is migrating"})
+        else:
+            body = b""
+            while True:
+                message = await receive()
+                body += message.get("body", b"")
+                if not message.get("more_body"):
+                    break
+            if self.touch_fn is not None:
+                self.touch_fn(room_id)
+            request = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "query_string": scope.get("query_string", b""),
+                "headers": list(scope.get("headers") or []),
+                "body": body,
+            }
+            try:
+                response = await self.pool.call_async(shard_index, "http", request)
+            except RoomWorkerError as e:
+                response = _json_response(503, {"status": "error", "message": str(e)})
+        await send({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+        await send({"type": "http.response.body", "body": response["body"]})
+
+    def _match_room_route(self, scope):
+        from starlette.routing import Match
+        app = scope.get("app")
+        for route in getattr(app, "routes", ()):
+            match, _ = route.matches(scope)
+            if match != Match.FULL:
+                continue
+            key = id(route)
+            if key not in self._room_routes:
+                dependant = getattr(route, "dependant", None)
+                self._room_routes[key] = dependant is not None and _depends_on(dependant, self.dependencies)
+            return route if self._room_routes[key] else None
+        return None
+
+
+# ----------------------------------------------------------------------
+# 房间状态导出 / 恢复（工作进程内调用）
+# ----------------------------------------------------------------------
+
+def export_room_state(player, state_message: dict) -> dict:
+    """导出恢复房间所需的状态（队列、当前曲目与位置、模式、MPV pid）"""
+    queue = player.get_runtime_queue()
+    mpv_state = state_message.get("mpv_state") or {}
+    meta = state_message.get("current_meta") or {}
+    process = getattr(player, "mpv_process", None)
+    return {
+        "songs": [dict(song) if isinstance(song, dict) else song for song in list(getattr(queue, "songs", None) or [])],
+        "current_index": state_message.get("current_index", -1),
+        "playing": bool(meta.get("url") or meta.get("rel") or meta.get("raw_url")),
+        "loop_mode": state_message.get("loop_mode", 0),
+        "shuffle_mode": bool(state_message.get("shuffle_mode", False)),
+        "pitch_shift": state_message.get("pitch_shift", 0),
+        "volume": mpv_state.get("volume"),
+        "paused": bool(mpv_state.get("paused")),
+        "time_pos": mpv_state.get("time_pos"),
+        "mpv_pid": getattr(process, "pid", None),
+        "captured_at": time.time(),
+    }
+
+
+def recovery_key(player, state_message: dict) -> tuple:
+    """恢复快照的版本：队列修改序号、当前曲目、模式或 MPV 进程变化时才需要重新导出"""
+    queue = player.get_runtime_queue()
+    meta = state_message.get("current_meta") or {}
+    process = getattr(player, "mpv_process", None)
+    return (
+        id(queue),
+        getattr(queue, "revision", None) or getattr(queue, "updated_at", 0),
+        state_message.get("current_index", -1),
+        meta.get("url") or meta.get("rel") or meta.get("raw_url"),
+        state_message.get("loop_mode", 0),
+        bool(state_message.get("shuffle_mode", False)),
+        state_message.get("pitch_shift", 0),
+        getattr(process, "pid", None),
+    )
+
+
+def refresh_room_state(snapshot: dict, state_message: dict) -> dict:
+    """用普通状态广播刷新恢复快照中的播放位置、暂停与音量（不复制队列）"""
+    mpv_state = state_message.get("mpv_state") or {}
+    return {
+        **snapshot,
+        "volume": mpv_state.get("volume", snapshot.get("volume")),
+        "paused": bool(mpv_state.get("paused", snapshot.get("paused"))),
+        "time_pos": mpv_state.get("time_pos", snapshot.get("time_pos")),
+        "captured_at": time.time(),
+    }
+
+
+def restore_room_state(player, snapshot: dict, history=None) -> bool:
+    """把导出的状态恢复到新建的 RoomPlayer；返回是否恢复了播放"""
+    from models.song import LocalSong, StreamSong
+
+    songs = list(snapshot.get("songs") or [])
+    index = snapshot.get("current_index", -1)
+    queue = player.get_runtime_queue()
+    with player._lock:
+        queue.songs = songs
+        queue.updated_at = time.time()
+        player.loop_mode = snapshot.get("loop_mode", player.loop_mode)
+        player.shuffle_mode = snapshot.get("shuffle_mode", player.shuffle_mode)
+        player.current_index = index if 0 <= index < len(songs) else -1
+    if snapshot.get("pitch_shift"):
+        player.set_pitch_shift(int(snapshot["pitch_shift"]))
+    if snapshot.get("volume") is not None:
+        player.set_volume(snapshot["volume"])
+    if not snapshot.get("playing") or player.current_index < 0:
+        return False
+
+    song_data = songs[player.current_index]
+    if isinstance(song_data, dict):
+        url = song_data.get("url")
+        title = song_data.get("title") or url
+        song_type = song_data.get("type", "local")
+    else:
+        url, title, song_type = song_data, os.path.basename(str(song_data)), "local"
+    if song_type == "youtube" or (url and str(url).startswith("http")):
+        song = StreamSong(stream_url=url, title=title or url)
+    else:
+        song = LocalSong(file_path=url, title=title)
+
+    with player._lock:
+        ok = player.play(
+            song,
+            mpv_command_func=player.mpv_command,
+            mpv_pipe_exists_func=player.mpv_pipe_exists,
+            ensure_mpv_func=player.ensure_mpv,
+            add_to_history_func=history.add_to_history if history is not None else None,
+            save_to_history=False,
+            mpv_cmd=player.mpv_cmd,
+        )
+        if ok:
+            player.current_index = index
+    if not ok:
+        return False
+
+    time_pos = snapshot.get("time_pos") or 0
+    if time_pos > 1:
+        # loadfile 是异步的：等文件加载出时长后再跳转
+        deadline = time.time() + RESTORE_SEEK_TIMEOUT_SECONDS
+        while time.time() < deadline and not player.mpv_get("duration"):
+            time.sleep(0.1)
+        player.mpv_command(["seek", float(time_pos), "absolute"])
+    if snapshot.get("paused"):
+        player.mpv_set("pause", True)
+    return True
+
+
+# ----------------------------------------------------------------------
+# 工作进程
+# ----------------------------------------------------------------------
+
+async def run_asgi(app, request: dict) -> dict:
+    """在工作进程内把转发来的请求交给 ASGI 应用，收集完整响应"""
+    body = request.get("body") or b""
+    response = {"status": 500, "headers": [], "body": b""}
+    chunks = []
+    finished = asyncio.Event()
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # 流式响应会监听断开事件：响应发送完毕后再报告断开
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = [(bytes(k), bytes(v)) for k, v in message.get("headers", [])]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                finished.set()
+
+    path = request["path"]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": request["method"],
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "root_path": "",
+        "query_string": request.get("query_string", b""),
+        "headers": [(bytes(k), bytes(v)) for k, v in request.get("headers", [])],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 0),
+    }
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    response["body"] = b"".join(chunks)
+    return response
+
+
+class _ConnectionLogHandler(logging.Handler):
+    """把工作进程的日志记录发回主进程，由主进程的日志处理器统一输出"""
+
+    def __init__(self, send_fn, shard_index: int):
+        super().__init__()
+        self.send_fn = send_fn
+        self.shard_index = shard_index
+
+    def emit(self, record):
+        try:
+            data = dict(record.__dict__)
+            data["msg"] = record.getMessage()
+            data["args"] = None
+            data["exc_info"] = None
+            if record.exc_info:
+                data["exc_text"] = logging.Formatter().formatException(record.exc_info)
+            data["processName"] = f"RoomWorker-{self.shard_index}"
+            self.send_fn(("log", data))
+        except Exception:
+            self.handleError(record)
+
+
+class _RoomWorker:
+    """工作进程主体：事件循环处理转发的请求，读线程接收主进程消息。"""
+
+    def __init__(self, conn, shard_index: int):
+        self.conn = conn
+        self.index = shard_index
+        self._send_lock = threading.Lock()
+        self.loop = None
+        self.app = None
+        self.state = None
+        self._recovery_keys = {}    # room_id -> 最近一次发送的恢复快照版本
+
+    def send(self, message):
+        with self._send_lock:
+            try:
+                self.conn.send(message)
+            except (OSError, ValueError):
+                pass
+
+    def run(self):
+        # models.logger 导入时会配置控制台 / 文件处理器：先导入再替换，日志文件只由主进程写入
+        from models.logger import load_logging_config, shutdown_logging
+        shutdown_logging()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(_ConnectionLogHandler(self.send, self.index))
+        root.setLevel(getattr(logging, load_logging_config()["level"], logging.INFO))
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.app = self._build_app()
+        threading.Thread(target=self._read_loop, daemon=True, name=f"RoomWorkerConn-{self.index}").start()
+        self.send(("ready", self.index, os.getpid()))
+        try:
+            self.loop.run_forever()
+        finally:
+            self._shutdown()
+
+    def _build_app(self):
+        import routers.state as state
+        from fastapi import FastAPI
+        from routers import history, media, player, playlist, room, search
+
+        self.state = state
+        state._main_loop = self.loop
+        state.PLAYLISTS_MANAGER.set_replica_sink(lambda records: self.send(("playlists", records)))
+        state.set_room_broadcast_sink(self._forward_broadcast)
+        self._start_services(state)
+
+        app = FastAPI()
+        for module in (playlist, player, search, history, media, room):
+            app.include_router(module.router)
+        return app
+
+    def _start_services(self, state):
+        """RoomPlayer 依赖的共享服务（与主进程 lifespan 对应的子集；不做标签扫描与空闲回收）"""
+        from models.loudness import loudness
+        from models.play_stats import play_stats
+        from models.tag_index import tag_index
+
+        data_dir = state.PLAYER.data_dir
+        try:
+            play_stats.open(os.path.join(data_dir, "play_events.db"))
+        except Exception as e:
+            logger.warning(f"[RoomWorkers] 播放统计库打开失败: {e}")
+        loudness.cache_file = os.path.join(data_dir, "loudness.json")
+        loudness.load()
+        tag_index.cache_file = os.path.join(data_dir, "tag_index.json")
+        tag_index.load()
+
+        def _health_monitor():
+            while True:
+                time.sleep(state.ROOM_HEALTH_CHECK_INTERVAL)
+                try:
+                    state.refresh_all_room_status_snapshots()
+                except Exception as e:
+                    logger.error(f"[RoomHealth] 异常: {e}")
+
+        threading.Thread(target=_health_monitor, daemon=True, name=f"RoomHealthMonitor-{self.index}").start()
+
+    def _forward_broadcast(self, room_id: str, message: dict, player):
+        key = recovery_key(player, message)
+        snapshot = None
+        if self._recovery_keys.get(room_id) != key:
+            self._recovery_keys[room_id] = key
+            snapshot = export_room_state(player, message)
+        self.send(("ws", room_id, message, snapshot))
+
+    def _read_loop(self):
+        handlers = {
+            "http": self._handle_http,
+            "export": self._handle_export,
+            "restore": self._handle_restore,
+            "state": self._handle_state,
+        }
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break   # 主进程已退出
+            kind, req_id = message[0], message[1]
+            if kind == "stop":
+                break
+            if kind == "playlists":
+                # 与请求处理同在事件循环线程中修改歌单
+                self.loop.call_soon_threadsafe(self.state.PLAYLISTS_MANAGER.apply_records, message[2], True)
+                continue
+            handler = handlers.get(kind)
+            if handler is None:
+                self.send(("reply", req_id, False, f"unknown request: {kind}"))
+                continue
+            asyncio.run_coroutine_threadsafe(self._reply(req_id, handler, *message[2:]), self.loop)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _reply(self, req_id, handler, *args):
+        try:
+            result = await handler(*args)
+        except KeyError as e:
+            self.send(("reply", req_id, False, f"KeyError: {e}"))
+            return
+        except Exception as e:
+            logger.error(f"[RoomWorkers] 分片 {self.index} 处理请求失败: {e}", exc_info=e)
+            self.send(("reply", req_id, False, f"{type(e).__name__}: {e}"))
+            return
+        self.send(("reply", req_id, True, result))
+
+    def _room_player(self, room_id: str):
+        player = self.state.get_player_for_room_id(room_id)
+        if player is None:
+            raise KeyError(f"room not found: {room_id}")
+        return player
+
+    async def _handle_http(self, request: dict) -> dict:
+        return await run_asgi(self.app, request)
+
+    async def _handle_state(self, room_id: str) -> dict:
+        player = self._room_player(room_id)
+        return await asyncio.to_thread(self.state._build_state_message, player)
+
+    async def _handle_export(self, room_id: str) -> dict:
+        player = self._room_player(room_id)
+        message = await asyncio.to_thread(self.state._build_state_message, player)
+        return export_room_state(player, message)
+
+    async def _handle_restore(self, room_id: str, snapshot: dict) -> bool:
+        player = self._room_player(room_id)
+        history = self.state.ROOM_HISTORIES.get(room_id)
+        self._recovery_keys.pop(room_id, None)
+        restored = await asyncio.to_thread(restore_room_state, player, snapshot, history)
+        await self.state._broadcast_state(player, playlist_updated=True)
+        return restored
+
+    def _shutdown(self):
+        state = self.state
+        if state is None:
+            return
+        with state._room_players_lock:
+            room_ids = list(state.ROOM_PLAYERS)
+        for room_id in room_ids:
+            try:
+                state.destroy_room_state(room_id)
+            except Exception as e:
+                logger.warning(f"[RoomWorkers] 销毁房间 {room_id} 失败: {e}")
+        # 未同步的歌单修改在退出前发回主进程
+        state.PLAYLISTS_MANAGER._do_save()
+
+
+def _worker_main(conn, shard_index: int):
+    """工作进程入口（spawn 启动，须在导入 routers.state 之前标记工作进程）"""
+    global _WORKER_SHARD
+    _WORKER_SHARD = shard_index
+    _RoomWorker(conn, shard_index).run()
+
+
+room_workers = RoomWorkerPool()
@@ -0,0 +1,168 @@
+"""
+共享后台任务调度器 - 以一个计时线程 + 小型线程池取代"每次操作一个 sleep 线程"。
+
+每个 RoomPlayer 在播放时都会启动标题轮询、直链预获取等短任务；房间数量增多后，
+大量休眠线程会放大 GIL 争用和线程切换开销。调度器用最小堆保存定时任务，
+计时线程只在最近的到期时间醒来，到期任务交给共享线程池执行。
+
+按任务性质分为三个互不阻塞的调度器（各自的计时线程与线程池）：
+  room_tasks      短任务：标题轮询、空闲触发、房间到期检查
+  blocking_tasks  可能阻塞数秒的任务：yt-dlp 预获取、就绪集合校验
+  teardown_tasks  房间销毁（终止 MPV 并等待退出）
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+
+class TimerHandle:
+    """call_later 返回的句柄，可用于取消尚未执行的任务。"""
+
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when: float, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TaskScheduler:
+    """基于最小堆的定时任务调度器（线程安全，首次使用时惰性启动）。"""
+
+    def __init__(self, max_workers: int = 4, name: str = "TaskScheduler"):
+        self.name = name
+        self._max_workers = max_workers
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._stopped = False
+
+    # ------------------------------------------------------------------
+    # 公共接口
+    # ------------------------------------------------------------------
+
+    def submit(self, fn, *args):
+        """立即在共享线程池中执行 fn，返回 Future。"""
+        self._ensure_started()
+        return self._executor.submit(self._run_safely, fn, args)
+
+    def call_later(self, delay: float, fn, *args) -> TimerHandle:
+        """delay 秒后在共享线程池中执行 fn。"""
+        return self.call_at(time.monotonic() + max(0.0, delay), fn, *args)
+
+    def call_at(self, when: float, fn, *args) -> TimerHandle:
+        """在 time.monotonic() 时刻 when 执行 fn。"""
+        self._ensure_started()
+        handle = TimerHandle(when, fn, args)
+        with self._cond:
+            heapq.heappush(self._heap, (when, next(self._seq), handle))
+            # 仅当新任务成为最早到期任务时才需要唤醒计时线程
+            if self._heap[0][2] is handle:
+                self._cond.notify()
+        return handle
+
+    def poll(self, interval: float, attempts: int, fn, on_exhausted=None) -> TimerHandle:
+        """每 interval 秒调用一次 fn()，返回真值或达到 attempts 次后停止。
+
+        替代 `for _ in range(n): time.sleep(interval); ...` 形式的轮询线程，
+        轮询期间不占用任何线程。on_exhausted 在全部尝试失败后调用（可选）。
+        """
+        control = TimerHandle(0.0, fn, ())  # 各次尝试共享的取消标记
+
+        def _attempt(remaining):
+            if control.cancelled:
+                return
+            try:
+                done = fn()
+            except Exception as e:
+                logger.debug(f"[{self.name}] 轮询任务异常: {e}")
+                done = False
+            if done:
+                return
+            if remaining > 1:
+                self.call_later(interval, _attempt, remaining - 1)
+            elif on_exhausted is not None:
+                on_exhausted()
+
+        self.call_later(interval, _attempt, attempts)
+        return control
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for _, _, handle in self._heap if not handle.cancelled)
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._cond.notify()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._max_workers, thread_name_prefix=f"{self.name}Worker"
+            )
+            self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+            self._thread.start()
+
+    def _run_safely(self, fn, args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            logger.warning(f"[{self.name}] 后台任务异常: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    timeout = self._heap[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+                due = []
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap)[2])
+            for handle in due:
+                if handle.cancelled:
+                    continue
+                try:
+                    self._executor.submit(self._run_safely, handle.callback, handle.args)
+                except RuntimeError:
+                    return  # 执行器已关闭
+
+
+# 房间播放相关的短任务（标题轮询、空闲触发、到期检查）
+room_tasks = TaskScheduler(max_workers=4, name="RoomTasks")
+# 调用 yt-dlp 等可能长时间阻塞的任务，慢解析不会拖住标题轮询与房间回收
+blocking_tasks = TaskScheduler(max_workers=4, name="BlockingTasks")
+# 房间销毁：terminate/wait MPV 最长数秒，独立线程池避免占用上面两个池
+teardown_tasks = TaskScheduler(max_workers=2, name="RoomTeardown")
@@ -38,10 +38,12 @@ _SETTINGS_SCHEMA = {
         "options": {
             "level": "日志级别，可选 DEBUG、INFO、WARNING、ERROR、CRITICAL。",
             "polling_sample_rate": "高频轮询接口的日志采样率，范围 0.0 到 1.0。",
-            "filtered_paths": "按采样规则处理的高频请求路径，使用逗号分隔。",
+            "filtered_paths": "按采样规则记录访问日志的高频路由（路由模板，如 /room/{room_id}/status），使用逗号分隔。",
             "heartbeat_log_interval": "心跳日志输出间隔，单位秒。",
             "log_dir": "日志目录；留空时不写入日志文件。",
             "log_keep_days": "日志文件保留天数。",
+            "levels": "按子系统覆盖日志级别，格式为 logger名=级别，使用逗号分隔（如 models.player.ipc=DEBUG）。",
+            "async_handlers": "是否通过后台队列线程输出日志（请求线程不直接写控制台与文件）。",
         },
     },
     "ui": {
@@ -57,6 +59,10 @@ _SETTINGS_SCHEMA = {
         "section_comment": "缓存配置。",
         "options": {
             "url_cache_enabled": "是否启用 YouTube 直链缓存。",
+            "local_cache_dir": "本地歌曲读穿缓存目录（music_dir 位于网络共享时建议设为本机 SSD 路径）；留空表示禁用。",
+            "local_cache_max_mb": "本地歌曲缓存总大小上限，单位 MB，超出后按最近最少使用淘汰。",
+            "local_cache_prefetch": "预先复制播放队列中接下来的本地歌曲数量。",
+            "local_cache_bandwidth_mbps": "后台复制限速，单位 MB/s；0 表示不限速。",
         },
     },
     "backup": {
@@ -82,6 +88,31 @@ _SETTINGS_SCHEMA = {
         "options": {
             "max_rooms": "允许同时存在的房间数量上限。",
             "idle_timeout": "房间空闲超时时间，单位秒。",
+            "prewarm_pool_size": "预热的空闲 MPV 进程数量，用于加速房间创建；0 表示禁用（默认，需要时再开启）。",
+            "ipc_dir": "非 Windows 平台下房间 MPV IPC socket（<room>.sock）与 PCM FIFO（<room>.pcm）所在目录。",
+            "worker_shards": "房间工作进程数量；大于 0 时 RoomPlayer 按分片运行在独立进程中（多核扩展、单个进程崩溃只影响本分片的房间），0 表示在主进程内运行（默认）。",
+        },
+    },
+    "library": {
+        "section_comment": "本地媒体库配置。",
+        "options": {
+            "tag_scan_workers": "后台读取音频标签（时长/艺术家/专辑）的进程数；0 表示不使用进程池。",
+        },
+    },
+    "loudness": {
+        "section_comment": "响度均衡配置（需要 ffmpeg，位于 bin 目录或系统 PATH）。",
+        "options": {
+            "enabled": "是否分析歌曲响度并在播放时施加逐曲增益。",
+            "target_lufs": "目标整体响度，单位 LUFS。",
+        },
+    },
+    "diagnostics": {
+        "section_comment": "运行诊断配置。",
+        "options": {
+            "loop_watchdog": "是否检测事件循环阻塞并记录阻塞调用栈（见 /diagnostic/loop-blocks）。",
+            "loop_block_threshold_ms": "事件循环停滞超过该时长（毫秒）时记录为一次阻塞。",
+            "tracing": "是否为每个请求记录阶段耗时 span（见 /diagnostic/traces）。",
+            "traces_per_route": "每个路由保留的最慢请求追踪条数。",
         },
     },
 }
@@ -6,8 +6,26 @@
 import os
 import sys
 import time
+import logging
 from urllib.parse import urlparse, parse_qs
-from models.logger import logger
+
+from models.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def library_relpath(path: str, music_dir: str):
+    """path 相对 music_dir 的路径（/ 分隔），用作标签索引与本地缓存的键。
+
+    不在 music_dir 之下（含 Windows 跨盘符，relpath 会抛 ValueError）时返回 None。
+    """
+    try:
+        rel = os.path.relpath(os.path.abspath(path), os.path.abspath(music_dir))
+    except ValueError:
+        return None
+    if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+        return None
+    return rel.replace("\\", "/")
 
 
 class Song:
@@ -153,8 +171,12 @@ class LocalSong(Song):
         abs_file = self.get_absolute_path(base_dir=music_dir)
         logger.info(f"LocalSong.play -> 播放本地文件: {abs_file}")
 
-        # 预检: 文件存在性
-        if not os.path.exists(abs_file):
+        # 预检: 文件存在性（同时取得 mtime/size 用于本地缓存校验）
+        try:
+            st = os.stat(abs_file)
+        except OSError:
+            st = None
+        if st is None:
             logger.error(
                 f"LocalSong.play -> 文件不存在: {abs_file}"
                 f"\n  原始 file_path: {self.file_path}"
@@ -167,13 +189,27 @@ class LocalSong(Song):
             return False
 
         try:
-            if not mpv_command_func(["loadfile", abs_file, "replace"]):
+            # 库外文件（如另一盘符）没有索引键：不查增益与缓存副本
+            rel = library_relpath(abs_file, music_dir) if music_dir else self.file_path.replace("\\", "/")
+
+            # 逐曲响度增益（未分析的文件移除增益滤镜，按原音量播放）
+            from models.loudness import loudness
+            loudness.apply_gain(mpv_command_func, loudness.local_gain(rel) if rel else None)
+
+            # music_dir 位于网络共享时优先加载本机缓存副本
+            from models.local_cache import local_cache
+            play_file = (local_cache.lookup(rel, st) if rel else None) or abs_file
+            if play_file != abs_file:
+                logger.info(f"LocalSong.play -> 使用本地缓存副本: {play_file}")
+
+            if not mpv_command_func(["loadfile", play_file, "replace"]):
                 logger.error(f"LocalSong.play: mpv loadfile 命令发送失败（管道不可用）")
                 return False
 
             # 添加到播放历史
             if save_to_history and add_to_history_func:
-                add_to_history_func(self.file_path, self.title, is_local=True)
+                with span("history.save"):
+                    add_to_history_func(self.file_path, self.title, is_local=True)
 
             return True
         except Exception as e:
@@ -237,6 +273,11 @@ class StreamSong(Song):
 
     def _extract_video_id(self, url: str) -> str:
         """从YouTube URL提取视频ID，兼容 watch/shorts/embed/youtu.be 链接"""
+        return StreamSong.extract_video_id(url)
+
+    @staticmethod
+    def extract_video_id(url: str) -> str:
+        """从YouTube URL提取视频ID（无需构造 StreamSong 实例）"""
         try:
             parsed = urlparse(url)
             host = (parsed.netloc or "").lower()
@@ -321,15 +362,10 @@ class StreamSong(Song):
           save_to_history: 是否保存到历史
           music_dir: 音乐库目录（串流不需要此参数）
         """
-        # 🔍 详细调试日志 - 网络歌曲播放追踪
-        logger.info("="*60)
-        logger.info(f"🎵 [StreamSong.play] 开始播放网络歌曲")
-        logger.info(f"   📌 URL: {self.stream_url}")
-        logger.info(f"   📌 标题: {self.title}")
-        logger.info(f"   📌 类型: {self.stream_type}")
-        logger.info(f"   📌 视频ID: {self.video_id}")
-        logger.info(f"   📌 时长: {self.duration}秒")
-        logger.info("="*60)
+        logger.info("[StreamSong.play] 播放网络歌曲: %s (%s)", self.title, self.video_id or self.stream_url)
+        logger.debug(
+            "[StreamSong.play] URL=%s 类型=%s 时长=%s秒", self.stream_url, self.stream_type, self.duration
+        )
 
         try:
             # 设置 ytdl-format 为最佳音质
@@ -339,91 +375,52 @@ class StreamSong(Song):
             # 对于 YouTube URL，优先使用 yt-dlp 获取直链（先查缓存，缓存未命中则并行获取）
             actual_url = self.stream_url
             if "youtube.com" in self.stream_url or "youtu.be" in self.stream_url:
-                import subprocess
-                import concurrent.futures as _cf
                 import time as _time
-                from models.url_cache import url_cache, _run_ytdlp
+                from models.url_cache import url_cache
 
-                logger.info(f"🎬 检测到 YouTube URL，尝试通过 yt-dlp 获取直链...")
 
                 from models.player import MusicPlayer
                 yt_dlp_exe = MusicPlayer._get_yt_dlp_path()
 
-                # 1. 优先查询缓存
-                cached = url_cache.get(self.video_id) if self.video_id else None
-                if cached:
-                    actual_url = cached["audio_url"]
-                    self.video_url = cached.get("video_url")
-                    logger.info(f"   ✅ [缓存命中] 直接使用缓存直链，跳过 yt-dlp 调用")
+                # 共享缓存解析：命中直接返回；其他房间正在解析同一 video_id 时等待其结果；
+                # 否则并行获取音频 + 视频直链并写入缓存
+                start_time = _time.time()
+                with span("ytdlp.resolve", video_id=self.video_id):
+                    resolved = url_cache.resolve(self.video_id, self.stream_url, yt_dlp_exe) if self.video_id else None
+                elapsed = _time.time() - start_time
+                if resolved:
+                    actual_url = resolved["audio_url"]
+                    self.video_url = resolved.get("video_url")
+                    logger.info("[StreamSong.play] 直链就绪（%.2f秒，视频直链%s）", elapsed, "可用" if self.video_url else "不可用")
+                    logger.debug("   音频直链: %.100s", actual_url)
                 else:
-                    # 2. 缓存未命中：并行获取音频 + 视频直链
-                    logger.info(f"   ⏳ [缓存未命中] 并行获取音频+视频直链...")
-                    start_time = _time.time()
-                    try:
-                        with _cf.ThreadPoolExecutor(max_workers=2) as executor:
-                            audio_fut = executor.submit(
-                                _run_ytdlp, yt_dlp_exe,
-                                ["-f", "bestaudio", "-g", self.stream_url]
-                            )
-                            video_fut = executor.submit(
-                                _run_ytdlp, yt_dlp_exe,
-                                ["-f", "bestvideo[height<=720][ext=mp4]", "-g", self.stream_url]
-                            )
-                            try:
-                                audio_urls = audio_fut.result(timeout=35)
-                            except Exception as e:
-                                logger.warning(f"   ⚠️ 音频直链获取失败: {e}")
-                                audio_urls = []
-                            try:
-                                video_urls = video_fut.result(timeout=35)
-                            except Exception as e:
-                                logger.warning(f"   ⚠️ 视频直链获取失败: {e}")
-                                video_urls = []
-
-                        elapsed = _time.time() - start_time
-                        logger.info(f"   ⏱️ 并行获取耗时: {elapsed:.2f}秒（原串行约需 2x 时间）")
-
-                        if audio_urls:
-                            actual_url = audio_urls[0]
-                            logger.info(f"   ✅ 音频直链: {actual_url[:100]}...")
-                        else:
-                            logger.warning(f"   ⚠️ 未获取到音频直链，使用原始 URL")
-
-                        self.video_url = video_urls[0] if video_urls else None
-                        if self.video_url:
-                            logger.info(f"   ✅ 视频直链: {self.video_url[:100]}...")
-                        else:
-                            logger.info(f"   ℹ️ 未获取到视频直链（KTV 功能不可用）")
-
-                        # 3. 写入缓存（仅当成功获取到音频直链时）
-                        if self.video_id and actual_url != self.stream_url:
-                            url_cache.set(self.video_id, actual_url, self.video_url)
-
-                    except Exception as e:
-                        logger.warning(f"   ⚠️ 并行获取直链异常: {type(e).__name__}: {e}")
-                        logger.warning(f"   ⚠️ 将使用原始 URL: {self.stream_url}")
-
-            logger.info(f"📤 调用 mpv loadfile 播放网络歌曲...")
-            logger.info(f"   📌 actual_url 长度: {len(actual_url)} 字符")
-            logger.info(f"   📌 actual_url 前缀: {actual_url[:50]}..." if len(actual_url) > 50 else f"   📌 actual_url: {actual_url}")
+                    logger.warning("[StreamSong.play] 未获取到音频直链，使用原始 URL: %s", self.stream_url)
+
+                meta = url_cache.get_metadata(self.video_id)
+                if meta:
+                    if meta.get("title") and self.title in ("", "加载中…", self.stream_url):
+                        self.title = meta["title"]
+                    if meta.get("duration") and not self.duration:
+                        self.duration = meta["duration"]
+
+            # 逐曲响度增益：已分析过的 video_id 直接施加；首次播放时后台分析直链，下次播放生效
+            from models.loudness import loudness
+            loudness.apply_gain(mpv_command_func, loudness.video_gain(self.video_id))
 
             if not mpv_command_func(["loadfile", actual_url, "replace"]):
-                logger.error(f"   ❌ mpv loadfile 命令发送失败（管道不可用）")
+                logger.error("[StreamSong.play] mpv loadfile 命令发送失败（管道不可用）")
                 return False
-            logger.info(f"   ✅ mpv loadfile 命令已发送")
+            if self.video_id and actual_url != self.stream_url:
+                loudness.analyze_video_later(self.video_id, actual_url)
 
             # 添加到播放历史
             if save_to_history and add_to_history_func:
-                add_to_history_func(self.stream_url, self.title, is_local=False, thumbnail_url=self.get_thumbnail_url())
-                logger.info(f"   ✅ 已添加到播放历史")
+                with span("history.save"):
+                    add_to_history_func(self.stream_url, self.title, is_local=False, thumbnail_url=self.get_thumbnail_url())
 
-            logger.info(f"🎵 [StreamSong.play] ✅ 播放流程完成")
-            logger.info("="*60)
             return True
         except Exception as e:
-            logger.error(f"❌ [StreamSong.play] 播放失败: {type(e).__name__}: {e}")
-            import traceback
-            logger.error(f"❌ 堆栈:\n{traceback.format_exc()}")
+            logger.exception("[StreamSong.play] 播放失败: %s: %s", type(e).__name__, e)
             return False
 
     def to_dict(self) -> dict:
@@ -494,6 +491,17 @@ class StreamSong(Song):
                                 }
                             )
                 logger.info(f"[YouTube搜索] 搜索完成，找到 {len(results)} 个结果")
+
+                # 搜索结果已带标题/时长，写入共享元数据缓存供各房间播放时复用
+                from models.url_cache import url_cache
+                for entry in results:
+                    url_cache.update_metadata(
+                        entry["id"],
+                        title=entry["title"],
+                        duration=entry["duration"],
+                        uploader=entry["uploader"],
+                        thumbnail_url=entry["thumbnail_url"],
+                    )
                 return {"status": "OK", "results": results}
         except Exception as e:
             logger.error(f"YouTube 搜索失败: {str(e)}")
@@ -518,7 +526,7 @@ class StreamSong(Song):
         try:
             import yt_dlp
 
-            logger.debug(f"提取播放列表: {url}")
+            logger.debug("提取播放列表: %s", url)
 
             # 使用 yt-dlp 提取播放列表
             ydl_opts = {
@@ -533,25 +541,17 @@ class StreamSong(Song):
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 result = ydl.extract_info(url, download=False)
 
-                logger.debug(f"提取结果类型: {type(result)}")
-                if result:
-                    print(
-                        f"[DEBUG] 结果包含键: {result.keys() if isinstance(result, dict) else 'N/A'}"
-                    )
+                logger.debug("提取结果类型: %s", type(result))
 
                 entries = []
 
                 if result and "entries" in result:
-                    logger.debug(f"找到 entries，共 {len(result['entries'])} 项")
+                    logger.debug("找到 entries，共 %d 项", len(result["entries"]))
                     for idx, item in enumerate(result["entries"]):
                         if not item:
-                            logger.warning(f"第 {idx} 项为空，跳过")
+                            logger.warning("第 %d 项为空，跳过", idx)
                             continue
 
-                        print(
-                            f"[DEBUG] 处理第 {idx} 项: {item.keys() if isinstance(item, dict) else type(item)}"
-                        )
-
                         # 获取视频 ID
                         video_id = item.get("id") or item.get("video_id")
                         entry_url = item.get("url")
@@ -576,7 +576,7 @@ class StreamSong(Song):
                         # 生成缩略图 URL（hqdefault 几乎所有视频都有，sddefault 仅 4:3 视频存在）
                         thumbnail_url = f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg" if video_id else ""
 
-                        logger.debug(f"添加视频: {title} - {entry_url}")
+                        logger.debug("添加视频: %s - %s", title, entry_url)
 
                         entries.append(
                             {
@@ -590,7 +590,7 @@ class StreamSong(Song):
                             }
                         )
 
-                    logger.debug(f"成功提取 {len(entries)} 个视频")
+                    logger.debug("成功提取 %d 个视频", len(entries))
                     if len(entries) > 0:
                         return {"status": "OK", "entries": entries}
                     else:
@@ -618,6 +618,25 @@ class StreamSong(Song):
         if not url or not url.strip():
             return {"status": "ERROR", "error": "视频 URL 不能为空"}
 
+        from models.url_cache import url_cache
+
+        video_id = StreamSong.extract_video_id(url)
+        cached = url_cache.get_metadata(video_id)
+        if cached and cached.get("title") and cached.get("duration"):
+            logger.debug(f"元数据缓存命中: {video_id}")
+            return {
+                "status": "OK",
+                "data": {
+                    "url": f"https://www.youtube.com/watch?v={video_id}",
+                    "title": cached["title"],
+                    "duration": cached["duration"],
+                    "uploader": cached.get("uploader", "Unknown"),
+                    "id": video_id,
+                    "type": "youtube",
+                    "thumbnail_url": cached.get("thumbnail_url") or f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
+                },
+            }
+
         try:
             import yt_dlp
 
@@ -643,6 +662,14 @@ class StreamSong(Song):
                     
                     # 构建完整的 YouTube URL
                     entry_url = f"https://www.youtube.com/watch?v={video_id}" if video_id else url
+
+                    url_cache.update_metadata(
+                        video_id,
+                        title=title,
+                        duration=duration,
+                        uploader=result.get("uploader"),
+                        thumbnail_url=thumbnail_url,
+                    )
                     
                     return {
                         "status": "OK",
@@ -0,0 +1,382 @@
+"""
+本地曲目标签索引 - 后台用 mutagen 读取时长、艺术家、专辑、音轨号与封面信息。
+
+- 扫描在后台线程调度，标签解析交给进程池（避免 GIL 争用），请求路径只读内存索引，
+  未扫描到的文件保持原有的 duration=0 / 文件名标题。
+- 结果按 (相对路径, mtime, size) 缓存并持久化到 tag_index.json，重启后只解析变化的文件。
+- 通过 enrich_song() 合并到目录歌曲、本地搜索、专辑与歌单条目中。
+- 标签解析完成（并落盘）后进入较慢的响度分析阶段（models.loudness，ffmpeg ebur128），结果
+  (lufs / peak) 写入同一条目并逐批落盘，文件变化时随条目一起失效；排队中的扫描优先。
+
+配置项（settings.ini [library] 节）：
+  tag_scan_workers = 2     # 标签解析进程数，0 表示在扫描线程内解析（不使用进程池）
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+import configparser
+import logging
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+_SETTINGS_FILE = "settings.ini"
+
+# 每批提交给进程池的文件数（减少进程间往返）
+SCAN_BATCH_SIZE = 64
+
+# 不同容器的标签键：ID3 / MP4 / Vorbis(FLAC、OGG、Opus) / APE(WMA 以外的少数格式)
+_TAG_KEYS = {
+    "title": ("TIT2", "\xa9nam", "title", "Title"),
+    "artist": ("TPE1", "\xa9ART", "artist", "Artist"),
+    "album": ("TALB", "\xa9alb", "album", "Album"),
+    "track": ("TRCK", "trkn", "tracknumber", "Track"),
+}
+_COVER_KEYS = ("covr", "metadata_block_picture", "Cover Art (Front)", "WM/Picture")
+
+
+def _first_text(value):
+    """从各种 mutagen 标签值中取出首个文本"""
+    if value is None:
+        return None
+    if hasattr(value, "text"):
+        value = value.text
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return None
+        value = value[0]
+    if isinstance(value, tuple):  # MP4 trkn: (track, total)
+        value = value[0]
+    text = str(value).strip()
+    return text or None
+
+
+def _parse_track(value):
+    text = _first_text(value)
+    if not text:
+        return None
+    try:
+        return int(text.split("/")[0])
+    except ValueError:
+        return None
+
+
+def read_tags(abs_path: str) -> dict:
+    """读取单个文件的标签（进程池中执行，必须为模块级函数）"""
+    from mutagen import File
+
+    result = {"duration": 0.0, "title": None, "artist": None, "album": None, "track": None, "has_cover": False}
+    audio = File(abs_path)
+    if audio is None:
+        return result
+
+    info = getattr(audio, "info", None)
+    result["duration"] = round(float(getattr(info, "length", 0) or 0), 3)
+
+    tags = getattr(audio, "tags", None)
+    if tags is not None:
+        keys = set(tags.keys())
+        for field, candidates in _TAG_KEYS.items():
+            for key in candidates:
+                if key in keys:
+                    value = _parse_track(tags[key]) if field == "track" else _first_text(tags[key])
+                    if value is not None:
+                        result[field] = value
+                        break
+        result["has_cover"] = any(key.startswith("APIC") for key in keys) or any(key in keys for key in _COVER_KEYS)
+    if getattr(audio, "pictures", None):
+        result["has_cover"] = True
+    return result
+
+
+def read_tags_batch(items: list) -> list:
+    """批量读取 [(rel, abs_path)]，返回 [(rel, tags 或 None)]；单个文件失败不影响其他文件"""
+    results = []
+    for rel, abs_path in items:
+        try:
+            results.append((rel, read_tags(abs_path)))
+        except Exception:
+            results.append((rel, None))
+    return results
+
+
+def iter_tree_rels(tree):
+    """遍历本地文件树（player.local_file_tree），生成所有文件的相对路径"""
+    stack = [tree] if tree else []
+    while stack:
+        node = stack.pop()
+        for f in node.get("files") or []:
+            rel = f.get("rel") or f.get("path")
+            if rel:
+                yield rel
+        stack.extend(node.get("dirs") or [])
+
+
+class TagIndex:
+    """本地曲目标签的内存索引（线程安全），扫描在后台进行。"""
+
+    def __init__(self, cache_file: str = None, workers: int = None):
+        self.cache_file = cache_file
+        self.workers = max(0, self._read_config() if workers is None else int(workers))
+        self._entries = {}           # rel -> {"mtime", "size", "duration", "title", ...}
+        self._lock = threading.Lock()
+        self._scan_thread = None
+        self._pending_scan = None    # 扫描进行中时收到的新请求 (music_dir, rels)
+        self._version = 0
+        self.scanned = 0
+        self.failed = 0
+        self.last_scan_seconds = 0.0
+
+    @staticmethod
+    def _read_config() -> int:
+        config = configparser.ConfigParser()
+        if os.path.exists(_SETTINGS_FILE):
+            config.read(_SETTINGS_FILE, encoding="utf-8")
+        return config.getint("library", "tag_scan_workers", fallback=2)
+
+    # ------------------------------------------------------------------
+    # 读取（请求路径，只读内存）
+    # ------------------------------------------------------------------
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, rel: str):
+        entry = self._entries.get(rel)
+        return dict(entry) if entry else None
+
+    def enrich_song(self, song: dict) -> dict:
+        """用已知标签补全本地歌曲 dict（原地修改并返回）：时长、艺术家、专辑、音轨号、封面"""
+        if not isinstance(song, dict) or song.get("type", "local") != "local":
+            return song
+        rel = song.get("url") or song.get("rel") or ""
+        entry = self._entries.get(rel)
+        if not entry:
+            return song
+        # 标题仍是文件名时用标签标题替换
+        if entry.get("title") and song.get("title") in (None, "", os.path.splitext(os.path.basename(rel))[0]):
+            song["title"] = entry["title"]
+        if not song.get("duration") and entry.get("duration"):
+            song["duration"] = entry["duration"]
+        for field in ("artist", "album", "track"):
+            if entry.get(field) is not None and not song.get(field):
+                song[field] = entry[field]
+        song["has_cover"] = entry.get("has_cover", False)
+        return song
+
+    def enrich_album(self, album: dict) -> dict:
+        """以专辑首曲的标签补全专辑艺术家/专辑名（原地修改并返回）"""
+        entry = self._entries.get(album.get("cover_path") or "")
+        if entry:
+            if entry.get("artist"):
+                album.setdefault("artist", entry["artist"])
+            if entry.get("album"):
+                album.setdefault("album", entry["album"])
+        return album
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "scanning": self.is_scanning(),
+            "workers": self.workers,
+            "scanned": self.scanned,
+            "failed": self.failed,
+            "last_scan_seconds": round(self.last_scan_seconds, 3),
+        }
+
+    def is_scanning(self) -> bool:
+        return self._scan_thread is not None and self._scan_thread.is_alive()
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                with self._lock:
+                    self._entries = {rel: entry for rel, entry in data.items() if isinstance(entry, dict)}
+                    self._version += 1
+            logger.info(f"[TagIndex] 已加载 {len(self._entries)} 条标签缓存")
+        except Exception as e:
+            logger.warning(f"[TagIndex] 加载标签缓存失败: {e}")
+
+    def save(self):
+        if not self.cache_file:
+            return
+        with self._lock:
+            data = dict(self._entries)
+        try:
+            dir_name = os.path.dirname(self.cache_file) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, self.cache_file)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except Exception as e:
+            logger.warning(f"[TagIndex] 保存标签缓存失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 扫描
+    # ------------------------------------------------------------------
+
+    def schedule_scan(self, music_dir: str, rel_paths):
+        """后台扫描 rel_paths（立即返回）；扫描进行中时合并为一次后续扫描"""
+        rels = list(rel_paths)
+        with self._lock:
+            if self.is_scanning():
+                self._pending_scan = (music_dir, rels)
+                return
+            self._scan_thread = threading.Thread(
+                target=self._scan_loop, args=(music_dir, rels), daemon=True, name="TagIndexScan"
+            )
+            self._scan_thread.start()
+
+    def _scan_loop(self, music_dir: str, rels: list):
+        while True:
+            try:
+                self.scan(music_dir, rels)
+            except Exception as e:
+                logger.error(f"[TagIndex] 扫描异常: {e}")
+            with self._lock:
+                pending, self._pending_scan = self._pending_scan, None
+                if pending is None:
+                    self._scan_thread = None
+                    return
+            music_dir, rels = pending
+
+    def _stale(self, music_dir: str, rels: list) -> tuple:
+        """返回 (需要解析的 [(rel, abs, mtime, size)], 仍存在的 rel 集合)"""
+        abs_root = os.path.abspath(music_dir)
+        stale, alive = [], set()
+        for rel in rels:
+            abs_path = os.path.join(abs_root, rel)
+            try:
+                st = os.stat(abs_path)
+            except OSError:
+                continue
+            alive.add(rel)
+            entry = self._entries.get(rel)
+            if entry and entry.get("mtime") == st.st_mtime and entry.get("size") == st.st_size:
+                continue
+            stale.append((rel, abs_path, st.st_mtime, st.st_size))
+        return stale, alive
+
+    def scan(self, music_dir: str, rels: list) -> int:
+        """同步扫描（在后台线程调用）：只解析 (mtime, size) 变化的文件，返回解析数量"""
+        started = time.perf_counter()
+        stale, alive = self._stale(music_dir, rels)
+        stat_by_rel = {rel: (mtime, size) for rel, _, mtime, size in stale}
+        batches = [
+            [(rel, abs_path) for rel, abs_path, _, _ in stale[i:i + SCAN_BATCH_SIZE]]
+            for i in range(0, len(stale), SCAN_BATCH_SIZE)
+        ]
+
+        parsed = 0
+        for results in self._run_batches(batches):
+            with self._lock:
+                for rel, tags in results:
+                    mtime, size = stat_by_rel[rel]
+                    if tags is None:
+                        self.failed += 1
+                        tags = {"duration": 0.0}
+                    self._entries[rel] = dict(tags, mtime=mtime, size=size)
+                    parsed += 1
+                self._version += 1
+
+        with self._lock:
+            removed = [rel for rel in self._entries if rel not in alive]
+            for rel in removed:
+                del self._entries[rel]
+            if removed:
+                self._version += 1
+        self.scanned += parsed
+        self.last_scan_seconds = time.perf_counter() - started
+        if parsed or removed:
+            logger.info(
+                f"[TagIndex] 标签扫描完成: 解析 {parsed} 个文件，移除 {len(removed)} 条，"
+                f"共 {len(self._entries)} 条，耗时 {self.last_scan_seconds:.1f}s"
+            )
+            # 标签结果先落盘：响度阶段可能持续数小时，中途重启不应丢失已解析的标签
+            self.save()
+
+        self._analyze_loudness(os.path.abspath(music_dir), alive)
+        return parsed
+
+    def _analyze_loudness(self, abs_root: str, alive: set) -> int:
+        """为尚无响度数据的条目分析响度，返回分析数量
+
+        每批写回后递增版本并落盘；有排队的扫描时提前结束，剩余条目由下一次扫描继续分析。
+        """
+        from models.loudness import loudness
+        if not loudness.enabled:
+            return 0
+        with self._lock:
+            pending = [
+                rel for rel, entry in self._entries.items()
+                if rel in alive and "lufs" not in entry
+            ]
+        started = time.perf_counter()
+        analyzed = 0
+        for i in range(0, len(pending), SCAN_BATCH_SIZE):
+            if self._pending_scan is not None:
+                logger.info(f"[TagIndex] 有新的扫描请求，响度分析暂停（剩余 {len(pending) - i} 个）")
+                break
+            batch = [(rel, os.path.join(abs_root, rel)) for rel in pending[i:i + SCAN_BATCH_SIZE]]
+            results = loudness.analyze_files(batch)
+            with self._lock:
+                for rel, measurement in results:
+                    entry = self._entries.get(rel)
+                    if entry is None:
+                        continue
+                    # 分析失败也记录 lufs=None，避免每次扫描重复分析无法解码的文件
+                    entry["lufs"] = measurement["lufs"] if measurement else None
+                    entry["peak"] = measurement["peak"] if measurement else None
+                    analyzed += 1
+                self._version += 1
+            self.save()
+        if analyzed:
+            logger.info(
+                f"[TagIndex] 响度分析完成: {analyzed} 个文件，耗时 {time.perf_counter() - started:.1f}s"
+            )
+        return analyzed
+
+    def _run_batches(self, batches: list):
+        """逐批产出解析结果；进程池不可用时退回当前线程解析"""
+        if not batches:
+            return
+        if self.workers <= 0:
+            for batch in batches:
+                yield read_tags_batch(batch)
+            return
+        completed = set()
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(read_tags_batch, batch): i for i, batch in enumerate(batches)}
+                for future in concurrent.futures.as_completed(futures):
+                    result = future.result()
+                    completed.add(futures[future])
+                    yield result
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"[TagIndex] 进程池不可用，改为线程内解析: {e}")
+            for i, batch in enumerate(batches):
+                if i not in completed:
+                    yield read_tags_batch(batch)
+
+
+tag_index = TagIndex()
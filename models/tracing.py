@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+请求级追踪 - 用 contextvars 传播的轻量 span，定位慢 /next、/play 的耗时阶段
+（锁等待、队列修改、yt-dlp 解析、loadfile、历史保存、广播）。
+
+- TracingMiddleware 为每个 HTTP 请求创建 Trace；span() 在没有活动 Trace 时为空操作
+- contextvars 随 await、anyio 子任务与 run_in_threadpool 传播；后台线程（room_tasks 等）不继承
+- 请求结束后按路由模板保留最慢的 N 条（有界最小堆；未匹配路由共用 <unmatched>），GET /diagnostic/traces 查看，
+  GET /diagnostic/traces/chrome 导出 Chrome trace-event JSON（chrome://tracing / Perfetto）
+
+配置项（settings.ini [diagnostics] 节）：
+  tracing             = true   # 是否启用请求追踪
+  traces_per_route    = 10     # 每个路由保留的最慢 Trace 数
+"""
+
+import os
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+import configparser
+from contextlib import contextmanager, nullcontext
+
+from models.access_log import UNMATCHED_ROUTE
+
+_SETTINGS_FILE = "settings.ini"
+MAX_SPANS_PER_TRACE = 500
+
+_current_trace = contextvars.ContextVar("clubmusic_trace", default=None)
+_current_span = contextvars.ContextVar("clubmusic_span", default=None)
+_NULL_SPAN = nullcontext()
+_trace_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ("name", "parent", "start", "end", "thread", "attrs")
+
+    def __init__(self, name: str, parent, attrs: dict):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end = None
+        self.thread = threading.get_ident()
+        self.attrs = attrs
+
+
+class Trace:
+    __slots__ = ("trace_id", "method", "path", "route", "status", "wall_start", "start", "end", "spans")
+
+    def __init__(self, method: str, path: str):
+        self.trace_id = next(_trace_ids)
+        self.method = method
+        self.path = path
+        self.route = path
+        self.status = 0
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans = []
+
+    @property
+    def duration(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start)
+
+    def to_dict(self) -> dict:
+        index = {id(s): i for i, s in enumerate(self.spans)}
+        return {
+            "trace_id": self.trace_id,
+            "method": self.method,
+            "route": self.route,
+            "path": self.path,
+            "status": self.status,
+            "start_ts": self.wall_start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "spans": [
+                {
+                    "name": s.name,
+                    "parent": index.get(id(s.parent)) if s.parent is not None else None,
+                    "start_ms": round((s.start - self.start) * 1000, 3),
+                    "duration_ms": round(((s.end or s.start) - s.start) * 1000, 3),
+                    "thread": s.thread,
+                    "attrs": {k: str(v) for k, v in s.attrs.items()},
+                }
+                for s in list(self.spans)
+            ],
+        }
+
+
+def span(name: str, **attrs):
+    """with span("stage"): ... —— 当前上下文没有 Trace 时返回共享的空上下文（几乎零开销）"""
+    trace = _current_trace.get()
+    if trace is None or len(trace.spans) >= MAX_SPANS_PER_TRACE:
+        return _NULL_SPAN
+    return _span(trace, name, attrs)
+
+
+@contextmanager
+def _span(trace: Trace, name: str, attrs: dict):
+    item = Span(name, _current_span.get(), attrs)
+    trace.spans.append(item)
+    token = _current_span.set(item)
+    try:
+        yield item
+    finally:
+        item.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+@contextmanager
+def traced_lock(lock, name: str = "lock_wait"):
+    """获取锁（等待时间记为一个 span）并在代码块结束后释放"""
+    with span(name):
+        lock.__enter__()
+    try:
+        yield
+    finally:
+        lock.__exit__(None, None, None)
+
+
+class TraceStore:
+    """按路由保留最慢的 N 条 Trace。"""
+
+    def __init__(self, per_route: int = None, enabled: bool = None):
+        config = self._read_config()
+        self.enabled = config["enabled"] if enabled is None else enabled
+        self.per_route = max(1, config["per_route"] if per_route is None else int(per_route))
+        self._lock = threading.Lock()
+        self._slowest = {}     # route -> [(duration, trace_id, trace)] 最小堆
+        self.finished = 0
+
+    @staticmethod
+    def _read_config() -> dict:
+        config = configparser.ConfigParser()
+        if os.path.exists(_SETTINGS_FILE):
+            config.read(_SETTINGS_FILE, encoding="utf-8")
+        return {
+            "enabled": config.getboolean("diagnostics", "tracing", fallback=True),
+            "per_route": config.getint("diagnostics", "traces_per_route", fallback=10),
+        }
+
+    def begin(self, method: str, path: str):
+        """创建 Trace 并设为当前上下文的活动 Trace；返回 (trace, token)"""
+        trace = Trace(method, path)
+        return trace, _current_trace.set(trace)
+
+    def finish(self, trace: Trace, token, route: str = None, status: int = 0):
+        _current_trace.reset(token)
+        trace.end = time.perf_counter()
+        # 未匹配路由（404 扫描等）统一归到一个键，避免按原始路径无限增加堆
+        trace.route = route or UNMATCHED_ROUTE
+        trace.status = status
+        item = (trace.duration, trace.trace_id, trace)
+        with self._lock:
+            self.finished += 1
+            heap = self._slowest.setdefault(trace.route, [])
+            if len(heap) < self.per_route:
+                heapq.heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
+    def slowest(self, route: str = None, limit: int = None) -> list:
+        """按耗时降序返回 Trace（route 为空时跨所有路由）"""
+        with self._lock:
+            if route is not None:
+                items = list(self._slowest.get(route, []))
+            else:
+                items = [item for heap in self._slowest.values() for item in heap]
+        items.sort(key=lambda item: item[0], reverse=True)
+        if limit:
+            items = items[:limit]
+        return [trace for _, _, trace in items]
+
+    def routes(self) -> list:
+        with self._lock:
+            return sorted(self._slowest)
+
+    def clear(self):
+        with self._lock:
+            self._slowest = {}
+
+    def chrome_trace(self, route: str = None, limit: int = None) -> dict:
+        """导出为 Chrome trace-event 格式：每条 Trace 一个 pid，span 按线程分 tid"""
+        events = []
+        for pid, trace in enumerate(self.slowest(route, limit), start=1):
+            base_us = trace.wall_start * 1e6
+            events.append({
+                "name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                "args": {"name": f"#{trace.trace_id} {trace.method} {trace.route}"},
+            })
+            events.append({
+                "name": f"{trace.method} {trace.route}", "cat": "request", "ph": "X", "pid": pid, "tid": 0,
+                "ts": base_us, "dur": trace.duration * 1e6,
+                "args": {"path": trace.path, "status": trace.status},
+            })
+            for s in list(trace.spans):
+                events.append({
+                    "name": s.name, "cat": "span", "ph": "X", "pid": pid, "tid": s.thread,
+                    "ts": base_us + (s.start - trace.start) * 1e6,
+                    "dur": ((s.end or s.start) - s.start) * 1e6,
+                    "args": {k: str(v) for k, v in s.attrs.items()},
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+trace_store = TraceStore()
+
+
+class TracingMiddleware:
+    """纯 ASGI 中间件：为每个 HTTP 请求建立 Trace，结束后按路由模板归档。"""
+
+    def __init__(self, app, store: TraceStore = None):
+        self.app = app
+        self.store = store or trace_store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.store.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        trace, token = self.store.begin(scope.get("method", ""), scope.get("path", ""))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            self.store.finish(trace, token, route=route, status=status[0])
@@ -1,12 +1,16 @@
 """
-YouTube 直链 URL 缓存管理器
+YouTube 媒体缓存管理器（所有房间与默认播放器共享，按 video_id 索引）
 
 - 线程安全的内存缓存
-- TTL 18000 秒（5小时），YouTube 直链约 6 小时过期
+- 直链过期时间优先取自直链自身的 expire 参数，否则使用 TTL 18000 秒（5小时）
+- 同时保存标题、时长、上传者、缩略图等元数据（独立于直链过期，LRU 上限）
+- single-flight：同一 video_id 同时只有一个 yt-dlp 解析，其他房间等待同一结果
 - 支持后台预获取，幂等（同一 video_id 不重复提交）
 - 并行获取音频 + 视频直链
+- 记录最近一次解析失败的类型（确定性 unavailable / 暂时性 transient），供调用方决定重试间隔
 - 可通过 settings.ini [cache] url_cache_enabled 开关
 """
+import json
 import threading
 import time
 import subprocess
@@ -14,28 +18,92 @@ import logging
 import concurrent.futures
 import configparser
 import os
+from collections import OrderedDict
 from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+from models.metrics import URL_CACHE_EVENTS, YTDLP_RESOLVE_SECONDS
 
 logger = logging.getLogger(__name__)
 
 URL_CACHE_TTL = 18000  # 5 小时
+URL_EXPIRY_MARGIN = 300  # 直链自带过期时间前 5 分钟视为失效
+METADATA_MAX_ENTRIES = 5000
+_METADATA_FIELDS = ("title", "duration", "uploader", "thumbnail_url")
 _SETTINGS_FILE = "settings.ini"
+FAILURE_MAX_ENTRIES = 1000
+
+# 解析失败类型：视频本身不可用（重试无意义） / 超时、网络、限流等暂时性问题
+FAILURE_UNAVAILABLE = "unavailable"
+FAILURE_TRANSIENT = "transient"
 
+# yt-dlp 错误输出中表示视频本身不可用的片段（小写匹配）
+_UNAVAILABLE_YTDLP_ERRORS = (
+    "video unavailable",
+    "private video",
+    "has been removed",
+    "been terminated",
+    "no longer available",
+    "not available in your country",
+    "copyright",
+    "members-only",
+    "confirm your age",
+    "does not exist",
+)
 
-def _run_ytdlp(yt_dlp_exe: str, args: list) -> list:
-    """执行 yt-dlp，返回输出的 URL 列表。失败或异常时返回空列表。"""
+
+def _run_ytdlp(yt_dlp_exe: str, args: list, errors: list = None) -> list:
+    """执行 yt-dlp，返回输出的 URL 列表。失败或异常时返回空列表（错误信息追加到 errors）。"""
     try:
         cmd = [yt_dlp_exe] + args
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
         if result.returncode == 0:
             return [u.strip() for u in result.stdout.strip().split("\n") if u.strip()]
+        if errors is not None:
+            errors.append(result.stderr or f"exit code {result.returncode}")
     except subprocess.TimeoutExpired:
         logger.warning(f"[URLCache] yt-dlp 超时: {args[-1][:60]}")
+        if errors is not None:
+            errors.append("timeout")
     except Exception as e:
         logger.warning(f"[URLCache] yt-dlp 异常: {e}")
+        if errors is not None:
+            errors.append(str(e))
     return []
 
 
+def classify_ytdlp_error(text: str) -> str:
+    """按 yt-dlp 错误输出判断失败类型；无法识别的错误视为暂时性"""
+    lowered = (text or "").lower()
+    if any(marker in lowered for marker in _UNAVAILABLE_YTDLP_ERRORS):
+        return FAILURE_UNAVAILABLE
+    return FAILURE_TRANSIENT
+
+
+def _url_expiry(url: str) -> Optional[float]:
+    """解析 googlevideo 直链中的 expire 参数（Unix 时间戳），无法解析时返回 None。"""
+    try:
+        expire = parse_qs(urlparse(url).query).get("expire", [""])[0]
+        return float(expire) if expire else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_audio_output(lines: list) -> tuple:
+    """拆分 `--print urls --print %(...)j` 输出：返回 (音频直链, 元数据 dict)。"""
+    audio_url = None
+    meta = {}
+    for line in lines:
+        if line.startswith("{"):
+            try:
+                meta = json.loads(line)
+            except ValueError:
+                pass
+        elif audio_url is None and line.startswith("http"):
+            audio_url = line
+    return audio_url, meta
+
+
 def _read_enabled_from_file() -> bool:
     """从 settings.ini 读取 [cache] url_cache_enabled，默认 True。"""
     try:
@@ -56,9 +124,13 @@ class URLCache:
         self._ttl = ttl
         # { video_id: {"audio_url": str, "video_url": str|None, "expires_at": float} }
         self._cache: dict = {}
+        # { video_id: {"title", "duration", "uploader", "thumbnail_url", "updated_at"} }
+        self._meta: OrderedDict = OrderedDict()
         self._lock = threading.RLock()
-        # 正在预获取的 video_id 集合，防止重复提交
-        self._prefetching: set = set()
+        # 正在解析的 video_id → Future（single-flight，预获取与播放共用）
+        self._inflight: dict = {}
+        # 最近一次解析失败的类型 { video_id: FAILURE_* }，解析成功时移除
+        self._failures: OrderedDict = OrderedDict()
         self._executor = concurrent.futures.ThreadPoolExecutor(
             max_workers=2, thread_name_prefix="URLCachePrefetch"
         )
@@ -96,23 +168,34 @@ class URLCache:
                 if time.time() < entry["expires_at"]:
                     remaining = entry["expires_at"] - time.time()
                     logger.info(f"[URLCache] 缓存命中: {video_id}，剩余 {remaining:.0f}s")
+                    URL_CACHE_EVENTS.inc("url", "hit")
                     return entry
                 else:
                     del self._cache[video_id]
                     logger.debug(f"[URLCache] 缓存已过期: {video_id}")
+                    URL_CACHE_EVENTS.inc("url", "expired")
+            URL_CACHE_EVENTS.inc("url", "miss")
             return None
 
     def set(self, video_id: str, audio_url: str, video_url: Optional[str] = None):
-        """写入缓存。缓存禁用时为空操作。"""
+        """写入缓存。缓存禁用时为空操作。
+
+        过期时间取 TTL 与直链自带 expire（提前 URL_EXPIRY_MARGIN 秒）中较早者。
+        """
         if not self.enabled:
             return
         if not video_id or not audio_url:
             return
+        expires_at = time.time() + self._ttl
+        for url in (audio_url, video_url):
+            url_expire = _url_expiry(url) if url else None
+            if url_expire:
+                expires_at = min(expires_at, url_expire - URL_EXPIRY_MARGIN)
         with self._lock:
             self._cache[video_id] = {
                 "audio_url": audio_url,
                 "video_url": video_url,
-                "expires_at": time.time() + self._ttl,
+                "expires_at": expires_at,
             }
         logger.info(
             f"[URLCache] 已缓存 {video_id}: "
@@ -120,6 +203,19 @@ class URLCache:
             f"video={'有' if video_url else '无'}"
         )
 
+    def count_cached(self, video_ids) -> int:
+        """统计 video_ids 中当前仍有效的缓存条目数（用于房间资源诊断）。"""
+        now = time.time()
+        with self._lock:
+            return sum(
+                1 for vid in set(video_ids)
+                if vid in self._cache and self._cache[vid]["expires_at"] > now
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cache)
+
     def invalidate(self, video_id: str):
         """主动使某条记录失效（如播放失败时调用）。"""
         if not video_id:
@@ -128,12 +224,120 @@ class URLCache:
             if video_id in self._cache:
                 del self._cache[video_id]
                 logger.info(f"[URLCache] 已失效缓存: {video_id}")
+                URL_CACHE_EVENTS.inc("url", "invalidated")
+
+    # ------------------------------------------------------------------
+    # 元数据（标题/时长/上传者/缩略图），不随直链过期
+    # ------------------------------------------------------------------
+
+    def get_metadata(self, video_id: str) -> Optional[dict]:
+        """返回已知元数据副本；未知时返回 None。"""
+        if not video_id:
+            return None
+        with self._lock:
+            meta = self._meta.get(video_id)
+            if meta is None:
+                return None
+            self._meta.move_to_end(video_id)
+            return dict(meta)
+
+    def update_metadata(self, video_id: str, **fields):
+        """合并写入元数据，忽略空值；超过 METADATA_MAX_ENTRIES 时淘汰最久未用的条目。"""
+        if not video_id:
+            return
+        values = {k: v for k, v in fields.items() if k in _METADATA_FIELDS and v not in (None, "", 0)}
+        if not values:
+            return
+        with self._lock:
+            meta = self._meta.get(video_id)
+            if meta is None:
+                meta = self._meta[video_id] = {}
+            else:
+                self._meta.move_to_end(video_id)
+            meta.update(values)
+            meta["updated_at"] = time.time()
+            while len(self._meta) > METADATA_MAX_ENTRIES:
+                self._meta.popitem(last=False)
+                URL_CACHE_EVENTS.inc("metadata", "evicted")
+
+    # ------------------------------------------------------------------
+    # 解析（single-flight）
+    # ------------------------------------------------------------------
+
+    def _claim(self, video_id: str):
+        """返回 (future, 是否由调用方负责解析)。"""
+        with self._lock:
+            future = self._inflight.get(video_id)
+            if future is not None:
+                return future, False
+            future = concurrent.futures.Future()
+            self._inflight[video_id] = future
+            return future, True
+
+    def _fill(self, video_id: str, youtube_url: str, yt_dlp_exe: str, future) -> dict:
+        """执行一次解析、写入缓存并唤醒所有等待者。"""
+        data = {"audio_url": None, "video_url": None, "meta": {}}
+        started = time.perf_counter()
+        try:
+            data = self._fetch_both(video_id, youtube_url, yt_dlp_exe)
+        except Exception as e:
+            logger.error(f"[URLCache] 解析异常: {video_id}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop(video_id, None)
+        YTDLP_RESOLVE_SECONDS.observe(time.perf_counter() - started, "ok" if data.get("audio_url") else "failed")
+
+        with self._lock:
+            if data.get("audio_url"):
+                self._failures.pop(video_id, None)
+            else:
+                self._failures[video_id] = data.get("error") or FAILURE_TRANSIENT
+                self._failures.move_to_end(video_id)
+                while len(self._failures) > FAILURE_MAX_ENTRIES:
+                    self._failures.popitem(last=False)
+        if data.get("audio_url"):
+            self.set(video_id, data["audio_url"], data.get("video_url"))
+        meta = data.get("meta") or {}
+        if meta:
+            self.update_metadata(
+                video_id,
+                title=meta.get("title"),
+                duration=meta.get("duration"),
+                uploader=meta.get("uploader"),
+            )
+        future.set_result(data)
+        return data
+
+    def resolve(self, video_id: str, youtube_url: str, yt_dlp_exe: str,
+                timeout: float = 40.0) -> Optional[dict]:
+        """返回可播放的直链条目 {"audio_url", "video_url", ...}；失败返回 None。
+
+        缓存命中直接返回；同一 video_id 正在被其他房间或预获取解析时等待其结果，
+        否则在调用线程中解析（不经线程池排队）。
+        """
+        if not video_id or not youtube_url:
+            return None
+        cached = self.get(video_id)
+        if cached:
+            return cached
+
+        future, owner = self._claim(video_id)
+        if owner:
+            data = self._fill(video_id, youtube_url, yt_dlp_exe, future)
+        else:
+            logger.info(f"[URLCache] 等待进行中的解析: {video_id}")
+            try:
+                data = future.result(timeout=timeout)
+            except Exception as e:
+                logger.warning(f"[URLCache] 等待解析超时或失败: {video_id}: {e}")
+                return None
+        return data if data.get("audio_url") else None
 
     def prefetch(self, video_id: str, youtube_url: str, yt_dlp_exe: str):
         """
         后台异步预获取直链并写入缓存。
         缓存禁用时直接返回。
-        幂等：同一 video_id 在进行中时不重复提交。
+        幂等：同一 video_id 在解析中时不重复提交。
         缓存有效且距过期超过 5 分钟时跳过。
         """
         if not self.enabled:
@@ -141,37 +345,46 @@ class URLCache:
         if not video_id or not youtube_url:
             return
         with self._lock:
-            if video_id in self._prefetching:
-                logger.debug(f"[URLCache] 预获取进行中，跳过: {video_id}")
-                return
             entry = self._cache.get(video_id)
             if entry and time.time() < entry["expires_at"] - 300:
                 logger.debug(f"[URLCache] 缓存有效，无需预获取: {video_id}")
                 return
-            self._prefetching.add(video_id)
+        future, owner = self._claim(video_id)
+        if not owner:
+            logger.debug(f"[URLCache] 解析进行中，跳过预获取: {video_id}")
+            return
 
         logger.info(f"[URLCache] 开始后台预获取: {video_id} ({youtube_url[:60]})")
-        future = self._executor.submit(
-            self._fetch_both, video_id, youtube_url, yt_dlp_exe
-        )
-        future.add_done_callback(lambda f: self._on_done(video_id, f))
+        self._executor.submit(self._fill, video_id, youtube_url, yt_dlp_exe, future)
+
+    def failure_kind(self, video_id: str) -> Optional[str]:
+        """最近一次解析失败的类型（FAILURE_UNAVAILABLE / FAILURE_TRANSIENT）；未失败时返回 None"""
+        with self._lock:
+            return self._failures.get(video_id)
 
     def _fetch_both(self, video_id: str, youtube_url: str, yt_dlp_exe: str) -> dict:
-        """并行获取音频和视频直链（在线程池中执行）。"""
-        result = {"audio_url": None, "video_url": None}
+        """并行获取音频直链（附带标题/时长/上传者）和视频直链。
+
+        音频直链获取失败时 result["error"] 为失败类型（FAILURE_*）。
+        """
+        result = {"audio_url": None, "video_url": None, "meta": {}}
+        audio_errors = []
         try:
             with concurrent.futures.ThreadPoolExecutor(max_workers=2) as inner:
                 audio_fut = inner.submit(
-                    _run_ytdlp, yt_dlp_exe, ["-f", "bestaudio", "-g", youtube_url]
+                    _run_ytdlp, yt_dlp_exe,
+                    ["-f", "bestaudio", "--print", "urls",
+                     "--print", "%(.{title,duration,uploader})j", youtube_url],
+                    audio_errors,
                 )
                 video_fut = inner.submit(
                     _run_ytdlp, yt_dlp_exe,
                     ["-f", "bestvideo[height<=720][ext=mp4]", "-g", youtube_url]
                 )
                 try:
-                    audio_urls = audio_fut.result(timeout=35)
-                    if audio_urls:
-                        result["audio_url"] = audio_urls[0]
+                    audio_url, meta = _parse_audio_output(audio_fut.result(timeout=35))
+                    result["audio_url"] = audio_url
+                    result["meta"] = meta
                 except Exception as e:
                     logger.warning(f"[URLCache] 音频直链获取失败: {e}")
                 try:
@@ -182,22 +395,10 @@ class URLCache:
                     logger.warning(f"[URLCache] 视频直链获取失败: {e}")
         except Exception as e:
             logger.error(f"[URLCache] _fetch_both 异常: {e}")
+        if not result["audio_url"]:
+            result["error"] = classify_ytdlp_error("\n".join(audio_errors))
         return result
 
-    def _on_done(self, video_id: str, future: concurrent.futures.Future):
-        """预获取完成回调。"""
-        with self._lock:
-            self._prefetching.discard(video_id)
-        try:
-            data = future.result()
-            if data.get("audio_url"):
-                self.set(video_id, data["audio_url"], data.get("video_url"))
-                logger.info(f"[URLCache] 预获取成功并已缓存: {video_id}")
-            else:
-                logger.warning(f"[URLCache] 预获取完成但无有效音频 URL: {video_id}")
-        except Exception as e:
-            logger.error(f"[URLCache] 预获取回调异常: {e}")
-
 
 # 全局单例，供 song.py、player.py、app.py 引用
 url_cache = URLCache()
@@ -4,14 +4,19 @@ routers/history.py - 播放历史相关路由
 
 路由：
   GET  /playback_history
-  GET  /playback_history_merged
+  GET  /playback_history_merged    支持 offset/limit 分页
   POST /song_add_to_history
   POST /playback_history_delete
+  GET  /playback_stats/top       最近 days 天播放最多的歌曲
+  GET  /playback_stats/hourly    最近 days 天按小时的播放分布
+  GET  /playback_stats/rooms     最近 days 天按房间的播放统计
 """
 
 import logging
-from fastapi import APIRouter, Depends
+import time
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 from models.api_contracts import (
     ErrorResponse,
@@ -19,11 +24,15 @@ from models.api_contracts import (
     HistoryDeleteRequest,
     PlaybackHistoryMergedResponse,
     PlaybackHistoryResponse,
+    PlayStatsHourlyResponse,
+    PlayStatsRoomsResponse,
+    PlayStatsTopResponse,
     StatusMessageResponse,
 )
+from models.play_stats import play_stats
 from models.player import MusicPlayer
 from routers.dependencies import get_player_for_request
-from routers.state import error_response
+from routers.state import cached_json_response, error_response
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +51,13 @@ _HISTORY_DELETE_ERROR_RESPONSES = {
     500: {"model": ErrorResponse, "description": "Unexpected server error"},
 }
 
+_STATS_ERROR_RESPONSES = {
+    503: {"model": ErrorResponse, "description": "Play statistics store unavailable"},
+    500: {"model": ErrorResponse, "description": "Unexpected server error"},
+}
+_STATS_DAYS_MAX = 3650
+_STATS_TOP_MAX = 100
+
 _history_add_request_schema = HistoryAddRequest.model_json_schema()
 _history_delete_request_schema = HistoryDeleteRequest.model_json_schema()
 _history_add_openapi_extra = {
@@ -70,51 +86,123 @@ _history_delete_openapi_extra = {
     response_model_exclude_none=True,
     responses=_HISTORY_GET_ERROR_RESPONSES,
 )
-async def get_playback_history(player: MusicPlayer = Depends(get_player_for_request)):
-    """获取播放历史"""
+async def get_playback_history(
+    player: MusicPlayer = Depends(get_player_for_request),
+    request: Request = None,
+):
+    """获取播放历史（支持 ETag / If-None-Match）"""
     try:
-        history = player.playback_history.get_all()
-        return {
-            "status": "OK",
-            "history": history
-        }
+        history = player.playback_history
+
+        def _build():
+            return {
+                "status": "OK",
+                "history": history.get_all()
+            }
+
+        return cached_json_response(
+            request,
+            f"history:{id(history)}",
+            getattr(history, "version", None),
+            _build,
+            PlaybackHistoryResponse,
+        )
     except Exception as e:
         return error_response("[/playback_history] 获取播放历史异常", exc=e, _logger=logger)
 
 
+_HISTORY_PAGE_DEFAULT = 200
+_HISTORY_PAGE_MAX = 1000
+
+
+def _merge_history_items(history) -> list:
+    """按 URL 合并播放历史，只保留最新的记录，按最后播放时间降序排列
+
+    PlayHistory 条目本身已按 URL 唯一、按最后播放时间排列，此函数只用于
+    未提供 get_page() 的历史对象。
+    """
+    raw_history = history.get_all()
+
+    merged_dict = {}
+    for item in raw_history:
+        url = item.get('url', '')
+        if url:
+            if url not in merged_dict:
+                merged_dict[url] = item
+            else:
+                existing_ts = merged_dict[url].get('ts', 0)
+                new_ts = item.get('ts', 0)
+                if new_ts > existing_ts:
+                    merged_dict[url] = item
+
+    # 转换为列表并按时间降序排列（最新的在前）
+    merged_history = list(merged_dict.values())
+    merged_history.sort(key=lambda x: x.get('ts', 0), reverse=True)
+    return merged_history
+
+
+def _build_merged_history_payload(history, offset: int = 0, limit: int = None, paginated: bool = False) -> dict:
+    """构建合并历史响应；count 始终为合并后的总条数"""
+    if hasattr(history, "get_page"):
+        total = history.size()
+        page = history.get_page(offset, limit)
+    else:
+        merged_history = _merge_history_items(history)
+        total = len(merged_history)
+        page = merged_history[offset:None if limit is None else offset + limit]
+
+    payload = {
+        "status": "OK",
+        "history": page,
+        "count": total,
+    }
+    if paginated:
+        payload["offset"] = offset
+        payload["limit"] = limit
+        if offset + len(page) < total:
+            payload["next_offset"] = offset + len(page)
+    return payload
+
+
 @router.get(
     "/playback_history_merged",
     response_model=PlaybackHistoryMergedResponse,
     response_model_exclude_none=True,
     responses=_HISTORY_GET_ERROR_RESPONSES,
 )
-async def get_playback_history_merged(player: MusicPlayer = Depends(get_player_for_request)):
-    """获取已合并的播放历史 - 相同URL只显示一次，最后播放时间降序排列"""
+async def get_playback_history_merged(
+    player: MusicPlayer = Depends(get_player_for_request),
+    request: Request = None,
+    offset: int = None,
+    limit: int = None,
+):
+    """获取已合并的播放历史 - 相同URL只显示一次，最后播放时间降序排列
+
+    分页：传 offset/limit 只返回对应区间，响应附带 offset/limit/next_offset；
+    count 为合并后的总条数。不传分页参数时返回完整历史（兼容旧前端）。
+    """
     try:
-        raw_history = player.playback_history.get_all()
-
-        # 按 URL 合并，只保留最新的记录
-        merged_dict = {}
-        for item in raw_history:
-            url = item.get('url', '')
-            if url:
-                if url not in merged_dict:
-                    merged_dict[url] = item
-                else:
-                    existing_ts = merged_dict[url].get('ts', 0)
-                    new_ts = item.get('ts', 0)
-                    if new_ts > existing_ts:
-                        merged_dict[url] = item
+        history = player.playback_history
 
-        # 转换为列表并按时间降序排列（最新的在前）
-        merged_history = list(merged_dict.values())
-        merged_history.sort(key=lambda x: x.get('ts', 0), reverse=True)
+        paginated = limit is not None or offset is not None
+        if paginated:
+            if limit is None:
+                limit = _HISTORY_PAGE_DEFAULT
+            limit = max(1, min(int(limit), _HISTORY_PAGE_MAX))
+            offset = max(0, int(offset or 0))
+        else:
+            offset = 0
 
-        return {
-            "status": "OK",
-            "history": merged_history,
-            "count": len(merged_history)
-        }
+        scope = f"history_merged:{id(history)}"
+        if paginated:
+            scope = f"{scope}:{offset}:{limit}"
+        return cached_json_response(
+            request,
+            scope,
+            getattr(history, "version", None),
+            lambda: _build_merged_history_payload(history, offset, limit, paginated),
+            PlaybackHistoryMergedResponse,
+        )
     except Exception as e:
         return error_response("[/playback_history_merged] 获取合并历史异常", exc=e, _logger=logger)
 
@@ -188,3 +276,89 @@ async def delete_playback_history(
             )
     except Exception as e:
         return error_response("[/playback_history_delete] 删除播放历史异常", exc=e, _logger=logger)
+
+
+def _stats_since(days: float) -> int:
+    """最近 days 天的起始时间戳（days <= 0 表示全部）"""
+    days = min(float(days or 0), _STATS_DAYS_MAX)
+    return int(time.time() - days * 86400) if days > 0 else 0
+
+
+def _stats_unavailable():
+    if play_stats.is_open:
+        return None
+    return error_response("播放统计未启用", status_code=503)
+
+
+@router.get(
+    "/playback_stats/top",
+    response_model=PlayStatsTopResponse,
+    response_model_exclude_none=True,
+    responses=_STATS_ERROR_RESPONSES,
+)
+async def get_playback_stats_top(days: float = 7, limit: int = 10, room_id: str = None):
+    """最近 days 天播放次数最多的歌曲；传 room_id 时只统计该房间（主播放器为空字符串）"""
+    try:
+        unavailable = _stats_unavailable()
+        if unavailable:
+            return unavailable
+        since = _stats_since(days)
+        limit = max(1, min(int(limit), _STATS_TOP_MAX))
+        # GROUP BY 聚合可能扫描大量事件，放到线程池执行，不阻塞事件循环
+        songs = await run_in_threadpool(play_stats.top_songs, since=since, room_id=room_id, limit=limit)
+        return {
+            "status": "OK",
+            "since": since,
+            "room_id": room_id,
+            "songs": songs,
+        }
+    except Exception as e:
+        return error_response("[/playback_stats/top] 获取播放排行异常", exc=e, _logger=logger)
+
+
+@router.get(
+    "/playback_stats/hourly",
+    response_model=PlayStatsHourlyResponse,
+    response_model_exclude_none=True,
+    responses=_STATS_ERROR_RESPONSES,
+)
+async def get_playback_stats_hourly(days: float = 7, room_id: str = None):
+    """最近 days 天按本地时间小时（0-23）的播放次数分布"""
+    try:
+        unavailable = _stats_unavailable()
+        if unavailable:
+            return unavailable
+        since = _stats_since(days)
+        hours = await run_in_threadpool(play_stats.hourly_histogram, since=since, room_id=room_id)
+        return {
+            "status": "OK",
+            "since": since,
+            "room_id": room_id,
+            "hours": hours,
+            "total": sum(hours),
+        }
+    except Exception as e:
+        return error_response("[/playback_stats/hourly] 获取播放分布异常", exc=e, _logger=logger)
+
+
+@router.get(
+    "/playback_stats/rooms",
+    response_model=PlayStatsRoomsResponse,
+    response_model_exclude_none=True,
+    responses=_STATS_ERROR_RESPONSES,
+)
+async def get_playback_stats_rooms(days: float = 7):
+    """最近 days 天各房间的播放次数与不同歌曲数"""
+    try:
+        unavailable = _stats_unavailable()
+        if unavailable:
+            return unavailable
+        since = _stats_since(days)
+        rooms = await run_in_threadpool(play_stats.room_stats, since=since)
+        return {
+            "status": "OK",
+            "since": since,
+            "rooms": rooms,
+        }
+    except Exception as e:
+        return error_response("[/playback_stats/rooms] 获取房间播放统计异常", exc=e, _logger=logger)
@@ -48,6 +48,7 @@ from models.player import MusicPlayer
 from models.playlist import PlayHistory
 from models.playlists import Playlists
 from models.song import LocalSong, StreamSong
+from models.tracing import span, traced_lock
 from routers.dependencies import get_player_for_request, get_playlists, get_playback_history, get_player_lock
 from routers.state import (
     DEFAULT_PLAYLIST_ID,
@@ -213,7 +214,7 @@ async def play(
         if room_output_error:
             return room_output_error
 
-        with player_lock:
+        with traced_lock(player_lock):
             success = player.play(
                 song,
                 mpv_command_func=player.mpv_command,
@@ -309,7 +310,7 @@ async def next_track(
         if room_output_error:
             return room_output_error
 
-        with player_lock:
+        with traced_lock(player_lock):
             playlist = get_runtime_playlist(player)
             songs = playlist.songs if playlist else []
 
@@ -330,32 +331,33 @@ async def next_track(
                         removed_index = idx
                         break
 
-            # 根据 loop_mode 处理当前歌曲
-            if player.loop_mode == 2:
-                # 全部循环：移到队尾
-                if removed_index >= 0:
-                    moved_song = songs.pop(removed_index)
-                    songs.append(moved_song)
-                    song_title = moved_song.get("title") if isinstance(moved_song, dict) else str(moved_song)
-                    logger.info(f"[/next] 🔁 全部循环: 已将 {song_title} 移到队尾")
+            with span("queue_mutation", loop_mode=player.loop_mode):
+                # 根据 loop_mode 处理当前歌曲
+                if player.loop_mode == 2:
+                    # 全部循环：移到队尾
+                    if removed_index >= 0:
+                        moved_song = songs.pop(removed_index)
+                        songs.append(moved_song)
+                        song_title = moved_song.get("title") if isinstance(moved_song, dict) else str(moved_song)
+                        logger.info(f"[/next] 🔁 全部循环: 已将 {song_title} 移到队尾")
+                    else:
+                        moved_song = songs.pop(0)
+                        songs.append(moved_song)
+                        song_title = moved_song.get("title") if isinstance(moved_song, dict) else str(moved_song)
+                        logger.info(f"[/next] 🔁 全部循环: 已将 {song_title} 移到队尾")
                 else:
-                    moved_song = songs.pop(0)
-                    songs.append(moved_song)
-                    song_title = moved_song.get("title") if isinstance(moved_song, dict) else str(moved_song)
-                    logger.info(f"[/next] 🔁 全部循环: 已将 {song_title} 移到队尾")
-            else:
-                # 不循环 / 单曲循环：删除当前曲（单曲循环下手动下一首 = 跳过）
-                if removed_index >= 0:
-                    removed_song = songs.pop(removed_index)
-                    song_title = removed_song.get("title") if isinstance(removed_song, dict) else str(removed_song)
-                    logger.info(f"[/next] 已删除当前曲 (索引{removed_index}): {song_title}")
-                elif songs:
-                    removed_song = songs.pop(0)
-                    song_title = removed_song.get("title") if isinstance(removed_song, dict) else str(removed_song)
-                    logger.info(f"[/next] 已删除第一首: {song_title}")
-
-            playlist.updated_at = time.time()
-            should_broadcast_playlist_update = True
+                    # 不循环 / 单曲循环：删除当前曲（单曲循环下手动下一首 = 跳过）
+                    if removed_index >= 0:
+                        removed_song = songs.pop(removed_index)
+                        song_title = removed_song.get("title") if isinstance(removed_song, dict) else str(removed_song)
+                        logger.info(f"[/next] 已删除当前曲 (索引{removed_index}): {song_title}")
+                    elif songs:
+                        removed_song = songs.pop(0)
+                        song_title = removed_song.get("title") if isinstance(removed_song, dict) else str(removed_song)
+                        logger.info(f"[/next] 已删除第一首: {song_title}")
+
+                playlist.updated_at = time.time()
+                should_broadcast_playlist_update = True
 
             if not songs:
                 logger.info("[/next] 队列已空，停止播放")
@@ -467,7 +469,7 @@ async def prev_track(
         if room_output_error:
             return room_output_error
 
-        with player_lock:
+        with traced_lock(player_lock):
             playlist = get_runtime_playlist(player)
             songs = playlist.songs if playlist else []
 
@@ -13,13 +13,14 @@ routers/playlist.py - 歌单管理和主页路由
   POST /playlists/{id}/add_next
   POST /playlists/{id}/add_top
     POST /playlists/{id}/clear
-  GET  /playlist
+  GET  /playlist                 支持 offset/limit/around_current 分页
   DELETE /playlists/{id}
   POST /playlists/{id}/remove
   PUT  /playlists/{id}
   POST /playlists/{id}/switch
   POST /playlist_play
   POST /playlist_reorder
+  POST /playlist_batch           批量 add/insert/remove/move，一次保存一次广播
   POST /playlist_remove
   POST /playlist_clear
 """
@@ -37,6 +38,8 @@ from models.api_contracts import (
     FileTreeResponse,
     IndexRequestForm,
     PlaylistAddRequest,
+    PlaylistBatchRequest,
+    PlaylistBatchResponse,
     PlaylistCreateResponse,
     PlaylistCreateRestResponse,
     PlaylistNameRequest,
@@ -54,8 +57,9 @@ from models.api_contracts import (
 from models.player import MusicPlayer
 from models.playlist import PlayHistory
 from models.playlists import sanitize_playlist_name
-from models.playlists import Playlists
+from models.playlists import Playlists, SongList, song_url_key
 from models.song import Song, LocalSong, StreamSong
+from models.tag_index import tag_index
 from routers.dependencies import get_player_for_request, get_playlists, get_playback_history, get_player_lock
 from routers.state import (
     DEFAULT_PLAYLIST_ID,
@@ -64,6 +68,7 @@ from routers.state import (
     is_runtime_playlist_id,
     resolve_playlist_for_request,
     _broadcast_state, _get_resource_path,
+    cached_json_response,
     error_response,
 )
 
@@ -93,12 +98,70 @@ _PLAYLIST_PLAY_ERROR_RESPONSES = {
     400: {"model": ErrorResponse, "description": "Invalid playlist index"},
     500: {"model": ErrorResponse, "description": "Playback failed"},
 }
+_PLAYLIST_BATCH_ERROR_RESPONSES = {
+    400: {"model": ErrorResponse, "description": "Invalid batch operation"},
+    404: {"model": ErrorResponse, "description": "Playlist not found"},
+    500: {"model": ErrorResponse, "description": "Unexpected server error"},
+}
 _PLAYLIST_REORDER_ERROR_RESPONSES = {
     400: {"model": ErrorResponse, "description": "Missing reorder parameters"},
     500: {"model": ErrorResponse, "description": "Unexpected server error"},
 }
 
 
+def _playlist_has_url(playlist, url: str) -> bool:
+    """歌单是否已包含该 URL（Playlist 走 O(1) 索引，其余对象回退线性扫描）"""
+    if not url:
+        return False
+    contains_url = getattr(playlist, "contains_url", None)
+    if contains_url is not None:
+        return contains_url(url)
+    return any(isinstance(s, dict) and s.get("url") == url for s in playlist.songs)
+
+
+def _build_song_dict(song_data: dict) -> dict:
+    """将前端提交的歌曲数据标准化为歌单条目（YouTube 缺缩略图时按 video_id 补全）"""
+    song_type = song_data.get("type", "local")
+    thumbnail_url = song_data.get("thumbnail_url")
+
+    if song_type == "youtube" and not thumbnail_url:
+        url = song_data.get("url", "")
+        if "youtube.com" in url or "youtu.be" in url:
+            video_id_match = re.search(r'(?:youtube\.com/watch\?v=|youtu\.be/)([a-zA-Z0-9_-]{11})', url)
+            if video_id_match:
+                video_id = video_id_match.group(1)
+                thumbnail_url = f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
+
+    song_obj = Song(
+        url=song_data.get("url"),
+        title=song_data.get("title"),
+        song_type=song_type,
+        duration=song_data.get("duration", 0),
+        thumbnail_url=thumbnail_url
+    )
+    return song_obj.to_dict()
+
+
+# /playlist 分页：默认页大小与单页上限（保证单次请求内存有界）
+_PLAYLIST_PAGE_DEFAULT = 200
+_PLAYLIST_PAGE_MAX = 1000
+
+
+def _playlist_revision(playlist) -> int:
+    """歌单修改序号，作为 /playlist 与 /playlist_batch 响应中的 version（可与后续轮询对比）"""
+    return int(getattr(playlist, "revision", 0) or 0) if playlist is not None else 0
+
+
+def _playlist_version(playlist):
+    """歌单版本标识：修改序号（每次修改严格递增，不依赖时钟精度）+ 名称"""
+    if playlist is None:
+        return None
+    revision = getattr(playlist, "revision", None)
+    if revision is None:
+        revision = (getattr(playlist, "updated_at", 0), len(getattr(playlist, "songs", None) or []))
+    return (id(playlist), revision, getattr(playlist, "name", ""))
+
+
 @router.get("/")
 async def index():
     """返回主页面"""
@@ -143,34 +206,56 @@ async def list_playlists(
     player: MusicPlayer = Depends(get_player_for_request),
     playlists: Playlists = Depends(get_playlists),
 ):
-    """获取所有歌单。当 pipe 指向 RoomPlayer 时，同时返回该房间的播放列表。"""
+    """获取所有歌单。当 pipe 指向 RoomPlayer 时，同时返回该房间的播放列表。
+
+    以各歌单 updated_at 组合为版本生成 ETag，未变化时返回 304。
+    """
     runtime_playlist = get_runtime_playlist(player)
     room_pid = getattr(player, '_room_playlist_id', None)
+    current_index = getattr(player, 'current_index', -1)
 
-    result_playlists = [
-        {
-            "id": pid,
-            "name": p.name,
-            "count": len(p.songs),
-            "songs": p.songs,
-            "is_room": False,
-            "current_playing_index": p.current_playing_index,
-        }
+    shared_items = [
+        (pid, p)
         for pid, p in playlists._playlists.items()
         if not playlists.is_runtime_playlist(pid)
     ]
 
-    if runtime_playlist:
-        result_playlists.insert(0, {
-            "id": runtime_playlist.id,
-            "name": runtime_playlist.name,
-            "count": len(runtime_playlist.songs),
-            "songs": runtime_playlist.songs,
-            "is_room": bool(room_pid),
-            "current_playing_index": getattr(player, 'current_index', -1),
-        })
+    def _build():
+        result_playlists = [
+            {
+                "id": pid,
+                "name": p.name,
+                "count": len(p.songs),
+                "songs": p.songs,
+                "is_room": False,
+                "current_playing_index": p.current_playing_index,
+            }
+            for pid, p in shared_items
+        ]
+
+        if runtime_playlist:
+            result_playlists.insert(0, {
+                "id": runtime_playlist.id,
+                "name": runtime_playlist.name,
+                "count": len(runtime_playlist.songs),
+                "songs": runtime_playlist.songs,
+                "is_room": bool(room_pid),
+                "current_playing_index": current_index,
+            })
+
+        return {"status": "OK", "playlists": result_playlists}
 
-    return {"status": "OK", "playlists": result_playlists}
+    version = (
+        tuple(
+            (pid, p.revision, p.name, p.current_playing_index)
+            for pid, p in shared_items
+        ),
+        _playlist_version(runtime_playlist),
+        bool(room_pid),
+        current_index,
+    )
+    scope = f"playlists:{runtime_playlist.id if runtime_playlist else '-'}"
+    return cached_json_response(request, scope, version, _build, PlaylistsListResponse)
 
 
 @router.post(
@@ -250,13 +335,11 @@ async def add_to_playlist(
 
         # 检查歌曲是否已存在（防止重复）
         song_url = song_data.get("url", "")
-        for existing_song in playlist.songs:
-            existing_url = existing_song.get("url", "")
-            if existing_url and existing_url == song_url:
-                return JSONResponse(
-                    {"status": "ERROR", "error": "该歌曲已存在于当前播放序列", "duplicate": True},
-                    status_code=409
-                )
+        if _playlist_has_url(playlist, song_url):
+            return JSONResponse(
+                {"status": "ERROR", "error": "该歌曲已存在于当前播放序列", "duplicate": True},
+                status_code=409
+            )
 
         if insert_index is None:
             current_index = player.current_index if hasattr(player, 'current_index') else -1
@@ -269,26 +352,7 @@ async def add_to_playlist(
                 insert_index = 1 if playlist.songs else 0
                 logger.info(f"[添加歌曲] 无当前播放歌曲或索引无效，使用默认位置: {insert_index}")
 
-        song_type = song_data.get("type", "local")
-        thumbnail_url = song_data.get("thumbnail_url")
-
-        if song_type == "youtube" and not thumbnail_url:
-            url = song_data.get("url", "")
-            if "youtube.com" in url or "youtu.be" in url:
-                video_id_match = re.search(r'(?:youtube\.com/watch\?v=|youtu\.be/)([a-zA-Z0-9_-]{11})', url)
-                if video_id_match:
-                    video_id = video_id_match.group(1)
-                    thumbnail_url = f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
-
-        song_obj = Song(
-            url=song_data.get("url"),
-            title=song_data.get("title"),
-            song_type=song_type,
-            duration=song_data.get("duration", 0),
-            thumbnail_url=thumbnail_url
-        )
-
-        song_dict = song_obj.to_dict()
+        song_dict = _build_song_dict(song_data)
         insert_index = max(0, min(insert_index, len(playlist.songs)))
         playlist.songs.insert(insert_index, song_dict)
         playlist.updated_at = time.time()
@@ -338,13 +402,11 @@ async def add_song_to_playlist_next(
                 status_code=404
             )
 
-        for existing_song in playlist.songs:
-            existing_url = existing_song.get("url", "")
-            if existing_url and existing_url == url:
-                return JSONResponse(
-                    {"status": "ERROR", "error": "该歌曲已存在于当前播放序列", "duplicate": True},
-                    status_code=409
-                )
+        if _playlist_has_url(playlist, url):
+            return JSONResponse(
+                {"status": "ERROR", "error": "该歌曲已存在于当前播放序列", "duplicate": True},
+                status_code=409
+            )
 
         if song_type == "youtube" and not thumbnail_url:
             video_id_match = re.search(r'(?:youtube\.com/watch\?v=|youtu\.be/)([a-zA-Z0-9_-]{11})', url)
@@ -442,46 +504,81 @@ async def get_current_playlist(
     playlist_id: str = None,
     player: MusicPlayer = Depends(get_player_for_request),
     playlists: Playlists = Depends(get_playlists),
+    offset: int = None,
+    limit: int = None,
+    around_current: bool = False,
 ):
-    """获取指定歌单内容（用户隔离：每个浏览器独立选择歌单）"""
+    """获取指定歌单内容（用户隔离：每个浏览器独立选择歌单）
+
+    分页：传 offset/limit 只返回对应区间，around_current=true 时以当前播放索引为中心取窗口；
+    响应附带 total/next_offset 便于继续翻页。不传分页参数时返回完整歌单（兼容旧前端）。
+    以歌单修改序号（响应中的 version）和当前播放索引生成 ETag，未变化时返回 304。
+    """
     try:
-        songs = []
-        playlist, target_playlist_id, _ = resolve_playlist_for_request(player, playlists, playlist_id)
+        playlist, target_playlist_id, is_runtime = resolve_playlist_for_request(player, playlists, playlist_id)
 
-        if playlist and hasattr(playlist, "songs"):
-            for s in playlist.songs:
+        current_index = -1
+        try:
+            current_index = player.current_index if hasattr(player, 'current_index') else -1
+        except Exception:
+            pass
+
+        all_songs = playlist.songs if playlist and hasattr(playlist, "songs") else []
+        total = len(all_songs)
+
+        paginated = limit is not None or offset is not None or around_current
+        if paginated:
+            if limit is None:
+                limit = _PLAYLIST_PAGE_DEFAULT
+            limit = max(1, min(int(limit), _PLAYLIST_PAGE_MAX))
+            if around_current:
+                anchor = current_index if is_runtime else getattr(playlist, "current_playing_index", -1)
+                offset = max(0, anchor) - limit // 2
+                offset = min(offset, total - limit)
+            offset = max(0, int(offset or 0))
+            page_end = min(offset + limit, total)
+        else:
+            offset, page_end = 0, total
+
+        def _build():
+            songs = []
+            for s in all_songs[offset:page_end]:
                 if isinstance(s, dict):
-                    songs.append({
+                    songs.append(tag_index.enrich_song({
                         "url": s.get("url"),
                         "title": s.get("title") or s.get("name") or s.get("url"),
                         "type": s.get("type", "local"),
                         "duration": s.get("duration", 0),
                         "thumbnail_url": s.get("thumbnail_url", ""),
-                    })
+                    }))
                 elif isinstance(s, str):
-                    songs.append({
+                    songs.append(tag_index.enrich_song({
                         "url": s,
                         "title": os.path.basename(s),
                         "type": "local",
-                    })
-        else:
-            songs = []
-
-        current_index = -1
-        try:
-            current_index = player.current_index if hasattr(player, 'current_index') else -1
-        except Exception:
-            pass
-
-        playlist_name = playlist.name if playlist else "--"
+                    }))
 
-        return {
-            "status": "OK",
-            "playlist": songs,
-            "playlist_id": target_playlist_id,
-            "playlist_name": playlist_name,
-            "current_index": current_index
-        }
+            payload = {
+                "status": "OK",
+                "playlist": songs,
+                "playlist_id": target_playlist_id,
+                "playlist_name": playlist.name if playlist else "--",
+                "current_index": current_index,
+                "total": total,
+                "version": _playlist_revision(playlist),
+            }
+            if paginated:
+                payload["offset"] = offset
+                payload["limit"] = limit
+                if page_end < total:
+                    payload["next_offset"] = page_end
+            return payload
+
+        version = (_playlist_version(playlist), current_index, tag_index.version)
+        scope = f"playlist:{target_playlist_id}"
+        if paginated:
+            scope = f"{scope}:{offset}:{limit}"
+        return cached_json_response(request, scope, version, _build, PlaylistQueryResponse)
     except Exception as e:
         return error_response("[/playlist] 获取歌单异常", exc=e, _logger=logger)
 
@@ -776,20 +873,18 @@ async def playlist_reorder(
     player: MusicPlayer = Depends(get_player_for_request),
     playlists: Playlists = Depends(get_playlists),
 ):
-    """重新排序播放队列"""
+    """重新排序播放队列（count > 1 时整体移动 [from_index, from_index + count) 区间）"""
     try:
         should_broadcast_playlist_update = False
         from_index = payload.from_index
         to_index = payload.to_index
+        count = payload.count or 1
         playlist_id = payload.playlist_id or get_current_playlist_id(player)
 
         if from_index is not None and to_index is not None:
             is_runtime_playlist = is_runtime_playlist_id(player, playlist_id)
             playlist = get_runtime_playlist(player) if is_runtime_playlist else playlists.get_playlist(playlist_id)
-            if playlist and 0 <= from_index < len(playlist.songs) and 0 <= to_index < len(playlist.songs):
-                song = playlist.songs.pop(from_index)
-                playlist.songs.insert(to_index, song)
-                playlist.updated_at = time.time()
+            if playlist and playlist.move_range(from_index, to_index, count):
                 if is_runtime_playlist:
                     playlist.current_playing_index = getattr(player, 'current_index', -1)
                     should_broadcast_playlist_update = True
@@ -894,3 +989,146 @@ async def playlist_clear(
         return JSONResponse({"status": "OK", "message": "清空成功"})
     except Exception as e:
         return error_response("[/playlist_clear] 清空队列异常", exc=e, _logger=logger)
+
+
+def _apply_batch_operation(working: SongList, op, default_insert_index: int, counters: dict):
+    """在工作副本上执行单个批量操作，返回错误信息（成功返回 None）"""
+    if op.op in ("add", "insert"):
+        raw_songs = list(op.songs or [])
+        if op.song is not None:
+            raw_songs.insert(0, op.song)
+        if not raw_songs:
+            return "缺少歌曲数据"
+
+        new_items = []
+        seen = set()
+        for raw in raw_songs:
+            song_data = raw.model_dump(exclude_none=True)
+            url = song_data.get("url")
+            if not url or url in seen or working.contains_url(url):
+                counters["skipped"] += 1
+                continue
+            seen.add(url)
+            new_items.append(_build_song_dict(song_data))
+
+        if new_items:
+            if op.op == "add":
+                working.extend(new_items)
+            else:
+                if op.index is None:
+                    # 连续的默认位置 insert 依次排在上一批之后，保持提交顺序
+                    index = counters.get("insert_cursor", default_insert_index)
+                else:
+                    index = op.index
+                index = max(0, min(index, len(working)))
+                working[index:index] = new_items
+                if op.index is None:
+                    counters["insert_cursor"] = index + len(new_items)
+            counters["added"] += len(new_items)
+            counters["added_urls"].extend(song["url"] for song in new_items)
+        return None
+
+    counters.pop("insert_cursor", None)
+    if op.op == "remove":
+        index = op.index
+        if index is None and op.url:
+            index = working.index_of_url(op.url)
+        if index is None or not (0 <= index < len(working)):
+            return "索引超出范围"
+        working.pop(index)
+        counters["removed"] += 1
+        return None
+
+    # move
+    count = op.count or 1
+    if op.from_index is None or op.to_index is None:
+        return "缺少参数"
+    total = len(working)
+    if count < 1 or not (0 <= op.from_index and op.from_index + count <= total) or not (0 <= op.to_index <= total - count):
+        return "索引超出范围"
+    if op.from_index != op.to_index:
+        block = working[op.from_index:op.from_index + count]
+        del working[op.from_index:op.from_index + count]
+        working[op.to_index:op.to_index] = block
+    return None
+
+
+@router.post(
+    "/playlist_batch",
+    response_model=PlaylistBatchResponse,
+    response_model_exclude_none=True,
+    responses=_PLAYLIST_BATCH_ERROR_RESPONSES,
+)
+async def playlist_batch(
+    payload: PlaylistBatchRequest,
+    player: MusicPlayer = Depends(get_player_for_request),
+    playlists: Playlists = Depends(get_playlists),
+    player_lock=Depends(get_player_lock),
+):
+    """批量修改歌单（事务性：任一操作失败则整体不生效）
+
+    所有操作在锁内作用于歌曲列表副本，全部成功后一次性替换，
+    持久化歌单只触发一次 save()，并只广播一次；返回的 version 与 /playlist 相同（修改序号）。
+    """
+    try:
+        if not payload.operations:
+            return error_response("操作列表不能为空", 400)
+
+        playlist_id = payload.playlist_id or get_current_playlist_id(player)
+        is_runtime_playlist = is_runtime_playlist_id(player, playlist_id)
+        counters = {"added": 0, "skipped": 0, "removed": 0, "added_urls": []}
+
+        with player_lock:
+            playlist = get_runtime_playlist(player) if is_runtime_playlist else playlists.get_playlist(playlist_id)
+            if not playlist:
+                return error_response("歌单不存在", 404)
+
+            working = SongList(playlist.songs)
+            if is_runtime_playlist:
+                current_index = getattr(player, 'current_index', -1)
+            else:
+                current_index = getattr(playlist, 'current_playing_index', -1)
+            current_url = song_url_key(working[current_index]) if 0 <= current_index < len(working) else None
+
+            for op_index, op in enumerate(payload.operations):
+                # 未指定位置的 insert 与 /playlist_add 一致：插入到当前歌曲之后
+                position = working.index_of_url(current_url) if current_url else -1
+                default_insert_index = position + 1 if position >= 0 else (1 if working else 0)
+                error = _apply_batch_operation(working, op, default_insert_index, counters)
+                if error:
+                    return error_response(f"第 {op_index + 1} 个操作失败: {error}", 400, extra={"op_index": op_index})
+
+            if current_index >= 0:
+                new_index = working.index_of_url(current_url) if current_url else -1
+                if new_index < 0:
+                    new_index = min(current_index, len(working) - 1)
+                current_index = new_index
+
+            playlist.songs = working
+            playlist.updated_at = time.time()
+            if is_runtime_playlist:
+                player.current_index = current_index
+            playlist.current_playing_index = current_index
+
+        if not is_runtime_playlist:
+            playlists.save()
+        await _broadcast_state(player, playlist_updated=True)
+
+        logger.info(
+            f"[批量操作] 歌单: {playlist_id}, 操作: {len(payload.operations)}, "
+            f"新增: {counters['added']}, 跳过: {counters['skipped']}, 删除: {counters['removed']}"
+        )
+        return {
+            "status": "OK",
+            "playlist_id": playlist.id if is_runtime_playlist else playlist_id,
+            "applied": len(payload.operations),
+            "added": counters["added"],
+            "skipped": counters["skipped"],
+            "removed": counters["removed"],
+            "added_urls": counters["added_urls"],
+            "total": len(playlist.songs),
+            "current_index": current_index,
+            "version": _playlist_revision(playlist),
+        }
+    except Exception as e:
+        return error_response("[/playlist_batch] 批量操作异常", exc=e, _logger=logger)
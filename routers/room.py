@@ -5,31 +5,51 @@ routers/room.py - 自定义房间 RoomPlayer 管理 API
 路由：
   POST /room/init         — 创建 RoomPlayer + 启动 MPV + PCM Pipe
   DELETE /room/{room_id}  — 销毁 RoomPlayer
-  GET /room/{room_id}/status — 查询房间 RoomPlayer 状态
-  GET /room/list          — 列出所有活跃房间
+  GET /room/{room_id}/status — 查询房间 RoomPlayer 状态（支持 ?fields= 投影）
+  GET /room/list          — 列出所有活跃房间（支持 ?fields= 投影）
+  POST /room/{room_id}/migrate — 把房间迁移到另一个房间工作进程
+  GET /diagnostic/rooms   — 各房间资源占用（MPV RSS、线程、队列、URL 缓存）
+  GET /diagnostic/room-workers — 房间工作进程分片状态
+
+启用房间工作进程（[room] worker_shards > 0）时，主进程中的这些路由只维护分片路由表，
+房间的创建 / 销毁 / 状态查询转发给承载房间的工作进程。
 """
 
 import logging
+import os
 import re
+import threading
 import time
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 from models.api_contracts import (
+    RoomDiagnosticsResponse,
     RoomErrorResponse,
     RoomDestroyResponse,
     RoomInitRequest,
     RoomInitResponse,
     RoomListResponse,
+    RoomMigrateRequest,
+    RoomMigrateResponse,
     RoomStatusResponse,
+    RoomStatusSnapshot,
+    RoomWorkersResponse,
 )
+from models.metrics import ROOM_INIT_PHASE_SECONDS
+from models.mpv_ipc import room_ipc_path
+from models.mpv_pool import room_mpv_pool
 from models.player import MusicPlayer
 from models.playlist import PlayHistory
+from models.room_workers import RoomWorkerError, build_request, response_json, room_workers
 from routers.state import (
     ROOM_PLAYERS, _room_players_lock, _creating_rooms,
     PLAYLISTS_MANAGER,
     ROOM_HISTORIES, ROOM_LAST_ACTIVITY, ROOM_MAX,
     _make_room_broadcast, PLAYER, touch_room_activity,
+    get_room_status_snapshot, refresh_room_status_snapshot,
+    ROOM_IDLE_TIMEOUT,
 )
 
 logger = logging.getLogger(__name__)
@@ -46,14 +66,26 @@ _ROOM_DESTROY_ERROR_RESPONSES = {
 }
 
 
-def _build_room_status_payload(room_id: str, player) -> dict:
-    """Build a room bot status snapshot for API callers."""
-    ipc_pipe = rf'\\.\pipe\mpv-ipc-{room_id}'
-    runtime_queue = player.get_runtime_queue() if player else None
-    mpv_running = bool(player and player.mpv_process is not None and player.mpv_process.poll() is None)
-    pipe_exists = bool(player and player.mpv_pipe_exists())
-    output_ready = bool(player and player.is_room_output_ready())
+_ROOM_STATUS_FIELDS = frozenset(RoomStatusSnapshot.model_fields)
 
+
+def _build_room_status_payload(room_id: str, player, fresh: bool = True) -> dict:
+    """Build a room bot status snapshot for API callers.
+
+    fresh=True 时重新检测 MPV/管道（房间创建、恢复路径）；
+    否则读取由事件和健康检查定时器维护的缓存快照。
+    """
+    ipc_pipe = room_ipc_path(room_id)
+    if player is None:
+        snapshot = {}
+    elif fresh:
+        snapshot = refresh_room_status_snapshot(player)
+    else:
+        snapshot = get_room_status_snapshot(player)
+
+    mpv_running = snapshot.get("mpv_running", False)
+    pipe_exists = snapshot.get("pipe_exists", False)
+    output_ready = snapshot.get("output_ready", False)
     return {
         "room_id": room_id,
         "ipc_pipe": ipc_pipe,
@@ -63,15 +95,91 @@ def _build_room_status_payload(room_id: str, player) -> dict:
         "pipe_exists": pipe_exists,
         "output_ready": output_ready,
         "bot_ready": mpv_running and pipe_exists and output_ready,
-        "current_playlist_id": getattr(runtime_queue, 'id', ''),
-        "current_index": getattr(player, 'current_index', -1) if player else -1,
-        "queue_length": len(getattr(runtime_queue, 'songs', []) or []),
-        "playlist_updated_at": getattr(runtime_queue, 'updated_at', 0) if runtime_queue else 0,
-        "current_meta": player.get_current_meta_snapshot() if player else {},
+        "current_playlist_id": snapshot.get("current_playlist_id", ''),
+        "current_index": snapshot.get("current_index", -1),
+        "queue_length": snapshot.get("queue_length", 0),
+        "playlist_updated_at": snapshot.get("playlist_updated_at", 0),
+        "current_meta": snapshot.get("current_meta", {}),
         "last_activity": ROOM_LAST_ACTIVITY.get(room_id, 0),
     }
 
 
+def _parse_room_fields(fields: str | None):
+    """解析 ?fields=a,b 投影参数；返回 (字段集合或 None, 错误响应或 None)。"""
+    if not fields:
+        return None, None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - _ROOM_STATUS_FIELDS)
+    if unknown:
+        return None, JSONResponse(
+            {"status": "error", "message": f"unknown fields: {', '.join(unknown)}"}, 400
+        )
+    # room_id 始终返回，便于调用方在列表中识别房间
+    requested.add("room_id")
+    return requested, None
+
+
+def _project_room_status(payload: dict, fields) -> dict:
+    return {key: value for key, value in payload.items() if key in fields}
+
+
+async def _call_room_worker(shard: int, method: str, path: str, query: dict = None, json_body=None):
+    """向工作进程发送请求，返回 (HTTP 状态码, JSON 正文)；工作进程不可用时返回 503"""
+    try:
+        response = await room_workers.call_async(shard, "http", build_request(method, path, query, json_body))
+    except RoomWorkerError as e:
+        return 503, {"status": "error", "message": str(e)}
+    return response["status"], response_json(response)
+
+
+def _with_main_activity(room: dict) -> dict:
+    """工作进程房间的活跃时间由主进程记录（请求在主进程中转发）"""
+    if "last_activity" in room:
+        room["last_activity"] = ROOM_LAST_ACTIVITY.get(room.get("room_id"), room["last_activity"])
+    return room
+
+
+async def _init_worker_room(room_id: str, default_volume: int):
+    """工作进程模式下的房间创建：选择房间最少的分片并转发"""
+    shard = room_workers.shard_of(room_id)
+    if shard is None:
+        with _room_players_lock:
+            if room_id in _creating_rooms:
+                return JSONResponse({"status": "error", "message": "room is being created"}, 409)
+            if len(ROOM_PLAYERS) + room_workers.room_count() >= ROOM_MAX:
+                logger.warning(f"[Room] 房间数量已达上限 ({ROOM_MAX})")
+                return JSONResponse({"status": "error", "message": f"room limit reached ({ROOM_MAX})"}, 429)
+            _creating_rooms.add(room_id)
+    else:
+        return await _forward_worker_init(room_id, shard, default_volume)
+
+    try:
+        shard = room_workers.pick_shard()
+        if shard is None:
+            return JSONResponse({"status": "error", "message": "no room worker available"}, 503)
+        # 先登记路由：创建过程中的状态广播会记录为房间的最近状态
+        room_workers.register(room_id, shard, default_volume)
+        response = await _forward_worker_init(room_id, shard, default_volume)
+        if response.status_code != 200:
+            room_workers.unregister(room_id)
+        else:
+            logger.info(f"[Room] ✓ 房间 {room_id} 已分配到工作进程分片 {shard}")
+        return response
+    finally:
+        with _room_players_lock:
+            _creating_rooms.discard(room_id)
+
+
+async def _forward_worker_init(room_id: str, shard: int, default_volume: int):
+    status, body = await _call_room_worker(
+        shard, "POST", "/room/init", json_body={"room_id": room_id, "default_volume": default_volume}
+    )
+    if status == 200:
+        touch_room_activity(room_id)
+        body = _with_main_activity(body)
+    return JSONResponse(body, status)
+
+
 @router.post(
     "/room/init",
     response_model=RoomInitResponse,
@@ -94,7 +202,9 @@ async def init_room(payload: RoomInitRequest):
         return JSONResponse({"status": "error", "message": "room_id must contain only ASCII letters, numbers, underscore, and hyphen"}, 400)
 
     default_volume = int(payload.default_volume)
-    ipc_pipe = rf'\\.\pipe\mpv-ipc-{room_id}'
+    if room_workers.running:
+        return await _init_worker_room(room_id, default_volume)
+    ipc_pipe = room_ipc_path(room_id)
     init_started_at = time.perf_counter()
 
     # 检查是否已存在
@@ -135,7 +245,7 @@ async def init_room(payload: RoomInitRequest):
 
         # 创建房间独立播放历史
         history_started_at = time.perf_counter()
-        room_history = PlayHistory(max_size=500)
+        room_history = PlayHistory(max_size=500, room_id=room_id)
         ROOM_HISTORIES[room_id] = room_history
         history_elapsed_ms = (time.perf_counter() - history_started_at) * 1000
 
@@ -158,9 +268,19 @@ async def init_room(payload: RoomInitRequest):
         registration_elapsed_ms = (time.perf_counter() - registration_started_at) * 1000
 
         # 启动 MPV（PCM 音频直接写入 ClubVoice 的 Named Pipe）
+        # 优先认领预热池中的空闲 MPV，池空时冷启动
         mpv_start_started_at = time.perf_counter()
-        ok = player.start_room_mpv()
+        pooled = room_mpv_pool.acquire()
+        ok = player.start_room_mpv(pooled=pooled)
         mpv_start_elapsed_ms = (time.perf_counter() - mpv_start_started_at) * 1000
+        for phase, elapsed_ms in (
+            ("history", history_elapsed_ms),
+            ("create_player", player_create_elapsed_ms),
+            ("register", registration_elapsed_ms),
+            ("mpv_start_prewarmed" if pooled is not None else "mpv_start_cold", mpv_start_elapsed_ms),
+            ("total", (time.perf_counter() - init_started_at) * 1000),
+        ):
+            ROOM_INIT_PHASE_SECONDS.observe(elapsed_ms / 1000, phase)
         if not ok:
             total_elapsed_ms = (time.perf_counter() - init_started_at) * 1000
             logger.error(
@@ -181,7 +301,7 @@ async def init_room(payload: RoomInitRequest):
             f"[Room] ✓ 房间就绪: {room_id}, ipc={ipc_pipe}, pcm={pcm_pipe}, "
             f"history_ms={history_elapsed_ms:.1f}, create_ms={player_create_elapsed_ms:.1f}, "
             f"register_ms={registration_elapsed_ms:.1f}, mpv_start_ms={mpv_start_elapsed_ms:.1f}, "
-            f"total_ms={total_elapsed_ms:.1f}"
+            f"prewarmed={pooled is not None}, total_ms={total_elapsed_ms:.1f}"
         )
         return {"status": "ok", "existed": False, **_build_room_status_payload(room_id, player)}
     finally:
@@ -201,7 +321,14 @@ async def destroy_room(room_id: str):
         player = ROOM_PLAYERS.pop(room_id, None)
 
     if not player:
-        return JSONResponse({"status": "error", "message": "room not found"}, 404)
+        shard = room_workers.shard_of(room_id)
+        if shard is None:
+            return JSONResponse({"status": "error", "message": "room not found"}, 404)
+        room_workers.unregister(room_id)
+        ROOM_LAST_ACTIVITY.pop(room_id, None)
+        status, body = await _call_room_worker(shard, "DELETE", f"/room/{room_id}")
+        logger.info(f"[Room] ✓ 已销毁工作进程分片 {shard} 中的房间: {room_id}")
+        return JSONResponse(body, status)
 
     player.destroy_room_player()
     ROOM_HISTORIES.pop(room_id, None)
@@ -210,28 +337,175 @@ async def destroy_room(room_id: str):
     return {"status": "ok"}
 
 
-@router.get("/room/{room_id}/status", response_model=RoomStatusResponse, response_model_exclude_none=True)
-async def room_status(room_id: str):
-    """查询房间 RoomPlayer 状态。"""
+_ROOM_QUERY_ERROR_RESPONSES = {
+    400: {"model": RoomErrorResponse, "description": "Unknown projection field"},
+}
+
+
+@router.get(
+    "/room/{room_id}/status",
+    response_model=RoomStatusResponse,
+    response_model_exclude_none=True,
+    responses=_ROOM_QUERY_ERROR_RESPONSES,
+)
+async def room_status(room_id: str, fields: str = None):
+    """查询房间 RoomPlayer 状态（读取缓存快照）。
+
+    ?fields=bot_ready,current_meta 仅返回指定字段（room_id 始终返回）。
+    """
+    projection, error = _parse_room_fields(fields)
+    if error is not None:
+        return error
+
     with _room_players_lock:
         player = ROOM_PLAYERS.get(room_id)
 
-    if not player:
-        return {"status": "ok", **_build_room_status_payload(room_id, None)}
+    shard = room_workers.shard_of(room_id) if player is None else None
+    if shard is not None:
+        status, body = await _call_room_worker(
+            shard, "GET", f"/room/{room_id}/status", {"fields": fields} if fields else None
+        )
+        return JSONResponse(_with_main_activity(body) if status == 200 else body, status)
 
-    return {"status": "ok", **_build_room_status_payload(room_id, player)}
+    payload = _build_room_status_payload(room_id, player, fresh=False)
+    if projection is not None:
+        return JSONResponse({"status": "ok", **_project_room_status(payload, projection)})
+    return {"status": "ok", **payload}
 
 
-@router.get("/room/list", response_model=RoomListResponse, response_model_exclude_none=True)
-async def list_rooms():
-    """列出所有活跃房间及其状态。"""
-    with _room_players_lock:
-        room_ids = list(ROOM_PLAYERS.keys())
+@router.get(
+    "/room/list",
+    response_model=RoomListResponse,
+    response_model_exclude_none=True,
+    responses=_ROOM_QUERY_ERROR_RESPONSES,
+)
+async def list_rooms(fields: str = None):
+    """列出所有活跃房间及其状态（读取缓存快照，支持 ?fields= 投影）。"""
+    projection, error = _parse_room_fields(fields)
+    if error is not None:
+        return error
 
-    rooms = []
-    for rid in room_ids:
-        with _room_players_lock:
-            player = ROOM_PLAYERS.get(rid)
-        if player:
-            rooms.append(_build_room_status_payload(rid, player))
+    with _room_players_lock:
+        players = list(ROOM_PLAYERS.items())
+
+    rooms = [_build_room_status_payload(rid, player, fresh=False) for rid, player in players]
+    if projection is not None:
+        rooms = [_project_room_status(room, projection) for room in rooms]
+    for shard in room_workers.shard_indexes() if room_workers.running else ():
+        status, body = await _call_room_worker(shard, "GET", "/room/list", {"fields": fields} if fields else None)
+        if status == 200:
+            rooms.extend(_with_main_activity(room) for room in body.get("rooms", []))
+        else:
+            logger.warning(f"[Room] 读取工作进程分片 {shard} 的房间列表失败: HTTP {status}")
+    if projection is not None:
+        return JSONResponse({"status": "ok", "rooms": rooms, "count": len(rooms), "max": ROOM_MAX})
     return {"status": "ok", "rooms": rooms, "count": len(rooms), "max": ROOM_MAX}
+
+
+_ROOM_MIGRATE_ERROR_RESPONSES = {
+    400: {"model": RoomErrorResponse, "description": "Room workers disabled or target shard unavailable"},
+    404: {"model": RoomErrorResponse, "description": "Room not found in any room worker"},
+    409: {"model": RoomErrorResponse, "description": "Room is migrating"},
+    503: {"model": RoomErrorResponse, "description": "Room worker unavailable"},
+}
+
+
+@router.post(
+    "/room/{room_id}/migrate",
+    response_model=RoomMigrateResponse,
+    responses=_ROOM_MIGRATE_ERROR_RESPONSES,
+)
+async def migrate_room(room_id: str, payload: RoomMigrateRequest = None):
+    """把房间迁移到另一个工作进程分片（导出状态 → 销毁 → 重建 → 恢复播放位置）。
+
+    请求体: {"shard": 1}，省略 shard 时迁移到房间最少的其他分片。
+    """
+    if not room_workers.running:
+        return JSONResponse({"status": "error", "message": "room workers are disabled"}, 400)
+    target = payload.shard if payload is not None else None
+    try:
+        source, target = await run_in_threadpool(room_workers.migrate, room_id, target)
+    except KeyError:
+        return JSONResponse({"status": "error", "message": "room not found"}, 404)
+    except ValueError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, 400)
+    except RoomWorkerError as e:
+        status = 409 if room_workers.is_moving(room_id) else 503
+        return JSONResponse({"status": "error", "message": str(e)}, status)
+    touch_room_activity(room_id)
+    return {"status": "ok", "room_id": room_id, "from_shard": source, "to_shard": target}
+
+
+@router.get("/diagnostic/room-workers", response_model=RoomWorkersResponse)
+async def room_worker_diagnostics():
+    """房间工作进程诊断：各分片进程、承载的房间、重启与崩溃次数。"""
+    return {"status": "ok", **room_workers.snapshot()}
+
+
+def _process_rss(pid) -> int | None:
+    """读取进程 RSS（psutil 不可用或无权限时返回 None）。"""
+    if not pid:
+        return None
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return None
+
+
+# RoomPlayer 专属线程的名称前缀（models/player.py：事件监听线程、MPV stderr 读取线程），后接 room_id
+_ROOM_THREAD_PREFIXES = ("MPVEventListener-", "mpv-stderr-")
+
+
+def _room_resource_usage(room_id: str, player, thread_names: list, now: float) -> dict:
+    from models.song import StreamSong
+    from models.url_cache import url_cache
+
+    mpv_process = getattr(player, 'mpv_process', None)
+    mpv_pid = getattr(mpv_process, 'pid', None) if mpv_process is not None else None
+    runtime_queue = player.get_runtime_queue()
+    songs = list(getattr(runtime_queue, 'songs', []) or [])
+    video_ids = [
+        StreamSong.extract_video_id(song.get("url", ""))
+        for song in songs
+        if isinstance(song, dict) and str(song.get("url", "")).startswith("http")
+    ]
+    history = ROOM_HISTORIES.get(room_id)
+    own_names = {prefix + room_id for prefix in _ROOM_THREAD_PREFIXES}
+    room_threads = [name for name in thread_names if name in own_names]
+    last_activity = ROOM_LAST_ACTIVITY.get(room_id, 0)
+    return {
+        "room_id": room_id,
+        "mpv_pid": mpv_pid,
+        "mpv_rss_bytes": _process_rss(mpv_pid),
+        "threads": room_threads,
+        "thread_count": len(room_threads),
+        "queue_length": len(songs),
+        "history_length": history.size() if hasattr(history, 'size') else 0,
+        "url_cache_entries": url_cache.count_cached(vid for vid in video_ids if vid),
+        "last_activity": last_activity,
+        "idle_seconds": max(0.0, now - last_activity) if last_activity else 0.0,
+    }
+
+
+@router.get("/diagnostic/rooms", response_model=RoomDiagnosticsResponse)
+async def room_diagnostics():
+    """房间资源诊断：按 MPV RSS 从大到小列出各房间占用。"""
+    from models.url_cache import url_cache
+
+    with _room_players_lock:
+        players = list(ROOM_PLAYERS.items())
+
+    now = time.time()
+    thread_names = [t.name for t in threading.enumerate()]
+    rooms = [_room_resource_usage(rid, player, thread_names, now) for rid, player in players]
+    rooms.sort(key=lambda room: room["mpv_rss_bytes"] or 0, reverse=True)
+    return {
+        "status": "ok",
+        "rooms": rooms,
+        "count": len(rooms),
+        "process_rss_bytes": _process_rss(os.getpid()),
+        "process_thread_count": len(thread_names),
+        "url_cache_entries": len(url_cache),
+        "idle_timeout": ROOM_IDLE_TIMEOUT,
+    }
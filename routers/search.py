@@ -27,8 +27,10 @@ from models.api_contracts import (
     SearchYoutubeResponse,
     YouTubeSearchConfigResponse,
 )
+from models.metrics import SEARCH_SECONDS
 from models.player import MusicPlayer
 from models.song import StreamSong
+from models.tag_index import tag_index
 from routers.dependencies import get_player_for_request
 from routers.state import error_response
 
@@ -56,7 +58,7 @@ _DIRECTORY_ERROR_RESPONSES = {
 async def list_albums(player: MusicPlayer = Depends(get_player_for_request)):
     """获取缓存的本地专辑列表。"""
     try:
-        albums = player.get_local_albums()
+        albums = [tag_index.enrich_album(dict(album)) for album in player.get_local_albums()]
         return {
             "status": "OK",
             "albums": albums,
@@ -75,7 +77,7 @@ async def list_albums(player: MusicPlayer = Depends(get_player_for_request)):
 async def refresh_albums(player: MusicPlayer = Depends(get_player_for_request)):
     """刷新本地媒体库缓存并返回专辑列表。"""
     try:
-        albums = player.refresh_local_library_cache()
+        albums = [tag_index.enrich_album(dict(album)) for album in player.refresh_local_library_cache()]
         return {
             "status": "OK",
             "albums": albums,
@@ -125,12 +127,17 @@ async def search_song(payload: SearchSongRequest, player: MusicPlayer = Depends(
                     video_result = StreamSong.extract_metadata(query)
                     if video_result.get("status") == "OK":
                         youtube_results = [video_result.get("data", {})]
+                SEARCH_SECONDS.observe(time_module.time() - yt_start, "youtube_url")
                 logger.info(f"[搜索性能] YouTube URL 提取耗时: {time_module.time() - yt_start:.2f}秒，结果数: {len(youtube_results)}")
             except Exception as e:
                 logger.warning(f"[警告] 提取 YouTube URL 失败: {e}")
         else:
             local_start = time_module.time()
-            local_results = player.search_local(query, max_results=player.local_search_max_results)
+            local_results = [
+                tag_index.enrich_song(item)
+                for item in player.search_local(query, max_results=player.local_search_max_results)
+            ]
+            SEARCH_SECONDS.observe(time_module.time() - local_start, "local")
             logger.info(f"[搜索性能] 本地搜索耗时: {time_module.time() - local_start:.2f}秒，结果数: {len(local_results)}")
 
             yt_start = time_module.time()
@@ -138,11 +145,13 @@ async def search_song(payload: SearchSongRequest, player: MusicPlayer = Depends(
                 yt_search_result = StreamSong.search(query, max_results=max_results)
                 if yt_search_result.get("status") == "OK":
                     youtube_results = yt_search_result.get("results", [])
+                SEARCH_SECONDS.observe(time_module.time() - yt_start, "youtube")
                 logger.info(f"[搜索性能] YouTube 搜索耗时: {time_module.time() - yt_start:.2f}秒，结果数: {len(youtube_results)}")
             except Exception as e:
                 logger.warning(f"[警告] YouTube搜索失败: {e}")
 
         total_time = time_module.time() - start_time
+        SEARCH_SECONDS.observe(total_time, "total")
         logger.info(f"[搜索性能] ✅ 总搜索耗时: {total_time:.2f}秒")
 
         return {
@@ -232,12 +241,12 @@ async def get_directory_songs(payload: DirectorySongsRequest, player: MusicPlaye
                 if ext in player.allowed_extensions:
                     full_path = os.path.join(dp, f)
                     rel_path = os.path.relpath(full_path, abs_root).replace("\\", "/")
-                    tracks.append({
+                    tracks.append(tag_index.enrich_song({
                         "url": rel_path,
                         "title": os.path.splitext(f)[0],
                         "type": "local",
                         "duration": 0
-                    })
+                    }))
 
         tracks.sort(key=lambda x: x["title"].lower())
         logger.info(f"获取目录歌曲: {directory} → {len(tracks)} 首歌曲")
@@ -12,6 +12,11 @@ routers/settings.py - 用户设置和 UI 配置路由
   POST /ui-config
     GET  /diagnostic/instance-status
   GET  /diagnostic/ytdlp
+  GET  /diagnostic/access
+  GET  /diagnostic/loop-blocks
+  GET  /diagnostic/traces
+  GET  /diagnostic/traces/chrome
+  GET  /metrics
 """
 
 import os
@@ -19,10 +24,13 @@ import sys
 import subprocess
 import logging
 from fastapi import APIRouter, Request, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from models.api_contracts import (
+    DiagnosticAccessStatsResponse,
     DiagnosticInstanceStatusResponse,
+    DiagnosticLoopBlocksResponse,
+    DiagnosticTracesResponse,
     DiagnosticYtDlpResponse,
     ErrorResponse,
     SettingsMutationResponse,
@@ -368,3 +376,67 @@ async def diagnostic_ytdlp(player: MusicPlayer = Depends(get_player)):
         return result
     except Exception as e:
         return error_response("[GET /diagnostic/ytdlp] 诊断异常", exc=e, _logger=logger)
+
+
+@router.get("/diagnostic/access", response_model=DiagnosticAccessStatsResponse)
+async def diagnostic_access():
+    """按路由聚合的访问统计（包括被采样掉、未输出日志的请求）"""
+    from models.access_log import access_sampler
+
+    return {
+        "status": "OK",
+        "sample_every": access_sampler.sample_every,
+        "sampled_routes": sorted(access_sampler.sampled_routes),
+        "routes": access_sampler.snapshot(),
+    }
+
+
+@router.get("/diagnostic/loop-blocks", response_model=DiagnosticLoopBlocksResponse)
+async def diagnostic_loop_blocks(limit: int = 20, reset: bool = False):
+    """事件循环阻塞点排行（按累计阻塞时长），reset=true 时返回后清空统计"""
+    from models.loop_watchdog import loop_watchdog
+
+    payload = {
+        "status": "OK",
+        "enabled": loop_watchdog.enabled,
+        "running": loop_watchdog.running,
+        "threshold_ms": loop_watchdog.threshold * 1000,
+        "total_blocks": loop_watchdog.total_blocks,
+        "offenders": loop_watchdog.offenders(limit=limit),
+    }
+    if reset:
+        loop_watchdog.reset()
+    return payload
+
+
+@router.get("/diagnostic/traces", response_model=DiagnosticTracesResponse)
+async def diagnostic_traces(route: str | None = None, limit: int = 20):
+    """各路由最慢请求的阶段耗时（route 为路由模板，如 /next；为空时跨路由按耗时排序）"""
+    from models.tracing import trace_store
+
+    return {
+        "status": "OK",
+        "enabled": trace_store.enabled,
+        "per_route": trace_store.per_route,
+        "routes": trace_store.routes(),
+        "traces": [trace.to_dict() for trace in trace_store.slowest(route, limit=max(1, limit))],
+    }
+
+
+@router.get("/diagnostic/traces/chrome")
+async def diagnostic_traces_chrome(route: str | None = None, limit: int = 20):
+    """导出最慢请求为 Chrome trace-event JSON（可在 chrome://tracing 或 Perfetto 中打开）"""
+    from models.tracing import trace_store
+
+    return JSONResponse(
+        trace_store.chrome_trace(route, limit=max(1, limit)),
+        headers={"Content-Disposition": 'attachment; filename="clubmusic-traces.json"'},
+    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 文本格式的进程内指标（IPC、yt-dlp、缓存、搜索、WebSocket、房间、事件循环）"""
+    from models.metrics import registry
+
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -10,19 +10,26 @@ import sys
 import time
 import logging
 import asyncio
+import hashlib
 import threading
-from typing import Dict
+from collections import OrderedDict
+from typing import Callable, Dict
 
 from fastapi import WebSocket
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 logger = logging.getLogger(__name__)
 
 # ==================== 模型导入 ====================
+from models.metrics import WS_BROADCAST_SECONDS, registry as metrics_registry, room_label
 from models.player import MusicPlayer
 from models.playlist import PlayHistory
 from models.playlists import Playlists
 from models.settings import initialize_settings
+from models.tracing import span
+from models.scheduler import room_tasks, teardown_tasks
+from models.mpv_ipc import room_id_from_ipc_path
+from models.room_workers import in_room_worker, room_workers
 
 # ==================== 获取资源路径函数 ====================
 def _get_resource_path(relative_path: str) -> str:
@@ -104,11 +111,13 @@ class ConnectionManager:
         if not conns:
             return
         dead = set()
-        for conn in conns:
+        started = time.perf_counter()
+        for conn in list(conns):
             try:
                 await conn.send_json(message)
             except Exception:
                 dead.add(conn)
+        WS_BROADCAST_SECONDS.observe(time.perf_counter() - started, room_label(room_id))
         if dead:
             conns -= dead
             self.active_connections -= dead
@@ -122,6 +131,12 @@ class ConnectionManager:
 
 ws_manager = ConnectionManager()
 
+metrics_registry.gauge(
+    "clubmusic_ws_connections", "当前 WebSocket 连接数（按房间）",
+    lambda: {room_label(room_id): len(conns) for room_id, conns in list(ws_manager._room_connections.items())},
+    ("room",),
+)
+
 
 # ==================== MPV 包装函数 ====================
 # 必须在 _build_state_message 之前定义
@@ -171,6 +186,44 @@ def _build_state_message(player: MusicPlayer = None, playlist_updated: bool = Fa
     }
 
 
+# 默认 PLAYER 状态变化监听器（如自动填充的空闲触发器），在广播入口处同步调用
+_main_state_listeners = []
+
+
+def add_main_state_listener(listener: Callable[[], None]):
+    """注册默认 PLAYER 状态变化回调（应快速返回，不得阻塞事件循环）"""
+    if listener not in _main_state_listeners:
+        _main_state_listeners.append(listener)
+
+
+def _notify_main_state_listeners():
+    for listener in list(_main_state_listeners):
+        try:
+            listener()
+        except Exception as e:
+            logger.debug(f"[State] 状态监听器异常: {e}")
+
+
+# 房间工作进程中的房间状态广播出口（room_id, message, player），由主进程扇出给 WebSocket
+_room_broadcast_sink = None
+
+
+def set_room_broadcast_sink(sink: Callable[[str, dict, MusicPlayer], None]):
+    """设置房间状态广播出口（房间工作进程使用，设置后房间广播不再经本进程的 WebSocket）"""
+    global _room_broadcast_sink
+    _room_broadcast_sink = sink
+
+
+def broadcast_room_message_from_thread(room_id: str, message: dict):
+    """把工作进程房间的状态消息广播给本进程中该房间的 WebSocket 客户端（线程安全入口）"""
+    if _main_loop is None or not ws_manager.has_connections_for_room(room_id):
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(ws_manager.broadcast_to_room(room_id, message), _main_loop)
+    except Exception as e:
+        logger.debug(f"[WS] 房间 {room_id} 跨进程广播失败: {e}")
+
+
 async def _broadcast_state(player: MusicPlayer = None, playlist_updated: bool = False):
     """广播当前状态给对应 room 的 WebSocket 客户端（必须在锁外调用）
 
@@ -178,17 +231,26 @@ async def _broadcast_state(player: MusicPlayer = None, playlist_updated: bool =
         player: 目标播放器。None 或默认 PLAYER → 广播给 room_id=None 的连接；
                 RoomPlayer → 广播给对应 room_id 的连接。
     """
-    if not ws_manager.active_connections:
-        return
     p = player or PLAYER
     room_id = getattr(p, '_room_id', None)
-    msg = _build_state_message(p, playlist_updated=playlist_updated)
-    await ws_manager.broadcast_to_room(room_id, msg)
+    if room_id:
+        _touch_room_status_snapshot(p)
+        if _room_broadcast_sink is not None:
+            _room_broadcast_sink(room_id, _build_state_message(p, playlist_updated=playlist_updated), p)
+            return
+    else:
+        _notify_main_state_listeners()
+    if not ws_manager.active_connections:
+        return
+    with span("broadcast", room=room_label(room_id)):
+        msg = _build_state_message(p, playlist_updated=playlist_updated)
+        await ws_manager.broadcast_to_room(room_id, msg)
 
 
 def _broadcast_from_thread(playlist_updated: bool = True):
     """从后台线程安全地触发默认 PLAYER 的 WebSocket 广播（线程安全入口）"""
     if _main_loop is None or not ws_manager.active_connections:
+        _notify_main_state_listeners()
         return
     try:
         asyncio.run_coroutine_threadsafe(_broadcast_state(playlist_updated=playlist_updated), _main_loop)
@@ -203,13 +265,18 @@ def _make_room_broadcast(room_id: str):
     MusicPlayer.set_external_deps(broadcast_from_thread=...)。
     """
     def _room_broadcast(playlist_updated: bool = True):
-        if _main_loop is None:
-            return
         with _room_players_lock:
             player = ROOM_PLAYERS.get(room_id)
         if player is None:
             return
-        if not ws_manager.has_connections_for_room(room_id):
+        _touch_room_status_snapshot(player)
+        if _room_broadcast_sink is not None:
+            try:
+                _room_broadcast_sink(room_id, _build_state_message(player, playlist_updated=playlist_updated), player)
+            except Exception as e:
+                logger.debug(f"[WS] 房间 {room_id} 状态转发失败: {e}")
+            return
+        if _main_loop is None or not ws_manager.has_connections_for_room(room_id):
             return
         try:
             asyncio.run_coroutine_threadsafe(
@@ -250,6 +317,92 @@ def error_response(
     return JSONResponse(body, status_code=status_code)
 
 
+# ==================== 条件请求（ETag / 304）====================
+# 以数据版本（歌单 updated_at / 历史 version）为 key 缓存已序列化的响应体，
+# 轮询客户端带 If-None-Match 命中时直接返回 304，无需重新构建和序列化。
+_PAYLOAD_CACHE_MAX = 256
+_payload_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_payload_cache_lock = threading.Lock()
+
+
+def make_etag(*parts) -> str:
+    """根据版本信息生成弱 ETag（W/"..."）"""
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request, etag: str) -> bool:
+    """判断请求头 If-None-Match 是否命中给定 ETag（弱比较）"""
+    if request is None or not etag:
+        return False
+    headers = getattr(request, "headers", None) or {}
+    header = headers.get("if-none-match")
+    if not header:
+        return False
+    header = header.strip()
+    if header == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def cached_json_response(
+    request,
+    scope: str,
+    version,
+    build_payload: Callable[[], dict],
+    response_model=None,
+):
+    """按版本缓存 JSON 响应，支持 If-None-Match → 304。
+
+    Args:
+        request: FastAPI Request；为 None 时（直接函数调用）返回 payload dict
+        scope: 缓存槽位（如 "playlist:default"），每个槽位只保留最新版本
+        version: 数据版本标识（可 repr 的元组）；为 None 时不缓存、不生成 ETag
+        build_payload: 版本未命中时构建响应 dict 的回调
+        response_model: 序列化时使用的 pydantic 模型（与 response_model_exclude_none 一致）
+    """
+    if version is None:
+        return build_payload()
+
+    etag = make_etag(scope, version)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    with _payload_cache_lock:
+        entry = _payload_cache.get(scope)
+        if entry is not None and entry[0] == etag:
+            _payload_cache.move_to_end(scope)
+    if entry is None or entry[0] != etag:
+        payload = build_payload()
+        if response_model is not None:
+            body = response_model.model_validate(payload).model_dump_json(
+                exclude_none=True, by_alias=True
+            ).encode("utf-8")
+        else:
+            body = JSONResponse(payload).body
+        entry = (etag, payload, body)
+        with _payload_cache_lock:
+            _payload_cache[scope] = entry
+            _payload_cache.move_to_end(scope)
+            while len(_payload_cache) > _PAYLOAD_CACHE_MAX:
+                _payload_cache.popitem(last=False)
+
+    if request is None:
+        return entry[1]
+    return Response(
+        content=entry[2],
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
 # ==================== 注入外部依赖到 MusicPlayer ====================
 # 消除 models/player.py 对 routers.state 的循环导入
 # handle_playback_end() 和 _prefetch_next_song_url() 通过这些回调访问全局单例
@@ -260,8 +413,8 @@ PLAYER.set_external_deps(
     broadcast_from_thread=_broadcast_from_thread,
 )
 
-# 预启动 MPV 进程，避免首次播放时等待管道创建
-if PLAYER.mpv_cmd is not None:
+# 预启动 MPV 进程，避免首次播放时等待管道创建（房间工作进程只承载 RoomPlayer）
+if PLAYER.mpv_cmd is not None and not in_room_worker():
     threading.Thread(
         target=PLAYER.ensure_mpv, daemon=True, name="mpv-prestart"
     ).start()
@@ -274,6 +427,7 @@ _pipe_players_lock = threading.Lock()
 # ==================== RoomPlayer 池（ClubMusic 管理的 MPV 房间）====================
 ROOM_PLAYERS: Dict[str, MusicPlayer] = {}
 _room_players_lock = threading.Lock()
+metrics_registry.gauge("clubmusic_rooms", "当前房间数", lambda: len(ROOM_PLAYERS) + room_workers.room_count())
 
 # 房间独立播放历史（room_id → PlayHistory）
 ROOM_HISTORIES: Dict[str, PlayHistory] = {}
@@ -289,11 +443,165 @@ import configparser as _cfgparser
 _room_cfg = _cfgparser.ConfigParser()
 _room_cfg.read("settings.ini", encoding="utf-8")
 ROOM_MAX: int = _room_cfg.getint("room", "max_rooms", fallback=10)
+ROOM_IDLE_TIMEOUT: int = _room_cfg.getint("room", "idle_timeout", fallback=3600)
+
+# 空闲回收：每个房间在共享调度器（最小堆）中最多挂一个到期检查，
+# 到期时若期间有活动则按新的到期时间重新挂起，否则交给房间销毁线程池执行（多房间并行）。
+# _room_expiry_scheduled 由请求线程与调度器工作线程共同修改，检查与登记均在 _room_expiry_lock 内完成。
+_room_reaper_enabled = False
+_room_expiry_scheduled: set = set()
+_room_expiry_lock = threading.Lock()
 
 
 def touch_room_activity(room_id: str):
     """更新房间最后活跃时间戳"""
     ROOM_LAST_ACTIVITY[room_id] = time.time()
+    if _room_reaper_enabled:
+        _ensure_room_expiry(room_id, ROOM_IDLE_TIMEOUT)
+
+
+def _ensure_room_expiry(room_id: str, delay: float):
+    """房间尚无到期检查时挂起一个（同一房间不会重复挂起）"""
+    with _room_expiry_lock:
+        if room_id in _room_expiry_scheduled:
+            return
+        _room_expiry_scheduled.add(room_id)
+    room_tasks.call_later(delay, _check_room_expiry, room_id)
+
+
+def _schedule_room_expiry(room_id: str, delay: float):
+    """顺延已登记房间的到期检查"""
+    with _room_expiry_lock:
+        _room_expiry_scheduled.add(room_id)
+    room_tasks.call_later(delay, _check_room_expiry, room_id)
+
+
+def _check_room_expiry(room_id: str):
+    """到期检查：仍活跃则顺延，超时则交给销毁线程池。"""
+    with _room_expiry_lock:
+        last = ROOM_LAST_ACTIVITY.get(room_id)
+        remaining = None if last is None else last + ROOM_IDLE_TIMEOUT - time.time()
+        if remaining is None or remaining <= 0:
+            _room_expiry_scheduled.discard(room_id)
+    if remaining is None:
+        return
+    if remaining > 0:
+        _schedule_room_expiry(room_id, remaining)
+        return
+    teardown_tasks.submit(_expire_idle_room, room_id, last)
+
+
+def _expire_idle_room(room_id: str, last: float):
+    """销毁空闲房间；登记后又有活动（新的到期检查已挂起）时放弃"""
+    if ROOM_LAST_ACTIVITY.get(room_id, last) != last:
+        return
+    if destroy_room_state(room_id):
+        logger.info(f"[RoomReaper] 已清理空闲房间: {room_id} (idle={time.time() - last:.0f}s)")
+
+
+def destroy_room_state(room_id: str) -> bool:
+    """注销并销毁房间（MPV 终止在锁外执行），返回房间是否存在。"""
+    with _room_players_lock:
+        if room_id in _creating_rooms:
+            return False
+        player = ROOM_PLAYERS.pop(room_id, None)
+    if player is None:
+        ROOM_LAST_ACTIVITY.pop(room_id, None)
+        return room_workers.destroy_room(room_id)
+    try:
+        player.destroy_room_player()
+    finally:
+        ROOM_HISTORIES.pop(room_id, None)
+        ROOM_LAST_ACTIVITY.pop(room_id, None)
+    return True
+
+
+def start_room_reaper() -> bool:
+    """启用空闲房间回收，并为已存在的房间挂起到期检查。"""
+    global _room_reaper_enabled
+    if ROOM_IDLE_TIMEOUT <= 0:
+        logger.info("[RoomReaper] 空闲清理已禁用 (idle_timeout <= 0)")
+        return False
+    _room_reaper_enabled = True
+    with _room_players_lock:
+        room_ids = list(ROOM_PLAYERS.keys())
+    for room_id in room_ids:
+        ROOM_LAST_ACTIVITY.setdefault(room_id, time.time())
+        _ensure_room_expiry(room_id, ROOM_IDLE_TIMEOUT)
+    logger.info(f"[RoomReaper] 空闲房间回收已启用 (timeout={ROOM_IDLE_TIMEOUT}s)")
+    return True
+
+
+# ==================== 房间状态快照 ====================
+# 每个 RoomPlayer 持有一份状态快照（player._room_status_snapshot），
+# 由事件（状态广播）和健康检查定时器刷新，/room/list、/room/{id}/status 只读内存。
+
+ROOM_HEALTH_CHECK_INTERVAL = 2.0
+
+
+def _probe_room_health(player) -> dict:
+    """检测 MPV 进程、IPC 管道和 PCM 输出（涉及 Win32 调用，较慢）。"""
+    mpv_process = getattr(player, 'mpv_process', None)
+    return {
+        "mpv_running": bool(mpv_process is not None and mpv_process.poll() is None),
+        "pipe_exists": bool(player.mpv_pipe_exists()),
+        "output_ready": bool(player.is_room_output_ready()),
+        "checked_at": time.time(),
+    }
+
+
+def refresh_room_status_snapshot(player, check_health: bool = True) -> dict:
+    """重建 RoomPlayer 的状态快照并整体替换（读取方无需加锁）。
+
+    check_health=False 时复用上次健康检查结果，仅刷新队列与 current_meta（事件驱动路径）。
+    """
+    previous = getattr(player, '_room_status_snapshot', None)
+    if check_health or not previous:
+        health = _probe_room_health(player)
+    else:
+        health = {key: previous[key] for key in ("mpv_running", "pipe_exists", "output_ready", "checked_at")}
+
+    runtime_queue = player.get_runtime_queue()
+    snapshot = {
+        **health,
+        "current_playlist_id": getattr(runtime_queue, 'id', ''),
+        "current_index": getattr(player, 'current_index', -1),
+        "queue_length": len(getattr(runtime_queue, 'songs', []) or []),
+        "playlist_updated_at": getattr(runtime_queue, 'updated_at', 0) if runtime_queue else 0,
+        "current_meta": player.get_current_meta_snapshot(),
+    }
+    player._room_status_snapshot = snapshot
+    return snapshot
+
+
+def get_room_status_snapshot(player) -> dict:
+    """返回缓存的房间状态快照，尚无快照时即时构建一次。"""
+    snapshot = getattr(player, '_room_status_snapshot', None)
+    if snapshot is None:
+        snapshot = refresh_room_status_snapshot(player)
+    return snapshot
+
+
+def _touch_room_status_snapshot(player):
+    """状态变化时刷新已有快照（不做健康检查）。"""
+    if getattr(player, '_room_status_snapshot', None) is None:
+        return
+    try:
+        refresh_room_status_snapshot(player, check_health=False)
+    except Exception as e:
+        logger.debug(f"[Room] 刷新状态快照失败: {e}")
+
+
+def refresh_all_room_status_snapshots() -> int:
+    """健康检查定时器入口：刷新所有房间快照，返回刷新数量。"""
+    with _room_players_lock:
+        players = list(ROOM_PLAYERS.values())
+    for player in players:
+        try:
+            refresh_room_status_snapshot(player)
+        except Exception as e:
+            logger.debug(f"[Room] 健康检查失败: {e}")
+    return len(players)
 
 
 def get_player_for_room_id(room_id: str):
@@ -307,23 +615,19 @@ def get_player_for_room_id(room_id: str):
         return ROOM_PLAYERS.get(room_id, None)
 
 
-# 房间管道前缀，用于识别房间管道模式
-_ROOM_IPC_PREFIX = r'\\.\pipe\mpv-ipc-'
-
-
 def get_player_for_pipe(pipe_name: str) -> MusicPlayer:
     """获取或创建指定管道的 Player 实例。
 
     无 pipe 或匹配默认管道 → 返回全局 PLAYER；
-    房间管道模式（\\\\.\\pipe\\mpv-ipc-*）→ 按 room_id 查 ROOM_PLAYERS，不自动创建；
+    房间管道模式（\\\\.\\pipe\\mpv-ipc-* 或 <ipc_dir>/<room>.sock）→ 按 room_id 查 ROOM_PLAYERS，不自动创建；
     其他管道 → 查/创建 PipePlayer。
     """
     if not pipe_name or pipe_name == PLAYER.pipe_name:
         return PLAYER
 
     # 房间管道模式：提取 room_id 查 ROOM_PLAYERS
-    if pipe_name.startswith(_ROOM_IPC_PREFIX):
-        room_id = pipe_name[len(_ROOM_IPC_PREFIX):]
+    room_id = room_id_from_ipc_path(pipe_name)
+    if room_id:
         with _room_players_lock:
             if room_id in ROOM_PLAYERS:
                 return ROOM_PLAYERS[room_id]
@@ -397,9 +701,7 @@ def cleanup_pipe_player(pipe_name: str):
     支持 room_id 或完整管道路径作为参数。
     """
     # 尝试从管道路径提取 room_id
-    lookup_key = pipe_name
-    if pipe_name.startswith(_ROOM_IPC_PREFIX):
-        lookup_key = pipe_name[len(_ROOM_IPC_PREFIX):]
+    lookup_key = room_id_from_ipc_path(pipe_name) or pipe_name
 
     # 先查 ROOM_PLAYERS（以 room_id 为 key）
     with _room_players_lock:
@@ -6,6 +6,7 @@ routers/websocket.py - WebSocket 实时状态推送端点
 import logging
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 
+from models.room_workers import RoomWorkerError, room_workers
 from routers.dependencies import get_ws_manager
 from routers.state import _build_state_message, get_player_for_room_id, PLAYER, _creating_rooms
 
@@ -22,7 +23,8 @@ async def websocket_endpoint(websocket: WebSocket, manager=Depends(get_ws_manage
     无 room_id 参数的连接属于默认播放器（dev/prod）。
     """
     room_id = websocket.query_params.get('room_id', None) or None
-    if room_id:
+    worker_shard = room_workers.shard_of(room_id) if room_id else None
+    if room_id and worker_shard is None:
         player = get_player_for_room_id(room_id)
         if player is None:
             if room_id in _creating_rooms:
@@ -36,12 +38,15 @@ async def websocket_endpoint(websocket: WebSocket, manager=Depends(get_ws_manage
 
     await manager.connect(websocket, room_id=room_id)
     try:
-        # 用对应的 player 构建初始状态消息
-        if room_id:
-            player = get_player_for_room_id(room_id)
+        # 用对应的 player 构建初始状态消息（工作进程中的房间由工作进程构建）
+        if worker_shard is not None:
+            try:
+                await websocket.send_json(await room_workers.call_async(worker_shard, "state", room_id))
+            except RoomWorkerError as e:
+                logger.warning(f"[WS] 获取房间 {room_id} 初始状态失败: {e}")
         else:
-            player = PLAYER
-        await websocket.send_json(_build_state_message(player, playlist_updated=False))
+            player = get_player_for_room_id(room_id) if room_id else PLAYER
+            await websocket.send_json(_build_state_message(player, playlist_updated=False))
         while True:
             # 接收心跳消息（客户端每 20 秒发送 "ping"，忽略内容）
             await websocket.receive_text()
@@ -406,6 +406,20 @@ export class MusicAPI {
         return this.get('/diagnostic/instance-status');
     }
 
+    async getAccessStats() {
+        return this.get('/diagnostic/access');
+    }
+
+    async getLoopBlocks(limit = 20) {
+        return this.get(`/diagnostic/loop-blocks?limit=${encodeURIComponent(limit)}`);
+    }
+
+    async getTraces(route = '', limit = 20) {
+        const params = new URLSearchParams({ limit: String(limit) });
+        if (route) params.set('route', route);
+        return this.get(`/diagnostic/traces?${params.toString()}`);
+    }
+
     async initRoom(roomId, defaultVolume = 80) {
         return this.post('/room/init', {
             room_id: roomId,
@@ -421,14 +435,23 @@ export class MusicAPI {
         return this.get('/room/list');
     }
 
+    async getRoomDiagnostics() {
+        return this.get('/diagnostic/rooms');
+    }
+
     async destroyRoom(roomId) {
         return this.delete(`/room/${encodeURIComponent(roomId)}`);
     }
 
     // 播放列表 API
-    async getPlaylist(playlistId = null) {
-        const url = playlistId ? `/playlist?playlist_id=${encodeURIComponent(playlistId)}` : '/playlist';
-        return this.get(url);
+    // 可选分页：{ offset, limit, aroundCurrent }，不传时返回完整歌单
+    async getPlaylist(playlistId = null, { offset = null, limit = null, aroundCurrent = false } = {}) {
+        const params = new URLSearchParams();
+        if (playlistId) params.set('playlist_id', playlistId);
+        if (offset !== null) params.set('offset', offset);
+        if (limit !== null) params.set('limit', limit);
+        if (aroundCurrent) params.set('around_current', 'true');
+        return this.get(`/playlist?${params.toString()}`);
     }
 
     async getPlaylists() {
@@ -471,11 +494,12 @@ export class MusicAPI {
         return this.postForm(`/playlists/${playlistId}/remove`, formData);
     }
 
-    async reorderPlaylist(playlistId, fromIndex, toIndex) {
+    async reorderPlaylist(playlistId, fromIndex, toIndex, count = 1) {
         return this.post('/playlist_reorder', {
             playlist_id: playlistId,
             from_index: fromIndex,
-            to_index: toIndex
+            to_index: toIndex,
+            count
         });
     }
 
@@ -493,6 +517,14 @@ export class MusicAPI {
         return this.post('/playlist_add', data, { quietHttpStatuses: [409] });
     }
 
+    // 批量修改歌单：operations 为 [{ op: 'add'|'insert'|'remove'|'move', ... }]，后端一次保存一次广播
+    async batchPlaylist(playlistId, operations) {
+        return this.post('/playlist_batch', {
+            playlist_id: playlistId,
+            operations
+        }, { timeout: 30000 });
+    }
+
     // 搜索 API
     async searchSong(query, maxResults = null) {
         const data = { query };
@@ -539,11 +571,29 @@ export class MusicAPI {
     }
 
     // ✅ 新增：获取已合并的播放历史（相同歌曲仅显示最后播放时间）
-    async getPlaybackHistoryMerged() {
-        return this.get('/playback_history_merged');
+    // 可选分页：{ offset, limit }，不传时返回完整历史
+    async getPlaybackHistoryMerged({ offset = null, limit = null } = {}) {
+        const params = new URLSearchParams();
+        if (offset !== null) params.set('offset', offset);
+        if (limit !== null) params.set('limit', limit);
+        const query = params.toString();
+        return this.get(query ? `/playback_history_merged?${query}` : '/playback_history_merged');
     }
 
     // 删除单条播放历史记录
+    // 播放统计：最近 days 天的排行 / 按小时分布 / 按房间统计
+    async getPlayStatsTop({ days = 7, limit = 10 } = {}) {
+        return this.get(`/playback_stats/top?days=${encodeURIComponent(days)}&limit=${encodeURIComponent(limit)}`);
+    }
+
+    async getPlayStatsHourly({ days = 7 } = {}) {
+        return this.get(`/playback_stats/hourly?days=${encodeURIComponent(days)}`);
+    }
+
+    async getPlayStatsRooms({ days = 7 } = {}) {
+        return this.get(`/playback_stats/rooms?days=${encodeURIComponent(days)}`);
+    }
+
     async deleteHistoryRecord(url) {
         return this.post('/playback_history_delete', { url });
     }
@@ -9,9 +9,16 @@ import { unavailableSongs } from './unavailable.js';
 import { executePlayNow, rerenderQueueWithCurrentMeta } from './playNow.js?v=22';
 import { getCurrentPlaybackStatus } from './playbackState.js?v=20';
 
+// 播放队列分页大小（与后端 /playlist 的默认 limit 一致）
+const QUEUE_PAGE_SIZE = 200;
+
 export class PlaylistManager {
     constructor() {
         this.currentPlaylist = [];
+        this.currentPlaylistTotal = 0; // 后端队列总数，大于 currentPlaylist.length 时表示还有未加载的分页
+        this.currentPlaylistVersion = null;
+        this._loadedPlaylistId = null;
+        this._loadMorePromise = null;
         this.playlists = [];
         this.urlSet = new Set();
         this.currentPlaylistName = i18n.t('playlist.current'); // 添加歌单名称
@@ -101,25 +108,103 @@ export class PlaylistManager {
     }
 
     // 加载当前播放队列（用户隔离：使用前端保存的 selectedPlaylistId）
-    async loadCurrent() {
+    // 分页拉取队列前缀：至少覆盖已滚动加载的长度和当前播放位置，其余部分由 loadMoreCurrent() 续取
+    async loadCurrent(minLength = 0) {
         // 使用前端独立维护的 selectedPlaylistId，每个浏览器独立
-        const result = this._assertStatusOk(
-            await api.getPlaylist(this.selectedPlaylistId),
-            '加载播放列表失败（后端响应无效）'
-        );
+        const playlistId = this.selectedPlaylistId;
+        const loadedLength = this._loadedPlaylistId === playlistId ? this.currentPlaylist.length : 0;
+        let wanted = Math.max(QUEUE_PAGE_SIZE, loadedLength, minLength);
+        let songs = [];
+        let version = null;
+        let restarts = 0;
+        let result = null;
+
+        while (true) {
+            result = this._assertStatusOk(
+                await api.getPlaylist(playlistId, {
+                    offset: songs.length,
+                    limit: Math.min(QUEUE_PAGE_SIZE, Math.max(1, wanted - songs.length)),
+                }),
+                '加载播放列表失败（后端响应无效）'
+            );
+            if (!Array.isArray(result.playlist)) {
+                throw new Error('加载播放列表失败');
+            }
+
+            if (songs.length === 0) {
+                version = result.version ?? null;
+                if (result.playlist_id === this.getActiveDefaultId() && result.current_index >= wanted) {
+                    wanted = result.current_index + QUEUE_PAGE_SIZE / 2;
+                }
+            } else if ((result.version ?? null) !== version && restarts < 3) {
+                // 翻页期间队列被修改：从头重新拉取，避免拼接出错位的列表
+                restarts += 1;
+                songs = [];
+                continue;
+            }
+
+            songs = songs.concat(result.playlist);
+            if (result.next_offset == null || result.playlist.length === 0 || songs.length >= wanted) {
+                break;
+            }
+        }
+
+        this.currentPlaylist = songs;
+        this.currentPlaylistTotal = Number.isFinite(result.total) ? result.total : songs.length;
+        this.currentPlaylistVersion = version;
+        this._loadedPlaylistId = result.playlist_id || playlistId;
+        this.currentPlaylistName = result.playlist_name || i18n.t('playlist.current'); // 获取歌单名称
+        // 如果返回的歌单ID与请求不同（例如歌单被删除），同步更新
+        if (result.playlist_id && result.playlist_id !== this.selectedPlaylistId) {
+            console.log('[歌单管理] 歌单已不存在，切换到:', result.playlist_id);
+            this.setSelectedPlaylist(result.playlist_id);
+        }
+        this.updateUrlSet();
+        return result;
+    }
+
+    // 队列是否还有未加载的分页
+    hasMoreCurrent() {
+        return this.currentPlaylist.length < this.currentPlaylistTotal;
+    }
+
+    // 续取下一页队列（渲染列表滚动到末尾时调用），返回是否追加了新歌曲
+    async loadMoreCurrent() {
+        if (!this.hasMoreCurrent()) {
+            return false;
+        }
+        if (this._loadMorePromise) {
+            return this._loadMorePromise;
+        }
+
+        this._loadMorePromise = (async () => {
+            const playlistId = this.selectedPlaylistId;
+            const offset = this.currentPlaylist.length;
+            const result = this._assertStatusOk(
+                await api.getPlaylist(playlistId, { offset, limit: QUEUE_PAGE_SIZE }),
+                '加载更多歌曲失败'
+            );
 
-        if (Array.isArray(result.playlist)) {
-            this.currentPlaylist = result.playlist;
-            this.currentPlaylistName = result.playlist_name || i18n.t('playlist.current'); // 获取歌单名称
-            // 如果返回的歌单ID与请求不同（例如歌单被删除），同步更新
-            if (result.playlist_id && result.playlist_id !== this.selectedPlaylistId) {
-                console.log('[歌单管理] 歌单已不存在，切换到:', result.playlist_id);
-                this.setSelectedPlaylist(result.playlist_id);
+            // 请求期间切换了歌单或队列已被重新加载：丢弃这一页
+            if (playlistId !== this.selectedPlaylistId || offset !== this.currentPlaylist.length || !Array.isArray(result.playlist)) {
+                return false;
             }
+            if ((result.version ?? null) !== this.currentPlaylistVersion) {
+                await this.loadCurrent(offset + QUEUE_PAGE_SIZE);
+                return true;
+            }
+
+            this.currentPlaylist = this.currentPlaylist.concat(result.playlist);
+            this.currentPlaylistTotal = Number.isFinite(result.total) ? result.total : this.currentPlaylist.length;
             this.updateUrlSet();
-            return result;
+            return result.playlist.length > 0;
+        })();
+
+        try {
+            return await this._loadMorePromise;
+        } finally {
+            this._loadMorePromise = null;
         }
-        throw new Error('加载播放列表失败');
     }
 
     // 加载所有歌单
@@ -151,6 +236,8 @@ export class PlaylistManager {
 
         const nextSongs = Array.isArray(targetPlaylist?.songs) ? [...targetPlaylist.songs] : [];
         this.currentPlaylist = nextSongs;
+        this.currentPlaylistTotal = nextSongs.length;
+        this._loadedPlaylistId = targetPlaylist?.id || null;
         this.currentPlaylistName = targetPlaylist?.name || i18n.t('playlist.current');
         this.updateUrlSet();
 
@@ -177,6 +264,8 @@ export class PlaylistManager {
 
         if (this.selectedPlaylistId === playlistId) {
             this.currentPlaylist = [...nextSongs];
+            this.currentPlaylistTotal = nextSongs.length;
+            this._loadedPlaylistId = playlistId;
             if (nextPlaylistName) {
                 this.currentPlaylistName = nextPlaylistName;
             }
@@ -359,6 +448,16 @@ export class PlaylistManager {
         return this._assertStatusOk(result, '添加到歌单失败');
     }
 
+    // 批量添加歌曲（单次请求，后端去重），返回 { added, skipped, added_urls, ... }
+    async addSongs(playlistId, songs, insertIndex = null) {
+        const operation = { op: 'insert', songs };
+        if (insertIndex !== null) {
+            operation.index = insertIndex;
+        }
+        const result = await api.batchPlaylist(playlistId, [operation]);
+        return this._assertStatusOk(result, '批量添加到歌单失败');
+    }
+
     // ✅ 新增：设置当前选择的歌单（并保存到 localStorage）
     setSelectedPlaylist(playlistId) {
         const normalizedPlaylistId = playlistId || this.getActiveDefaultId();
@@ -407,7 +506,8 @@ export class PlaylistManager {
             
             if (result.status === 'OK') {
                 console.log(`[删除成功] ${songTitle} 已从歌单删除`);
-                if (isDefaultPlaylist) {
+                if (isDefaultPlaylist || this.hasMoreCurrent()) {
+                    // 队列只加载了部分分页时不能用本地前缀覆盖歌单缓存，直接重新加载
                     await this.loadCurrent();
                 } else {
                     const nextSongs = this.currentPlaylist.filter((_, currentIndex) => currentIndex !== index);
@@ -452,11 +552,16 @@ export class PlaylistManager {
         });
     }
 
-    // 获取当前播放列表
+    // 获取当前播放列表（分页加载时只包含已加载的前缀）
     getCurrent() {
         return this.currentPlaylist;
     }
 
+    // 获取当前播放列表的总歌曲数（含未加载的分页）
+    getCurrentTotal() {
+        return Math.max(this.currentPlaylistTotal, this.currentPlaylist.length);
+    }
+
     // 获取当前歌单名称
     getCurrentName() {
         return this.currentPlaylistName;
@@ -895,7 +1000,8 @@ export function renderPlaylistToolbar({ toolbarContainer, playlist, playlistName
     const colors = getThemeColors(appTheme);
     const isDefaultPlaylist = selectedPlaylistId === playlistManager.getActiveDefaultId();
     const headerContainer = createToolbarHeaderContainer(appTheme, colors);
-    const infoSection = createToolbarInfoSection(playlistName, playlist.length, colors);
+    const songCount = isDefaultPlaylist ? playlistManager.getCurrentTotal() : playlist.length;
+    const infoSection = createToolbarInfoSection(playlistName, songCount, colors);
 
     headerContainer.appendChild(createToolbarLeadSection(playlistManager.getCurrentPlaylistIcon(), infoSection));
 
@@ -1764,6 +1870,7 @@ export function renderPlaylistUI({ container, onPlay, currentMeta }) {
     renderPlaylistToolbar({ toolbarContainer: getPlaylistToolbarContainer(container), playlist, playlistName, selectedPlaylistId, container, onPlay, currentMeta });
 
     if (!playlist || playlist.length === 0) {
+        container._playlistTailObserver?.disconnect();
         container._playlistItemNodes = new Map();
         container._playlistEmptyStateVisible = true;
         // 播放列表为空时，显示空状态提示和历史按钮
@@ -1978,11 +2085,38 @@ export function renderPlaylistUI({ container, onPlay, currentMeta }) {
     });
 
     container._playlistItemNodes = nextItemNodes;
+    observePlaylistTail(container, selectedPlaylistId === playlistManager.getActiveDefaultId());
 
     // 初始化触摸拖拽排序
     initTouchDragSort(container, renderPlaylistUI, { container, onPlay, currentMeta });
 }
 
+// 队列分页：最后一项滚动进入视口且后端还有未加载的歌曲时，续取下一页并重新渲染
+function observePlaylistTail(container, isDefaultPlaylist) {
+    container._playlistTailObserver?.disconnect();
+    container._playlistTailObserver = null;
+
+    const lastItem = container.lastElementChild;
+    if (!isDefaultPlaylist || !lastItem || !playlistManager.hasMoreCurrent() || typeof IntersectionObserver !== 'function') {
+        return;
+    }
+
+    const observer = new IntersectionObserver(async (entries) => {
+        if (!entries.some((entry) => entry.isIntersecting)) return;
+        observer.disconnect();
+        try {
+            if (await playlistManager.loadMoreCurrent() && container._playlistRenderContext) {
+                renderPlaylistUI(container._playlistRenderContext);
+            }
+        } catch (err) {
+            console.warn('[播放列表] 加载更多歌曲失败:', err);
+        }
+    }, { rootMargin: '400px 0px' });
+
+    observer.observe(lastItem);
+    container._playlistTailObserver = observer;
+}
+
 // 触摸拖拽排序 - 移动端优化
 function initTouchDragSort(container, rerenderFn, rerenderArgs) {
     let draggedItem = null;
@@ -634,6 +634,29 @@ export class SearchManager {
         return playlistManager.addSong(playlistId, song, insertIndex);
     }
 
+    // 批量添加：一次请求提交全部歌曲，后端一次保存一次广播；按返回的 added_urls 同步本地缓存
+    async addSongsToPlaylist(playlistId, songs, insertIndex, { syncCache = false } = {}) {
+        const result = await playlistManager.addSongs(playlistId, songs, insertIndex);
+        const addedUrls = new Set(result.added_urls || []);
+
+        if (syncCache && addedUrls.size > 0) {
+            let offset = 0;
+            for (const song of songs) {
+                if (addedUrls.has(song.url)) {
+                    playlistManager.insertSongIntoPlaylistCache(playlistId, song, insertIndex + offset);
+                    addedUrls.delete(song.url);
+                    offset++;
+                }
+            }
+        }
+
+        return {
+            addedCount: result.added || 0,
+            skippedCount: result.skipped || 0,
+            failedCount: 0
+        };
+    }
+
     getSearchResultsForBatchAction(tabName) {
         return this.totalSearchResults[tabName] || this.currentSearchResults[tabName] || [];
     }
@@ -1496,48 +1519,19 @@ export class SearchManager {
                             return;
                         }
                         
-                        // 将所有歌曲添加到歌单（保持原有顺序）
-                        let addedCount = 0;
-                        let skippedCount = 0;
-                        let failedCount = 0;
-                        let insertIndex = null;  // 第一首歌曲的插入位置
-                        
-                        for (let i = 0; i < songs.length; i++) {
-                            const song = songs[i];
-                            
-                            try {
-                                // 第一首歌曲时计算插入位置
-                                if (i === 0) {
-                                    insertIndex = await this.getQueueInsertIndex({
-                                        fallback: 1,
-                                        minimum: 1,
-                                        logPrefix: '[搜索]'
-                                    });
-                                }
-                                
-                                // 计算当前歌曲的插入位置（后续歌曲依次递增）
-                                const currentInsertIndex = insertIndex + i;
-                                
-                                const addResponse = await this.addSongToPlaylist(playlistId, song, currentInsertIndex);
-                                
-                                if (!addResponse?._error && addResponse?.status === 'OK') {
-                                    addedCount++;
-                                    if (useLocalSelectedPlaylistSync) {
-                                        playlistManager.insertSongIntoPlaylistCache(playlistId, song, currentInsertIndex);
-                                    }
-                                    console.log(`[搜索] ✓ 添加歌曲 (${i+1}/${songs.length}): ${song.title} 在位置 ${currentInsertIndex}`);
-                                } else if (addResponse?.duplicate) {
-                                    skippedCount++;
-                                    console.warn(`[搜索] 跳过重复歌曲: ${song.title}`);
-                                } else {
-                                    failedCount++;
-                                    console.warn(`[搜索] ✗ 添加歌曲失败: ${song.title}`, addResponse?.error || addResponse?.message || addResponse);
-                                }
-                            } catch (err) {
-                                failedCount++;
-                                console.warn(`[搜索] 添加歌曲异常: ${err.message}`);
-                            }
-                        }
+                        // 将所有歌曲一次性添加到歌单（保持原有顺序）
+                        const insertIndex = await this.getQueueInsertIndex({
+                            fallback: 1,
+                            minimum: 1,
+                            logPrefix: '[搜索]'
+                        });
+                        const { addedCount, skippedCount, failedCount } = await this.addSongsToPlaylist(
+                            playlistId,
+                            songs,
+                            insertIndex,
+                            { syncCache: useLocalSelectedPlaylistSync }
+                        );
+                        console.log(`[搜索] ✓ 目录批量添加: 新增 ${addedCount}，跳过重复 ${skippedCount}，位置 ${insertIndex}`);
 
                         const playlistName = this.getPlaylistDisplayName(playlistId);
                         this.notifyBulkAddResult({
@@ -1652,57 +1646,22 @@ export class SearchManager {
                         logPrefix: '[批量添加]'
                     });
 
-                    // 批量添加歌曲
-                    let addedCount = 0;
-                    let skippedCount = 0;
-                    let failedCount = 0;
-                    for (let i = 0; i < songs.length; i++) {
-                        const song = songs[i];
-                        const currentInsertIndex = insertIndex + i;
-
-                        try {
-                            // 准备歌曲数据
-                            const songData = {
-                                url: song.url,
-                                title: song.title || song.name || i18n.t('track.unknown'),
-                                type: song.type || 'local',
-                                duration: song.duration || 0,
-                                thumbnail_url: song.thumbnail_url || ''
-                            };
-
-                            const response = await this.addSongToPlaylist(playlistId, songData, currentInsertIndex);
-
-                            if (!response?._error && response?.status === 'OK') {
-                                addedCount++;
-                                if (useLocalSelectedPlaylistSync) {
-                                    playlistManager.insertSongIntoPlaylistCache(playlistId, songData, currentInsertIndex);
-                                }
-                                const processedCount = addedCount + skippedCount + failedCount;
-                                const progress = Math.round((processedCount / songs.length) * 100);
-                                searchLoading.show(i18n.t('search.batchAddProgress', { done: addedCount, total: songs.length, pct: progress }));
-                            } else if (response?.duplicate) {
-                                skippedCount++;
-                                const processedCount = addedCount + skippedCount + failedCount;
-                                const progress = Math.round((processedCount / songs.length) * 100);
-                                searchLoading.show(i18n.t('search.batchAddProgress', { done: addedCount, total: songs.length, pct: progress }));
-                                console.warn('[批量添加] 跳过重复歌曲:', songData.title);
-                            } else {
-                                failedCount++;
-                                const processedCount = addedCount + skippedCount + failedCount;
-                                const progress = Math.round((processedCount / songs.length) * 100);
-                                searchLoading.show(i18n.t('search.batchAddProgress', { done: addedCount, total: songs.length, pct: progress }));
-                                console.warn('[批量添加] 添加失败:', songData.title, response?.error || response?.message || response);
-                            }
-                        } catch (err) {
-                            failedCount++;
-                            const processedCount = addedCount + skippedCount + failedCount;
-                            const progress = Math.round((processedCount / songs.length) * 100);
-                            searchLoading.show(i18n.t('search.batchAddProgress', { done: addedCount, total: songs.length, pct: progress }));
-                            console.warn('[批量添加] 添加歌曲异常:', err);
-                        }
-
-                        // 避免请求过于频繁
-                        await new Promise(resolve => setTimeout(resolve, 50));
+                    // 批量添加歌曲（单次请求）
+                    const songDataList = songs.map((song) => ({
+                        url: song.url,
+                        title: song.title || song.name || i18n.t('track.unknown'),
+                        type: song.type || 'local',
+                        duration: song.duration || 0,
+                        thumbnail_url: song.thumbnail_url || ''
+                    }));
+                    const { addedCount, skippedCount, failedCount } = await this.addSongsToPlaylist(
+                        playlistId,
+                        songDataList,
+                        insertIndex,
+                        { syncCache: useLocalSelectedPlaylistSync }
+                    );
+                    if (skippedCount > 0) {
+                        console.warn(`[批量添加] 跳过重复歌曲 ${skippedCount} 首`);
                     }
 
                     searchLoading.hide();
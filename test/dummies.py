@@ -0,0 +1,205 @@
+import os
+import threading
+from types import SimpleNamespace
+
+from routers import websocket as websocket_router
+
+
+class DummyRequest:
+    def __init__(self, json_data=None, form_data=None, query_params=None, headers=None, client=None):
+        self._json_data = json_data or {}
+        self._form_data = form_data or {}
+        self.query_params = query_params or {}
+        self.headers = headers or {}
+        self.client = client
+
+    async def json(self):
+        return self._json_data
+
+    async def form(self):
+        return self._form_data
+
+
+class DummyDependencyRequest:
+    def __init__(self, *, room_id=None, pipe=None, path="/status"):
+        query_params = {}
+        if room_id is not None:
+            query_params["room_id"] = room_id
+        if pipe is not None:
+            query_params["pipe"] = pipe
+        self.query_params = query_params
+        self.url = SimpleNamespace(path=path)
+
+
+class DummyQueue:
+    def __init__(self, playlist_id="default", name="正在播放", songs=None):
+        self.id = playlist_id
+        self.name = name
+        self.songs = list(songs or [])
+        self.updated_at = 0
+        self.current_playing_index = -1
+
+
+class DummyPlayer:
+    def __init__(self, songs=None, current_meta=None, current_index=-1):
+        self.runtime_queue = DummyQueue(songs=songs)
+        self.current_meta = current_meta or {}
+        self.current_index = current_index
+        self.loop_mode = 0
+        self.shuffle_mode = False
+        self.pitch_shift = 0
+        self._lock = threading.RLock()
+        self.mpv_cmd = None
+        self.pipe_name = r"\\.\pipe\mpv-pipe"
+        self.pipe_ready = True
+        self.mpv_state = {
+            "pause": False,
+            "time-pos": 0,
+            "duration": 0,
+            "volume": 50,
+        }
+        self.local_file_tree = {"name": "root", "dirs": [], "files": []}
+        self.local_albums = []
+        self.local_search_max_results = 5
+        self.youtube_search_max_results = 8
+        self.youtube_url_extra_max = 16
+        self.music_dir = os.getcwd()
+        self.allowed_extensions = {".mp3", ".flac"}
+        self.config = {"LOCAL_VOLUME": "50"}
+        self.refresh_called = False
+
+    def get_runtime_queue(self):
+        self.runtime_queue.current_playing_index = self.current_index
+        return self.runtime_queue
+
+    def mpv_command(self, cmd, *_args, **_kwargs):
+        if cmd[:2] == ["set_property", "volume"] and len(cmd) >= 3:
+            self.mpv_state["volume"] = int(cmd[2])
+        return True
+
+    def mpv_get(self, property_name):
+        return self.mpv_state.get(property_name)
+
+    def search_local(self, query, max_results=20):
+        return [{"url": f"{query}.mp3", "title": query, "type": "local", "duration": 0}][:max_results]
+
+    def mpv_pipe_exists(self):
+        return self.pipe_ready
+
+    def ensure_mpv(self):
+        return True
+
+    def is_room_output_ready(self):
+        return True
+
+    def reset_pitch_shift(self):
+        self.pitch_shift = 0
+
+    def toggle_loop_mode(self):
+        self.loop_mode = (self.loop_mode + 1) % 3
+
+    def toggle_shuffle_mode(self):
+        self.shuffle_mode = not self.shuffle_mode
+
+    def set_pitch_shift(self, semitones):
+        self.pitch_shift = semitones
+
+    def play(self, song, **_kwargs):
+        self.current_meta = song.to_dict()
+        return True
+
+    def get_current_meta_snapshot(self):
+        return dict(self.current_meta)
+
+    def get_local_albums(self):
+        return list(self.local_albums)
+
+    def refresh_local_library_cache(self):
+        self.refresh_called = True
+        return list(self.local_albums)
+
+
+class DummyRoomPlayer(DummyPlayer):
+    def __init__(self, room_id):
+        super().__init__()
+        self._room_id = room_id
+        self._room_playlist_id = f"room_{room_id}"
+        self._pcm_pipe_name = rf"\\.\pipe\pcm-{room_id}"
+        self.runtime_queue.id = self._room_playlist_id
+        self.runtime_queue.name = f"Room {room_id}"
+        self.mpv_process = None
+        self.pipe_ready = False
+        self.started = False
+        self.destroyed = False
+
+    def start_room_mpv(self, pooled=None):
+        self.started = True
+        self.pooled = pooled
+        self.pipe_ready = True
+        self.mpv_process = SimpleNamespace(poll=lambda: None)
+        return True
+
+    def is_room_output_ready(self):
+        return self.pipe_ready
+
+    def destroy_room_player(self):
+        self.destroyed = True
+
+
+class DummyHistory:
+    def __init__(self, items):
+        self._items = list(items)
+        self.add_calls = []
+
+    def get_all(self):
+        return list(self._items)
+
+    def add_to_history(self, *args, **kwargs):
+        self.add_calls.append((args, kwargs))
+
+    def remove_by_url(self, url):
+        before = len(self._items)
+        self._items = [item for item in self._items if item.get("url") != url]
+        return len(self._items) != before
+
+
+class DummyWebSocket:
+    def __init__(self, query_params=None):
+        self.accepted = False
+        self.closed = None
+        self.messages = []
+        self.query_params = query_params or {}
+        self.receive_count = 0
+
+    async def accept(self):
+        self.accepted = True
+
+    async def send_json(self, message):
+        self.messages.append(message)
+
+    async def close(self, code=1000, reason=""):
+        self.closed = {"code": code, "reason": reason}
+
+    async def receive_text(self):
+        self.receive_count += 1
+        raise websocket_router.WebSocketDisconnect()
+
+
+class DummyWsManager:
+    def __init__(self):
+        self.connected = []
+        self.disconnected = []
+
+    async def connect(self, websocket, room_id=None):
+        self.connected.append((websocket, room_id))
+
+    def disconnect(self, websocket):
+        self.disconnected.append(websocket)
+
+
+def get_route(router_obj, path, method):
+    routes = router_obj.routes if hasattr(router_obj, "routes") else router_obj
+    for route in routes:
+        if getattr(route, "path", None) == path and method in getattr(route, "methods", set()):
+            return route
+    raise AssertionError(f"route not found: {method} {path}")
@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+from routers import settings as settings_router
+
+
+def test_access_log_middleware_samples_by_route_and_keeps_stats(caplog):
+    import logging
+
+    from models.access_log import AccessLogMiddleware, AccessLogSampler
+    from routers import settings as settings_router
+
+    sampler = AccessLogSampler(sampled_routes={"/room/{room_id}/status"}, sample_rate=0.25)
+    assert sampler.sample_every == 4
+
+    async def app(scope, receive, send):
+        scope["route"] = SimpleNamespace(path="/room/{room_id}/status" if "status" in scope["path"] else "/play")
+        await send({"type": "http.response.start", "status": 200 if scope["path"] != "/boom" else 503})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = AccessLogMiddleware(app, sampler=sampler)
+
+    async def noop_send(message):
+        pass
+
+    async def run():
+        for _ in range(9):
+            await middleware({"type": "http", "method": "GET", "path": "/room/a/status"}, None, noop_send)
+        await middleware({"type": "http", "method": "POST", "path": "/boom"}, None, noop_send)
+
+    with caplog.at_level(logging.INFO, logger="clubmusic.access"):
+        asyncio.run(run())
+
+    messages = [r.getMessage() for r in caplog.records if r.name == "clubmusic.access"]
+    # 确定性采样：第 1、5、9 个轮询请求记录日志；非高频路由每次都记录
+    assert len([m for m in messages if "/room/{room_id}/status" in m]) == 3
+    assert any(m.startswith("POST /play 503") for m in messages)
+
+    stats = {(s["method"], s["route"]): s for s in sampler.snapshot()}
+    polled = stats[("GET", "/room/{room_id}/status")]
+    assert (polled["count"], polled["logged"], polled["sampled_out"]) == (9, 3, 6)
+    assert stats[("POST", "/play")]["server_errors"] == 1
+
+    payload = asyncio.run(settings_router.diagnostic_access())
+    assert payload["status"] == "OK" and isinstance(payload["routes"], list)
+
+    # 默认配置即对房间与歌单轮询采样
+    from models.logger import DEFAULT_FILTERED_PATHS
+    assert {"/room/{room_id}/status", "/room/list", "/playlist", "/playlists"} <= DEFAULT_FILTERED_PATHS
+    assert {"/room/{room_id}/status", "/playlist"} <= AccessLogSampler().sampled_routes
@@ -0,0 +1,123 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from models.playlists import Playlists
+
+
+def test_auto_fill_pool_rebuilds_changed_sources_and_weights_recent_plays(tmp_path):
+    import random as _random
+
+    from models.auto_fill import AutoFillCandidatePool, IdleTrigger, history_weight
+    from models.playlist import PlayHistory
+    from models.scheduler import TaskScheduler
+
+    playlists = Playlists(str(tmp_path / "playlists.json"))
+    mix = playlists.create_playlist("Mix")
+    mix.add_songs([{"url": f"song-{i}.mp3", "title": f"Song {i}"} for i in range(20)])
+    tree = {"files": [{"rel": "song-0.mp3", "name": "song-0.mp3"}], "dirs": [{"files": [{"rel": "deep/x.mp3"}], "dirs": []}]}
+    history = PlayHistory(max_size=50)
+    pool = AutoFillCandidatePool(playlists, history, tree_fn=lambda: tree,
+                                 skip_playlist_fn=lambda pid: pid == "default")
+
+    assert len(pool.candidates()) == 21
+    rebuilds = pool.rebuilds
+    assert len(pool.candidates()) == 21 and pool.rebuilds == rebuilds
+
+    history.add_to_history("https://www.youtube.com/watch?v=abc", "Net", is_local=False)
+    assert len(pool.candidates()) == 22
+    assert pool.rebuilds == rebuilds + 1  # 只重建历史来源
+
+    # 刚播放过的歌曲权重降到最低
+    history.add_to_history("song-3.mp3", "Song 3", is_local=True)
+    weight = history_weight(history)
+    assert weight({"url": "song-3.mp3"}) < weight({"url": "song-4.mp3"}) == 1.0
+    rng = _random.Random(7)
+    picks = [song["url"] for _ in range(200) for song in pool.sample(5, weight, rng)]
+    assert len({song["url"] for song in pool.sample(10, weight, rng)}) == 10
+    assert picks.count("song-3.mp3") < picks.count("song-4.mp3")
+
+    # 空闲触发器：仅在空闲时计时，恢复播放即取消
+    scheduler = TaskScheduler(max_workers=1, name="TestAutoFill")
+    idle = {"value": True}
+    fired = threading.Event()
+    trigger = IdleTrigger(lambda: idle["value"], fired.set, idle_seconds=0.05, scheduler=scheduler)
+    trigger.notify()
+    assert trigger.armed
+    idle["value"] = False
+    trigger.notify()
+    assert not trigger.armed
+    idle["value"] = True
+    trigger.notify()
+    assert fired.wait(2)
+    idle["value"] = False
+    scheduler.shutdown()
+
+
+def test_auto_fill_ready_set_prevalidates_and_skips_unavailable(tmp_path):
+    from models.auto_fill import AutoFillCandidatePool, AutoFillReadySet, validate_song
+    from models.scheduler import TaskScheduler
+
+    (tmp_path / "ok.mp3").write_bytes(b"")
+    songs = [
+        {"url": "ok.mp3", "title": "OK", "type": "local"},
+        {"url": "gone.mp3", "title": "Gone", "type": "local"},
+        {"url": "flagged.mp3", "title": "Flagged", "type": "local", "unavailable": True},
+    ]
+    playlists = SimpleNamespace(get_all=lambda: [SimpleNamespace(id="mix", songs=songs, updated_at=1)])
+    pool = AutoFillCandidatePool(playlists)
+    scheduler = TaskScheduler(max_workers=1, name="TestReadySet")
+    validated = []
+
+    def validate(song):
+        validated.append(song["url"])
+        return validate_song(song, music_dir=str(tmp_path))
+
+    ready_set = AutoFillReadySet(pool, validate_fn=validate, size=2, scheduler=scheduler)
+    assert ready_set.refresh() == 1
+    assert [song["url"] for song in ready_set.ready_songs()] == ["ok.mp3"]
+    assert "flagged.mp3" not in validated
+    assert ready_set.is_unavailable({"url": "gone.mp3"})
+
+    # 就绪歌曲优先，不可用歌曲不会被抽中
+    assert [song["url"] for song in ready_set.take(3)] == ["ok.mp3"]
+    assert ready_set.ready_songs() == []
+    scheduler.shutdown()
+
+
+def test_auto_fill_ready_set_backs_off_transient_failures_and_blocks_definitive_ones(monkeypatch):
+    import models.auto_fill as auto_fill
+    from models.auto_fill import AutoFillCandidatePool, AutoFillReadySet
+    from models.scheduler import TaskScheduler
+    from models.url_cache import FAILURE_UNAVAILABLE, classify_ytdlp_error
+
+    assert classify_ytdlp_error("ERROR: [youtube] abc: Video unavailable. This video has been removed") == "unavailable"
+    assert classify_ytdlp_error("ERROR: Unable to download webpage: HTTP Error 429: Too Many Requests") == "transient"
+    assert classify_ytdlp_error("timeout") == "transient"
+
+    songs = [
+        {"url": "https://www.youtube.com/watch?v=flakyflaky1", "title": "Flaky", "type": "youtube"},
+        {"url": "https://www.youtube.com/watch?v=removedvid1", "title": "Removed", "type": "youtube"},
+    ]
+    playlists = SimpleNamespace(get_all=lambda: [SimpleNamespace(id="mix", songs=songs, updated_at=1)])
+    scheduler = TaskScheduler(max_workers=1, name="TestReadySetBackoff")
+    results = {songs[0]["url"]: (False, None), songs[1]["url"]: (False, FAILURE_UNAVAILABLE)}
+    ready_set = AutoFillReadySet(
+        AutoFillCandidatePool(playlists), validate_fn=lambda song: results[song["url"]], size=2, scheduler=scheduler,
+    )
+    now = time.time()
+    monkeypatch.setattr(auto_fill.time, "time", lambda: now)
+
+    assert ready_set.refresh() == 0
+    assert ready_set._unavailable[songs[0]["url"]] == now + auto_fill.TRANSIENT_RETRY_SECONDS
+    assert ready_set._unavailable[songs[1]["url"]] == now + auto_fill.UNAVAILABLE_TTL_SECONDS
+
+    # 连续暂时性失败翻倍退避，封顶后不再增长；成功后计数清零
+    for _ in range(8):
+        ready_set.mark_failed(songs[0]["url"])
+    assert ready_set._unavailable[songs[0]["url"]] == now + auto_fill.TRANSIENT_RETRY_MAX_SECONDS
+    now += auto_fill.TRANSIENT_RETRY_MAX_SECONDS + 1
+    results[songs[0]["url"]] = (True, now + 3600)
+    assert ready_set.refresh() == 1
+    assert songs[0]["url"] not in ready_set._transient_failures
+    scheduler.shutdown()
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from models.api_contracts import PlaybackHistoryMergedResponse
+from routers import history as history_router
+
+from dummies import DummyRequest, DummyPlayer
+
+
+def test_playback_history_etag_follows_history_version():
+    from models.playlist import PlayHistory
+
+    history = PlayHistory(max_size=10)
+    history.add_to_history("a.mp3", "A", is_local=True)
+    player = DummyPlayer()
+    player.playback_history = history
+
+    first = asyncio.run(history_router.get_playback_history(player, DummyRequest()))
+    etag = first.headers["etag"]
+    cached = asyncio.run(
+        history_router.get_playback_history(player, DummyRequest(headers={"if-none-match": etag}))
+    )
+    assert cached.status_code == 304
+
+    version = history.version
+    history.add_to_history("b.mp3", "B", is_local=True)
+    assert history.version > version
+
+    merged = asyncio.run(
+        history_router.get_playback_history_merged(player, DummyRequest(headers={"if-none-match": etag}))
+    )
+    assert merged.status_code == 200
+    assert json.loads(merged.body)["count"] == 2
+
+
+def test_play_history_moves_to_front_and_debounces_saves(tmp_path, monkeypatch):
+    from models.playlist import PlayHistory
+
+    history_file = tmp_path / "playback_history.json"
+    # 旧版文件：timestamps 为逗号分隔字符串
+    history_file.write_text(json.dumps([
+        {"url": "b.mp3", "title": "B", "type": "local", "play_count": 2, "ts": 20, "timestamps": "10,20"},
+        {"url": "a.mp3", "title": "A", "type": "local", "play_count": 1, "ts": 5, "timestamps": "5"},
+    ]), encoding="utf-8")
+    monkeypatch.setattr(PlayHistory, "SAVE_DEBOUNCE_SECONDS", 60.0)
+
+    history = PlayHistory(max_size=3, file_path=str(history_file))
+    history.load()
+    assert history.get_play_timestamps("b.mp3") == [10, 20]
+
+    history.add_to_history("a.mp3", "A", is_local=True)
+    history.add_to_history("c.mp3", "C", is_local=True)
+    history.add_to_history("d.mp3", "D", is_local=True)
+    items = history.get_all()
+    assert [item["url"] for item in items] == ["d.mp3", "c.mp3", "a.mp3"]
+    assert items[2]["play_count"] == 2
+    assert items[2]["timestamps"].startswith("5,")
+
+    # 延迟保存：多次播放只在 flush 时写盘一次
+    assert json.loads(history_file.read_text(encoding="utf-8"))[0]["url"] == "b.mp3"
+    history.flush()
+    saved = json.loads(history_file.read_text(encoding="utf-8"))
+    assert [item["url"] for item in saved] == ["d.mp3", "c.mp3", "a.mp3"]
+    assert saved[2]["timestamps"][0] == 5 and isinstance(saved[2]["timestamps"][1], int)
+
+    reloaded = PlayHistory(max_size=3, file_path=str(history_file))
+    reloaded.load()
+    assert reloaded.get_play_timestamps("a.mp3") == saved[2]["timestamps"]
+
+
+def test_merged_history_is_paginated_and_rebuilt_incrementally():
+    from models.playlist import PlayHistory
+
+    history = PlayHistory(max_size=10)
+    for name in ("a", "b", "c", "a"):
+        history.add_to_history(f"{name}.mp3", name.upper(), is_local=True)
+    player = DummyPlayer()
+    player.playback_history = history
+
+    full = asyncio.run(history_router.get_playback_history_merged(player))
+    assert [item["url"] for item in full["history"]] == ["a.mp3", "c.mp3", "b.mp3"]
+    assert full["count"] == 3 and "offset" not in full
+
+    page = asyncio.run(history_router.get_playback_history_merged(player, None, offset=1, limit=1))
+    validated = PlaybackHistoryMergedResponse(**page)
+    assert [item.url for item in validated.history] == ["c.mp3"]
+    assert (validated.count, validated.offset, validated.limit, validated.next_offset) == (3, 1, 1, 2)
+
+    # 只有变更过的条目会重新生成字典
+    cached_c = history.get_page(1, 1)[0]
+    assert history.update_latest("a.mp3", title="A (live)")
+    assert not history.update_latest("c.mp3", title="ignored")
+    items = history.get_all()
+    assert items[0]["title"] == "A (live)"
+    assert items[1] is cached_c
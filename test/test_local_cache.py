@@ -0,0 +1,91 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from models.player import MusicPlayer
+
+
+def test_local_audio_cache_copies_upcoming_tracks_and_plays_cached_copy(tmp_path, monkeypatch):
+    import models.local_cache as local_cache_module
+    from models.local_cache import LocalAudioCache
+    from models.song import LocalSong
+
+    share = tmp_path / "share"
+    share.mkdir()
+    for name in ("a.flac", "b.flac", "c.flac"):
+        (share / name).write_bytes(name.encode() * 100)  # 600 字节
+
+    cache = LocalAudioCache(cache_dir=str(tmp_path / "ssd"), max_bytes=1300, prefetch_count=2, bandwidth_bytes=0)
+    assert cache.ensure_cached(str(share), "a.flac") and cache.ensure_cached(str(share), "b.flac")
+    cached = cache.lookup("a.flac", os.stat(share / "a.flac"))
+    assert cached and open(cached, "rb").read() == (share / "a.flac").read_bytes()
+
+    # 超出总字节上限时淘汰最久未使用的副本（b 比刚访问过的 a 更旧）
+    cache.ensure_cached(str(share), "c.flac")
+    assert cache.lookup("b.flac", os.stat(share / "b.flac")) is None
+    assert cache.total_bytes() == 1200 and cache.evictions == 1
+
+    # 源文件变化（mtime/size）后副本失效；索引持久化，重启后仍可命中
+    (share / "c.flac").write_bytes(b"changed")
+    assert cache.lookup("c.flac", os.stat(share / "c.flac")) is None
+    reopened = LocalAudioCache(cache_dir=str(tmp_path / "ssd"), bandwidth_bytes=0)
+    assert reopened.lookup("a.flac", os.stat(share / "a.flac")) == cached
+
+    monkeypatch.setattr(local_cache_module, "local_cache", reopened)
+    commands = []
+    song = LocalSong(file_path="a.flac")
+    assert song.play(lambda cmd: commands.append(cmd) or True, None, None, save_to_history=False, music_dir=str(share))
+    assert ["loadfile", cached, "replace"] in commands
+
+
+def test_local_song_outside_music_dir_plays_without_gain_or_cache_lookup(tmp_path, monkeypatch):
+    import ntpath
+
+    import models.song as song_module
+    from models.song import LocalSong, library_relpath
+
+    music_dir = tmp_path / "music"
+    music_dir.mkdir()
+    other = tmp_path / "other" / "x.mp3"
+    other.parent.mkdir()
+    other.write_bytes(b"")
+
+    assert library_relpath(str(music_dir / "a" / "b.mp3"), str(music_dir)) == "a/b.mp3"
+    assert library_relpath(str(other), str(music_dir)) is None
+    with pytest.raises(ValueError):
+        ntpath.relpath(r"C:\music\x.mp3", r"Z:\library")
+
+    # Windows 跨盘符：relpath 抛 ValueError，播放仍应成功并直接加载原文件
+    def cross_drive_relpath(path, start=os.curdir):
+        return ntpath.relpath(r"C:\music\x.mp3", r"Z:\library")
+
+    monkeypatch.setattr(song_module.os.path, "relpath", cross_drive_relpath)
+    commands = []
+    song = LocalSong(file_path=str(other))
+    assert song.play(lambda cmd: commands.append(cmd) or True, None, None, save_to_history=False, music_dir=str(music_dir))
+    assert ["loadfile", str(other), "replace"] in commands
+
+
+def test_local_cache_prefetch_skips_files_outside_music_dir(tmp_path, monkeypatch):
+    import models.local_cache as local_cache_module
+
+    music_dir = tmp_path / "music"
+    scheduled = []
+    monkeypatch.setattr(local_cache_module, "local_cache", SimpleNamespace(
+        enabled=True, prefetch_count=5,
+        schedule_prefetch=lambda root, rels: scheduled.append((root, rels)),
+    ))
+    player = object.__new__(MusicPlayer)
+    player.music_dir = str(music_dir)
+    songs = [
+        {"url": "current.mp3", "type": "local"},
+        {"url": str(music_dir / "a" / "in.mp3"), "type": "local"},
+        {"url": str(tmp_path / "elsewhere.mp3"), "type": "local"},
+        {"url": "https://www.youtube.com/watch?v=abcdefghijk", "type": "youtube"},
+        {"url": "b\\rel.mp3", "type": "local"},
+    ]
+
+    player._prefetch_local_cache(songs, 0)
+
+    assert scheduled == [(str(music_dir), ["a/in.mp3", "b/rel.mp3"])]
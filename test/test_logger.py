@@ -0,0 +1,40 @@
+
+
+
+def test_structured_logging_levels_and_async_queue_handler():
+    import logging
+    import logging.handlers
+    import queue
+
+    from models.logger import AsyncQueueHandler, apply_logger_levels, parse_logger_levels
+
+    assert parse_logger_levels("models.player.ipc=debug, bad, x=NOPE, models.song = WARNING") == {
+        "models.player.ipc": "DEBUG",
+        "models.song": "WARNING",
+    }
+
+    class Lazy:
+        formatted = 0
+
+        def __str__(self):
+            Lazy.formatted += 1
+            return "lazy"
+
+    name = "test.structured.ipc"
+    apply_logger_levels({name: "WARNING"})
+    target = logging.getLogger(name)
+    target.propagate = False
+    log_queue = queue.SimpleQueue()
+    handler = AsyncQueueHandler(log_queue)
+    target.addHandler(handler)
+    try:
+        # 被子系统级别过滤的日志不做格式化
+        target.debug("value=%s", Lazy())
+        assert Lazy.formatted == 0 and log_queue.empty()
+
+        target.warning("value=%s", Lazy())
+        record = log_queue.get_nowait()
+        assert (record.msg, record.args, Lazy.formatted) == ("value=lazy", None, 1)
+    finally:
+        target.removeHandler(handler)
+        target.setLevel(logging.NOTSET)
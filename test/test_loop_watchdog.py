@@ -0,0 +1,30 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+
+def test_loop_watchdog_attributes_blocking_call_to_route():
+    from models.loop_watchdog import LoopWatchdog
+
+    watchdog = LoopWatchdog(threshold_ms=50, interval=0.01, enabled=True)
+
+    def blocking_helper():
+        time.sleep(0.25)
+
+    async def endpoint(scope):
+        blocking_helper()
+
+    async def main():
+        watchdog.start(asyncio.get_running_loop())
+        await asyncio.sleep(0.05)
+        await endpoint({"type": "http", "path": "/search_song", "route": SimpleNamespace(path="/search_song")})
+        await asyncio.sleep(0.1)
+        watchdog.stop()
+
+    asyncio.run(main())
+    offenders = watchdog.offenders()
+    assert watchdog.total_blocks >= 1
+    worst = offenders[0]
+    assert worst["route"] == "/search_song"
+    assert "in blocking_helper" in worst["site"] and worst["max_ms"] >= 150
+    assert any("time.sleep(0.25)" in line for line in worst["stack"])
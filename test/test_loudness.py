@@ -0,0 +1,55 @@
+import os
+
+
+def test_loudness_parses_ebur128_and_stores_gain_in_tag_index(tmp_path, monkeypatch):
+    import models.loudness as loudness_module
+    from models.loudness import compute_gain_db, parse_ebur128_summary, LoudnessAnalyzer
+    from models.tag_index import TagIndex
+
+    stderr = (
+        "[Parsed_ebur128_0 @ 0x1] t: 0.4  TARGET:-23 LUFS    M: -20.1 S:-120.7     I: -19.0 LUFS\n"
+        "[Parsed_ebur128_0 @ 0x1] Summary:\n\n"
+        "  Integrated loudness:\n    I:          -9.5 LUFS\n    Threshold: -19.6 LUFS\n\n"
+        "  True peak:\n    Peak:        -0.3 dBFS\n"
+    )
+    assert parse_ebur128_summary(stderr) == {"lufs": -9.5, "peak": -0.3}
+    assert parse_ebur128_summary("Summary:\n    I:         -inf LUFS\n") is None
+    # 响亮的曲目降低增益；安静的曲目提升增益但受峰值与最大增益限制
+    assert compute_gain_db(-9.5, -0.3, target_lufs=-16) == -6.5
+    assert compute_gain_db(-24.0, -4.0, target_lufs=-16) == 3.0
+    assert compute_gain_db(-40.0, None, target_lufs=-16) == 12.0
+
+    analyzer = LoudnessAnalyzer(cache_file=str(tmp_path / "loudness.json"), ffmpeg_fn=lambda: "ffmpeg")
+    analyzer.enabled, analyzer.target_lufs = True, -16.0
+    monkeypatch.setattr(loudness_module, "loudness", analyzer)
+    analyzed = []
+
+    def fake_analyze(ffmpeg, source, timeout=None):
+        analyzed.append(os.path.basename(source))
+        return {"lufs": -20.0, "peak": -6.0} if source.endswith("a.mp3") else None
+
+    monkeypatch.setattr(loudness_module, "analyze_loudness", fake_analyze)
+    (tmp_path / "a.mp3").write_bytes(b"x")
+    (tmp_path / "b.mp3").write_bytes(b"y")
+    index = TagIndex(workers=0)
+    index.scan(str(tmp_path), ["a.mp3", "b.mp3"])
+    assert index.get("a.mp3")["lufs"] == -20.0 and index.get("b.mp3")["lufs"] is None
+    # 已分析（包括分析失败）的文件不重复分析
+    index.scan(str(tmp_path), ["a.mp3", "b.mp3"])
+    assert sorted(analyzed) == ["a.mp3", "b.mp3"]
+
+    commands = []
+    analyzer.apply_gain(lambda cmd: commands.append(cmd) or True, analyzer.gain_for(index.get("a.mp3")))
+    analyzer.apply_gain(lambda cmd: commands.append(cmd) or True, analyzer.video_gain("unknown"))
+    assert commands == [
+        ["af", "add", "@trackgain:lavfi=[volume=4.00dB]"],
+        ["af", "remove", "@trackgain"],
+    ]
+
+    # YouTube：首次播放后台分析，按 video_id 缓存并持久化
+    analyzer._analyze_video("vid123", "https://cdn.example/a.mp3")
+    assert analyzer.video_gain("vid123") == 4.0
+    analyzer.shutdown()
+    reloaded = LoudnessAnalyzer(cache_file=str(tmp_path / "loudness.json"))
+    reloaded.load()
+    assert reloaded._videos["vid123"]["lufs"] == -20.0
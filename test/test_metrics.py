@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+from routers import settings as settings_router
+
+
+def test_metrics_registry_merges_thread_shards_and_renders_prometheus_text():
+    from models.metrics import MetricsRegistry
+    from routers import settings as settings_router
+
+    registry = MetricsRegistry()
+    counter = registry.counter("test_events_total", "events", ("kind",))
+    histogram = registry.histogram("test_latency_seconds", "latency", ("op",), buckets=(0.1, 1.0))
+    registry.gauge("test_rooms", "rooms", lambda: {"a": 2}, ("room",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc("hit")
+        histogram.observe(0.05, "get")
+        histogram.observe(0.1, "get")
+        histogram.observe(5.0, "get")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    counter.inc("miss", value=3)
+
+    # 已退出线程的分片并入汇总，计数不丢失
+    assert counter.value("hit") == 4000 and counter.value("miss") == 3
+    assert histogram.count("get") == 12
+    text = registry.render()
+    assert "# TYPE test_events_total counter" in text
+    assert 'test_events_total{kind="hit"} 4000' in text
+    assert 'test_latency_seconds_bucket{op="get",le="0.1"} 8' in text
+    assert 'test_latency_seconds_bucket{op="get",le="+Inf"} 12' in text
+    assert 'test_rooms{room="a"} 2' in text
+
+    response = asyncio.run(settings_router.metrics())
+    body = response.body.decode("utf-8")
+    assert "# TYPE clubmusic_mpv_ipc_seconds histogram" in body
+    assert "# TYPE clubmusic_rooms gauge" in body
@@ -1,8 +1,13 @@
 import errno
 import json
 import logging
+import os
+import socket
+import time
 from types import SimpleNamespace
 
+import pytest
+
 from models.player import MusicPlayer
 import models.player as player_model
 
@@ -96,4 +101,76 @@ def test_room_mpv_request_skips_when_player_stopped(monkeypatch):
 
     monkeypatch.setattr("builtins.open", fail_open)
 
-    assert player.mpv_request({"command": ["get_property", "pause"], "request_id": 1}) is None
\ No newline at end of file
+    assert player.mpv_request({"command": ["get_property", "pause"], "request_id": 1}) is None
+
+
+@pytest.mark.skipif(os.name == "nt" or not hasattr(socket, "AF_UNIX"), reason="需要 Unix socket")
+def test_room_player_talks_to_mpv_over_unix_socket_transport(tmp_path):
+    from benchmarks.fake_mpv import FakeMpvServer
+    from models.mpv_ipc import UnixSocketTransport, transport_for
+
+    player = _make_room_player("bench-room")
+    player._req_id = 0
+    player.pipe_name = str(tmp_path / "bench-room.sock")
+    assert isinstance(transport_for(player.pipe_name), UnixSocketTransport)
+    assert player._pipe_exists(player.pipe_name) is False
+
+    with FakeMpvServer(player.pipe_name, latency_ms=1) as server:
+        assert player._pipe_exists(player.pipe_name) is True
+        assert player.mpv_command(["set_property", "volume", 42]) is True
+        deadline = time.time() + 2
+        while server.properties["volume"] != 42 and time.time() < deadline:
+            time.sleep(0.01)
+        assert player.mpv_get("volume") == 42
+        assert player.mpv_get("no-such-property") is None
+        assert server.commands == 3
+
+    # MPV 崩溃留下的 socket 文件（无人监听）不算存在
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(player.pipe_name)
+    stale.close()
+    assert os.path.exists(player.pipe_name)
+    assert player._pipe_exists(player.pipe_name) is False
+
+
+@pytest.mark.skipif(os.name == "nt" or not hasattr(os, "mkfifo"), reason="需要 FIFO")
+def test_room_output_ready_requires_a_fifo_without_opening_it(tmp_path, monkeypatch):
+    player = _make_room_player("pcm-room")
+    player._pcm_pipe_name = str(tmp_path / "pcm-room.pcm")
+    assert player.is_room_output_ready() is False
+
+    # 只检查文件类型：打开写端再关闭会让读端收到 EOF
+    os.mkfifo(player._pcm_pipe_name)
+    reader = os.open(player._pcm_pipe_name, os.O_RDONLY | os.O_NONBLOCK)
+    opened = []
+    real_open = os.open
+    monkeypatch.setattr(os, "open", lambda path, *args: opened.append(path) or real_open(path, *args))
+    try:
+        assert player.is_room_output_ready() is True
+        assert opened == []
+    finally:
+        monkeypatch.undo()
+        os.close(reader)
+    assert player.is_room_output_ready() is True
+
+    # socket 或普通文件不能作为 PCM 输出
+    os.unlink(player._pcm_pipe_name)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        listener.bind(player._pcm_pipe_name)
+        listener.listen(1)
+        assert player.is_room_output_ready() is False
+    finally:
+        listener.close()
+    os.unlink(player._pcm_pipe_name)
+    (tmp_path / "pcm-room.pcm").write_bytes(b"")
+    assert player.is_room_output_ready() is False
+
+
+def test_room_id_from_ipc_path_ignores_prewarm_pool_paths():
+    from models.mpv_ipc import pool_ipc_path, room_id_from_ipc_path, room_ipc_path
+
+    assert room_id_from_ipc_path(room_ipc_path("lobby")) == "lobby"
+    assert room_id_from_ipc_path(pool_ipc_path("123-1")) == ""
+    assert room_id_from_ipc_path(r"\\.\pipe\mpv-ipc-pool-123-1") == ""
+    assert room_id_from_ipc_path(r"\\.\pipe\mpv-ipc-lobby") == "lobby"
@@ -0,0 +1,43 @@
+import asyncio
+
+from routers import history as history_router
+
+
+def test_play_stats_store_records_history_plays_and_serves_queries(tmp_path, monkeypatch):
+    from models import playlist as playlist_module
+    from models.play_stats import PlayEventStore
+    from models.playlist import PlayHistory
+
+    store = PlayEventStore()
+    monkeypatch.setattr(playlist_module, "play_stats", store)
+    monkeypatch.setattr(history_router, "play_stats", store)
+
+    unavailable = asyncio.run(history_router.get_playback_stats_top())
+    assert unavailable.status_code == 503
+
+    store.open(str(tmp_path / "play_events.db"))
+    main_history = PlayHistory(max_size=10)
+    room_history = PlayHistory(max_size=10, room_id="room-a")
+    main_history.add_to_history("a.mp3", "A", is_local=True)
+    main_history.add_to_history("a.mp3", "A", is_local=True)
+    main_history.add_to_history("b.mp3", "B", is_local=True)
+    room_history.add_to_history("b.mp3", "B", is_local=True)
+    store.record("old.mp3", "Old", ts=1)
+
+    top = asyncio.run(history_router.get_playback_stats_top(days=7, limit=5))
+    assert {song["url"]: song["plays"] for song in top["songs"]} == {"a.mp3": 2, "b.mp3": 2}
+    room_top = asyncio.run(history_router.get_playback_stats_top(days=7, room_id="room-a"))
+    assert [song["url"] for song in room_top["songs"]] == ["b.mp3"]
+    for bad_limit in (0, -5):
+        clamped = asyncio.run(history_router.get_playback_stats_top(days=7, limit=bad_limit))
+        assert len(clamped["songs"]) == 1
+
+    hourly = asyncio.run(history_router.get_playback_stats_hourly(days=0))
+    assert len(hourly["hours"]) == 24 and hourly["total"] == 5
+
+    rooms = asyncio.run(history_router.get_playback_stats_rooms(days=7))
+    assert {room["room_id"]: room["plays"] for room in rooms["rooms"]} == {"": 3, "room-a": 1}
+
+    # 已有数据时不会重复导入
+    assert store.backfill_from_history(main_history) == 0
+    store.close()
@@ -0,0 +1,184 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from models.api_contracts import PlaylistQueryResponse
+from models.playlists import Playlist, Playlists
+from routers import playlist as playlist_router
+
+from dummies import DummyRequest, DummyPlayer, DummyRoomPlayer
+
+
+def test_get_current_playlist_returns_304_when_etag_matches():
+    room_player = DummyRoomPlayer("room-etag")
+    room_player.runtime_queue.songs = [{"url": "etag.mp3", "title": "ETag", "type": "local"}]
+    room_player.runtime_queue.updated_at = 100.0
+    shared_playlists = SimpleNamespace(get_playlist=lambda playlist_id: None)
+
+    def _fetch(headers=None):
+        return asyncio.run(
+            playlist_router.get_current_playlist(
+                request=DummyRequest(headers=headers or {}),
+                playlist_id="default",
+                player=room_player,
+                playlists=shared_playlists,
+            )
+        )
+
+    first = _fetch()
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert json.loads(first.body)["playlist"][0]["url"] == "etag.mp3"
+
+    assert _fetch({"if-none-match": etag}).status_code == 304
+
+    room_player.runtime_queue.songs.append({"url": "etag-2.mp3", "title": "ETag 2", "type": "local"})
+    room_player.runtime_queue.updated_at = 101.0
+    changed = _fetch({"if-none-match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(json.loads(changed.body)["playlist"]) == 2
+
+
+def test_get_current_playlist_etag_changes_for_same_tick_same_length_edits():
+    room_player = DummyRoomPlayer("room-tick")
+    queue = Playlist(
+        playlist_id=room_player._room_playlist_id,
+        songs=[{"url": f"{name}.mp3", "title": name, "type": "local"} for name in ("a", "b", "c")],
+        updated_at=100.0,
+    )
+    room_player.runtime_queue = queue
+    shared_playlists = SimpleNamespace(get_playlist=lambda playlist_id: None)
+
+    def _fetch():
+        response = asyncio.run(
+            playlist_router.get_current_playlist(
+                request=DummyRequest(headers={}),
+                playlist_id="default",
+                player=room_player,
+                playlists=shared_playlists,
+            )
+        )
+        return response.headers["etag"], [song["url"] for song in json.loads(response.body)["playlist"]]
+
+    etag, urls = _fetch()
+    assert urls == ["a.mp3", "b.mp3", "c.mp3"]
+
+    # loop_mode=2 的出队再入队 + 同一时钟刻度内的移动：长度与 updated_at 都不变
+    queue.songs.append(queue.songs.pop(0))
+    queue.updated_at = 100.0
+    rotated_etag, urls = _fetch()
+    assert rotated_etag != etag and urls == ["b.mp3", "c.mp3", "a.mp3"]
+
+    queue.songs[0], queue.songs[1] = queue.songs[1], queue.songs[0]
+    queue.updated_at = 100.0
+    moved_etag, urls = _fetch()
+    assert moved_etag not in (etag, rotated_etag) and urls == ["c.mp3", "b.mp3", "a.mp3"]
+
+
+def test_get_current_playlist_supports_offset_and_window_pagination():
+    room_player = DummyRoomPlayer("room-page")
+    room_player.runtime_queue.songs = [
+        {"url": f"song-{i}.mp3", "title": f"Song {i}", "type": "local"} for i in range(20000)
+    ]
+    room_player.current_index = 10000
+    shared_playlists = SimpleNamespace(get_playlist=lambda playlist_id: None)
+
+    first_page = asyncio.run(
+        playlist_router.get_current_playlist(
+            request=None,
+            playlist_id="default",
+            player=room_player,
+            playlists=shared_playlists,
+            offset=0,
+            limit=50,
+        )
+    )
+    validated = PlaylistQueryResponse(**first_page)
+    assert validated.total == 20000
+    assert len(validated.playlist) == 50
+    assert validated.next_offset == 50
+
+    window = asyncio.run(
+        playlist_router.get_current_playlist(
+            request=None,
+            playlist_id="default",
+            player=room_player,
+            playlists=shared_playlists,
+            limit=10,
+            around_current=True,
+        )
+    )
+    assert window["offset"] == 9995
+    assert window["playlist"][5]["url"] == "song-10000.mp3"
+
+
+def test_playlist_batch_applies_operations_once_and_is_transactional(monkeypatch):
+    from models.api_contracts import PlaylistBatchRequest, PlaylistBatchResponse
+
+    broadcasts = []
+
+    async def fake_broadcast(player, playlist_updated=False):
+        broadcasts.append(playlist_updated)
+
+    monkeypatch.setattr(playlist_router, "_broadcast_state", fake_broadcast)
+    player = DummyPlayer(songs=[{"url": "a"}, {"url": "b"}, {"url": "c"}], current_index=1)
+    shared_playlists = SimpleNamespace(get_playlist=lambda playlist_id: None)
+
+    payload = PlaylistBatchRequest(
+        playlist_id="default",
+        operations=[
+            {"op": "insert", "songs": [{"url": "x", "title": "X"}, {"url": "a", "title": "dup"}]},
+            {"op": "insert", "song": {"url": "y", "title": "Y"}},
+            {"op": "remove", "url": "c"},
+            {"op": "move", "from_index": 0, "to_index": 3},
+        ],
+    )
+    result = asyncio.run(playlist_router.playlist_batch(payload, player, shared_playlists, player._lock))
+    validated = PlaylistBatchResponse(**result)
+
+    assert [s["url"] for s in player.runtime_queue.songs] == ["b", "x", "y", "a"]
+    assert validated.added == 2
+    assert validated.skipped == 1
+    assert validated.removed == 1
+    assert validated.current_index == 0
+    assert player.current_index == 0
+    assert broadcasts == [True]
+
+    failing = PlaylistBatchRequest(
+        operations=[
+            {"op": "remove", "index": 0},
+            {"op": "remove", "index": 99},
+        ],
+    )
+    response = asyncio.run(playlist_router.playlist_batch(failing, player, shared_playlists, player._lock))
+    assert response.status_code == 400
+    assert json.loads(response.body)["op_index"] == 1
+    assert [s["url"] for s in player.runtime_queue.songs] == ["b", "x", "y", "a"]
+
+
+def test_playlist_batch_on_shared_playlist_reports_revision_and_broadcasts(tmp_path, monkeypatch):
+    from models.api_contracts import PlaylistBatchRequest
+
+    broadcasts = []
+
+    async def fake_broadcast(player, playlist_updated=False):
+        broadcasts.append(playlist_updated)
+
+    monkeypatch.setattr(playlist_router, "_broadcast_state", fake_broadcast)
+    player = DummyPlayer(songs=[], current_index=-1)
+    shared_playlists = Playlists(str(tmp_path / "playlists.json"))
+    playlist = shared_playlists.create_playlist("Shared")
+
+    def batch(url):
+        payload = PlaylistBatchRequest(playlist_id=playlist.id, operations=[{"op": "insert", "song": {"url": url}}])
+        return asyncio.run(playlist_router.playlist_batch(payload, player, shared_playlists, player._lock))
+
+    first, second = batch("a.mp3"), batch("b.mp3")
+    # 同一时钟刻度内的两次批量修改也有不同的 version，且与 /playlist 的 version 一致
+    assert second["version"] > first["version"]
+    polled = asyncio.run(playlist_router.get_current_playlist(
+        request=None, playlist_id=playlist.id, player=player, playlists=shared_playlists,
+    ))
+    assert polled["version"] == second["version"] == playlist.revision
+    assert broadcasts == [True, True]
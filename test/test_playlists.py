@@ -0,0 +1,130 @@
+import json
+import time
+from pathlib import Path
+
+from models.playlists import Playlist, Playlists
+
+
+def test_playlist_move_range_moves_block():
+    playlist = Playlist(playlist_id="range", songs=[{"url": str(i)} for i in range(6)])
+
+    assert playlist.move_range(1, 3, count=2) is True
+    assert [s["url"] for s in playlist.songs] == ["0", "3", "4", "1", "2", "5"]
+    assert playlist.move_range(5, 0, count=2) is False
+
+
+def test_playlist_url_index_stays_consistent_across_direct_mutations():
+    playlist = Playlist(playlist_id="idx", songs=[{"url": "a"}, {"url": "b"}, {"url": "c"}])
+
+    assert playlist.index_of_url("c") == 2
+    playlist.songs.insert(0, {"url": "z"})
+    assert playlist.index_of_url("c") == 3
+    playlist.songs.append(playlist.songs.pop(1))
+    assert [s["url"] for s in playlist.songs] == ["z", "b", "c", "a"]
+    assert playlist.index_of_url("a") == 3
+    assert playlist.move_range(2, 0, count=2) is True
+    assert playlist.index_of_url("a") == 1
+
+    playlist.songs = [{"url": "only"}]
+    assert playlist.contains_url("only") is True
+    assert playlist.contains_url("a") is False
+    playlist.songs.clear()
+    assert playlist.index_of_url("only") == -1
+
+
+def test_playlist_add_songs_dedups_batch_in_one_pass():
+    playlist = Playlist(playlist_id="batch", songs=[{"url": "a"}, {"url": "b"}])
+
+    added = playlist.add_songs([{"url": "b"}, {"url": "c"}, {"url": "c"}, {"url": "d"}], insert_index=1)
+
+    assert [s["url"] for s in added] == ["c", "d"]
+    assert [s["url"] for s in playlist.songs] == ["a", "c", "d", "b"]
+    assert playlist.add_song({"url": "d"}) is False
+
+
+def test_playlists_save_appends_journal_and_replays_on_load(tmp_path):
+    data_file = tmp_path / "playlists.json"
+    playlists = Playlists(str(data_file))
+    first = playlists.create_playlist("First")
+    time.sleep(0.01)  # 歌单 ID 基于毫秒时间戳
+    second = playlists.create_playlist("Second")
+    playlists._do_save()
+    base_text = data_file.read_text(encoding="utf-8")
+
+    first.add_song({"url": "first-song.mp3", "title": "First Song"})
+    playlists.delete_playlist(second.id)
+    playlists._do_save()
+
+    # 增量保存只追加日志，基准文件保持不变
+    assert data_file.read_text(encoding="utf-8") == base_text
+    journal_file = Path(playlists.journal_file)
+    records = [json.loads(line) for line in journal_file.read_text(encoding="utf-8").splitlines()]
+    assert [r["op"] for r in records] == ["delete", "put", "order"]
+
+    # 模拟崩溃时写了一半的日志行
+    with open(journal_file, "a", encoding="utf-8") as f:
+        f.write('{"op": "put", "playl')
+
+    reloaded = Playlists(str(data_file))
+    assert [p.id for p in reloaded.get_all()] == [first.id]
+    assert reloaded.get_playlist(first.id).songs[0]["url"] == "first-song.mp3"
+
+    reloaded.JOURNAL_COMPACT_RECORDS = 1
+    reloaded.rename_playlist(first.id, "Renamed")
+    reloaded._do_save()
+    assert not journal_file.exists()
+    saved = json.loads(data_file.read_text(encoding="utf-8"))
+    assert saved["playlists"][0]["name"] == "Renamed"
+
+
+def test_playlists_save_journals_same_tick_same_length_edits(tmp_path):
+    data_file = tmp_path / "playlists.json"
+    playlists = Playlists(str(data_file))
+    playlist = playlists.create_playlist("Tick")
+    playlist.songs = [{"url": "a.mp3", "title": "A"}, {"url": "b.mp3", "title": "B"}]
+    playlist.updated_at = 100.0
+    playlists._do_save()
+
+    # 交换顺序：长度与 updated_at 都不变
+    playlist.songs[0], playlist.songs[1] = playlist.songs[1], playlist.songs[0]
+    playlist.updated_at = 100.0
+    playlists._do_save()
+
+    records = [json.loads(line) for line in Path(playlists.journal_file).read_text(encoding="utf-8").splitlines()]
+    assert [r["op"] for r in records] == ["put"]
+    reloaded = Playlists(str(data_file))
+    assert [s["url"] for s in reloaded.get_playlist(playlist.id).songs] == ["b.mp3", "a.mp3"]
+
+
+def test_playlists_replica_sink_forwards_records_without_echo(tmp_path):
+    data_file = tmp_path / "playlists.json"
+    main = Playlists(str(data_file))
+    worker = Playlists(str(data_file))
+    pushed, sent = [], []
+    main.add_change_listener(pushed.extend)
+    worker.set_replica_sink(sent.extend)
+
+    playlist = worker.create_playlist("Worker")
+    playlist.songs = [{"url": "a.mp3", "title": "A"}]
+    playlist.updated_at = 100.0
+    worker._do_save()
+    # 工作进程不落盘，只交出变更记录
+    assert not data_file.exists() and not Path(worker.journal_file).exists()
+    assert sorted(r["op"] for r in sent) == ["order", "put"]
+
+    main.apply_records(sent)
+    main._do_save()
+    assert [s["url"] for s in Playlists(str(data_file)).get_playlist(playlist.id).songs] == ["a.mp3"]
+    assert sorted(r["op"] for r in pushed) == ["order", "put"]
+
+    # 主进程推送回来的记录视为已落盘，不再回传
+    sent.clear()
+    worker.apply_records(pushed, persisted=True)
+    worker._do_save()
+    assert sent == []
+
+    # 本地尚未同步的修改不被推送覆盖
+    worker.get_playlist(playlist.id).songs = [{"url": "b.mp3", "title": "B"}]
+    worker.get_playlist(playlist.id).updated_at = 101.0
+    worker.apply_records(pushed, persisted=True)
+    assert [s["url"] for s in worker.get_playlist(playlist.id).songs] == ["b.mp3"]
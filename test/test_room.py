@@ -0,0 +1,217 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from models.api_contracts import RoomInitRequest
+from routers import room as room_router
+from routers import state as state_router
+
+from dummies import DummyRoomPlayer
+
+
+def test_room_mpv_pool_fills_acquires_and_skips_dead_processes(monkeypatch):
+    from models.mpv_pool import RoomMpvPool
+
+    class FakeProcess:
+        _pids = iter(range(100, 200))
+
+        def __init__(self):
+            self.pid = next(self._pids)
+            self.returncode = None
+
+        def poll(self):
+            return self.returncode
+
+        def terminate(self):
+            self.returncode = 0
+
+        def wait(self, timeout=None):
+            return self.returncode
+
+    spawned = []
+
+    def fake_spawn(ipc_pipe):
+        process = FakeProcess()
+        spawned.append((ipc_pipe, process))
+        return process
+
+    pool = RoomMpvPool(size=2, spawn_fn=fake_spawn, pipe_ready_fn=lambda pipe: True)
+
+    assert pool.fill() == 2
+    assert pool.idle_count() == 2
+    assert all("mpv-ipc-pool-" in pipe for pipe, _ in spawned)
+
+    spawned[0][1].returncode = 1
+    pooled = pool.acquire()
+    assert pooled.process is spawned[1][1]
+    assert pool.acquire() is None
+    assert pool.stats()["hits"] == 1
+    assert pool.stats()["misses"] == 1
+
+    assert pool.fill() == 2
+    pool.shutdown()
+    assert pool.idle_count() == 0
+    assert all(process.returncode is not None for _, process in spawned[2:])
+
+
+def test_room_init_passes_prewarmed_mpv_to_room_player(monkeypatch):
+    room_id = "room-warm"
+    pooled = SimpleNamespace(ipc_pipe=r"\\.\pipe\mpv-ipc-pool-1")
+    created = []
+
+    def fake_create_room_player(**kwargs):
+        player = DummyRoomPlayer(kwargs["room_id"])
+        created.append(player)
+        return player
+
+    monkeypatch.setattr(room_router, "room_mpv_pool", SimpleNamespace(acquire=lambda: pooled))
+    monkeypatch.setattr(room_router, "PlayHistory", lambda max_size=500, room_id="": object())
+    monkeypatch.setattr(room_router.MusicPlayer, "create_room_player", staticmethod(fake_create_room_player))
+    monkeypatch.setattr(room_router, "ROOM_PLAYERS", {})
+    monkeypatch.setattr(room_router, "ROOM_HISTORIES", {})
+    monkeypatch.setattr(room_router, "ROOM_LAST_ACTIVITY", {})
+    monkeypatch.setattr(room_router, "_creating_rooms", set())
+    monkeypatch.setattr(room_router, "ROOM_MAX", 10)
+    monkeypatch.setattr(room_router, "_room_players_lock", threading.Lock())
+    monkeypatch.setattr(room_router, "PLAYLISTS_MANAGER", object())
+    monkeypatch.setattr(room_router, "PLAYER", SimpleNamespace(music_dir=""))
+    monkeypatch.setattr(room_router, "_make_room_broadcast", lambda room_id_arg: None)
+    monkeypatch.setattr(room_router, "touch_room_activity", lambda room_id_arg: None)
+
+    result = asyncio.run(room_router.init_room(RoomInitRequest(room_id=room_id, default_volume=70)))
+
+    assert result["status"] == "ok"
+    assert created[0].pooled is pooled
+
+
+def test_room_status_reads_cached_snapshot_and_supports_field_projection(monkeypatch):
+    room_id = "room-cached"
+    room_player = DummyRoomPlayer(room_id)
+    room_player.start_room_mpv()
+    room_player.current_meta = {"url": "first.mp3", "title": "First", "type": "local"}
+
+    monkeypatch.setattr(room_router, "ROOM_PLAYERS", {room_id: room_player})
+    monkeypatch.setattr(room_router, "ROOM_LAST_ACTIVITY", {room_id: 5.0})
+    monkeypatch.setattr(room_router, "ROOM_MAX", 10)
+    monkeypatch.setattr(room_router, "_room_players_lock", threading.Lock())
+
+    first = asyncio.run(room_router.room_status(room_id))
+    assert first["bot_ready"] is True
+
+    # 健康状态变化在下一次健康检查前不会被探测，状态接口只读快照
+    room_player.pipe_ready = False
+    room_player.current_meta = {"url": "second.mp3", "title": "Second", "type": "local"}
+    cached = asyncio.run(room_router.room_status(room_id))
+    assert cached["bot_ready"] is True
+    assert cached["current_meta"]["url"] == "first.mp3"
+
+    # 事件驱动刷新：只更新元数据，沿用上次健康检查结果
+    state_router.refresh_room_status_snapshot(room_player, check_health=False)
+    projected = asyncio.run(room_router.room_status(room_id, fields="bot_ready,current_meta"))
+    assert json.loads(projected.body) == {
+        "status": "ok",
+        "room_id": room_id,
+        "bot_ready": True,
+        "current_meta": {"url": "second.mp3", "title": "Second", "type": "local"},
+    }
+
+    state_router.refresh_room_status_snapshot(room_player)
+    listed = asyncio.run(room_router.list_rooms(fields="bot_ready"))
+    assert json.loads(listed.body)["rooms"] == [{"room_id": room_id, "bot_ready": False}]
+
+    invalid = asyncio.run(room_router.room_status(room_id, fields="bot_ready,secret"))
+    assert invalid.status_code == 400
+
+
+def test_room_expiry_check_postpones_active_rooms_and_destroys_idle_ones(monkeypatch):
+    active = DummyRoomPlayer("room-active")
+    idle = DummyRoomPlayer("room-idle")
+    now = time.time()
+    scheduled = []
+
+    monkeypatch.setattr(state_router, "ROOM_PLAYERS", {"room-active": active, "room-idle": idle})
+    monkeypatch.setattr(state_router, "ROOM_HISTORIES", {"room-active": object(), "room-idle": object()})
+    monkeypatch.setattr(state_router, "ROOM_LAST_ACTIVITY", {"room-active": now - 10, "room-idle": now - 120})
+    monkeypatch.setattr(state_router, "ROOM_IDLE_TIMEOUT", 60)
+    monkeypatch.setattr(state_router, "_creating_rooms", set())
+    monkeypatch.setattr(state_router, "_room_expiry_scheduled", {"room-active", "room-idle"})
+    monkeypatch.setattr(state_router, "_room_players_lock", threading.Lock())
+    monkeypatch.setattr(
+        state_router, "_schedule_room_expiry",
+        lambda room_id, delay: scheduled.append((room_id, round(delay))),
+    )
+    teardowns = []
+
+    def run_teardown(fn, *args):
+        teardowns.append(args[0])
+        return fn(*args)
+
+    monkeypatch.setattr(state_router, "teardown_tasks", SimpleNamespace(submit=run_teardown))
+
+    state_router._check_room_expiry("room-active")
+    state_router._check_room_expiry("room-idle")
+
+    assert scheduled == [("room-active", 50)]
+    assert teardowns == ["room-idle"]
+    assert active.destroyed is False
+    assert idle.destroyed is True
+    assert "room-idle" not in state_router.ROOM_PLAYERS
+    assert "room-idle" not in state_router.ROOM_HISTORIES
+    assert "room-idle" not in state_router.ROOM_LAST_ACTIVITY
+    assert "room-idle" not in state_router._room_expiry_scheduled
+
+
+def test_room_expiry_is_scheduled_once_under_concurrent_touches(monkeypatch):
+    calls = []
+    monkeypatch.setattr(state_router, "_room_reaper_enabled", True)
+    monkeypatch.setattr(state_router, "_room_expiry_scheduled", set())
+    monkeypatch.setattr(state_router, "ROOM_LAST_ACTIVITY", {})
+    monkeypatch.setattr(
+        state_router, "room_tasks",
+        SimpleNamespace(call_later=lambda delay, fn, *args: calls.append(args)),
+    )
+
+    threads = [threading.Thread(target=state_router.touch_room_activity, args=("room-busy",)) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [("room-busy",)]
+    assert state_router._room_expiry_scheduled == {"room-busy"}
+
+
+def test_room_diagnostics_reports_per_room_resource_usage(monkeypatch):
+    from models.url_cache import url_cache
+
+    room_id = "room-diag"
+    room_player = DummyRoomPlayer(room_id)
+    room_player.mpv_process = SimpleNamespace(pid=None, poll=lambda: None)
+    room_player.runtime_queue.songs = [
+        {"url": "https://www.youtube.com/watch?v=diagVid0001", "title": "A", "type": "youtube"},
+        {"url": "local.mp3", "title": "B", "type": "local"},
+    ]
+    monkeypatch.setattr(url_cache, "enabled", True)
+    monkeypatch.setattr(url_cache, "_cache", {"diagVid0001": {"audio_url": "x", "video_url": None, "expires_at": time.time() + 60}})
+    monkeypatch.setattr(room_router, "ROOM_PLAYERS", {room_id: room_player})
+    monkeypatch.setattr(room_router, "ROOM_HISTORIES", {})
+    monkeypatch.setattr(room_router, "ROOM_LAST_ACTIVITY", {room_id: time.time() - 5})
+    monkeypatch.setattr(room_router, "_room_players_lock", threading.Lock())
+    thread_names = [
+        f"MPVEventListener-{room_id}", f"mpv-stderr-{room_id}",
+        f"MPVEventListener-{room_id}-2", f"mpv-stderr-x{room_id}", "RoomTasksWorker_0",
+    ]
+    monkeypatch.setattr(room_router.threading, "enumerate", lambda: [SimpleNamespace(name=n) for n in thread_names])
+
+    result = asyncio.run(room_router.room_diagnostics())
+
+    assert result["count"] == 1
+    room = result["rooms"][0]
+    assert room["room_id"] == room_id
+    assert room["queue_length"] == 2
+    assert room["url_cache_entries"] == 1
+    assert room["threads"] == [f"MPVEventListener-{room_id}", f"mpv-stderr-{room_id}"]
+    assert room["idle_seconds"] >= 5
+    assert result["url_cache_entries"] == 1
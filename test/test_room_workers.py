@@ -0,0 +1,224 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from routers import dependencies as router_dependencies
+
+
+class _FakeWorkerContext:
+    """线程版 multiprocessing 上下文：真实 Pipe，工作进程换成线程"""
+
+    class _ChildConn:
+        def __init__(self, conn):
+            self.conn = conn
+
+        def close(self):
+            # 主进程侧 close() 在线程版中不能关闭子线程仍在使用的连接
+            pass
+
+    class Process:
+        def __init__(self, target, args, name=None, daemon=None):
+            self._thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+            self.pid = None
+            self.exitcode = None
+
+        def start(self):
+            self._thread.start()
+
+        def join(self, timeout=None):
+            self._thread.join(timeout)
+
+        def is_alive(self):
+            return self._thread.is_alive()
+
+        def terminate(self):
+            pass
+
+    def Pipe(self):
+        import multiprocessing
+        parent, child = multiprocessing.Pipe()
+        return parent, self._ChildConn(child)
+
+
+def _fake_room_worker(log):
+    def target(child, index):
+        conn = child.conn
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            kind, req_id = message[0], message[1]
+            log.append((index, kind, message[2:]))
+            if kind == "stop":
+                return
+            if kind == "crash":
+                conn.close()
+                return
+            if kind == "http":
+                request = message[2]
+                if request["method"] == "POST" and request["path"] == "/room/init":
+                    room_id = json.loads(request["body"])["room_id"]
+                    conn.send(("ws", room_id, {"type": "state_update", "room": room_id},
+                               {"songs": [{"url": "a.mp3"}], "current_index": 0, "time_pos": 42.0, "mpv_pid": None}))
+                result = {"status": 200, "headers": [], "body": json.dumps({"status": "ok", "shard": index}).encode()}
+            elif kind == "export":
+                result = {"songs": [{"url": "b.mp3"}], "current_index": 0, "time_pos": 7.0, "mpv_pid": None}
+            else:
+                result = True
+            conn.send(("reply", req_id, True, result))
+    return target
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_room_worker_pool_routes_recovers_crashed_shards_and_migrates():
+    from models.room_workers import RoomWorkerError, RoomWorkerPool, build_request
+
+    log, events = [], []
+    pool = RoomWorkerPool(shards=2, context=_FakeWorkerContext(), target=_fake_room_worker(log))
+    assert pool.start(event_fn=lambda room_id, message: events.append(room_id))
+    try:
+        # 新房间分配到房间最少的分片，状态广播交给 event_fn 并记录最近状态
+        pool._place("r1", pool.pick_shard(), 80)
+        pool._place("r2", pool.pick_shard(), 60)
+        assert (pool.shard_of("r1"), pool.shard_of("r2")) == (0, 1)
+        assert _wait_until(lambda: sorted(events) == ["r1", "r2"])
+        response = pool.call(1, "http", build_request("GET", "/status", {"room_id": "r2"}))
+        assert json.loads(response["body"]) == {"status": "ok", "shard": 1}
+
+        # 分片崩溃：等待中的请求失败，分片重启后按最近状态恢复房间
+        with pytest.raises(RoomWorkerError):
+            pool.submit(0, "crash").result(5)
+        assert _wait_until(lambda: any(e[:2] == (0, "restore") for e in log))
+        restore = next(e for e in log if e[:2] == (0, "restore"))
+        assert restore[2] == ("r1", {"songs": [{"url": "a.mp3"}], "current_index": 0, "time_pos": 42.0, "mpv_pid": None})
+        assert pool.restarts == 1 and pool.shard_of("r1") == 0
+
+        # 迁移：原分片导出并销毁，目标分片重建并恢复导出的状态
+        assert pool.migrate("r1", 1) == (0, 1)
+        assert (0, "export", ("r1",)) in log
+        assert any(e[0] == 0 and e[1] == "http" and e[2][0]["method"] == "DELETE" for e in log)
+        assert (1, "restore", ("r1", {"songs": [{"url": "b.mp3"}], "current_index": 0, "time_pos": 7.0, "mpv_pid": None})) in log
+        assert pool.shard_of("r1") == 1 and not pool.is_moving("r1")
+
+        # 窗口期内反复崩溃的分片停用，房间迁移到其他分片
+        pool._shards[1].crashes = [time.time(), time.time()]
+        with pytest.raises(RoomWorkerError):
+            pool.submit(1, "crash").result(5)
+        assert _wait_until(lambda: pool.shard_of("r1") == 0 and pool.shard_of("r2") == 0)
+        snapshot = pool.snapshot()
+        assert snapshot["shards"][1]["disabled"] and snapshot["room_count"] == 2
+        assert pool.shard_indexes() == [0]
+        with pytest.raises(RoomWorkerError):
+            pool.submit(1, "http", build_request("GET", "/status")).result(1)
+    finally:
+        pool.stop(timeout=2)
+
+
+def test_room_worker_middleware_forwards_room_routes_to_worker():
+    from fastapi import Depends, FastAPI
+    from models.room_workers import RoomWorkerError, RoomWorkerMiddleware, build_request, run_asgi
+
+    app = FastAPI()
+
+    @app.post("/player/next")
+    async def player_next(player=Depends(router_dependencies.get_player_for_request)):
+        return {"handled": "main"}
+
+    @app.get("/version")
+    async def version():
+        return {"handled": "main"}
+
+    class StubPool:
+        running = True
+        moving = False
+        fail = False
+
+        def __init__(self):
+            self.calls = []
+
+        def shard_of(self, room_id):
+            return 1 if room_id == "remote" else None
+
+        def is_moving(self, room_id):
+            return self.moving
+
+        async def call_async(self, shard, kind, request):
+            if self.fail:
+                raise RoomWorkerError("room worker 1 exited")
+            self.calls.append((shard, kind, request))
+            return {"status": 200, "headers": [(b"content-type", b"application/json")], "body": b'{"handled":"worker"}'}
+
+    pool, touched, routes = StubPool(), [], []
+    middleware = RoomWorkerMiddleware(
+        app, pool=pool, dependencies=(router_dependencies.get_player_for_request,), touch_fn=touched.append
+    )
+
+    async def outer(scope, receive, send):
+        scope["app"] = app
+        try:
+            await middleware(scope, receive, send)
+        finally:
+            routes.append(getattr(scope.get("route"), "path", None))
+
+    def request(method, path, room_id, body=None):
+        response = asyncio.run(run_asgi(outer, build_request(method, path, {"room_id": room_id}, body)))
+        return response["status"], json.loads(response["body"])
+
+    assert request("POST", "/player/next", "remote", {"x": 1}) == (200, {"handled": "worker"})
+    shard, kind, forwarded = pool.calls[-1]
+    assert (shard, kind, forwarded["path"], forwarded["query_string"]) == (1, "http", "/player/next", b"room_id=remote")
+    assert json.loads(forwarded["body"]) == {"x": 1}
+    assert touched == ["remote"] and routes[-1] == "/player/next"
+
+    # 不依赖 RoomPlayer 的路由、主进程房间仍由本进程处理
+    assert request("GET", "/version", "remote") == (200, {"handled": "main"})
+    assert len(pool.calls) == 1
+
+    pool.moving = True
+    assert request("POST", "/player/next", "remote")[0] == 409
+    pool.moving, pool.fail = False, True
+    assert request("POST", "/player/next", "remote") == (503, {"status": "error", "message": "room worker 1 exited"})
+
+
+def test_room_worker_sends_recovery_snapshot_only_when_queue_or_mode_changes():
+    from models.room_workers import RoomWorkerPool, _RoomWorker, _Shard
+
+    sent = []
+    worker = _RoomWorker(SimpleNamespace(send=sent.append), 0)
+    queue = SimpleNamespace(revision=1, songs=[{"url": f"{i}.mp3"} for i in range(500)])
+    player = SimpleNamespace(get_runtime_queue=lambda: queue, mpv_process=None)
+
+    def message(time_pos, index=0):
+        return {"current_index": index, "current_meta": {"url": "0.mp3"}, "loop_mode": 0,
+                "mpv_state": {"time_pos": time_pos, "paused": False, "volume": 70}}
+
+    worker._forward_broadcast("r1", message(1.0), player)
+    worker._forward_broadcast("r1", message(2.0), player)
+    worker._forward_broadcast("r1", message(3.0, index=1), player)
+    queue.revision = 2
+    worker._forward_broadcast("r1", message(4.0, index=1), player)
+    snapshots = [m[3] for m in sent]
+    assert [s is not None for s in snapshots] == [True, False, True, True]
+    assert len(snapshots[0]["songs"]) == 500
+
+    # 主进程用不带快照的广播刷新播放位置，队列沿用最近的快照
+    pool = RoomWorkerPool(shards=1)
+    pool._shards = [_Shard(0)]
+    pool.register("r1", 0)
+    pool._dispatch(pool._shards[0], sent[0])
+    pool._dispatch(pool._shards[0], sent[1])
+    state = pool._rooms["r1"]["state"]
+    assert state["time_pos"] == 2.0 and state["volume"] == 70 and len(state["songs"]) == 500
@@ -1,6 +1,5 @@
 import asyncio
 import json
-import os
 import threading
 from pathlib import Path
 from types import SimpleNamespace
@@ -67,204 +66,16 @@ from routers import settings as settings_router
 from routers import state as state_router
 from routers import websocket as websocket_router
 
-
-class DummyRequest:
-    def __init__(self, json_data=None, form_data=None, query_params=None, headers=None, client=None):
-        self._json_data = json_data or {}
-        self._form_data = form_data or {}
-        self.query_params = query_params or {}
-        self.headers = headers or {}
-        self.client = client
-
-    async def json(self):
-        return self._json_data
-
-    async def form(self):
-        return self._form_data
-
-
-class DummyDependencyRequest:
-    def __init__(self, *, room_id=None, pipe=None, path="/status"):
-        query_params = {}
-        if room_id is not None:
-            query_params["room_id"] = room_id
-        if pipe is not None:
-            query_params["pipe"] = pipe
-        self.query_params = query_params
-        self.url = SimpleNamespace(path=path)
-
-
-class DummyQueue:
-    def __init__(self, playlist_id="default", name="正在播放", songs=None):
-        self.id = playlist_id
-        self.name = name
-        self.songs = list(songs or [])
-        self.updated_at = 0
-        self.current_playing_index = -1
-
-
-class DummyPlayer:
-    def __init__(self, songs=None, current_meta=None, current_index=-1):
-        self.runtime_queue = DummyQueue(songs=songs)
-        self.current_meta = current_meta or {}
-        self.current_index = current_index
-        self.loop_mode = 0
-        self.shuffle_mode = False
-        self.pitch_shift = 0
-        self._lock = threading.RLock()
-        self.mpv_cmd = None
-        self.pipe_name = r"\\.\pipe\mpv-pipe"
-        self.pipe_ready = True
-        self.mpv_state = {
-            "pause": False,
-            "time-pos": 0,
-            "duration": 0,
-            "volume": 50,
-        }
-        self.local_file_tree = {"name": "root", "dirs": [], "files": []}
-        self.local_albums = []
-        self.local_search_max_results = 5
-        self.youtube_search_max_results = 8
-        self.youtube_url_extra_max = 16
-        self.music_dir = os.getcwd()
-        self.allowed_extensions = {".mp3", ".flac"}
-        self.config = {"LOCAL_VOLUME": "50"}
-        self.refresh_called = False
-
-    def get_runtime_queue(self):
-        self.runtime_queue.current_playing_index = self.current_index
-        return self.runtime_queue
-
-    def mpv_command(self, cmd, *_args, **_kwargs):
-        if cmd[:2] == ["set_property", "volume"] and len(cmd) >= 3:
-            self.mpv_state["volume"] = int(cmd[2])
-        return True
-
-    def mpv_get(self, property_name):
-        return self.mpv_state.get(property_name)
-
-    def search_local(self, query, max_results=20):
-        return [{"url": f"{query}.mp3", "title": query, "type": "local", "duration": 0}][:max_results]
-
-    def mpv_pipe_exists(self):
-        return self.pipe_ready
-
-    def ensure_mpv(self):
-        return True
-
-    def is_room_output_ready(self):
-        return True
-
-    def reset_pitch_shift(self):
-        self.pitch_shift = 0
-
-    def toggle_loop_mode(self):
-        self.loop_mode = (self.loop_mode + 1) % 3
-
-    def toggle_shuffle_mode(self):
-        self.shuffle_mode = not self.shuffle_mode
-
-    def set_pitch_shift(self, semitones):
-        self.pitch_shift = semitones
-
-    def play(self, song, **_kwargs):
-        self.current_meta = song.to_dict()
-        return True
-
-    def get_current_meta_snapshot(self):
-        return dict(self.current_meta)
-
-    def get_local_albums(self):
-        return list(self.local_albums)
-
-    def refresh_local_library_cache(self):
-        self.refresh_called = True
-        return list(self.local_albums)
-
-
-class DummyRoomPlayer(DummyPlayer):
-    def __init__(self, room_id):
-        super().__init__()
-        self._room_id = room_id
-        self._room_playlist_id = f"room_{room_id}"
-        self._pcm_pipe_name = rf"\\.\pipe\pcm-{room_id}"
-        self.runtime_queue.id = self._room_playlist_id
-        self.runtime_queue.name = f"Room {room_id}"
-        self.mpv_process = None
-        self.pipe_ready = False
-        self.started = False
-        self.destroyed = False
-
-    def start_room_mpv(self):
-        self.started = True
-        self.pipe_ready = True
-        self.mpv_process = SimpleNamespace(poll=lambda: None)
-        return True
-
-    def is_room_output_ready(self):
-        return self.pipe_ready
-
-    def destroy_room_player(self):
-        self.destroyed = True
-
-
-class DummyHistory:
-    def __init__(self, items):
-        self._items = list(items)
-        self.add_calls = []
-
-    def get_all(self):
-        return list(self._items)
-
-    def add_to_history(self, *args, **kwargs):
-        self.add_calls.append((args, kwargs))
-
-    def remove_by_url(self, url):
-        before = len(self._items)
-        self._items = [item for item in self._items if item.get("url") != url]
-        return len(self._items) != before
-
-
-class DummyWebSocket:
-    def __init__(self, query_params=None):
-        self.accepted = False
-        self.closed = None
-        self.messages = []
-        self.query_params = query_params or {}
-        self.receive_count = 0
-
-    async def accept(self):
-        self.accepted = True
-
-    async def send_json(self, message):
-        self.messages.append(message)
-
-    async def close(self, code=1000, reason=""):
-        self.closed = {"code": code, "reason": reason}
-
-    async def receive_text(self):
-        self.receive_count += 1
-        raise websocket_router.WebSocketDisconnect()
-
-
-class DummyWsManager:
-    def __init__(self):
-        self.connected = []
-        self.disconnected = []
-
-    async def connect(self, websocket, room_id=None):
-        self.connected.append((websocket, room_id))
-
-    def disconnect(self, websocket):
-        self.disconnected.append(websocket)
-
-
-def _get_route(router_obj, path, method):
-    routes = router_obj.routes if hasattr(router_obj, "routes") else router_obj
-    for route in routes:
-        if getattr(route, "path", None) == path and method in getattr(route, "methods", set()):
-            return route
-    raise AssertionError(f"route not found: {method} {path}")
+from dummies import (
+    DummyRequest,
+    DummyDependencyRequest,
+    DummyPlayer,
+    DummyRoomPlayer,
+    DummyHistory,
+    DummyWebSocket,
+    DummyWsManager,
+    get_route,
+)
 
 
 def test_prev_track_walks_backward_without_rewriting_history(monkeypatch):
@@ -339,48 +150,48 @@ def test_runtime_queue_add_broadcasts_playlist_updated(monkeypatch):
 
 
 def test_player_router_registers_core_response_models():
-    assert _get_route(player_router.router, "/play", "POST").response_model is PlaySuccessResponse
-    assert _get_route(player_router.router, "/debug/pipe-check", "GET").response_model is DebugPipeCheckResponse
-    assert _get_route(player_router.router, "/play_song", "POST").response_model is PlaySuccessResponse
-    assert _get_route(player_router.router, "/next", "POST").response_model is PlaybackAdvanceResponse
-    assert _get_route(player_router.router, "/prev", "POST").response_model is PlaybackAdvanceResponse
-    assert set(get_args(_get_route(player_router.router, "/status", "GET").response_model)) == {
+    assert get_route(player_router.router, "/play", "POST").response_model is PlaySuccessResponse
+    assert get_route(player_router.router, "/debug/pipe-check", "GET").response_model is DebugPipeCheckResponse
+    assert get_route(player_router.router, "/play_song", "POST").response_model is PlaySuccessResponse
+    assert get_route(player_router.router, "/next", "POST").response_model is PlaybackAdvanceResponse
+    assert get_route(player_router.router, "/prev", "POST").response_model is PlaybackAdvanceResponse
+    assert set(get_args(get_route(player_router.router, "/status", "GET").response_model)) == {
         PlayerStatusResponse,
         PlayerStatusErrorResponse,
     }
-    assert _get_route(player_router.router, "/pause", "POST").response_model is PauseToggleResponse
-    assert _get_route(player_router.router, "/toggle_pause", "POST").response_model is PauseToggleResponse
-    assert _get_route(player_router.router, "/seek", "POST").response_model is SeekResponse
-    assert _get_route(player_router.router, "/loop", "POST").response_model is LoopModeResponse
-    assert _get_route(player_router.router, "/shuffle", "POST").response_model is ShuffleModeResponse
-    assert _get_route(player_router.router, "/pitch", "POST").response_model is PitchShiftResponse
-    assert _get_route(player_router.router, "/youtube_extract_playlist", "POST").response_model is YoutubeExtractPlaylistResponse
-    assert _get_route(player_router.router, "/play_youtube_playlist", "POST").response_model is PlayYoutubePlaylistResponse
+    assert get_route(player_router.router, "/pause", "POST").response_model is PauseToggleResponse
+    assert get_route(player_router.router, "/toggle_pause", "POST").response_model is PauseToggleResponse
+    assert get_route(player_router.router, "/seek", "POST").response_model is SeekResponse
+    assert get_route(player_router.router, "/loop", "POST").response_model is LoopModeResponse
+    assert get_route(player_router.router, "/shuffle", "POST").response_model is ShuffleModeResponse
+    assert get_route(player_router.router, "/pitch", "POST").response_model is PitchShiftResponse
+    assert get_route(player_router.router, "/youtube_extract_playlist", "POST").response_model is YoutubeExtractPlaylistResponse
+    assert get_route(player_router.router, "/play_youtube_playlist", "POST").response_model is PlayYoutubePlaylistResponse
 
 
 def test_playlist_search_settings_history_media_and_room_routes_register_response_models():
-    assert _get_route(playlist_router.router, "/playlists", "GET").response_model is PlaylistsListResponse
-    assert _get_route(playlist_router.router, "/playlists", "POST").response_model is PlaylistCreateRestResponse
-    assert _get_route(playlist_router.router, "/playlist_create", "POST").response_model is PlaylistCreateResponse
-    assert _get_route(playlist_router.router, "/playlist", "GET").response_model is PlaylistQueryResponse
-    assert _get_route(playlist_router.router, "/playlists/{playlist_id}", "PUT").response_model is PlaylistRenameResponse
-    assert _get_route(search_router.router, "/search_song", "POST").response_model is SearchSongResponse
-    assert _get_route(settings_router.router, "/version", "GET").response_model is VersionResponse
-    assert _get_route(settings_router.router, "/settings", "POST").response_model is SettingsMutationResponse
-    assert _get_route(settings_router.router, "/settings/schema", "GET").response_model is SettingsSchemaResponse
-    assert _get_route(settings_router.router, "/ui-config", "GET").response_model is UIConfigResponse
-    assert _get_route(settings_router.router, "/diagnostic/instance-status", "GET").response_model is DiagnosticInstanceStatusResponse
-    assert _get_route(history_router.router, "/playback_history", "GET").response_model is PlaybackHistoryResponse
-    assert _get_route(history_router.router, "/playback_history_merged", "GET").response_model is PlaybackHistoryMergedResponse
-    assert _get_route(history_router.router, "/song_add_to_history", "POST").response_model is StatusMessageResponse
-    assert _get_route(history_router.router, "/playback_history_delete", "POST").response_model is StatusMessageResponse
-    assert _get_route(media_router.router, "/refresh_video_url", "POST").response_model is RefreshVideoUrlResponse
-    assert _get_route(media_router.router, "/volume", "POST").response_model is VolumeResponse
-    assert _get_route(media_router.router, "/volume/defaults", "GET").response_model is VolumeDefaultsResponse
-    assert _get_route(room_router.router, "/room/init", "POST").response_model is RoomInitResponse
-    assert _get_route(room_router.router, "/room/{room_id}", "DELETE").response_model is RoomDestroyResponse
-    assert _get_route(room_router.router, "/room/{room_id}/status", "GET").response_model is RoomStatusResponse
-    assert _get_route(room_router.router, "/room/list", "GET").response_model is RoomListResponse
+    assert get_route(playlist_router.router, "/playlists", "GET").response_model is PlaylistsListResponse
+    assert get_route(playlist_router.router, "/playlists", "POST").response_model is PlaylistCreateRestResponse
+    assert get_route(playlist_router.router, "/playlist_create", "POST").response_model is PlaylistCreateResponse
+    assert get_route(playlist_router.router, "/playlist", "GET").response_model is PlaylistQueryResponse
+    assert get_route(playlist_router.router, "/playlists/{playlist_id}", "PUT").response_model is PlaylistRenameResponse
+    assert get_route(search_router.router, "/search_song", "POST").response_model is SearchSongResponse
+    assert get_route(settings_router.router, "/version", "GET").response_model is VersionResponse
+    assert get_route(settings_router.router, "/settings", "POST").response_model is SettingsMutationResponse
+    assert get_route(settings_router.router, "/settings/schema", "GET").response_model is SettingsSchemaResponse
+    assert get_route(settings_router.router, "/ui-config", "GET").response_model is UIConfigResponse
+    assert get_route(settings_router.router, "/diagnostic/instance-status", "GET").response_model is DiagnosticInstanceStatusResponse
+    assert get_route(history_router.router, "/playback_history", "GET").response_model is PlaybackHistoryResponse
+    assert get_route(history_router.router, "/playback_history_merged", "GET").response_model is PlaybackHistoryMergedResponse
+    assert get_route(history_router.router, "/song_add_to_history", "POST").response_model is StatusMessageResponse
+    assert get_route(history_router.router, "/playback_history_delete", "POST").response_model is StatusMessageResponse
+    assert get_route(media_router.router, "/refresh_video_url", "POST").response_model is RefreshVideoUrlResponse
+    assert get_route(media_router.router, "/volume", "POST").response_model is VolumeResponse
+    assert get_route(media_router.router, "/volume/defaults", "GET").response_model is VolumeDefaultsResponse
+    assert get_route(room_router.router, "/room/init", "POST").response_model is RoomInitResponse
+    assert get_route(room_router.router, "/room/{room_id}", "DELETE").response_model is RoomDestroyResponse
+    assert get_route(room_router.router, "/room/{room_id}/status", "GET").response_model is RoomStatusResponse
+    assert get_route(room_router.router, "/room/list", "GET").response_model is RoomListResponse
 
 
 def test_get_status_payload_matches_response_schema():
@@ -682,7 +493,7 @@ def test_room_init_registers_player_and_history(monkeypatch):
     history_instances = []
 
     class DummyPlayHistory:
-        def __init__(self, max_size=500):
+        def __init__(self, max_size=500, room_id=""):
             self.max_size = max_size
             history_instances.append(self)
 
@@ -1387,4 +1198,4 @@ def test_switch_playlist_accepts_default_alias_for_room_runtime_queue():
     assert result["status"] == "OK"
     assert result["playlist"]["id"] == "room_room-theta"
     assert result["playlist"]["name"] == "Room room-theta"
-    assert result["playlist"]["count"] == 1
\ No newline at end of file
+    assert result["playlist"]["count"] == 1
@@ -0,0 +1,39 @@
+import threading
+import time
+
+
+def test_task_scheduler_runs_timers_in_order_and_polls_until_done():
+    from models.scheduler import TaskScheduler
+
+    scheduler = TaskScheduler(max_workers=1, name="TestScheduler")
+    try:
+        fired = []
+        done = threading.Event()
+        scheduler.submit(lambda: None).result(timeout=2)  # 预先启动计时线程与线程池
+        base = time.monotonic()
+        scheduler.call_at(base + 0.4, lambda: (fired.append("late"), done.set()))
+        scheduler.call_at(base + 0.2, fired.append, "early")
+        scheduler.call_at(base + 0.3, fired.append, "cancelled").cancel()
+        assert done.wait(2)
+        assert fired == ["early", "late"]
+
+        attempts = []
+        finished = threading.Event()
+
+        def _probe():
+            attempts.append(len(attempts) + 1)
+            if len(attempts) == 3:
+                finished.set()
+                return True
+            return False
+
+        scheduler.poll(0.01, 10, _probe)
+        assert finished.wait(2)
+        time.sleep(0.05)
+        assert attempts == [1, 2, 3]
+
+        exhausted = threading.Event()
+        scheduler.poll(0.01, 2, lambda: False, on_exhausted=exhausted.set)
+        assert exhausted.wait(2)
+    finally:
+        scheduler.shutdown()
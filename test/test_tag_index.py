@@ -0,0 +1,77 @@
+import json
+import os
+
+
+def test_tag_index_scans_changed_files_and_enriches_local_songs(tmp_path):
+    import wave
+
+    from models.tag_index import TagIndex
+
+    music_dir = tmp_path / "music"
+    (music_dir / "album").mkdir(parents=True)
+    for name, frames in (("a.wav", 8000), ("b.wav", 16000)):
+        with wave.open(str(music_dir / "album" / name), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(8000)
+            w.writeframes(b"\0\0" * frames)
+    (music_dir / "album" / "broken.mp3").write_bytes(b"not audio")
+
+    index = TagIndex(cache_file=str(tmp_path / "tag_index.json"), workers=1)
+    rels = ["album/a.wav", "album/b.wav", "album/broken.mp3"]
+    assert index.scan(str(music_dir), rels) == 3
+    assert index.get("album/b.wav")["duration"] == 2.0
+
+    song = index.enrich_song({"url": "album/a.wav", "title": "a", "type": "local", "duration": 0})
+    assert song["duration"] == 1.0 and song["has_cover"] is False
+    stream = {"url": "https://example.com/a.wav", "type": "stream", "duration": 0}
+    assert index.enrich_song(dict(stream)) == stream
+
+    # 未变化的文件不会重复解析；删除的文件移出索引
+    (music_dir / "album" / "b.wav").unlink()
+    version = index.version
+    assert index.scan(str(music_dir), rels) == 0
+    assert index.get("album/b.wav") is None and index.version > version
+
+    reloaded = TagIndex(cache_file=str(tmp_path / "tag_index.json"), workers=0)
+    reloaded.load()
+    assert reloaded.scan(str(music_dir), rels) == 0
+    assert reloaded.get("album/a.wav")["duration"] == 1.0
+
+
+def test_tag_index_saves_tags_before_loudness_and_after_each_batch(tmp_path, monkeypatch):
+    import models.loudness as loudness_module
+    import models.tag_index as tag_index_module
+    from models.loudness import LoudnessAnalyzer
+    from models.tag_index import TagIndex
+
+    analyzer = LoudnessAnalyzer(ffmpeg_fn=lambda: "ffmpeg")
+    analyzer.enabled = True
+    monkeypatch.setattr(loudness_module, "loudness", analyzer)
+    monkeypatch.setattr(tag_index_module, "SCAN_BATCH_SIZE", 1)
+    cache_file = tmp_path / "tag_index.json"
+    index = TagIndex(cache_file=str(cache_file), workers=0)
+    seen = []
+
+    def fake_analyze(ffmpeg, source, timeout=None):
+        # 标签阶段的结果与之前批次的响度都已落盘
+        saved = json.loads(cache_file.read_text(encoding="utf-8"))
+        seen.append((os.path.basename(source), sorted(saved), sorted(r for r, e in saved.items() if "lufs" in e)))
+        if source.endswith("b.mp3"):
+            index._pending_scan = (str(tmp_path), [])
+        return {"lufs": -20.0, "peak": -6.0}
+
+    monkeypatch.setattr(loudness_module, "analyze_loudness", fake_analyze)
+    for name in ("a.mp3", "b.mp3", "c.mp3"):
+        (tmp_path / name).write_bytes(b"x")
+    index.scan(str(tmp_path), ["a.mp3", "b.mp3", "c.mp3"])
+    analyzer.shutdown()
+
+    assert seen == [
+        ("a.mp3", ["a.mp3", "b.mp3", "c.mp3"], []),
+        ("b.mp3", ["a.mp3", "b.mp3", "c.mp3"], ["a.mp3"]),
+    ]
+    # 排队的扫描优先：c.mp3 留给下一次扫描；已分析的批次递增版本并落盘
+    saved = json.loads(cache_file.read_text(encoding="utf-8"))
+    assert saved["b.mp3"]["lufs"] == -20.0 and "lufs" not in saved["c.mp3"]
+    assert index.version == 3 + 2  # 三批标签 + 两批响度
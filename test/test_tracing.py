@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+
+def test_tracing_middleware_keeps_slowest_traces_per_route_with_nested_spans():
+    import threading
+    from models.tracing import TraceStore, TracingMiddleware, span, traced_lock
+
+    store = TraceStore(per_route=2, enabled=True)
+    lock = threading.Lock()
+
+    def play_in_thread(delay):
+        with span("song.play"):
+            with span("ytdlp.resolve"):
+                time.sleep(delay)
+
+    async def app(scope, receive, send):
+        delay = float(scope["path"].rsplit("/", 1)[-1])
+        scope["route"] = SimpleNamespace(path="/next/{delay}")
+        with traced_lock(lock):
+            await asyncio.to_thread(play_in_thread, delay)
+        with span("broadcast"):
+            pass
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    async def main():
+        middleware = TracingMiddleware(app, store=store)
+        for delay in ("0.01", "0.05", "0.001", "0.03"):
+            await middleware({"type": "http", "method": "POST", "path": f"/next/{delay}"}, None, send)
+
+    asyncio.run(main())
+    assert store.finished == 4 and store.routes() == ["/next/{delay}"]
+    slowest = [trace.to_dict() for trace in store.slowest("/next/{delay}")]
+    assert [t["path"] for t in slowest] == ["/next/0.05", "/next/0.03"]
+    spans = slowest[0]["spans"]
+    assert [s["name"] for s in spans] == ["lock_wait", "song.play", "ytdlp.resolve", "broadcast"]
+    assert spans[2]["parent"] == 1 and spans[1]["parent"] is None
+    assert spans[2]["duration_ms"] >= 45 and slowest[0]["status"] == 200
+
+    # 没有活动 Trace 时 span 为空操作
+    with span("outside"):
+        pass
+    events = store.chrome_trace(limit=1)["traceEvents"]
+    assert {e["ph"] for e in events} == {"M", "X"}
+    assert [e["name"] for e in events if e.get("cat") == "span"] == [s["name"] for s in spans]
+
+
+def test_tracing_middleware_groups_unmatched_paths_under_one_route():
+    from models.access_log import UNMATCHED_ROUTE
+    from models.tracing import TraceStore, TracingMiddleware
+
+    store = TraceStore(per_route=2, enabled=True)
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 404, "headers": []})
+
+    async def send(message):
+        pass
+
+    async def main():
+        middleware = TracingMiddleware(app, store=store)
+        for i in range(20):
+            await middleware({"type": "http", "method": "GET", "path": f"/scan/{i}"}, None, send)
+
+    asyncio.run(main())
+    assert store.finished == 20 and store.routes() == [UNMATCHED_ROUTE]
+    assert len(store.slowest(UNMATCHED_ROUTE)) == 2
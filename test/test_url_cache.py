@@ -0,0 +1,46 @@
+import threading
+import time
+
+
+def test_url_cache_resolve_is_single_flight_and_keeps_metadata(monkeypatch):
+    from models.url_cache import URLCache
+
+    cache = URLCache()
+    cache.enabled = True
+    calls = []
+    release = threading.Event()
+    expire = int(time.time()) + 1000
+
+    def fake_fetch(video_id, youtube_url, yt_dlp_exe):
+        calls.append(video_id)
+        release.wait(2)
+        return {
+            "audio_url": f"https://rr1.googlevideo.com/videoplayback?expire={expire}&id={video_id}",
+            "video_url": None,
+            "meta": {"title": "Shared Song", "duration": 212, "uploader": "Artist"},
+        }
+
+    monkeypatch.setattr(cache, "_fetch_both", fake_fetch)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.resolve("vidShared01", "https://youtu.be/vidShared01", "yt-dlp")))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert calls == ["vidShared01"]
+    assert len(results) == 3
+    assert all(result and "expire=" in result["audio_url"] for result in results)
+    assert cache.get("vidShared01")["expires_at"] <= expire - 300
+    assert cache.get_metadata("vidShared01")["title"] == "Shared Song"
+    assert cache.get_metadata("vidShared01")["duration"] == 212
+
+    # 已缓存：再次解析不触发 yt-dlp
+    assert cache.resolve("vidShared01", "https://youtu.be/vidShared01", "yt-dlp")["audio_url"]
+    assert calls == ["vidShared01"]